@@ -12,14 +12,17 @@ import PixivServer.routers
 import PixivServer.routers.database
 import PixivServer.routers.dlq
 import PixivServer.routers.download_queue
+import PixivServer.routers.files
 import PixivServer.routers.health
 import PixivServer.routers.metadata_queue
 import PixivServer.routers.metrics
 import PixivServer.routers.server
+import PixivServer.routers.thumbnails
 
 # import PixivServer.routers.subscription
 import PixivServer.service
 import PixivServer.service.pixiv
+import PixivServer.service.thumbnails
 from PixivServer.config.server import config as server_config
 from PixivServer.metrics import (
     HTTP_REQUEST_DURATION,
@@ -28,7 +31,11 @@ from PixivServer.metrics import (
     HTTP_RESPONSE_SIZE,
     SERVER_INFO,
 )
+from PixivServer.repository.async_pixivutil import async_repository
+from PixivServer.repository.snapshot import database_snapshot
+from PixivServer.service.maintenance import periodic_database_maintenance
 from PixivServer.service.metrics import periodic_metrics_collector
+from PixivServer.service.snapshot import periodic_snapshot_refresher
 from PixivServer.utils import get_version
 
 logger = logging.getLogger('uvicorn.pixivutil')
@@ -46,12 +53,19 @@ async def lifespan(_: FastAPI):
     except Exception as e:
         print(f"Encountered exception during application setup: {traceback.format_exc()}")
         raise e
-    collector_task = asyncio.create_task(periodic_metrics_collector())
+    background_tasks = [asyncio.create_task(periodic_metrics_collector())]
+    if database_snapshot.enabled:
+        background_tasks.append(asyncio.create_task(periodic_snapshot_refresher()))
+    if server_config.database_maintenance:
+        background_tasks.append(asyncio.create_task(periodic_database_maintenance()))
     yield
     # shutdown actions
-    collector_task.cancel()
-    await asyncio.gather(collector_task, return_exceptions=True)
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
     PixivServer.service.pixiv.service.close()
+    PixivServer.service.thumbnails.thumbnail_cache.close()
+    async_repository.close()
     # PixivServer.service.subscription_service.close()
 
 logger.info("Starting PixivUtil Server...")
@@ -118,6 +132,16 @@ app.include_router(
     prefix="/api/database",
     dependencies=auth_dependency,
 )
+app.include_router(
+    PixivServer.routers.files.router,
+    prefix="/api/files",
+    dependencies=auth_dependency,
+)
+app.include_router(
+    PixivServer.routers.thumbnails.router,
+    prefix="/api/thumbnails",
+    dependencies=auth_dependency,
+)
 app.include_router(
     PixivServer.routers.dlq.router,
     prefix="/api/queue/dead-letter",
@@ -14,4 +14,70 @@ class ServerConfig:
             raise ValueError(f"Unrecognized environment: {server_env}")
         self.server_env: Literal["production", "development"] = server_env
 
+        # Files served by /api/files must resolve inside this directory.
+        self.downloads_dir = os.getenv("PIXIVUTIL_SERVER_DOWNLOADS_DIR", "./downloads")
+        # When set (e.g. "/_downloads"), file responses are offloaded to the reverse proxy with
+        # X-Accel-Redirect to this internal location, which must alias `downloads_dir`.
+        accel_redirect_prefix = os.getenv("PIXIVUTIL_SERVER_ACCEL_REDIRECT_PREFIX")
+        self.accel_redirect_prefix = accel_redirect_prefix.rstrip("/") if accel_redirect_prefix else None
+        # Number of open ZIP archives kept for serving archive-mode pages.
+        self.zip_cache_size = int(os.getenv("PIXIVUTIL_SERVER_ZIP_CACHE_SIZE", "32"))
+        # How duplicate downloads are replaced: "hardlink" works everywhere, "reflink" needs a
+        # copy-on-write filesystem (btrfs, XFS) but keeps each path independently writable.
+        dedup_mode = os.getenv("PIXIVUTIL_SERVER_DEDUP_MODE", "hardlink")
+        if dedup_mode != "hardlink" and dedup_mode != "reflink":
+            raise ValueError(f"Unrecognized dedup mode: {dedup_mode}")
+        self.dedup_mode: Literal["hardlink", "reflink"] = dedup_mode
+        # Hash and deduplicate an artwork's files right after it is downloaded.
+        self.dedup_on_download = os.getenv("PIXIVUTIL_SERVER_DEDUP_ON_DOWNLOAD", "false").lower() in ("1", "true", "yes")
+        # Keep-alive connections kept open per upstream host (Pixiv pages, i.pximg.net) by the worker.
+        self.upstream_pool_size = int(os.getenv("PIXIVUTIL_SERVER_UPSTREAM_POOL_SIZE", "8"))
+        # Idle pooled connections older than this are closed instead of reused.
+        self.upstream_idle_timeout_seconds = float(os.getenv("PIXIVUTIL_SERVER_UPSTREAM_IDLE_TIMEOUT_SECONDS", "60"))
+        # Parsed member, artwork and series pages are cached in this SQLite file for the worker and
+        # server to share; it outlives worker restarts. A TTL of 0 disables the cache.
+        self.upstream_cache_db = os.getenv("PIXIVUTIL_SERVER_UPSTREAM_CACHE_DB", "./.pixivUtil2/db/upstream_cache.sqlite")
+        self.upstream_cache_ttl_seconds = float(os.getenv("PIXIVUTIL_SERVER_UPSTREAM_CACHE_TTL_SECONDS", "600"))
+        self.upstream_cache_max_entries = int(os.getenv("PIXIVUTIL_SERVER_UPSTREAM_CACHE_MAX_ENTRIES", "10000"))
+        # Related tags are kept for this many of the most used tags, chosen by each tag statistics rebuild.
+        self.tag_stats_top_tags = int(os.getenv("PIXIVUTIL_SERVER_TAG_STATS_TOP_TAGS", "1000"))
+        # Database API reads run on their own thread pool, one connection per thread, so slow
+        # queries cannot starve the threads other endpoints run on.
+        self.database_read_workers = int(os.getenv("PIXIVUTIL_SERVER_DATABASE_READ_WORKERS", "4"))
+        # Reads waiting for a thread beyond this are rejected with 503 instead of queueing.
+        self.database_max_queued_reads = int(os.getenv("PIXIVUTIL_SERVER_DATABASE_MAX_QUEUED_READS", "100"))
+        # Reads running longer than this are interrupted and answered with 504; 0 disables the limit.
+        self.database_query_timeout_seconds = float(os.getenv("PIXIVUTIL_SERVER_DATABASE_QUERY_TIMEOUT_SECONDS", "30"))
+        # Serve database API reads from a copy of the database refreshed every interval with the
+        # SQLite backup API, so readers never hold the live database's WAL back from checkpointing.
+        self.database_snapshot = os.getenv("PIXIVUTIL_SERVER_DATABASE_SNAPSHOT", "false").lower() in ("1", "true", "yes")
+        self.database_snapshot_path = os.getenv("PIXIVUTIL_SERVER_DATABASE_SNAPSHOT_PATH", "./.pixivUtil2/db/db.snapshot.sqlite")
+        self.database_snapshot_interval_seconds = float(os.getenv("PIXIVUTIL_SERVER_DATABASE_SNAPSHOT_INTERVAL_SECONDS", "60"))
+        # Reads fall back to the live database while the snapshot is older than this.
+        self.database_snapshot_max_staleness_seconds = float(
+            os.getenv("PIXIVUTIL_SERVER_DATABASE_SNAPSHOT_MAX_STALENESS_SECONDS", "600")
+        )
+        # Pages copied per backup step; the live database is free for the writer between steps.
+        self.database_snapshot_pages_per_step = int(os.getenv("PIXIVUTIL_SERVER_DATABASE_SNAPSHOT_PAGES_PER_STEP", "4096"))
+        # Background maintenance of the live database: WAL checkpoints, planner statistics and
+        # incremental vacuum.
+        self.database_maintenance = os.getenv("PIXIVUTIL_SERVER_DATABASE_MAINTENANCE", "true").lower() in ("1", "true", "yes")
+        self.database_maintenance_interval_seconds = float(
+            os.getenv("PIXIVUTIL_SERVER_DATABASE_MAINTENANCE_INTERVAL_SECONDS", "60")
+        )
+        # The WAL is checkpointed and truncated once it grows past this.
+        self.wal_checkpoint_threshold_mb = float(os.getenv("PIXIVUTIL_SERVER_WAL_CHECKPOINT_THRESHOLD_MB", "64"))
+        self.database_optimize_interval_seconds = float(
+            os.getenv("PIXIVUTIL_SERVER_DATABASE_OPTIMIZE_INTERVAL_SECONDS", "21600")
+        )
+        # Free pages returned per incremental vacuum step while the queue is idle; 0 disables it.
+        self.incremental_vacuum_pages = int(os.getenv("PIXIVUTIL_SERVER_INCREMENTAL_VACUUM_PAGES", "1000"))
+        # PixivUtil2 commits every write on its own. The worker groups them into one transaction
+        # of up to this many writes, committed at the latest on the first write after the delay
+        # and when a job ends. 1 commits every write.
+        self.database_write_batch_size = int(os.getenv("PIXIVUTIL_SERVER_DATABASE_WRITE_BATCH_SIZE", "100"))
+        if self.database_write_batch_size < 1:
+            raise ValueError(f"Database write batch size must be at least 1: {self.database_write_batch_size}")
+        self.database_write_batch_seconds = float(os.getenv("PIXIVUTIL_SERVER_DATABASE_WRITE_BATCH_SECONDS", "2"))
+
 config = ServerConfig()
@@ -0,0 +1,29 @@
+import os
+from typing import Literal
+
+SQLITE_TEMP_STORES = ("default", "file", "memory")
+
+
+class SQLiteConfig:
+    """
+    Performance profile applied to every connection to the PixivUtil2 database, by the
+    server and the worker.
+    """
+
+    def __init__(self):
+        # Memory-mapped I/O reads pages straight from the OS page cache instead of copying them
+        # into SQLite's own cache. 0 disables it.
+        self.mmap_size_mb = int(os.getenv("PIXIVUTIL_SERVER_SQLITE_MMAP_SIZE_MB", "256"))
+        # Page cache per connection; SQLite's default is about 2 MB.
+        self.cache_size_mb = int(os.getenv("PIXIVUTIL_SERVER_SQLITE_CACHE_SIZE_MB", "32"))
+        # Where sorts, DISTINCT and other temporary tables are kept.
+        temp_store = os.getenv("PIXIVUTIL_SERVER_SQLITE_TEMP_STORE", "memory").lower()
+        if temp_store not in SQLITE_TEMP_STORES:
+            raise ValueError(f"Unrecognized SQLite temp store: {temp_store}")
+        self.temp_store: Literal["default", "file", "memory"] = temp_store
+        # Only applies when the database is created; an existing database keeps its page size.
+        self.page_size = int(os.getenv("PIXIVUTIL_SERVER_SQLITE_PAGE_SIZE", "4096"))
+        # Refuse writes on the connections that serve database API reads.
+        self.query_only_readers = os.getenv("PIXIVUTIL_SERVER_SQLITE_QUERY_ONLY_READERS", "false").lower() in ("1", "true", "yes")
+
+config = SQLiteConfig()
@@ -0,0 +1,13 @@
+import os
+
+
+class ThumbnailConfig:
+
+    def __init__(self):
+        # Kept on the persistent PixivUtil2 data volume, shared by server and worker.
+        self.cache_dir = os.getenv("PIXIVUTIL_SERVER_THUMBNAIL_DIR", "./.pixivUtil2/thumbnails")
+        self.cache_max_bytes = int(os.getenv("PIXIVUTIL_SERVER_THUMBNAIL_CACHE_BYTES", str(2 * 1024 ** 3)))
+        self.workers = int(os.getenv("PIXIVUTIL_SERVER_THUMBNAIL_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.quality = int(os.getenv("PIXIVUTIL_SERVER_THUMBNAIL_QUALITY", "80"))
+
+config = ThumbnailConfig()
@@ -0,0 +1,20 @@
+import os
+
+UGOIRA_FORMATS = ("gif", "apng", "webp", "webm")
+
+
+class UgoiraConfig:
+
+    def __init__(self):
+        # Formats to convert downloaded ugoira ZIPs to, e.g. "webp,webm". Empty disables conversion.
+        formats = [name.strip().lower() for name in os.getenv("PIXIVUTIL_SERVER_UGOIRA_FORMATS", "").split(",") if name.strip()]
+        for name in formats:
+            if name not in UGOIRA_FORMATS:
+                raise ValueError(f"Unrecognized ugoira format: {name}")
+        self.formats: list[str] = formats
+        self.workers = int(os.getenv("PIXIVUTIL_SERVER_UGOIRA_WORKERS", str(os.cpu_count() or 1)))
+        self.timeout_seconds = int(os.getenv("PIXIVUTIL_SERVER_UGOIRA_TIMEOUT_SECONDS", "600"))
+        # Frame delay used when no animation.json with per-frame delays is available.
+        self.default_delay_ms = int(os.getenv("PIXIVUTIL_SERVER_UGOIRA_DEFAULT_DELAY_MS", "100"))
+
+config = UgoiraConfig()
@@ -48,3 +48,116 @@ HTTP_RESPONSE_SIZE = Histogram(
     ["method", "endpoint"],
     buckets=[256, 1_024, 16_384, 65_536, 1_048_576],
 )
+
+# --- Thumbnail metrics ---
+THUMBNAIL_REQUESTS_TOTAL = Counter(
+    "pixivutil_thumbnail_requests_total",
+    "Thumbnail cache lookups",
+    ["result"],
+)
+THUMBNAIL_RENDER_DURATION = Histogram(
+    "pixivutil_thumbnail_render_duration_seconds",
+    "Time to render a thumbnail in the process pool",
+)
+THUMBNAIL_CACHE_BYTES = Gauge("pixivutil_thumbnail_cache_bytes", "Bytes used by the thumbnail cache")
+
+# --- Database read metrics ---
+DATABASE_READS_TOTAL = Counter(
+    "pixivutil_database_reads_total",
+    "Database API reads by repository method and result (ok, error, timeout, rejected)",
+    ["method", "result"],
+)
+DATABASE_READ_WAIT_SECONDS = Histogram(
+    "pixivutil_database_read_wait_seconds",
+    "Time database API reads waited for a free database thread",
+    ["method"],
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30],
+)
+DATABASE_READ_DURATION = Histogram(
+    "pixivutil_database_read_duration_seconds",
+    "Time database API reads ran on a database thread",
+    ["method"],
+    buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30],
+)
+DATABASE_READS_PENDING = Gauge(
+    "pixivutil_database_reads_pending",
+    "Database API reads queued or running on the database threads",
+)
+
+DATABASE_SNAPSHOT_AGE_SECONDS = Gauge(
+    "pixivutil_database_snapshot_age_seconds",
+    "Age of the database snapshot serving API reads (NaN when there is none)",
+)
+DATABASE_SNAPSHOT_REFRESHES_TOTAL = Counter(
+    "pixivutil_database_snapshot_refreshes_total",
+    "Database snapshot refreshes, by whether they were copied incrementally, in one step, or failed",
+    ["result"],
+)
+DATABASE_SNAPSHOT_REFRESH_DURATION = Histogram(
+    "pixivutil_database_snapshot_refresh_duration_seconds",
+    "Time to copy the database into a new snapshot",
+    buckets=[0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600],
+)
+
+# --- Database maintenance metrics ---
+DATABASE_WAL_BYTES = Gauge(
+    "pixivutil_database_wal_bytes",
+    "Size of the database write-ahead log file",
+)
+DATABASE_FREELIST_PAGES = Gauge(
+    "pixivutil_database_freelist_pages",
+    "Unused pages in the database file that a vacuum would return to the filesystem",
+)
+DATABASE_MAINTENANCE_TOTAL = Counter(
+    "pixivutil_database_maintenance_total",
+    "Database maintenance runs, by operation (checkpoint, optimize, incremental_vacuum, vacuum) and result",
+    ["operation", "result"],
+)
+DATABASE_MAINTENANCE_DURATION = Histogram(
+    "pixivutil_database_maintenance_duration_seconds",
+    "Time database maintenance operations ran",
+    ["operation"],
+    buckets=[0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300],
+)
+
+# --- Database write metrics ---
+DATABASE_WRITE_BATCH_WRITES = Histogram(
+    "pixivutil_database_write_batch_writes",
+    "PixivUtil2 database writes committed together in one transaction by the worker",
+    buckets=[1, 2, 5, 10, 25, 50, 100, 250, 500, 1000],
+)
+
+# --- Download metrics ---
+UPSTREAM_CONNECTIONS_TOTAL = Counter(
+    "pixivutil_upstream_connections_total",
+    "Upstream requests by whether they reused a pooled keep-alive connection or opened a new one",
+    ["host", "result"],
+)
+UPSTREAM_IDLE_CONNECTIONS = Gauge(
+    "pixivutil_upstream_idle_connections",
+    "Idle keep-alive connections pooled per upstream host",
+    ["host"],
+)
+UPSTREAM_CACHE_REQUESTS_TOTAL = Counter(
+    "pixivutil_upstream_cache_requests_total",
+    "Upstream page lookups by page kind and whether the response cache was hit, missed or bypassed",
+    ["kind", "result"],
+)
+RESUMABLE_DOWNLOAD_BYTES_TOTAL = Counter(
+    "pixivutil_resumable_download_bytes_total",
+    "Bytes of resumable downloads, by whether they came over the network or were kept from a partial file",
+    ["source"],
+)
+
+# --- Ugoira conversion metrics ---
+UGOIRA_CONVERSIONS_TOTAL = Counter(
+    "pixivutil_ugoira_conversions_total",
+    "Ugoira conversions, by output format and result",
+    ["format", "result"],
+)
+UGOIRA_CONVERSION_CPU_SECONDS = Histogram(
+    "pixivutil_ugoira_conversion_cpu_seconds",
+    "CPU time of one ugoira conversion, including encoder subprocesses",
+    ["format"],
+    buckets=[0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600],
+)
@@ -2,7 +2,7 @@
 Model layer for PixivUtil worker queue processing interface.
 """
 
-from typing import Any, Protocol, cast
+from typing import Any, Literal, Protocol, cast
 
 from celery.result import AsyncResult
 from pixivutil_server_common.models import (
@@ -38,24 +38,79 @@ class DownloadArtworksByTagsRequest(BaseModel):
     bookmark_count: int | None = None
     sort_order: TagSortOrder
     type_mode: TagTypeMode = 'a'
+    # Overrides PixivUtil2 checkUpdatedLimit for this request: stop crawling after this many
+    # consecutive already-downloaded artworks. Combined with sort_order='date_d' this ends the
+    # crawl once the newest known artworks are reached.
+    check_updated_limit: int | None = None
 
 class DeleteArtworkByIdRequest(BaseModel):
     artwork_id: int
     delete_metadata: bool = True
 
+class DeleteArtworksRequest(BaseModel):
+    """Delete the listed artworks and/or all artworks of a member."""
+    artwork_ids: list[int] = []
+    member_id: int | None = None
+    delete_metadata: bool = True
+
 
 class DownloadMemberMetadataByIdRequest(BaseModel):
     member_id: int
+    # Fetch fresh pages instead of cached ones.
+    refresh: bool = False
 
 
 class DownloadArtworkMetadataByIdRequest(BaseModel):
     artwork_id: int
+    # Fetch fresh pages instead of cached ones.
+    refresh: bool = False
 
 
 class DownloadSeriesMetadataByIdRequest(BaseModel):
     series_id: int
+    # Fetch fresh pages instead of cached ones.
+    refresh: bool = False
 
 
 class DownloadTagMetadataByIdRequest(BaseModel):
     tag: str
     filter_mode: TagMetadataFilterMode = "none"
+
+
+class WarmThumbnailsRequest(BaseModel):
+    """Render cover thumbnails for every artwork of a member or tag; exactly one must be set."""
+    member_id: int | None = None
+    tag: str | None = None
+    sizes: list[int] = [256]
+    image_format: Literal["webp", "jpeg"] = "webp"
+
+
+class DeduplicateDownloadsRequest(BaseModel):
+    """Index every downloaded file and replace duplicates; `mode` defaults to the server's configured mode."""
+    mode: Literal["hardlink", "reflink"] | None = None
+
+
+class VerifyDownloadsRequest(BaseModel):
+    """Check that downloaded files exist and are intact, resuming the last unfinished run unless `restart` is set."""
+    restart: bool = False
+    hash_files: bool = False
+    files_per_second: float | None = None
+    repair: bool = False
+
+
+class BackfillSearchIndexRequest(BaseModel):
+    """Index existing rows for full-text search in chunks, resuming the last unfinished backfill unless `restart` is set."""
+    restart: bool = False
+    batch_size: int = 1000
+    pause_seconds: float = 0.0
+
+
+class RebuildTagStatsRequest(BaseModel):
+    """Count tag links of existing artworks in chunks, resuming the last unfinished rebuild unless `restart` is set."""
+    restart: bool = False
+    batch_size: int = 1000
+    pause_seconds: float = 0.0
+
+
+class VacuumDatabaseRequest(BaseModel):
+    """Rebuild the database with incremental auto-vacuum, returning its free pages to the filesystem."""
@@ -0,0 +1,189 @@
+import asyncio
+import functools
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from PixivServer.config.server import config as server_config
+from PixivServer.metrics import (
+    DATABASE_READ_DURATION,
+    DATABASE_READ_WAIT_SECONDS,
+    DATABASE_READS_PENDING,
+    DATABASE_READS_TOTAL,
+)
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.repository.snapshot import database_snapshot
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# SQLite VM instructions between deadline checks; a few milliseconds of work.
+PROGRESS_HANDLER_STEPS = 10000
+
+
+class DatabaseQueryTimeout(sqlite3.OperationalError):
+    """A read ran past the query timeout and was interrupted."""
+
+
+class DatabaseOverloaded(sqlite3.OperationalError):
+    """Too many reads are already waiting for a database thread."""
+
+
+class AsyncPixivUtilRepository:
+    """
+    Async facade over PixivUtilRepository. Reads run on a dedicated, bounded thread pool with one
+    long-lived connection per thread, so slow scans queue behind each other instead of taking
+    the threads health checks and other endpoints run on. A progress handler interrupts reads
+    that run past the query timeout. In snapshot mode reads go to the database snapshot while
+    it is fresh.
+
+    Repository methods can be awaited directly (`await repository.get_tag_info_by_id(...)`), or
+    `run` can do more work on the database thread, e.g. serializing a large result.
+    """
+
+    def __init__(self, workers: int, max_queued: int, query_timeout_seconds: float):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.query_timeout_seconds = query_timeout_seconds
+        self._executor: ThreadPoolExecutor | None = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._repositories: list[PixivUtilRepository] = []
+        # Bumped when the database file or snapshot is replaced; threads then reopen their connection.
+        self._generation = 0
+        self._pending = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pixivutil-db")
+        return self._executor
+
+    def _thread_repository(self) -> PixivUtilRepository:
+        reader = database_snapshot.reader()
+        repository: PixivUtilRepository | None = getattr(self._local, "repository", None)
+        if repository is not None and (
+            self._local.generation != self._generation or repository.db_path != reader.db_path
+        ):
+            repository.close()
+            with self._lock:
+                self._repositories.remove(repository)
+            repository = None
+        if repository is None:
+            repository = reader
+            # Closed from the event loop thread on shutdown.
+            repository.open(check_same_thread=False, reader=True)
+            self._local.repository = repository
+            self._local.generation = self._generation
+            with self._lock:
+                self._repositories.append(repository)
+        return repository
+
+    def _run_on_thread(
+        self, method: str, fn: Callable[[PixivUtilRepository], T], queued_at: float, timeout: float | None
+    ) -> T:
+        DATABASE_READ_WAIT_SECONDS.labels(method).observe(time.perf_counter() - queued_at)
+        repository = self._thread_repository()
+        deadline = time.monotonic() + timeout if timeout else None
+        if deadline is not None:
+            # A non-zero return aborts the running statement with "interrupted".
+            repository.connection.set_progress_handler(lambda: time.monotonic() > deadline, PROGRESS_HANDLER_STEPS)
+        start = time.perf_counter()
+        try:
+            result = fn(repository)
+            DATABASE_READS_TOTAL.labels(method, "ok").inc()
+            return result
+        except sqlite3.OperationalError as e:
+            if deadline is not None and time.monotonic() > deadline and "interrupted" in str(e):
+                DATABASE_READS_TOTAL.labels(method, "timeout").inc()
+                raise DatabaseQueryTimeout(f"{method} was interrupted after {timeout} seconds") from e
+            DATABASE_READS_TOTAL.labels(method, "error").inc()
+            raise
+        except Exception:
+            DATABASE_READS_TOTAL.labels(method, "error").inc()
+            raise
+        finally:
+            if deadline is not None:
+                repository.connection.set_progress_handler(None, 0)
+            DATABASE_READ_DURATION.labels(method).observe(time.perf_counter() - start)
+
+    async def run(
+        self, method: str, fn: Callable[[PixivUtilRepository], T], query_timeout: float | None = None
+    ) -> T:
+        """
+        Run `fn` with a database thread's repository. `method` labels the metrics.
+
+        Raises:
+            DatabaseOverloaded: If the queue of waiting reads is full.
+            DatabaseQueryTimeout: If a statement runs past `query_timeout` (default: the configured timeout).
+        """
+        if self._pending >= self.workers + self.max_queued:
+            DATABASE_READS_TOTAL.labels(method, "rejected").inc()
+            raise DatabaseOverloaded(f"{self._pending} database reads are already pending")
+        self._pending += 1
+        DATABASE_READS_PENDING.inc()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(),
+                self._run_on_thread,
+                method,
+                fn,
+                time.perf_counter(),
+                self.query_timeout_seconds if query_timeout is None else query_timeout,
+            )
+        finally:
+            self._pending -= 1
+            DATABASE_READS_PENDING.dec()
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(PixivUtilRepository, name, None)
+        if name.startswith("_") or not callable(method):
+            raise AttributeError(name)
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            return await self.run(name, lambda repository: getattr(repository, name)(*args, **kwargs))
+
+        return call
+
+    async def stream(self, iter_batches: Callable[[PixivUtilRepository], Iterator[list]]) -> AsyncIterator[list]:
+        """
+        Yield batches from a repository batch iterator, fetching each batch on a database thread.
+        Streams use their own connection and no timeout, and hold a thread only per batch.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        repository = database_snapshot.reader()
+        try:
+            await loop.run_in_executor(executor, functools.partial(repository.open, check_same_thread=False, reader=True))
+            batches = iter_batches(repository)
+            while (batch := await loop.run_in_executor(executor, next, batches, None)) is not None:
+                yield batch
+        finally:
+            repository.close()
+
+    def invalidate(self):
+        """Reopen connections on next use, e.g. after the database file was replaced."""
+        self._generation += 1
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            for repository in self._repositories:
+                repository.close()
+            self._repositories.clear()
+        self._local = threading.local()
+
+
+async_repository = AsyncPixivUtilRepository(
+    workers=server_config.database_read_workers,
+    max_queued=server_config.database_max_queued_reads,
+    query_timeout_seconds=server_config.database_query_timeout_seconds,
+)
@@ -0,0 +1,207 @@
+import logging
+import sqlite3
+
+from PixivServer.config.pixivutil import config as pixivutil_config
+from PixivServer.repository.profile import apply_performance_profile
+
+logger = logging.getLogger(__name__)
+
+class ContentRepository:
+    """
+    Content-hash index of downloaded files, used to find and link duplicate downloads.
+    """
+
+    def __init__(self):
+        self.db_path = pixivutil_config.db_path
+        self.connection: sqlite3.Connection = None  # pyright: ignore[reportAttributeAccessIssue] this will be handled during open.
+
+    def open(self):
+        self.connection = sqlite3.connect(self.db_path, timeout=30.0)
+        apply_performance_profile(self.connection)
+        self.create_table()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    def create_table(self):
+        c = self.connection.cursor()
+        # dedup_of is the path this file was replaced with a link to, or NULL if it holds its own copy.
+        c.execute('''
+                  CREATE TABLE IF NOT EXISTS pixiv_server_file_content (
+                  path TEXT PRIMARY KEY,
+                  sha256 TEXT NOT NULL,
+                  size INTEGER NOT NULL,
+                  mtime_ns INTEGER NOT NULL,
+                  device INTEGER NOT NULL,
+                  inode INTEGER NOT NULL,
+                  dedup_of TEXT,
+                  indexed_date DATE)
+                  ''')
+        c.execute('''
+                  CREATE INDEX IF NOT EXISTS idx_pixiv_server_file_content_sha256
+                  ON pixiv_server_file_content (sha256)
+                  ''')
+        self.connection.commit()
+        c.close()
+
+    def select_file(self, path: str) -> tuple[int, int, str] | None:
+        """Get the (size, mtime_ns, sha256) a file was indexed with, or None if it is not indexed."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''SELECT size, mtime_ns, sha256 FROM pixiv_server_file_content WHERE path = ?''',
+                (path, )
+            )
+            row = cursor.fetchone()
+            return (row[0], row[1], row[2]) if row else None
+        except Exception as e:
+            logger.error(f'Failed to get file signature for {path}: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def upsert_file(self, path: str, sha256: str, size: int, mtime_ns: int, device: int, inode: int):
+        """Record a file's content hash. A changed file is no longer considered deduplicated."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''INSERT INTO pixiv_server_file_content
+                   (path, sha256, size, mtime_ns, device, inode, dedup_of, indexed_date)
+                   VALUES (?, ?, ?, ?, ?, ?, NULL, datetime('now'))
+                   ON CONFLICT(path) DO UPDATE SET
+                       sha256 = excluded.sha256,
+                       size = excluded.size,
+                       mtime_ns = excluded.mtime_ns,
+                       device = excluded.device,
+                       inode = excluded.inode,
+                       dedup_of = NULL,
+                       indexed_date = excluded.indexed_date''',
+                (path, sha256, size, mtime_ns, device, inode)
+            )
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f'Failed to index file {path}: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def mark_deduplicated(self, path: str, dedup_of: str, mtime_ns: int, inode: int):
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''UPDATE pixiv_server_file_content SET dedup_of = ?, mtime_ns = ?, inode = ? WHERE path = ?''',
+                (dedup_of, mtime_ns, inode, path)
+            )
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f'Failed to mark {path} as deduplicated: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def delete_files(self, paths: list[str]):
+        """Remove files from the index. Links to a removed file now hold the only copy of it."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                '''DELETE FROM pixiv_server_file_content WHERE path = ?''',
+                [(path, ) for path in paths]
+            )
+            cursor.executemany(
+                '''UPDATE pixiv_server_file_content SET dedup_of = NULL WHERE dedup_of = ?''',
+                [(path, ) for path in paths]
+            )
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f'Failed to remove {len(paths)} files from the content index: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_all_paths(self) -> list[str]:
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''SELECT path FROM pixiv_server_file_content''')
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f'Failed to list indexed files: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_duplicate_groups(self, sha256s: list[str] | None = None) -> list[list[tuple[str, int, int, int, str | None]]]:
+        """
+        Get files whose content appears under more than one (device, inode), grouped by hash.
+        Each row is (path, size, device, inode, dedup_of), oldest indexed first.
+        Limit to `sha256s` when given.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            query = '''SELECT sha256, path, size, device, inode, dedup_of
+                       FROM pixiv_server_file_content
+                       WHERE sha256 IN (
+                           SELECT sha256 FROM pixiv_server_file_content
+                           GROUP BY sha256
+                           HAVING COUNT(DISTINCT device || ':' || inode) > 1)'''
+            params: tuple = ()
+            if sha256s is not None:
+                query += f''' AND sha256 IN ({', '.join('?' for _ in sha256s)})'''
+                params = tuple(sha256s)
+            cursor.execute(query + ''' ORDER BY sha256, indexed_date, rowid''', params)
+
+            groups: dict[str, list[tuple[str, int, int, int, str | None]]] = {}
+            for sha256, path, size, device, inode, dedup_of in cursor.fetchall():
+                groups.setdefault(sha256, []).append((path, size, device, inode, dedup_of))
+            return list(groups.values())
+        except Exception as e:
+            logger.error(f'Failed to get duplicate files: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_report(self) -> dict[str, int]:
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''SELECT COUNT(*),
+                          COALESCE(SUM(size), 0),
+                          COUNT(DISTINCT sha256),
+                          COUNT(dedup_of),
+                          COALESCE(SUM(CASE WHEN dedup_of IS NOT NULL THEN size ELSE 0 END), 0)
+                   FROM pixiv_server_file_content'''
+            )
+            files, total_bytes, unique_contents, deduplicated_files, reclaimed_bytes = cursor.fetchone()
+            cursor.execute(
+                '''SELECT COALESCE(SUM(size), 0) FROM (
+                       SELECT MAX(size) AS size FROM pixiv_server_file_content GROUP BY sha256)'''
+            )
+            unique_bytes = cursor.fetchone()[0]
+            return {
+                "files": files,
+                "total_bytes": total_bytes,
+                "unique_contents": unique_contents,
+                "unique_bytes": unique_bytes,
+                "deduplicated_files": deduplicated_files,
+                "reclaimed_bytes": reclaimed_bytes,
+                "reclaimable_bytes": total_bytes - unique_bytes - reclaimed_bytes,
+            }
+        except Exception as e:
+            logger.error(f'Failed to build deduplication report: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
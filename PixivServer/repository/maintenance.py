@@ -0,0 +1,139 @@
+import logging
+import os
+import sqlite3
+
+from PixivServer.config.pixivutil import config as pixivutil_config
+from PixivServer.repository.profile import apply_performance_profile
+
+logger = logging.getLogger(__name__)
+
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+
+
+class MaintenanceRepository:
+    """
+    Checkpoints, statistics and vacuuming of the live PixivUtil2 database. Opened with a short
+    busy timeout, so maintenance gives way to the worker instead of queueing behind it.
+    """
+
+    def __init__(self, busy_timeout_seconds: float = 5.0):
+        self.db_path = pixivutil_config.db_path
+        self.busy_timeout_seconds = busy_timeout_seconds
+        self.connection: sqlite3.Connection = None  # pyright: ignore[reportAttributeAccessIssue] this will be handled during open.
+
+    def open(self):
+        # Autocommit, so PRAGMAs that cannot run inside a transaction (VACUUM, checkpoints) work.
+        self.connection = sqlite3.connect(self.db_path, timeout=self.busy_timeout_seconds, isolation_level=None)
+        self.connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_seconds * 1000)}")
+        apply_performance_profile(self.connection)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    def wal_bytes(self) -> int:
+        """Size of the write-ahead log; it only shrinks on a TRUNCATE checkpoint."""
+        wal_path = self.db_path + "-wal"
+        return os.path.getsize(wal_path) if os.path.isfile(wal_path) else 0
+
+    def checkpoint(self, mode: str = "TRUNCATE") -> tuple[int, int, int]:
+        """
+        Copy the WAL back into the database. A TRUNCATE checkpoint then empties the WAL file,
+        unless a reader still uses part of it.
+
+        Returns:
+            (busy, WAL frames, frames checkpointed), as reported by `PRAGMA wal_checkpoint`.
+        """
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"Unrecognized checkpoint mode: {mode}")
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            busy, log, checkpointed = cursor.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            return busy, log, checkpointed
+        except Exception as e:
+            logger.error(f'Failed to checkpoint database: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def optimize(self, analysis_limit: int = 1000):
+        """
+        Refresh the query planner statistics. ANALYZE samples at most `analysis_limit` rows per
+        index, so it stays fast on large tables; `PRAGMA optimize` then records the statistics as
+        current for later connections.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(f"PRAGMA analysis_limit={int(analysis_limit)}")
+            cursor.execute("ANALYZE")
+            cursor.execute("PRAGMA optimize")
+        except Exception as e:
+            logger.error(f'Failed to optimize database: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_freelist(self) -> dict:
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            freelist_count = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+            page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+            page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+            auto_vacuum = cursor.execute("PRAGMA auto_vacuum").fetchone()[0]
+            return {
+                "freelist_pages": freelist_count,
+                "page_count": page_count,
+                "page_size": page_size,
+                "auto_vacuum": AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum)),
+            }
+        except Exception as e:
+            logger.error(f'Failed to get database free pages: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def incremental_vacuum(self, pages: int) -> int:
+        """
+        Return up to `pages` free pages to the filesystem, in one short write transaction. Does
+        nothing unless the database uses incremental auto-vacuum.
+
+        Returns:
+            The number of pages freed.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            before = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+            # Each freed page is a result row; the step only completes once they are all read.
+            cursor.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            return before - cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        except Exception as e:
+            logger.error(f'Failed to vacuum database incrementally: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def vacuum(self):
+        """
+        Rebuild the database file with incremental auto-vacuum, so free pages can afterwards be
+        returned in small steps. Rewrites the whole file and blocks every writer while it runs.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            # Only takes effect on an existing database through the VACUUM that follows.
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            cursor.execute("VACUUM")
+        except Exception as e:
+            logger.error(f'Failed to vacuum database: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
@@ -0,0 +1,273 @@
+import logging
+import sqlite3
+from typing import Literal
+
+from PixivServer.config.pixivutil import config as pixivutil_config
+from PixivServer.repository.profile import apply_performance_profile
+from PixivServer.utils import canonical_path
+
+logger = logging.getLogger(__name__)
+
+FileStatus = Literal["ok", "missing", "corrupt", "orphaned"]
+ISSUE_STATUSES: tuple[FileStatus, ...] = ("missing", "corrupt", "orphaned")
+
+class ManifestRepository:
+    """
+    Manifest of downloaded files (size, mtime, hash) and the state of the integrity verification run.
+    """
+
+    def __init__(self):
+        self.db_path = pixivutil_config.db_path
+        self.connection: sqlite3.Connection = None  # pyright: ignore[reportAttributeAccessIssue] this will be handled during open.
+
+    def open(self):
+        self.connection = sqlite3.connect(self.db_path, timeout=30.0)
+        apply_performance_profile(self.connection)
+        self.connection.create_function("canonical_path", 1, canonical_path, deterministic=True)
+        self.create_table()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    def create_table(self):
+        c = self.connection.cursor()
+        # image_id is NULL for orphaned files, which no artwork references.
+        c.execute('''
+                  CREATE TABLE IF NOT EXISTS pixiv_server_file_manifest (
+                  path TEXT PRIMARY KEY,
+                  image_id INTEGER,
+                  size INTEGER,
+                  mtime_ns INTEGER,
+                  sha256 TEXT,
+                  status TEXT NOT NULL DEFAULT 'ok',
+                  recorded_date DATE,
+                  verified_date DATE)
+                  ''')
+        c.execute('''
+                  CREATE INDEX IF NOT EXISTS idx_pixiv_server_file_manifest_status
+                  ON pixiv_server_file_manifest (status)
+                  ''')
+        # Single-row table: the current (or last) verification run, checkpointed after every batch.
+        c.execute('''
+                  CREATE TABLE IF NOT EXISTS pixiv_server_verification_run (
+                  id INTEGER PRIMARY KEY CHECK (id = 1),
+                  last_image_id INTEGER NOT NULL DEFAULT 0,
+                  artworks INTEGER NOT NULL DEFAULT 0,
+                  files INTEGER NOT NULL DEFAULT 0,
+                  missing INTEGER NOT NULL DEFAULT 0,
+                  corrupt INTEGER NOT NULL DEFAULT 0,
+                  orphaned INTEGER NOT NULL DEFAULT 0,
+                  started_date DATE,
+                  finished_date DATE)
+                  ''')
+        self.connection.commit()
+        c.close()
+
+    def record_file(self, path: str, image_id: int, size: int, mtime_ns: int, sha256: str | None):
+        """Record a freshly downloaded file as intact."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''INSERT INTO pixiv_server_file_manifest
+                   (path, image_id, size, mtime_ns, sha256, status, recorded_date, verified_date)
+                   VALUES (?, ?, ?, ?, ?, 'ok', datetime('now'), datetime('now'))
+                   ON CONFLICT(path) DO UPDATE SET
+                       image_id = excluded.image_id,
+                       size = excluded.size,
+                       mtime_ns = excluded.mtime_ns,
+                       sha256 = excluded.sha256,
+                       status = 'ok',
+                       recorded_date = excluded.recorded_date,
+                       verified_date = excluded.verified_date''',
+                (path, image_id, size, mtime_ns, sha256)
+            )
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f'Failed to record {path} in the file manifest: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_files(self, paths: list[str]) -> dict[str, tuple[int | None, int | None, str | None]]:
+        """Get the recorded (size, mtime_ns, sha256) of the given paths that are in the manifest."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f'''SELECT path, size, mtime_ns, sha256 FROM pixiv_server_file_manifest
+                    WHERE path IN ({', '.join('?' for _ in paths)})''',
+                paths
+            )
+            return {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f'Failed to get manifest entries: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def load_expected_paths(self):
+        """
+        Collect every path the PixivUtil2 tables reference into a temporary indexed table, so
+        candidate orphans can be checked without scanning the (unindexed) save_name columns.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''DROP TABLE IF EXISTS temp.expected_paths''')
+            cursor.execute('''CREATE TEMP TABLE expected_paths (path TEXT PRIMARY KEY) WITHOUT ROWID''')
+            cursor.execute(
+                """INSERT OR IGNORE INTO temp.expected_paths (path)
+                   SELECT canonical_path(save_name) FROM pixiv_master_image WHERE save_name IS NOT NULL AND save_name != ''
+                   UNION ALL
+                   SELECT canonical_path(save_name) FROM pixiv_manga_image WHERE save_name IS NOT NULL AND save_name != ''"""
+            )
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f'Failed to load expected file paths: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_expected_paths(self, paths: list[str]) -> set[str]:
+        """Of `paths`, get those referenced by an artwork. Requires `load_expected_paths`."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f'''SELECT path FROM temp.expected_paths WHERE path IN ({', '.join('?' for _ in paths)})''',
+                paths
+            )
+            return {row[0] for row in cursor.fetchall()}
+        except Exception as e:
+            logger.error(f'Failed to check expected file paths: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def get_run(self) -> dict | None:
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''SELECT last_image_id, artworks, files, missing, corrupt, orphaned, started_date, finished_date
+                   FROM pixiv_server_verification_run WHERE id = 1'''
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            keys = ("last_image_id", "artworks", "files", "missing", "corrupt", "orphaned", "started_date", "finished_date")
+            return dict(zip(keys, row, strict=True))
+        except Exception as e:
+            logger.error(f'Failed to get verification run: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def start_run(self):
+        """Start a new verification run, forgetting the orphans found by the previous one."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("""DELETE FROM pixiv_server_file_manifest WHERE status = 'orphaned'""")
+            cursor.execute(
+                '''INSERT OR REPLACE INTO pixiv_server_verification_run (id, started_date) VALUES (1, datetime('now'))'''
+            )
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f'Failed to start verification run: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def save_batch(
+        self,
+        last_image_id: int,
+        artworks: int,
+        entries: list[tuple[str, int | None, int | None, int | None, str | None, FileStatus]],
+    ):
+        """
+        Store verified entries (path, image_id, size, mtime_ns, sha256, status) and advance the run's
+        checkpoint in one transaction, so an interrupted run resumes after the last saved batch.
+        Size, mtime and hash are only overwritten when given.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.executemany(
+                '''INSERT INTO pixiv_server_file_manifest
+                   (path, image_id, size, mtime_ns, sha256, status, recorded_date, verified_date)
+                   VALUES (?, ?, ?, ?, ?, ?, datetime('now'), datetime('now'))
+                   ON CONFLICT(path) DO UPDATE SET
+                       image_id = excluded.image_id,
+                       size = COALESCE(excluded.size, size),
+                       mtime_ns = COALESCE(excluded.mtime_ns, mtime_ns),
+                       sha256 = COALESCE(excluded.sha256, sha256),
+                       status = excluded.status,
+                       verified_date = excluded.verified_date''',
+                entries
+            )
+            counts = {status: sum(1 for entry in entries if entry[5] == status) for status in ISSUE_STATUSES}
+            cursor.execute(
+                '''UPDATE pixiv_server_verification_run SET
+                       last_image_id = ?,
+                       artworks = artworks + ?,
+                       files = files + ?,
+                       missing = missing + ?,
+                       corrupt = corrupt + ?,
+                       orphaned = orphaned + ?
+                   WHERE id = 1''',
+                (last_image_id, artworks, len(entries) - counts["orphaned"], counts["missing"], counts["corrupt"], counts["orphaned"])
+            )
+            self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f'Failed to save verification batch: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def finish_run(self):
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''UPDATE pixiv_server_verification_run SET finished_date = datetime('now') WHERE id = 1''')
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f'Failed to finish verification run: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_issues(self, status: FileStatus | None = None, limit: int = 100) -> list[dict]:
+        """Get files found missing, corrupt or orphaned, most recently verified first."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            statuses = [status] if status is not None else list(ISSUE_STATUSES)
+            cursor.execute(
+                f'''SELECT path, image_id, status, size, verified_date FROM pixiv_server_file_manifest
+                    WHERE status IN ({', '.join('?' for _ in statuses)})
+                    ORDER BY verified_date DESC, path
+                    LIMIT ?''',
+                (*statuses, limit)
+            )
+            return [
+                {"path": row[0], "image_id": row[1], "status": row[2], "size": row[3], "verified_date": row[4]}
+                for row in cursor.fetchall()
+            ]
+        except Exception as e:
+            logger.error(f'Failed to get verification issues: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
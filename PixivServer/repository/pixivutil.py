@@ -1,5 +1,14 @@
 import logging
+import os
 import sqlite3
+from collections.abc import Iterator
+from urllib.request import pathname2url
+
+from pixivutil_server_common.models import (
+    ImageListFields,
+    ImageListOrder,
+    TagExpression,
+)
 
 from PixivServer.config.pixivutil import config as pixivutil_config
 from PixivServer.models.pixiv_metadata import (
@@ -17,20 +26,64 @@ from PixivServer.models.pixiv_metadata import (
     PixivTagInfo,
     PixivTagTranslation,
 )
+from PixivServer.repository.profile import apply_performance_profile
+from PixivServer.repository.tag_query import compile_tag_query, expression_tags
 
 logger = logging.getLogger(__name__)
 
+# Indexes the keyset pages and counts of a member's or tag's images are read from, and the one
+# that finds the artworks a download job saved.
+SERVER_INDEXES = {
+    "idx_pixiv_server_master_image_member_id": "pixiv_master_image (member_id, image_id)",
+    "idx_pixiv_server_image_to_tag_tag_id": "pixiv_image_to_tag (tag_id, image_id)",
+    "idx_pixiv_server_master_image_last_update_date": "pixiv_master_image (last_update_date)",
+}
+
+
+def image_page_clause(after: int | None, order: ImageListOrder, limit: int | None) -> tuple[str, str, list]:
+    """
+    Keyset condition (prefixed with AND), ORDER BY/LIMIT suffix and their parameters for one
+    page of image IDs. `after` is the last image ID of the previous page.
+    """
+    condition = ""
+    params: list = []
+    if after is not None:
+        condition = "AND image_id > ?" if order == "asc" else "AND image_id < ?"
+        params.append(after)
+    suffix = f"ORDER BY image_id {order.upper()}"
+    if limit is not None:
+        suffix += " LIMIT ?"
+        params.append(limit)
+    return condition, suffix, params
+
+
+def next_image_cursor(image_ids: list[int], limit: int | None) -> int | None:
+    return image_ids[-1] if limit is not None and len(image_ids) == limit else None
+
+
 class PixivUtilRepository:
     """
     Service layer for PixivUtil2 SQLite database.
     """
 
-    def __init__(self):
-        self.db_path = pixivutil_config.db_path
+    def __init__(self, db_path: str | None = None, read_only: bool = False):
+        self.db_path = db_path or pixivutil_config.db_path
+        self.read_only = read_only
         self.connection: sqlite3.Connection = None  # pyright: ignore[reportAttributeAccessIssue] this will be handled during open.
 
-    def open(self):
-        self.connection = sqlite3.connect(self.db_path, timeout=30.0)
+    def open(self, check_same_thread: bool = True, reader: bool = False):
+        """
+        Open the database connection. Pass check_same_thread=False when the connection is
+        used sequentially from several threads, e.g. by a streaming response generator, and
+        reader=True when it only serves reads.
+        """
+        if self.read_only:
+            uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+            self.connection = sqlite3.connect(uri, uri=True, timeout=30.0, check_same_thread=check_same_thread)
+            apply_performance_profile(self.connection, reader=True)
+            return
+        self.connection = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=check_same_thread)
+        apply_performance_profile(self.connection, reader=reader)
         cursor = self.connection.cursor()
         try:
             cursor.execute("PRAGMA journal_mode=WAL")
@@ -43,9 +96,27 @@ class PixivUtilRepository:
         if self.connection is not None:
             self.connection.close()
 
-    def get_member_data_by_id(self, member_id: int) -> PixivMemberPortfolio:
+    def create_indexes(self):
+        cursor = self.connection.cursor()
+        try:
+            for name, definition in SERVER_INDEXES.items():
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {definition}")
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    def get_member_data_by_id(
+        self,
+        member_id: int,
+        *,
+        limit: int | None = None,
+        after: int | None = None,
+        order: ImageListOrder = "asc",
+        fields: ImageListFields = "full",
+    ) -> PixivMemberPortfolio:
         """
-        Get member data and their images from the database.
+        Get member data and one page of their images from the database, ordered by image ID.
+        Without `limit` all images are returned. `total_images` is counted from the member index.
 
         Raises:
             KeyError: If member with the given ID is not found.
@@ -78,13 +149,33 @@ class PixivUtilRepository:
                 member_token=member_row[7]
             )
 
+            cursor.execute("SELECT COUNT(*) FROM pixiv_master_image WHERE member_id = ?", (member_id,))
+            total_images = cursor.fetchone()[0]
+
             # Get images for this member
+            condition, suffix, page_params = image_page_clause(after, order, limit)
+            if fields == "ids":
+                cursor.execute(
+                    f"SELECT image_id FROM pixiv_master_image WHERE member_id = ? {condition} {suffix}",
+                    (member_id, *page_params)
+                )
+                image_ids = [row[0] for row in cursor.fetchall()]
+                return PixivMemberPortfolio(
+                    member=member,
+                    images=[],
+                    image_ids=image_ids,
+                    total_images=total_images,
+                    next_cursor=next_image_cursor(image_ids, limit),
+                )
+
+            caption = "NULL" if fields == "no_caption" else "caption"
             cursor.execute(
-                """SELECT image_id, member_id, title, save_name, created_date,
-                          last_update_date, is_manga, caption
+                f"""SELECT image_id, member_id, title, save_name, created_date,
+                          last_update_date, is_manga, {caption}
                    FROM pixiv_master_image
-                   WHERE member_id = ?""",
-                (member_id,)
+                   WHERE member_id = ? {condition}
+                   {suffix}""",
+                (member_id, *page_params)
             )
             image_rows = cursor.fetchall()
             images = [
@@ -101,7 +192,12 @@ class PixivUtilRepository:
                 for row in image_rows
             ]
 
-            return PixivMemberPortfolio(member=member, images=images)
+            return PixivMemberPortfolio(
+                member=member,
+                images=images,
+                total_images=total_images,
+                next_cursor=next_image_cursor([image.image_id for image in images], limit),
+            )
         except Exception as e:
             logger.error(f"Error getting member data for {member_id}: {e}")
             raise
@@ -229,9 +325,52 @@ class PixivUtilRepository:
             if cursor:
                 cursor.close()
 
-    def get_tag_info_by_id(self, tag_id: str) -> PixivTagInfo:
+    def _iter_first_column_batches(self, query: str, batch_size: int) -> Iterator[list]:
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query)
+            while rows := cursor.fetchmany(batch_size):
+                yield [row[0] for row in rows]
+        finally:
+            cursor.close()
+
+    def iter_pixiv_member_id_batches(self, batch_size: int = 1000) -> Iterator[list[int]]:
+        """
+        Iterate over all member IDs in ascending order, in batches of at most batch_size.
+        """
+        return self._iter_first_column_batches("SELECT member_id FROM pixiv_master_member ORDER BY member_id ASC", batch_size)
+
+    def iter_pixiv_image_id_batches(self, batch_size: int = 1000) -> Iterator[list[int]]:
+        """
+        Iterate over all image IDs in ascending order, in batches of at most batch_size.
+        """
+        return self._iter_first_column_batches("SELECT image_id FROM pixiv_master_image ORDER BY image_id ASC", batch_size)
+
+    def iter_pixiv_tag_batches(self, batch_size: int = 1000) -> Iterator[list[str]]:
+        """
+        Iterate over all tag IDs in ascending order, in batches of at most batch_size.
+        """
+        return self._iter_first_column_batches("SELECT tag_id FROM pixiv_master_tag ORDER BY tag_id ASC", batch_size)
+
+    def iter_pixiv_series_batches(self, batch_size: int = 1000) -> Iterator[list[str]]:
         """
-        Get tag information including translations and associated images.
+        Iterate over all series IDs in ascending order, in batches of at most batch_size.
+        """
+        return self._iter_first_column_batches("SELECT series_id FROM pixiv_master_series ORDER BY series_id ASC", batch_size)
+
+    def get_tag_info_by_id(
+        self,
+        tag_id: str,
+        *,
+        limit: int | None = None,
+        after: int | None = None,
+        order: ImageListOrder = "asc",
+        fields: ImageListFields = "full",
+    ) -> PixivTagInfo:
+        """
+        Get tag information including translations and one page of associated images, ordered
+        by image ID. Without `limit` all images are returned. `total_images` is counted from
+        the tag index. Tag links have no caption, so `no_caption` returns every column.
 
         Raises:
             KeyError: If tag with the given ID is not found.
@@ -277,13 +416,32 @@ class PixivUtilRepository:
                 for row in translation_rows
             ]
 
+            cursor.execute("SELECT COUNT(*) FROM pixiv_image_to_tag WHERE tag_id = ?", (tag_id,))
+            total_images = cursor.fetchone()[0]
+
             # Get images with this tag
+            condition, suffix, page_params = image_page_clause(after, order, limit)
+            if fields == "ids":
+                cursor.execute(
+                    f"SELECT image_id FROM pixiv_image_to_tag WHERE tag_id = ? {condition} {suffix}",
+                    (tag_id, *page_params)
+                )
+                image_ids = [row[0] for row in cursor.fetchall()]
+                return PixivTagInfo(
+                    tag=tag,
+                    translations=translations,
+                    images=[],
+                    image_ids=image_ids,
+                    total_images=total_images,
+                    next_cursor=next_image_cursor(image_ids, limit),
+                )
+
             cursor.execute(
-                """SELECT image_id, tag_id, created_date, last_update_date
+                f"""SELECT image_id, tag_id, created_date, last_update_date
                    FROM pixiv_image_to_tag
-                   WHERE tag_id = ?
-                   ORDER BY image_id ASC""",
-                (tag_id,)
+                   WHERE tag_id = ? {condition}
+                   {suffix}""",
+                (tag_id, *page_params)
             )
             image_rows = cursor.fetchall()
             images = [
@@ -296,7 +454,13 @@ class PixivUtilRepository:
                 for row in image_rows
             ]
 
-            return PixivTagInfo(tag=tag, translations=translations, images=images)
+            return PixivTagInfo(
+                tag=tag,
+                translations=translations,
+                images=images,
+                total_images=total_images,
+                next_cursor=next_image_cursor([image.image_id for image in images], limit),
+            )
         except Exception as e:
             logger.error(f"Error getting tag info for {tag_id}: {e}")
             raise
@@ -304,6 +468,37 @@ class PixivUtilRepository:
             if cursor:
                 cursor.close()
 
+    def get_tag_high_water_mark(self, tag_id: str) -> tuple[int, int | None] | None:
+        """
+        Get the newest artwork stored for a tag.
+
+        Returns:
+            Tuple of (image_id, uploaded_date_epoch), or None if no artwork has the tag.
+            uploaded_date_epoch is None when server-mode date metadata is missing.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                """SELECT itt.image_id, di.uploaded_date_epoch
+                   FROM pixiv_image_to_tag itt
+                   LEFT JOIN pixiv_date_info di ON itt.image_id = di.image_id
+                   WHERE itt.tag_id = ?
+                   ORDER BY itt.image_id DESC
+                   LIMIT 1""",
+                (tag_id,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return row[0], row[1]
+        except Exception as e:
+            logger.error(f"Error getting high-water mark for tag {tag_id}: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
     def get_series_info_by_id(self, series_id: str) -> PixivSeriesInfo:
         """
         Get series information and associated images.
@@ -545,3 +740,295 @@ class PixivUtilRepository:
         finally:
             if cursor:
                 cursor.close()
+
+    def get_image_save_name(self, image_id: int) -> str:
+        """
+        Get the saved file path of an artwork; for archive-mode artworks this is the ZIP file.
+
+        Raises:
+            KeyError: If the image is not found or has no saved file.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("SELECT save_name FROM pixiv_master_image WHERE image_id = ?", (image_id,))
+            row = cursor.fetchone()
+            if row is None or not row[0]:
+                raise KeyError(f"No saved file for image {image_id}")
+            return row[0]
+        except Exception as e:
+            logger.error(f"Error getting save name for image {image_id}: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def get_page_save_name(self, image_id: int, page: int) -> str:
+        """
+        Get the saved file path of a manga page. In archive mode this is the page's file name
+        inside the artwork's ZIP file rather than a path.
+
+        Raises:
+            KeyError: If the page is not found or has no saved file.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                "SELECT save_name FROM pixiv_manga_image WHERE image_id = ? AND page = ?",
+                (image_id, page)
+            )
+            row = cursor.fetchone()
+            if row is None or not row[0]:
+                raise KeyError(f"No saved file for page {page} of image {image_id}")
+            return row[0]
+        except Exception as e:
+            logger.error(f"Error getting save name for page {page} of image {image_id}: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def get_page_save_names(self, image_id: int) -> list[str]:
+        """Get the saved file paths of all pages of an artwork, in page order."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                "SELECT save_name FROM pixiv_manga_image WHERE image_id = ? AND save_name IS NOT NULL ORDER BY page",
+                (image_id,)
+            )
+            return [row[0] for row in cursor.fetchall() if row[0]]
+        except Exception as e:
+            logger.error(f"Error getting page save names for image {image_id}: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def get_artwork_save_names(self, image_id: int) -> list[str]:
+        """
+        Get the saved file paths of an artwork: its master file and pages, or just the ZIP file
+        for archive-mode artworks. Empty if the artwork is unknown or has no files.
+        """
+        try:
+            image_save_name = self.get_image_save_name(image_id)
+        except KeyError:
+            return []
+        if image_save_name.endswith('.zip'):
+            return [image_save_name]
+        return list(dict.fromkeys([image_save_name, *self.get_page_save_names(image_id)]))
+
+    def get_artwork_files_after(self, image_id: int, batch_size: int = 500) -> list[tuple[int, list[str]]]:
+        """
+        Get the saved file paths of the next `batch_size` artworks with IDs above `image_id`, in ID order.
+        Archive-mode artworks have a single path, their ZIP file. Artworks without files have an empty list.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                "SELECT image_id, save_name FROM pixiv_master_image WHERE image_id > ? ORDER BY image_id LIMIT ?",
+                (image_id, batch_size)
+            )
+            artworks: dict[int, list[str]] = {
+                row[0]: [row[1]] if row[1] else [] for row in cursor.fetchall()
+            }
+            page_image_ids = [
+                artwork_id for artwork_id, save_names in artworks.items()
+                if not (save_names and save_names[0].endswith('.zip'))
+            ]
+            if page_image_ids:
+                cursor.execute(
+                    f"""SELECT image_id, save_name FROM pixiv_manga_image
+                        WHERE image_id IN ({', '.join('?' for _ in page_image_ids)}) AND save_name IS NOT NULL
+                        ORDER BY image_id, page""",
+                    page_image_ids
+                )
+                for artwork_id, save_name in cursor.fetchall():
+                    if save_name and save_name not in artworks[artwork_id]:
+                        artworks[artwork_id].append(save_name)
+            return list(artworks.items())
+        except Exception as e:
+            logger.error(f"Error getting artwork files after image {image_id}: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def delete_artworks(
+        self,
+        image_ids: list[int] | None = None,
+        member_id: int | None = None,
+        delete_metadata: bool = True,
+    ) -> tuple[list[int], list[str]]:
+        """
+        Delete artworks, given by ID or by member, in one transaction. Their files are not removed.
+
+        The IDs are collected into a temporary table that every DELETE joins against, so the cost is
+        one statement per table regardless of how many artworks are deleted.
+
+        Returns:
+            The deleted artwork IDs and the saved file paths of those artworks.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS deleted_image_ids (image_id INTEGER PRIMARY KEY)")
+            cursor.execute("DELETE FROM temp.deleted_image_ids")
+            if image_ids:
+                cursor.executemany(
+                    """INSERT OR IGNORE INTO temp.deleted_image_ids (image_id)
+                       SELECT image_id FROM pixiv_master_image WHERE image_id = ?""",
+                    [(image_id,) for image_id in image_ids]
+                )
+            if member_id is not None:
+                cursor.execute(
+                    """INSERT OR IGNORE INTO temp.deleted_image_ids (image_id)
+                       SELECT image_id FROM pixiv_master_image WHERE member_id = ?""",
+                    (member_id,)
+                )
+
+            cursor.execute("SELECT image_id FROM temp.deleted_image_ids ORDER BY image_id")
+            deleted_image_ids = [row[0] for row in cursor.fetchall()]
+
+            # In archive mode pages are stored inside the ZIP file as basenames, so only the ZIP is a file.
+            cursor.execute(
+                """SELECT save_name FROM pixiv_master_image
+                   WHERE image_id IN (SELECT image_id FROM temp.deleted_image_ids) AND save_name IS NOT NULL
+                   UNION
+                   SELECT manga.save_name FROM pixiv_manga_image AS manga
+                   JOIN pixiv_master_image AS master ON master.image_id = manga.image_id
+                   WHERE manga.image_id IN (SELECT image_id FROM temp.deleted_image_ids)
+                   AND manga.save_name IS NOT NULL
+                   AND (master.save_name IS NULL OR master.save_name NOT LIKE '%.zip')"""
+            )
+            save_names = [row[0] for row in cursor.fetchall() if row[0]]
+
+            tables = ["pixiv_master_image", "pixiv_manga_image", "pixiv_image_to_tag"]
+            if delete_metadata:
+                tables += ["pixiv_date_info", "pixiv_ai_info", "pixiv_image_to_series"]
+            for table in tables:
+                cursor.execute(f"DELETE FROM {table} WHERE image_id IN (SELECT image_id FROM temp.deleted_image_ids)")
+            cursor.execute("DELETE FROM temp.deleted_image_ids")
+            self.connection.commit()
+            return deleted_image_ids, save_names
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"Error deleting artworks: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def get_image_ids_by_member_id(self, member_id: int) -> list[int]:
+        """Get IDs of a member's artworks, newest first."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                "SELECT image_id FROM pixiv_master_image WHERE member_id = ? ORDER BY image_id DESC",
+                (member_id,)
+            )
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error getting image IDs for member {member_id}: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def get_image_ids_by_tag_id(self, tag_id: str) -> list[int]:
+        """Get IDs of artworks with a tag, newest first."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                "SELECT image_id FROM pixiv_image_to_tag WHERE tag_id = ? ORDER BY image_id DESC",
+                (tag_id,)
+            )
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error getting image IDs for tag {tag_id}: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def get_image_ids_updated_since(self, since: str) -> list[int]:
+        """
+        Get IDs of artworks PixivUtil2 saved since a UTC time formatted like SQLite's
+        datetime('now'), which it stamps last_update_date with.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                "SELECT image_id FROM pixiv_master_image WHERE last_update_date >= ? ORDER BY image_id",
+                (since,)
+            )
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error getting artworks updated since {since}: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def get_tag_cardinality(self, tag_ids: list[str]) -> dict[str, int]:
+        """Count the artworks of each tag; tags without artworks are left out."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                f"""SELECT tag_id, COUNT(*) FROM pixiv_image_to_tag
+                    WHERE tag_id IN ({', '.join('?' for _ in tag_ids)})
+                    GROUP BY tag_id""",
+                tag_ids
+            )
+            return dict(cursor.fetchall())
+        except Exception as e:
+            logger.error(f"Error counting artworks of {len(tag_ids)} tags: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
+
+    def query_image_ids_by_tags(
+        self,
+        expression: TagExpression,
+        *,
+        member_id: int | None = None,
+        uploaded_after: int | None = None,
+        uploaded_before: int | None = None,
+        ai: bool | None = None,
+        before_image_id: int | None = None,
+        limit: int = 100,
+    ) -> list[int]:
+        """
+        Get IDs of artworks matching a boolean tag expression and filters, newest first.
+        Pass the last ID of a page as `before_image_id` to get the next one.
+        """
+        cardinality = self.get_tag_cardinality(sorted(expression_tags(expression)))
+        sql, params = compile_tag_query(
+            expression,
+            cardinality,
+            member_id=member_id,
+            uploaded_after=uploaded_after,
+            uploaded_before=uploaded_before,
+            ai=ai,
+            before_image_id=before_image_id,
+            limit=limit,
+        )
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error querying artworks by tags: {e}")
+            raise
+        finally:
+            if cursor:
+                cursor.close()
@@ -0,0 +1,23 @@
+import sqlite3
+
+from PixivServer.config.sqlite import config as sqlite_config
+
+
+def apply_performance_profile(connection: sqlite3.Connection, reader: bool = False):
+    """
+    Apply the configured SQLite performance profile to a connection. Call it right after
+    connecting, before the journal mode is set, so a new database gets the configured page size.
+    Pass reader=True for connections that only serve reads.
+    """
+    cursor = connection.cursor()
+    try:
+        # A no-op once the database has been written to.
+        cursor.execute(f"PRAGMA page_size={sqlite_config.page_size}")
+        cursor.execute(f"PRAGMA mmap_size={sqlite_config.mmap_size_mb * 1024 * 1024}")
+        # A negative cache size is in KiB rather than pages.
+        cursor.execute(f"PRAGMA cache_size={-sqlite_config.cache_size_mb * 1024}")
+        cursor.execute(f"PRAGMA temp_store={sqlite_config.temp_store.upper()}")
+        if reader and sqlite_config.query_only_readers:
+            cursor.execute("PRAGMA query_only=1")
+    finally:
+        cursor.close()
@@ -0,0 +1,281 @@
+import logging
+import sqlite3
+from typing import Literal
+
+from PixivServer.config.pixivutil import config as pixivutil_config
+from PixivServer.repository.profile import apply_performance_profile
+
+logger = logging.getLogger(__name__)
+
+SearchKind = Literal["image", "member", "tag"]
+SEARCH_KINDS: tuple[SearchKind, ...] = ("image", "member", "tag")
+# The trigram tokenizer matches substrings, which Japanese titles without word breaks need,
+# but cannot match terms shorter than three characters.
+MIN_TERM_LENGTH = 3
+
+# Per kind: source table, key column, and the indexed title and body expressions (source alias `src`).
+SEARCH_SOURCES: dict[SearchKind, tuple[str, str, str, str]] = {
+    "image": ("pixiv_master_image", "image_id", "COALESCE(src.title, '')", "COALESCE(src.caption, '')"),
+    "member": ("pixiv_master_member", "member_id", "COALESCE(src.name, '')", "''"),
+    "tag": (
+        "pixiv_master_tag",
+        "tag_id",
+        "src.tag_id",
+        "COALESCE((SELECT group_concat(tt.translation, ' ') FROM pixiv_tag_translation tt WHERE tt.tag_id = src.tag_id), '')",
+    ),
+}
+# Updates to other columns (save names, dates) do not touch the index.
+INDEXED_COLUMNS: dict[SearchKind, str] = {"image": "image_id, title, caption", "member": "member_id, name", "tag": "tag_id"}
+
+
+def reindex_statements(kind: SearchKind, condition: str) -> list[str]:
+    """
+    Statements that (re)index the `kind` rows of the source table matching `condition`, which
+    refers to the key column through `src`. Used by the triggers and the backfill alike.
+    """
+    table, key, title, body = SEARCH_SOURCES[kind]
+    documents = f'''SELECT d.doc_id FROM pixiv_server_search_document d
+                    JOIN {table} src ON d.kind = '{kind}' AND d.ref = CAST(src.{key} AS TEXT)
+                    WHERE {condition}'''
+    return [
+        f'''INSERT OR IGNORE INTO pixiv_server_search_document (kind, ref)
+            SELECT '{kind}', CAST(src.{key} AS TEXT) FROM {table} src WHERE {condition}''',
+        f'''DELETE FROM pixiv_server_search WHERE rowid IN ({documents})''',
+        f'''INSERT INTO pixiv_server_search (rowid, title, body)
+            SELECT d.doc_id, {title}, {body} FROM pixiv_server_search_document d
+            JOIN {table} src ON d.kind = '{kind}' AND d.ref = CAST(src.{key} AS TEXT)
+            WHERE {condition}''',
+    ]
+
+
+def unindex_statements(kind: SearchKind, ref: str) -> list[str]:
+    document = f'''SELECT doc_id FROM pixiv_server_search_document WHERE kind = '{kind}' AND ref = CAST({ref} AS TEXT)'''
+    return [
+        f'''DELETE FROM pixiv_server_search WHERE rowid IN ({document})''',
+        f'''DELETE FROM pixiv_server_search_document WHERE kind = '{kind}' AND ref = CAST({ref} AS TEXT)''',
+    ]
+
+
+def trigger_definitions() -> dict[str, tuple[str, list[str]]]:
+    """Trigger name -> (event clause, body statements) keeping the index in sync with PixivUtil2's tables."""
+    definitions: dict[str, tuple[str, list[str]]] = {}
+    for kind, (table, key, _, _) in SEARCH_SOURCES.items():
+        reindex = reindex_statements(kind, f"src.{key} = NEW.{key}")
+        definitions[f"pixiv_server_search_{kind}_insert"] = (f"AFTER INSERT ON {table}", reindex)
+        definitions[f"pixiv_server_search_{kind}_update"] = (f"AFTER UPDATE OF {INDEXED_COLUMNS[kind]} ON {table}", reindex)
+        definitions[f"pixiv_server_search_{kind}_delete"] = (f"AFTER DELETE ON {table}", unindex_statements(kind, f"OLD.{key}"))
+    # A translation is part of its tag's document.
+    definitions["pixiv_server_search_translation_insert"] = (
+        "AFTER INSERT ON pixiv_tag_translation", reindex_statements("tag", "src.tag_id = NEW.tag_id")
+    )
+    definitions["pixiv_server_search_translation_update"] = (
+        "AFTER UPDATE OF tag_id, translation ON pixiv_tag_translation",
+        reindex_statements("tag", "src.tag_id = NEW.tag_id") + reindex_statements("tag", "src.tag_id = OLD.tag_id"),
+    )
+    definitions["pixiv_server_search_translation_delete"] = (
+        "AFTER DELETE ON pixiv_tag_translation", reindex_statements("tag", "src.tag_id = OLD.tag_id")
+    )
+    return definitions
+
+
+def build_match_query(text: str) -> str:
+    """
+    Turn user input into an FTS5 query matching documents that contain every term. Terms are
+    quoted, so FTS5 operators in the input are searched for literally.
+
+    Raises:
+        ValueError: If there are no terms, or a term is too short to match.
+    """
+    terms = text.split()
+    if not terms:
+        raise ValueError("Search query is empty.")
+    short_terms = [term for term in terms if len(term) < MIN_TERM_LENGTH]
+    if short_terms:
+        raise ValueError(f"Search terms must be at least {MIN_TERM_LENGTH} characters: {', '.join(short_terms)}")
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+class SearchRepository:
+    """
+    Full-text index over artwork titles and captions, member names, and tags with their
+    translations, kept in sync with the PixivUtil2 tables by triggers.
+    """
+
+    def __init__(self):
+        self.db_path = pixivutil_config.db_path
+        self.connection: sqlite3.Connection = None  # pyright: ignore[reportAttributeAccessIssue] this will be handled during open.
+        self._owns_connection = True
+
+    def open(self, connection: sqlite3.Connection | None = None):
+        """
+        Open the database connection, creating the tables and triggers. Pass the `connection` of
+        a database API read thread to read through it instead; it is left open on close.
+        """
+        if connection is not None:
+            self.connection = connection
+            self._owns_connection = False
+            return
+        self.connection = sqlite3.connect(self.db_path, timeout=30.0)
+        apply_performance_profile(self.connection)
+        self.connection.execute("PRAGMA busy_timeout=30000")
+        self.create_table()
+
+    def close(self):
+        if self.connection is not None and self._owns_connection:
+            self.connection.close()
+
+    def create_table(self):
+        c = self.connection.cursor()
+        # Maps FTS rowids to what they index; tags have text keys and no stable integer ID.
+        c.execute('''
+                  CREATE TABLE IF NOT EXISTS pixiv_server_search_document (
+                  doc_id INTEGER PRIMARY KEY,
+                  kind TEXT NOT NULL,
+                  ref TEXT NOT NULL,
+                  UNIQUE (kind, ref))
+                  ''')
+        c.execute('''
+                  CREATE VIRTUAL TABLE IF NOT EXISTS pixiv_server_search
+                  USING fts5(title, body, tokenize = 'trigram')
+                  ''')
+        # last_ref is untyped: integer keys for images and members, text keys for tags.
+        c.execute('''
+                  CREATE TABLE IF NOT EXISTS pixiv_server_search_backfill (
+                  kind TEXT PRIMARY KEY,
+                  last_ref,
+                  indexed INTEGER NOT NULL DEFAULT 0,
+                  finished_date DATE)
+                  ''')
+        for name, (event, statements) in trigger_definitions().items():
+            body = "; ".join(statements)
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS {name} {event} FOR EACH ROW BEGIN {body}; END''')
+        self.connection.commit()
+        c.close()
+
+    def search(self, query: str, kind: SearchKind | None = None, limit: int = 50, offset: int = 0) -> list[dict]:
+        """
+        Rank documents matching every term of `query` with BM25, weighting titles (and member
+        names, tag names) above captions and translations.
+
+        Raises:
+            ValueError: If the query has no usable terms.
+        """
+        match = build_match_query(query)
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            kind_filter = "AND d.kind = ?" if kind is not None else ""
+            params: tuple = (match, kind, limit, offset) if kind is not None else (match, limit, offset)
+            cursor.execute(
+                f'''SELECT d.kind, d.ref, s.title,
+                           snippet(pixiv_server_search, -1, '<b>', '</b>', '...', 16),
+                           bm25(pixiv_server_search, 10.0, 1.0) AS score
+                    FROM pixiv_server_search s
+                    JOIN pixiv_server_search_document d ON d.doc_id = s.rowid
+                    WHERE pixiv_server_search MATCH ? {kind_filter}
+                    ORDER BY score
+                    LIMIT ? OFFSET ?''',
+                params
+            )
+            return [
+                {
+                    "kind": result_kind,
+                    "id": ref if result_kind == "tag" else int(ref),
+                    "title": title,
+                    "snippet": snippet,
+                    "score": -score,
+                }
+                for result_kind, ref, title, snippet, score in cursor.fetchall()
+            ]
+        except Exception as e:
+            logger.error(f'Failed to search for {query!r}: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def reset_backfill(self):
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''DELETE FROM pixiv_server_search_backfill''')
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f'Failed to reset the search backfill: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def backfill_chunk(self, kind: SearchKind, batch_size: int) -> int:
+        """
+        Index the next `batch_size` rows of a kind after the saved position, in one short write
+        transaction so concurrent downloads only wait for a chunk.
+
+        Returns:
+            The number of rows indexed; 0 once the kind is fully indexed.
+        """
+        table, key, _, _ = SEARCH_SOURCES[kind]
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            row = cursor.execute(
+                '''SELECT last_ref, finished_date FROM pixiv_server_search_backfill WHERE kind = ?''', (kind, )
+            ).fetchone()
+            last_ref, finished_date = row if row else (None, None)
+            if finished_date is not None:
+                self.connection.rollback()
+                return 0
+
+            lower_bound = f"src.{key} > ?" if last_ref is not None else "1"
+            keys = cursor.execute(
+                f'''SELECT src.{key} FROM {table} src WHERE {lower_bound} ORDER BY src.{key} LIMIT ?''',
+                (last_ref, batch_size) if last_ref is not None else (batch_size, )
+            ).fetchall()
+            if keys:
+                upper_ref = keys[-1][0]
+                condition = f"{lower_bound} AND src.{key} <= ?"
+                params = (last_ref, upper_ref) if last_ref is not None else (upper_ref, )
+                for statement in reindex_statements(kind, condition):
+                    cursor.execute(statement, params)
+            cursor.execute(
+                '''INSERT INTO pixiv_server_search_backfill (kind, last_ref, indexed, finished_date)
+                   VALUES (?, ?, ?, CASE WHEN ? THEN NULL ELSE datetime('now') END)
+                   ON CONFLICT(kind) DO UPDATE SET
+                       last_ref = excluded.last_ref,
+                       indexed = indexed + excluded.indexed,
+                       finished_date = excluded.finished_date''',
+                (kind, keys[-1][0] if keys else last_ref, len(keys), bool(keys))
+            )
+            self.connection.commit()
+            return len(keys)
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f'Failed to backfill the search index for {kind}: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_status(self) -> dict:
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''SELECT kind, COUNT(*) FROM pixiv_server_search_document GROUP BY kind''')
+            documents = dict(cursor.fetchall())
+            cursor.execute('''SELECT kind, last_ref, indexed, finished_date FROM pixiv_server_search_backfill''')
+            backfill = {
+                kind: {"last_ref": last_ref, "indexed": indexed, "finished_date": finished_date}
+                for kind, last_ref, indexed, finished_date in cursor.fetchall()
+            }
+            return {
+                kind: {"documents": documents.get(kind, 0), "backfill": backfill.get(kind)}
+                for kind in SEARCH_KINDS
+            }
+        except Exception as e:
+            logger.error(f'Failed to get search index status: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
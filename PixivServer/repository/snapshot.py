@@ -0,0 +1,131 @@
+import logging
+import math
+import os
+import sqlite3
+import time
+
+from PixivServer.config.pixivutil import config as pixivutil_config
+from PixivServer.config.server import config as server_config
+from PixivServer.metrics import (
+    DATABASE_SNAPSHOT_AGE_SECONDS,
+    DATABASE_SNAPSHOT_REFRESH_DURATION,
+    DATABASE_SNAPSHOT_REFRESHES_TOTAL,
+)
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.repository.profile import apply_performance_profile
+
+logger = logging.getLogger(__name__)
+
+# A write to the live database restarts an incremental backup. After this many steps without
+# progress the snapshot is copied in one step instead, which in WAL mode does not block the writer
+# either, but keeps the WAL from being checkpointed while it runs.
+MAX_STALLED_STEPS = 3
+# Pause between backup steps, leaving the live database to the writer.
+STEP_PAUSE_SECONDS = 0.01
+
+
+class BackupStalled(Exception):
+    pass
+
+
+class DatabaseSnapshot:
+    """
+    Read-only copy of the PixivUtil2 database for API reads, refreshed with the SQLite online
+    backup API. Readers of the snapshot never hold a read transaction on the live database,
+    so they cannot keep its WAL from being checkpointed.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        snapshot_path: str,
+        interval_seconds: float,
+        max_staleness_seconds: float,
+        pages_per_step: int,
+        source_path: str | None = None,
+    ):
+        self.enabled = enabled
+        self.snapshot_path = snapshot_path
+        self.interval_seconds = interval_seconds
+        self.max_staleness_seconds = max_staleness_seconds
+        self.pages_per_step = pages_per_step
+        self._source_path = source_path
+        # Wall time the current snapshot was started; it has every write committed before then.
+        self.refreshed_at: float | None = None
+
+    @property
+    def source_path(self) -> str:
+        return self._source_path or pixivutil_config.db_path
+
+    def age(self) -> float:
+        return time.time() - self.refreshed_at if self.refreshed_at is not None else math.nan
+
+    def is_fresh(self) -> bool:
+        return self.enabled and self.refreshed_at is not None and self.age() <= self.max_staleness_seconds
+
+    def reader(self) -> PixivUtilRepository:
+        """Repository to read from: the snapshot while it is fresh, else the live database."""
+        if self.is_fresh():
+            return PixivUtilRepository(db_path=self.snapshot_path, read_only=True)
+        return PixivUtilRepository()
+
+    def refresh(self):
+        """Copy the live database to a temporary file and swap it in for the snapshot."""
+        started = time.time()
+        temp_path = self.snapshot_path + ".tmp"
+        os.makedirs(os.path.dirname(os.path.abspath(temp_path)), exist_ok=True)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+        source = sqlite3.connect(self.source_path, timeout=30.0)
+        target = sqlite3.connect(temp_path)
+        apply_performance_profile(source, reader=True)
+        apply_performance_profile(target)
+        try:
+            try:
+                source.backup(target, pages=self.pages_per_step, progress=self._progress())
+                result = "incremental"
+            except BackupStalled:
+                logger.info("Database snapshot kept restarting on concurrent writes; copying it in one step.")
+                source.backup(target)
+                result = "full"
+            # The copy keeps the live database's WAL mode, which read-only connections cannot open
+            # without its -shm file.
+            target.execute("PRAGMA journal_mode=DELETE")
+        except Exception:
+            DATABASE_SNAPSHOT_REFRESHES_TOTAL.labels("error").inc()
+            raise
+        finally:
+            target.close()
+            source.close()
+
+        # Open connections keep reading the replaced file until they reopen.
+        os.replace(temp_path, self.snapshot_path)
+        self.refreshed_at = started
+        DATABASE_SNAPSHOT_REFRESHES_TOTAL.labels(result).inc()
+        DATABASE_SNAPSHOT_REFRESH_DURATION.observe(time.time() - started)
+
+    def _progress(self):
+        last_remaining: int | None = None
+        stalled = 0
+
+        def progress(_status: int, remaining: int, _total: int):
+            nonlocal last_remaining, stalled
+            if last_remaining is not None and remaining >= last_remaining:
+                stalled += 1
+                if stalled >= MAX_STALLED_STEPS:
+                    raise BackupStalled()
+            last_remaining = remaining
+            time.sleep(STEP_PAUSE_SECONDS)
+
+        return progress
+
+
+database_snapshot = DatabaseSnapshot(
+    enabled=server_config.database_snapshot,
+    snapshot_path=server_config.database_snapshot_path,
+    interval_seconds=server_config.database_snapshot_interval_seconds,
+    max_staleness_seconds=server_config.database_snapshot_max_staleness_seconds,
+    pages_per_step=server_config.database_snapshot_pages_per_step,
+)
+DATABASE_SNAPSHOT_AGE_SECONDS.set_function(database_snapshot.age)
@@ -2,6 +2,7 @@ import logging
 import sqlite3
 
 from PixivServer.config.pixivutil import config as pixivutil_config
+from PixivServer.repository.profile import apply_performance_profile
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +14,7 @@ class SubscriptionRepository:
 
     def open(self):
         self.connection = sqlite3.connect(self.db_path)
+        apply_performance_profile(self.connection)
         self.create_table()
 
     def create_table(self):
@@ -29,8 +31,15 @@ class SubscriptionRepository:
                   tag_id VARCHAR(255) PRIMARY KEY ON CONFLICT IGNORE,
                   bookmark_count INTEGER,
                   created_date DATE,
-                  last_modified_date DATE)
+                  last_modified_date DATE,
+                  last_image_id INTEGER,
+                  last_image_date DATE)
                   ''')
+        # High-water mark columns were added after the initial schema; migrate older tables in place.
+        existing_columns = {row[1] for row in c.execute('PRAGMA table_info(pixiv_server_tag_subscription)').fetchall()}
+        for column, column_type in (('last_image_id', 'INTEGER'), ('last_image_date', 'DATE')):
+            if column not in existing_columns:
+                c.execute(f'ALTER TABLE pixiv_server_tag_subscription ADD COLUMN {column} {column_type}')
         self.connection.commit()
 
     def check_member_id_exist(self, member_id: int) -> bool:
@@ -157,6 +166,57 @@ class SubscriptionRepository:
 
         return results
 
+    def select_tag_subscription_states(self) -> list[tuple[str, int | None, int | None, str | None]]:
+        """
+        Get tag subscriptions with their crawl state.
+
+        Returns:
+            List of (tag_id, bookmark_count, last_image_id, last_image_date) tuples.
+        """
+        results: list[tuple[str, int | None, int | None, str | None]] = []
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''SELECT tag_id, bookmark_count, last_image_id, last_image_date
+                FROM pixiv_server_tag_subscription
+                ORDER BY tag_id''',
+            )
+            results = cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Failed to export tag subscription states: {e}")
+            raise e
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+        return results
+
+    def update_tag_high_water_mark(self, tag_id: str, last_image_id: int, last_image_date: str | None) -> bool:
+        """
+        Advance the newest artwork seen for a tag subscription. The mark never moves backwards.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''UPDATE pixiv_server_tag_subscription
+                SET last_image_id = ?,
+                    last_image_date = COALESCE(?, last_image_date),
+                    last_modified_date = datetime('now')
+                WHERE tag_id = ?
+                  AND (last_image_id IS NULL OR last_image_id < ?)''',
+                (last_image_id, last_image_date, tag_id, last_image_id, )
+            )
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f'Failed to update high-water mark for tag subscription: {tag_id}', e)
+            raise e
+        finally:
+            if cursor is not None:
+                cursor.close()
+        return True
+
     def add_tag_subscription(self, tag_id: str, bookmark_count: int) -> bool:
         cursor = None
         try:
@@ -0,0 +1,138 @@
+"""
+Compiles boolean tag expressions into SQL over pixiv_image_to_tag.
+
+Every tag test is an index probe on (tag_id, image_id). Results are driven by the cheapest
+positive part of the expression: the rarest tag of an AND, or the union of an OR's tags,
+walked newest first through the same index. Every other tag is only probed for the rows
+the driver yields. A LIMIT then stops the scan as soon as a page is full.
+"""
+
+from pixivutil_server_common.models import TagAllOf, TagAnyOf, TagExpression, TagNoneOf
+
+
+def _children(expression: TagAllOf | TagAnyOf | TagNoneOf) -> list[TagExpression]:
+    if isinstance(expression, TagAllOf):
+        return expression.all_of
+    if isinstance(expression, TagAnyOf):
+        return expression.any_of
+    return expression.none_of
+
+
+def expression_tags(expression: TagExpression) -> set[str]:
+    if isinstance(expression, str):
+        return {expression}
+    return set().union(*(expression_tags(child) for child in _children(expression)))
+
+
+def _cost(expression: TagExpression, cardinality: dict[str, int]) -> int:
+    """Upper bound on the artworks matching an expression; NONE OF is treated as unbounded."""
+    if isinstance(expression, str):
+        return cardinality.get(expression, 0)
+    if isinstance(expression, TagAllOf):
+        return min(_cost(child, cardinality) for child in expression.all_of)
+    if isinstance(expression, TagAnyOf):
+        return sum(_cost(child, cardinality) for child in expression.any_of)
+    return sum(cardinality.values()) + 1
+
+
+def compile_predicate(expression: TagExpression, cardinality: dict[str, int], image_id: str) -> tuple[str, list]:
+    """
+    SQL condition that is true when the artwork `image_id` refers to matches the expression.
+    AND operands are probed rarest first and OR operands most common first, so each
+    short-circuits as early as possible.
+    """
+    if isinstance(expression, str):
+        return f"EXISTS (SELECT 1 FROM pixiv_image_to_tag WHERE tag_id = ? AND image_id = {image_id})", [expression]
+
+    # NONE OF is NOT (ANY OF).
+    is_all = isinstance(expression, TagAllOf)
+    children = sorted(_children(expression), key=lambda child: _cost(child, cardinality) * (1 if is_all else -1))
+    joiner = " AND " if is_all else " OR "
+    negate = isinstance(expression, TagNoneOf)
+
+    parts: list[str] = []
+    params: list = []
+    for child in children:
+        sql, child_params = compile_predicate(child, cardinality, image_id)
+        parts.append(f"({sql})")
+        params.extend(child_params)
+    sql = joiner.join(parts)
+    return (f"NOT ({sql})", params) if negate else (sql, params)
+
+
+def compile_driver(expression: TagExpression, cardinality: dict[str, int]) -> tuple[str, list] | None:
+    """
+    Query yielding a superset of the matching image IDs from the tag index, or None when the
+    expression has no positive part to drive from (e.g. a bare NONE OF).
+    """
+    if isinstance(expression, str):
+        return "SELECT image_id FROM pixiv_image_to_tag WHERE tag_id = ?", [expression]
+    if isinstance(expression, TagAllOf):
+        drivers = [
+            (child, driver) for child in expression.all_of
+            if (driver := compile_driver(child, cardinality)) is not None
+        ]
+        if not drivers:
+            return None
+        return min(drivers, key=lambda item: _cost(item[0], cardinality))[1]
+    if isinstance(expression, TagAnyOf):
+        drivers = [compile_driver(child, cardinality) for child in expression.any_of]
+        if any(driver is None for driver in drivers):
+            return None
+        # UNION also removes artworks reached through several of the tags.
+        params: list = []
+        for _, driver_params in drivers:  # type: ignore[misc]
+            params.extend(driver_params)
+        return " UNION ".join(sql for sql, _ in drivers), params  # type: ignore[misc]
+    return None
+
+
+def compile_tag_query(
+    expression: TagExpression,
+    cardinality: dict[str, int],
+    *,
+    member_id: int | None = None,
+    uploaded_after: int | None = None,
+    uploaded_before: int | None = None,
+    ai: bool | None = None,
+    before_image_id: int | None = None,
+    limit: int = 100,
+) -> tuple[str, list]:
+    """Build the query for one page of matching image IDs, newest first."""
+    driver = compile_driver(expression, cardinality) or ("SELECT image_id FROM pixiv_master_image", [])
+    predicate, predicate_params = compile_predicate(expression, cardinality, "d.image_id")
+
+    joins: list[str] = []
+    conditions = [predicate]
+    params: list = [*driver[1]]
+    if member_id is not None:
+        joins.append("JOIN pixiv_master_image mi ON mi.image_id = d.image_id")
+        conditions.append("mi.member_id = ?")
+    if uploaded_after is not None or uploaded_before is not None:
+        joins.append("JOIN pixiv_date_info di ON di.image_id = d.image_id")
+    if ai is not None:
+        joins.append("LEFT JOIN pixiv_ai_info ai ON ai.image_id = d.image_id")
+
+    params.extend(predicate_params)
+    if member_id is not None:
+        params.append(member_id)
+    if uploaded_after is not None:
+        conditions.append("di.uploaded_date_epoch >= ?")
+        params.append(uploaded_after)
+    if uploaded_before is not None:
+        conditions.append("di.uploaded_date_epoch < ?")
+        params.append(uploaded_before)
+    if ai is not None:
+        # Pixiv's aiType: 2 is AI-generated; 0 (unknown), 1 (not AI) and a missing row are not.
+        conditions.append("COALESCE(ai.ai_type, 0) = 2" if ai else "COALESCE(ai.ai_type, 0) != 2")
+    if before_image_id is not None:
+        conditions.append("d.image_id < ?")
+        params.append(before_image_id)
+    params.append(limit)
+
+    sql = f'''SELECT d.image_id FROM ({driver[0]}) d
+              {" ".join(joins)}
+              WHERE {" AND ".join(conditions)}
+              ORDER BY d.image_id DESC
+              LIMIT ?'''
+    return sql, params
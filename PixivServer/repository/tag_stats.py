@@ -0,0 +1,351 @@
+import logging
+import sqlite3
+
+from PixivServer.config.pixivutil import config as pixivutil_config
+from PixivServer.repository.profile import apply_performance_profile
+
+logger = logging.getLogger(__name__)
+
+# Tag links of an image are counted once the image is covered: the rebuild has passed it, or
+# the rebuild has finished. Until then the rebuild counts it, so no link is counted twice.
+COVERED_CONDITION = '''EXISTS (
+    SELECT 1 FROM pixiv_server_tag_stats_state
+    WHERE finished_date IS NOT NULL OR {image_id} <= last_image_id)'''
+
+
+def _adjust_statements(image_id: str, tag_id: str, delta: int) -> list[str]:
+    """
+    Statements adding `delta` to a tag link's count and to its pairs with the image's other tags.
+    Only pairs of top tags are kept: those of the tag if it is one, and those of the other tags
+    that are.
+    """
+    partners = f'''SELECT tag_id FROM pixiv_image_to_tag WHERE image_id = {image_id} AND tag_id != {tag_id}'''
+    return [
+        f'''INSERT INTO pixiv_server_tag_count (tag_id, image_count) VALUES ({tag_id}, {delta})
+            ON CONFLICT(tag_id) DO UPDATE SET image_count = image_count + excluded.image_count''',
+        f'''INSERT INTO pixiv_server_tag_pair (tag_id, other_tag_id, image_count)
+            SELECT {tag_id}, tag_id, {delta} FROM ({partners})
+            WHERE EXISTS (SELECT 1 FROM pixiv_server_tag_top WHERE tag_id = {tag_id})
+            ON CONFLICT(tag_id, other_tag_id) DO UPDATE SET image_count = image_count + excluded.image_count''',
+        f'''INSERT INTO pixiv_server_tag_pair (tag_id, other_tag_id, image_count)
+            SELECT partner.tag_id, {tag_id}, {delta} FROM ({partners}) partner
+            JOIN pixiv_server_tag_top top ON top.tag_id = partner.tag_id WHERE 1
+            ON CONFLICT(tag_id, other_tag_id) DO UPDATE SET image_count = image_count + excluded.image_count''',
+        f'''DELETE FROM pixiv_server_tag_count WHERE tag_id = {tag_id} AND image_count <= 0''',
+        f'''DELETE FROM pixiv_server_tag_pair
+            WHERE image_count <= 0 AND (tag_id = {tag_id} OR other_tag_id = {tag_id})''',
+    ]
+
+
+def trigger_definitions() -> dict[str, tuple[str, list[str]]]:
+    """Trigger name -> (event clause, body statements) keeping the statistics in sync with pixiv_image_to_tag."""
+    return {
+        "pixiv_server_tag_stats_insert": (
+            f"AFTER INSERT ON pixiv_image_to_tag WHEN {COVERED_CONDITION.format(image_id='NEW.image_id')}",
+            _adjust_statements("NEW.image_id", "NEW.tag_id", 1),
+        ),
+        "pixiv_server_tag_stats_delete": (
+            f"AFTER DELETE ON pixiv_image_to_tag WHEN {COVERED_CONDITION.format(image_id='OLD.image_id')}",
+            _adjust_statements("OLD.image_id", "OLD.tag_id", -1),
+        ),
+    }
+
+
+class TagStatsRepository:
+    """
+    Per-tag image counts and per-pair co-occurrence counts, kept up to date by triggers on
+    pixiv_image_to_tag so that top tags, tag counts and related tags are index lookups.
+
+    Pairs are only kept for the top tags, the most used ones as of the last rebuild: pairs of
+    every tag would be tags² rows per artwork, and two upserts per tag already on an artwork
+    for every tag link written.
+    """
+
+    def __init__(self):
+        self.db_path = pixivutil_config.db_path
+        self.connection: sqlite3.Connection = None  # pyright: ignore[reportAttributeAccessIssue] this will be handled during open.
+        self._owns_connection = True
+
+    def open(self, connection: sqlite3.Connection | None = None):
+        """
+        Open the database connection, creating the tables and triggers. Pass the `connection` of
+        a database API read thread to read through it instead; it is left open on close.
+        """
+        if connection is not None:
+            self.connection = connection
+            self._owns_connection = False
+            return
+        self.connection = sqlite3.connect(self.db_path, timeout=30.0)
+        apply_performance_profile(self.connection)
+        self.connection.execute("PRAGMA busy_timeout=30000")
+        self.create_table()
+
+    def close(self):
+        if self.connection is not None and self._owns_connection:
+            self.connection.close()
+
+    def create_table(self):
+        c = self.connection.cursor()
+        c.execute('''
+                  CREATE TABLE IF NOT EXISTS pixiv_server_tag_count (
+                  tag_id VARCHAR(255) PRIMARY KEY,
+                  image_count INTEGER NOT NULL)
+                  ''')
+        c.execute('''
+                  CREATE INDEX IF NOT EXISTS idx_pixiv_server_tag_count_image_count
+                  ON pixiv_server_tag_count (image_count DESC, tag_id)
+                  ''')
+        # A top tag's pairs are stored under it, so the related tags of a tag are one index range.
+        c.execute('''
+                  CREATE TABLE IF NOT EXISTS pixiv_server_tag_pair (
+                  tag_id VARCHAR(255) NOT NULL,
+                  other_tag_id VARCHAR(255) NOT NULL,
+                  image_count INTEGER NOT NULL,
+                  PRIMARY KEY (tag_id, other_tag_id)) WITHOUT ROWID
+                  ''')
+        c.execute('''
+                  CREATE INDEX IF NOT EXISTS idx_pixiv_server_tag_pair_image_count
+                  ON pixiv_server_tag_pair (tag_id, image_count DESC, other_tag_id)
+                  ''')
+        c.execute('''
+                  CREATE TABLE IF NOT EXISTS pixiv_server_tag_top (
+                  tag_id VARCHAR(255) PRIMARY KEY) WITHOUT ROWID
+                  ''')
+        c.execute('''
+                  CREATE TABLE IF NOT EXISTS pixiv_server_tag_stats_state (
+                  id INTEGER PRIMARY KEY CHECK (id = 1),
+                  last_image_id INTEGER,
+                  counted INTEGER NOT NULL DEFAULT 0,
+                  finished_date DATE)
+                  ''')
+        # With no tag links yet there is nothing to rebuild, and the triggers count everything.
+        c.execute('''
+                  INSERT OR IGNORE INTO pixiv_server_tag_stats_state (id, finished_date)
+                  SELECT 1, datetime('now') WHERE NOT EXISTS (SELECT 1 FROM pixiv_image_to_tag)
+                  ''')
+        for name, (event, statements) in trigger_definitions().items():
+            body = "; ".join(statements)
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS {name} {event} BEGIN {body}; END''')
+        self.connection.commit()
+        c.close()
+
+    def reset(self):
+        """Drop all counts; the triggers stop counting until the rebuild covers images again."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute('''DELETE FROM pixiv_server_tag_count''')
+            cursor.execute('''DELETE FROM pixiv_server_tag_pair''')
+            cursor.execute('''DELETE FROM pixiv_server_tag_top''')
+            cursor.execute('''
+                           INSERT INTO pixiv_server_tag_stats_state (id, last_image_id, counted, finished_date)
+                           VALUES (1, NULL, 0, NULL)
+                           ON CONFLICT(id) DO UPDATE SET last_image_id = NULL, counted = 0, finished_date = NULL
+                           ''')
+            self.connection.commit()
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f'Failed to reset tag statistics: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def rebuild_chunk(self, batch_size: int) -> int:
+        """
+        Count the tag links of the next `batch_size` images after the saved position, in one
+        short write transaction. Pairs are counted by `refresh_top_tags` once the counts are complete.
+
+        Returns:
+            The number of images counted; 0 once the statistics are complete.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            row = cursor.execute(
+                '''SELECT last_image_id, finished_date FROM pixiv_server_tag_stats_state WHERE id = 1'''
+            ).fetchone()
+            last_image_id, finished_date = row if row else (None, None)
+            if finished_date is not None:
+                self.connection.rollback()
+                return 0
+
+            lower = last_image_id if last_image_id is not None else -1
+            image_ids = cursor.execute(
+                '''SELECT DISTINCT image_id FROM pixiv_image_to_tag WHERE image_id > ? ORDER BY image_id LIMIT ?''',
+                (lower, batch_size)
+            ).fetchall()
+            if image_ids:
+                upper = image_ids[-1][0]
+                cursor.execute(
+                    '''INSERT INTO pixiv_server_tag_count (tag_id, image_count)
+                       SELECT tag_id, COUNT(*) FROM pixiv_image_to_tag
+                       WHERE image_id > ? AND image_id <= ? GROUP BY tag_id
+                       ON CONFLICT(tag_id) DO UPDATE SET image_count = image_count + excluded.image_count''',
+                    (lower, upper)
+                )
+            cursor.execute(
+                '''INSERT INTO pixiv_server_tag_stats_state (id, last_image_id, counted, finished_date)
+                   VALUES (1, ?, ?, CASE WHEN ? THEN NULL ELSE datetime('now') END)
+                   ON CONFLICT(id) DO UPDATE SET
+                       last_image_id = excluded.last_image_id,
+                       counted = counted + excluded.counted,
+                       finished_date = excluded.finished_date''',
+                (image_ids[-1][0] if image_ids else last_image_id, len(image_ids), bool(image_ids))
+            )
+            self.connection.commit()
+            return len(image_ids)
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f'Failed to rebuild tag statistics: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def refresh_top_tags(self, top_tags: int) -> tuple[int, int]:
+        """
+        Make the `top_tags` most used tags the ones pairs are kept for. Each tag joining or leaving
+        gets its own write transaction, which counts or drops its pairs.
+
+        Returns:
+            The number of tags that joined and left.
+        """
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            if not self.is_complete():
+                return 0, 0
+            top = {row[0] for row in cursor.execute(
+                '''SELECT tag_id FROM pixiv_server_tag_count ORDER BY image_count DESC, tag_id LIMIT ?''',
+                (top_tags, )
+            )}
+            current = {row[0] for row in cursor.execute('''SELECT tag_id FROM pixiv_server_tag_top''')}
+            for tag_id in current - top:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute('''DELETE FROM pixiv_server_tag_top WHERE tag_id = ?''', (tag_id, ))
+                cursor.execute('''DELETE FROM pixiv_server_tag_pair WHERE tag_id = ?''', (tag_id, ))
+                self.connection.commit()
+            for tag_id in top - current:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute('''INSERT INTO pixiv_server_tag_top (tag_id) VALUES (?)''', (tag_id, ))
+                cursor.execute(
+                    '''INSERT INTO pixiv_server_tag_pair (tag_id, other_tag_id, image_count)
+                       SELECT a.tag_id, b.tag_id, COUNT(*) FROM pixiv_image_to_tag a
+                       JOIN pixiv_image_to_tag b ON b.image_id = a.image_id AND b.tag_id != a.tag_id
+                       WHERE a.tag_id = ? GROUP BY b.tag_id''',
+                    (tag_id, )
+                )
+                self.connection.commit()
+            return len(top - current), len(current - top)
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f'Failed to refresh top tags: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def is_top_tag(self, tag_id: str) -> bool:
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''SELECT 1 FROM pixiv_server_tag_top WHERE tag_id = ?''', (tag_id, ))
+            return cursor.fetchone() is not None
+        except Exception as e:
+            logger.error(f'Failed to get whether {tag_id} is a top tag: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def is_complete(self) -> bool:
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''SELECT finished_date FROM pixiv_server_tag_stats_state WHERE id = 1''')
+            row = cursor.fetchone()
+            return row is not None and row[0] is not None
+        except Exception as e:
+            logger.error(f'Failed to get tag statistics state: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_top_tags(self, limit: int, offset: int = 0) -> list[tuple[str, int]]:
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''SELECT tag_id, image_count FROM pixiv_server_tag_count
+                   ORDER BY image_count DESC, tag_id LIMIT ? OFFSET ?''',
+                (limit, offset)
+            )
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f'Failed to get top tags: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_tag_count(self, tag_id: str) -> int:
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''SELECT image_count FROM pixiv_server_tag_count WHERE tag_id = ?''', (tag_id, ))
+            row = cursor.fetchone()
+            return row[0] if row else 0
+        except Exception as e:
+            logger.error(f'Failed to get image count of tag {tag_id}: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_related_tags(self, tag_id: str, limit: int) -> list[tuple[str, int]]:
+        """Tags most often on the same artworks as `tag_id`, with the number of shared artworks."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''SELECT other_tag_id, image_count FROM pixiv_server_tag_pair
+                   WHERE tag_id = ? ORDER BY image_count DESC, other_tag_id LIMIT ?''',
+                (tag_id, limit)
+            )
+            return cursor.fetchall()
+        except Exception as e:
+            logger.error(f'Failed to get related tags of {tag_id}: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def select_status(self) -> dict:
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''SELECT last_image_id, counted, finished_date FROM pixiv_server_tag_stats_state WHERE id = 1'''
+            )
+            row = cursor.fetchone()
+            last_image_id, counted, finished_date = row if row else (None, 0, None)
+            tags = cursor.execute('''SELECT COUNT(*) FROM pixiv_server_tag_count''').fetchone()[0]
+            top_tags = cursor.execute('''SELECT COUNT(*) FROM pixiv_server_tag_top''').fetchone()[0]
+            pairs = cursor.execute('''SELECT COUNT(*) FROM pixiv_server_tag_pair''').fetchone()[0]
+            return {
+                "complete": finished_date is not None,
+                "tags": tags,
+                "top_tags": top_tags,
+                "pairs": pairs,
+                "rebuild": {"last_image_id": last_image_id, "counted": counted, "finished_date": finished_date},
+            }
+        except Exception as e:
+            logger.error(f'Failed to get tag statistics status: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
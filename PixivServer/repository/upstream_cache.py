@@ -0,0 +1,131 @@
+import logging
+import sqlite3
+import time
+
+from PixivServer.config.server import config as server_config
+
+logger = logging.getLogger(__name__)
+
+class UpstreamCacheRepository:
+    """
+    Short-lived cache of parsed upstream pages, kept in its own SQLite file so cache churn does
+    not grow or lock the PixivUtil2 database.
+    """
+
+    def __init__(self, db_path: str | None = None):
+        self.db_path = db_path or server_config.upstream_cache_db
+        self.connection: sqlite3.Connection = None  # pyright: ignore[reportAttributeAccessIssue] this will be handled during open.
+
+    def open(self):
+        self.connection = sqlite3.connect(self.db_path, timeout=30.0, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.create_table()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    def create_table(self):
+        c = self.connection.cursor()
+        c.execute('''
+                  CREATE TABLE IF NOT EXISTS pixiv_server_upstream_cache (
+                  kind TEXT NOT NULL,
+                  key TEXT NOT NULL,
+                  value BLOB NOT NULL,
+                  stored_at REAL NOT NULL,
+                  PRIMARY KEY (kind, key))
+                  ''')
+        c.execute('''
+                  CREATE INDEX IF NOT EXISTS idx_pixiv_server_upstream_cache_stored_at
+                  ON pixiv_server_upstream_cache (stored_at)
+                  ''')
+        self.connection.commit()
+        c.close()
+
+    def select_entry(self, kind: str, key: str, min_stored_at: float) -> bytes | None:
+        """Get a cached value stored at or after `min_stored_at`, or None."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''SELECT value FROM pixiv_server_upstream_cache WHERE kind = ? AND key = ? AND stored_at >= ?''',
+                (kind, key, min_stored_at)
+            )
+            row = cursor.fetchone()
+            return row[0] if row else None
+        except Exception as e:
+            logger.error(f'Failed to get cached {kind} {key}: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def upsert_entry(self, kind: str, key: str, value: bytes):
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(
+                '''INSERT OR REPLACE INTO pixiv_server_upstream_cache (kind, key, value, stored_at) VALUES (?, ?, ?, ?)''',
+                (kind, key, value, time.time())
+            )
+            self.connection.commit()
+        except Exception as e:
+            logger.error(f'Failed to cache {kind} {key}: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def delete_entries(self, kind: str | None = None) -> int:
+        """Delete cached entries of a kind, or all of them."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            if kind is None:
+                cursor.execute('''DELETE FROM pixiv_server_upstream_cache''')
+            else:
+                cursor.execute('''DELETE FROM pixiv_server_upstream_cache WHERE kind = ?''', (kind, ))
+            self.connection.commit()
+            return cursor.rowcount
+        except Exception as e:
+            logger.error(f'Failed to clear the upstream cache: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def prune(self, min_stored_at: float, max_entries: int) -> int:
+        """Delete expired entries, then the oldest ones beyond `max_entries`. Returns the number deleted."""
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''DELETE FROM pixiv_server_upstream_cache WHERE stored_at < ?''', (min_stored_at, ))
+            deleted = cursor.rowcount
+            cursor.execute(
+                '''DELETE FROM pixiv_server_upstream_cache WHERE rowid IN (
+                       SELECT rowid FROM pixiv_server_upstream_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)''',
+                (max_entries, )
+            )
+            deleted += cursor.rowcount
+            self.connection.commit()
+            return deleted
+        except Exception as e:
+            logger.error(f'Failed to prune the upstream cache: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
+
+    def count_entries(self) -> int:
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute('''SELECT COUNT(*) FROM pixiv_server_upstream_cache''')
+            return cursor.fetchone()[0]
+        except Exception as e:
+            logger.error(f'Failed to count upstream cache entries: {e}')
+            raise
+        finally:
+            if cursor is not None:
+                cursor.close()
@@ -0,0 +1,69 @@
+import logging
+import sqlite3
+import time
+
+from PixivServer.config.server import config as server_config
+from PixivServer.metrics import DATABASE_WRITE_BATCH_WRITES
+
+logger = logging.getLogger(__name__)
+
+# Marks the last commit() inside a batch, so a rollback only undoes the writes after it.
+SAVEPOINT_NAME = "pixiv_server_write_batch"
+
+
+class BatchingConnection(sqlite3.Connection):
+    """
+    Connection that groups commits into short transactions. Pass it as the `factory` of
+    `sqlite3.connect` for a writer that commits after every statement, like PixivUtil2's
+    database manager.
+
+    commit() only ends a write: the transaction stays open until `max_writes` writes have
+    ended or `max_delay_seconds` have passed since the first of them, when it is committed on
+    the next commit(). flush() and close() commit right away. Until then, other connections do
+    not see the writes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_writes = server_config.database_write_batch_size
+        self.max_delay_seconds = server_config.database_write_batch_seconds
+        self._pending = 0
+        self._batch_started: float | None = None
+
+    @property
+    def pending_writes(self) -> int:
+        return self._pending
+
+    def commit(self):
+        if not self.in_transaction:
+            return super().commit()
+        if self._batch_started is None:
+            self._batch_started = time.monotonic()
+        self._pending += 1
+        if self._pending >= self.max_writes or time.monotonic() - self._batch_started >= self.max_delay_seconds:
+            return self.flush()
+        self.execute(f"SAVEPOINT {SAVEPOINT_NAME}")
+
+    def rollback(self):
+        if self._pending and self.in_transaction:
+            # Keep the writes committed earlier in the batch.
+            self.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT_NAME}")
+            return
+        return super().rollback()
+
+    def flush(self):
+        """Commit the writes batched so far."""
+        if self._pending:
+            DATABASE_WRITE_BATCH_WRITES.observe(self._pending)
+        self._pending = 0
+        self._batch_started = None
+        # COMMIT also releases the savepoints.
+        return super().commit()
+
+    def close(self):
+        try:
+            if self.in_transaction and self._pending:
+                self.flush()
+        except sqlite3.Error as e:
+            logger.error(f'Failed to commit batched database writes: {e}')
+        return super().close()
@@ -1,151 +1,236 @@
 import json
 import logging
 import sqlite3
+from collections.abc import AsyncIterator, Callable, Iterator
 
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, Query, Request, Response
 from fastapi.encoders import jsonable_encoder
-
+from fastapi.responses import StreamingResponse
+from pixivutil_server_common.models import (
+    ImageListFields,
+    ImageListOrder,
+    TagQueryRequest,
+    TagQueryResponse,
+)
+
+from PixivServer.repository.async_pixivutil import (
+    DatabaseOverloaded,
+    DatabaseQueryTimeout,
+    async_repository,
+)
 from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.repository.search import SearchKind
+from PixivServer.service import search, tag_stats
 
 logger = logging.getLogger('uvicorn.pixivutil')
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def stream_ndjson(
+    iter_batches: Callable[[PixivUtilRepository], Iterator[list]],
+    description: str,
+) -> StreamingResponse:
+    """
+    Stream rows as newline-delimited JSON, one value per line, without materializing the
+    full result set. Each database batch is fetched on a database thread and written as one chunk.
+    """
+    async def generate() -> AsyncIterator[bytes]:
+        try:
+            async for batch in async_repository.stream(iter_batches):
+                yield "".join(json.dumps(value) + "\n" for value in batch).encode()
+        except sqlite3.Error as e:
+            logger.error(f"Database error while streaming {description}: {e}")
+            raise
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def database_error_response(e: sqlite3.Error, description: str) -> Response:
+    if isinstance(e, DatabaseQueryTimeout):
+        logger.warning(f"Database query timed out while {description}: {e}")
+        return Response(
+            content="Database query timed out.",
+            status_code=504,
+        )
+    if isinstance(e, DatabaseOverloaded):
+        logger.warning(f"Database busy while {description}: {e}")
+        return Response(
+            content="Database is busy, retry later.",
+            status_code=503,
+        )
+    logger.error(f"Database error while {description}: {e}")
+    return Response(
+        content="Database error occurred.",
+        status_code=500,
+    )
+
 @router.get("/members")
-def get_all_pixiv_member_ids() -> Response:
-    """Get all member IDs from the database."""
-    logger.info("Getting all member IDs from database.")
+async def get_all_pixiv_member_ids(request: Request) -> Response:
+    """
+    Get all member IDs from the database.
 
-    repository = PixivUtilRepository()
+    Send `Accept: application/x-ndjson` to receive a stream with one JSON value per line.
+    """
+    logger.info("Getting all member IDs from database.")
+    if wants_ndjson(request):
+        return stream_ndjson(PixivUtilRepository.iter_pixiv_member_id_batches, "member IDs")
 
     try:
-        repository.open()
-        member_ids = repository.get_all_pixiv_member_ids()
-
-        member_ids_json = json.dumps(member_ids)
+        member_ids_json = await async_repository.run(
+            "get_all_pixiv_member_ids", lambda repository: json.dumps(repository.get_all_pixiv_member_ids())
+        )
         return Response(
             content=member_ids_json,
             status_code=200,
         )
     except sqlite3.Error as e:
-        logger.error(f"Database error while getting all member IDs: {e}")
-        return Response(
-            content="Database error occurred.",
-            status_code=500,
-        )
+        return database_error_response(e, "getting all member IDs")
     except (TypeError, ValueError, RecursionError) as e:
         logger.error(f"Serialization error while getting all member IDs: {e}")
         return Response(
             content="Response serialization error occurred.",
             status_code=500,
         )
-    finally:
-        repository.close()
 
 @router.get("/images")
-def get_all_pixiv_image_ids() -> Response:
-    """Get all image IDs from the database."""
-    logger.info("Getting all image IDs from database.")
+async def get_all_pixiv_image_ids(request: Request) -> Response:
+    """
+    Get all image IDs from the database.
 
-    repository = PixivUtilRepository()
+    Send `Accept: application/x-ndjson` to receive a stream with one JSON value per line.
+    """
+    logger.info("Getting all image IDs from database.")
+    if wants_ndjson(request):
+        return stream_ndjson(PixivUtilRepository.iter_pixiv_image_id_batches, "image IDs")
 
     try:
-        repository.open()
-        image_ids = repository.get_all_pixiv_image_ids()
-
-        image_ids_json = json.dumps(image_ids)
+        image_ids_json = await async_repository.run(
+            "get_all_pixiv_image_ids", lambda repository: json.dumps(repository.get_all_pixiv_image_ids())
+        )
         return Response(
             content=image_ids_json,
             status_code=200,
         )
     except sqlite3.Error as e:
-        logger.error(f"Database error while getting all image IDs: {e}")
-        return Response(
-            content="Database error occurred.",
-            status_code=500,
-        )
+        return database_error_response(e, "getting all image IDs")
     except (TypeError, ValueError, RecursionError) as e:
         logger.error(f"Serialization error while getting all image IDs: {e}")
         return Response(
             content="Response serialization error occurred.",
             status_code=500,
         )
-    finally:
-        repository.close()
 
 @router.get("/tags")
-def get_all_pixiv_tags() -> Response:
-    """Get all tag IDs from the database."""
-    logger.info("Getting all tag IDs from database.")
+async def get_all_pixiv_tags(request: Request) -> Response:
+    """
+    Get all tag IDs from the database.
 
-    repository = PixivUtilRepository()
+    Send `Accept: application/x-ndjson` to receive a stream with one JSON value per line.
+    """
+    logger.info("Getting all tag IDs from database.")
+    if wants_ndjson(request):
+        return stream_ndjson(PixivUtilRepository.iter_pixiv_tag_batches, "tag IDs")
 
     try:
-        repository.open()
-        tag_ids = repository.get_all_pixiv_tags()
-
-        tag_ids_json = json.dumps(tag_ids)
+        tag_ids_json = await async_repository.run(
+            "get_all_pixiv_tags", lambda repository: json.dumps(repository.get_all_pixiv_tags())
+        )
         return Response(
             content=tag_ids_json,
             status_code=200,
         )
     except sqlite3.Error as e:
-        logger.error(f"Database error while getting all tag IDs: {e}")
-        return Response(
-            content="Database error occurred.",
-            status_code=500,
-        )
+        return database_error_response(e, "getting all tag IDs")
     except (TypeError, ValueError, RecursionError) as e:
         logger.error(f"Serialization error while getting all tag IDs: {e}")
         return Response(
             content="Response serialization error occurred.",
             status_code=500,
         )
-    finally:
-        repository.close()
 
 @router.get("/series")
-def get_all_pixiv_series() -> Response:
-    """Get all series IDs from the database."""
-    logger.info("Getting all series IDs from database.")
+async def get_all_pixiv_series(request: Request) -> Response:
+    """
+    Get all series IDs from the database.
 
-    repository = PixivUtilRepository()
+    Send `Accept: application/x-ndjson` to receive a stream with one JSON value per line.
+    """
+    logger.info("Getting all series IDs from database.")
+    if wants_ndjson(request):
+        return stream_ndjson(PixivUtilRepository.iter_pixiv_series_batches, "series IDs")
 
     try:
-        repository.open()
-        series_ids = repository.get_all_pixiv_series()
-
-        series_ids_json = json.dumps(series_ids)
+        series_ids_json = await async_repository.run(
+            "get_all_pixiv_series", lambda repository: json.dumps(repository.get_all_pixiv_series())
+        )
         return Response(
             content=series_ids_json,
             status_code=200,
         )
     except sqlite3.Error as e:
-        logger.error(f"Database error while getting all series IDs: {e}")
-        return Response(
-            content="Database error occurred.",
-            status_code=500,
-        )
+        return database_error_response(e, "getting all series IDs")
     except (TypeError, ValueError, RecursionError) as e:
         logger.error(f"Serialization error while getting all series IDs: {e}")
         return Response(
             content="Response serialization error occurred.",
             status_code=500,
         )
-    finally:
-        repository.close()
+
+@router.post("/tags/query")
+async def query_pixiv_images_by_tags(request: TagQueryRequest) -> Response:
+    """
+    Get IDs of artworks matching a boolean tag expression, newest first, optionally filtered by
+    member, upload date and AI flag. Pass `next_cursor` as `before_image_id` for the next page.
+    """
+    logger.info(f"Querying images by tags: {request.query}.")
+    try:
+        image_ids = await async_repository.query_image_ids_by_tags(
+            request.query,
+            member_id=request.member_id,
+            uploaded_after=request.uploaded_after,
+            uploaded_before=request.uploaded_before,
+            ai=request.ai,
+            before_image_id=request.before_image_id,
+            limit=request.limit,
+        )
+        response = TagQueryResponse(
+            image_ids=image_ids,
+            next_cursor=image_ids[-1] if len(image_ids) == request.limit else None,
+        )
+        return Response(
+            content=response.model_dump_json(),
+            status_code=200,
+        )
+    except sqlite3.Error as e:
+        return database_error_response(e, "querying images by tags")
 
 @router.get("/tag/{tag_id}")
-def get_pixiv_tag_info_by_id(tag_id: str) -> Response:
-    """Get tag information from the database."""
+async def get_pixiv_tag_info_by_id(
+    tag_id: str,
+    limit: int | None = Query(default=None, ge=1, le=10000),
+    after: int | None = None,
+    order: ImageListOrder = "asc",
+    fields: ImageListFields = "full",
+) -> Response:
+    """
+    Get tag information from the database, with one page of its images when `limit` is set.
+    Pass `next_cursor` as `after` for the next page.
+    """
     logger.info(f"Getting tag info by ID from database: {tag_id}.")
 
-    repository = PixivUtilRepository()
-
     try:
-        repository.open()
-        tag_info = repository.get_tag_info_by_id(tag_id)
-
-        tag_info_json = json.dumps(jsonable_encoder(tag_info))
+        tag_info_json = await async_repository.run(
+            "get_tag_info_by_id",
+            lambda repository: json.dumps(jsonable_encoder(
+                repository.get_tag_info_by_id(tag_id, limit=limit, after=after, order=order, fields=fields)
+            )),
+        )
         return Response(
             content=tag_info_json,
             status_code=200,
@@ -157,32 +242,75 @@ def get_pixiv_tag_info_by_id(tag_id: str) -> Response:
             status_code=404,
         )
     except sqlite3.Error as e:
-        logger.error(f"Database error while getting tag {tag_id}: {e}")
-        return Response(
-            content="Database error occurred.",
-            status_code=500,
-        )
+        return database_error_response(e, f"getting tag {tag_id}")
     except (TypeError, ValueError, RecursionError) as e:
         logger.error(f"Serialization error while getting tag {tag_id}: {e}")
         return Response(
             content="Response serialization error occurred.",
             status_code=500,
         )
-    finally:
-        repository.close()
+
+@router.get("/tags/top")
+async def get_top_pixiv_tags(
+    limit: int = Query(default=50, ge=1, le=1000),
+    offset: int = Query(default=0, ge=0),
+) -> Response:
+    """Get the tags on the most artworks, from the precomputed tag statistics."""
+    logger.info(f"Getting top tags (limit={limit}, offset={offset}).")
+    try:
+        top_tags_json = await async_repository.run(
+            "get_top_tags",
+            lambda repository: json.dumps(tag_stats.get_top_tags(limit, offset, repository.connection)),
+        )
+        return Response(
+            content=top_tags_json,
+            status_code=200,
+        )
+    except sqlite3.Error as e:
+        return database_error_response(e, "getting top tags")
+
+@router.get("/tag/{tag_id}/count")
+async def get_pixiv_tag_count(tag_id: str) -> Response:
+    """Get the number of artworks with a tag, from the precomputed tag statistics."""
+    logger.info(f"Getting image count of tag: {tag_id}.")
+    try:
+        tag_count_json = await async_repository.run(
+            "get_tag_count",
+            lambda repository: json.dumps(tag_stats.get_tag_count(tag_id, repository.connection)),
+        )
+        return Response(
+            content=tag_count_json,
+            status_code=200,
+        )
+    except sqlite3.Error as e:
+        return database_error_response(e, f"getting image count of tag {tag_id}")
+
+@router.get("/tag/{tag_id}/related")
+async def get_related_pixiv_tags(tag_id: str, limit: int = Query(default=20, ge=1, le=1000)) -> Response:
+    """Get the tags most often on the same artworks as a tag, from the precomputed tag statistics."""
+    logger.info(f"Getting related tags of tag: {tag_id}.")
+    try:
+        related_tags_json = await async_repository.run(
+            "get_related_tags",
+            lambda repository: json.dumps(tag_stats.get_related_tags(tag_id, limit, repository.connection)),
+        )
+        return Response(
+            content=related_tags_json,
+            status_code=200,
+        )
+    except sqlite3.Error as e:
+        return database_error_response(e, f"getting related tags of tag {tag_id}")
 
 @router.get("/series/{series_id}")
-def get_pixiv_series_info_by_id(series_id: str) -> Response:
+async def get_pixiv_series_info_by_id(series_id: str) -> Response:
     """Get series information from the database."""
     logger.info(f"Getting series info by ID from database: {series_id}.")
 
-    repository = PixivUtilRepository()
-
     try:
-        repository.open()
-        series_info = repository.get_series_info_by_id(series_id)
-
-        series_info_json = json.dumps(jsonable_encoder(series_info))
+        series_info_json = await async_repository.run(
+            "get_series_info_by_id",
+            lambda repository: json.dumps(jsonable_encoder(repository.get_series_info_by_id(series_id))),
+        )
         return Response(
             content=series_info_json,
             status_code=200,
@@ -194,23 +322,26 @@ def get_pixiv_series_info_by_id(series_id: str) -> Response:
             status_code=404,
         )
     except sqlite3.Error as e:
-        logger.error(f"Database error while getting series {series_id}: {e}")
-        return Response(
-            content="Database error occurred.",
-            status_code=500,
-        )
+        return database_error_response(e, f"getting series {series_id}")
     except (TypeError, ValueError, RecursionError) as e:
         logger.error(f"Serialization error while getting series {series_id}: {e}")
         return Response(
             content="Response serialization error occurred.",
             status_code=500,
         )
-    finally:
-        repository.close()
 
 @router.get("/member/{member_id}")
-def get_pixiv_member_portfolio_by_id(member_id: str | None) -> Response:
-    """Get member portfolio data from the database."""
+async def get_pixiv_member_portfolio_by_id(
+    member_id: str | None,
+    limit: int | None = Query(default=None, ge=1, le=10000),
+    after: int | None = None,
+    order: ImageListOrder = "asc",
+    fields: ImageListFields = "full",
+) -> Response:
+    """
+    Get member portfolio data from the database, with one page of their images when `limit` is
+    set. Pass `next_cursor` as `after` for the next page.
+    """
     logger.info(f"Getting member data by ID from database: {member_id}.")
 
     if member_id is None:
@@ -225,13 +356,13 @@ def get_pixiv_member_portfolio_by_id(member_id: str | None) -> Response:
         )
 
     member_id_int = int(member_id)
-    repository = PixivUtilRepository()
-
     try:
-        repository.open()
-        member_data = repository.get_member_data_by_id(member_id_int)
-
-        member_json = json.dumps(jsonable_encoder(member_data))
+        member_json = await async_repository.run(
+            "get_member_data_by_id",
+            lambda repository: json.dumps(jsonable_encoder(repository.get_member_data_by_id(
+                member_id_int, limit=limit, after=after, order=order, fields=fields
+            ))),
+        )
         return Response(
             content=member_json,
             status_code=200,
@@ -243,22 +374,16 @@ def get_pixiv_member_portfolio_by_id(member_id: str | None) -> Response:
             status_code=404,
         )
     except sqlite3.Error as e:
-        logger.error(f"Database error while getting member {member_id}: {e}")
-        return Response(
-            content="Database error occurred.",
-            status_code=500,
-        )
+        return database_error_response(e, f"getting member {member_id}")
     except (TypeError, ValueError, RecursionError) as e:
         logger.error(f"Serialization error while getting member {member_id}: {e}")
         return Response(
             content="Response serialization error occurred.",
             status_code=500,
         )
-    finally:
-        repository.close()
 
 @router.get("/image/{image_id}")
-def get_pixiv_image_data_by_id(image_id: str | None) -> Response:
+async def get_pixiv_image_data_by_id(image_id: str | None) -> Response:
     """Get complete image data from the database."""
     logger.info(f"Getting image data by ID from database: {image_id}.")
 
@@ -274,13 +399,11 @@ def get_pixiv_image_data_by_id(image_id: str | None) -> Response:
         )
 
     image_id_int = int(image_id)
-    repository = PixivUtilRepository()
-
     try:
-        repository.open()
-        image_data = repository.get_image_data_by_id(image_id_int)
-
-        image_json = json.dumps(jsonable_encoder(image_data))
+        image_json = await async_repository.run(
+            "get_image_data_by_id",
+            lambda repository: json.dumps(jsonable_encoder(repository.get_image_data_by_id(image_id_int))),
+        )
         return Response(
             content=image_json,
             status_code=200,
@@ -292,16 +415,43 @@ def get_pixiv_image_data_by_id(image_id: str | None) -> Response:
             status_code=404,
         )
     except sqlite3.Error as e:
-        logger.error(f"Database error while getting image {image_id}: {e}")
-        return Response(
-            content="Database error occurred.",
-            status_code=500,
-        )
+        return database_error_response(e, f"getting image {image_id}")
     except (TypeError, ValueError, RecursionError) as e:
         logger.error(f"Serialization error while getting image {image_id}: {e}")
         return Response(
             content="Response serialization error occurred.",
             status_code=500,
         )
-    finally:
-        repository.close()
+
+@router.get("/search")
+async def search_database(
+    q: str,
+    kind: SearchKind | None = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+) -> Response:
+    """
+    Full-text search over artwork titles and captions, member names, and tags with their
+    translations, best matches first.
+    """
+    logger.info(f"Searching database: {q!r} (kind={kind}).")
+    try:
+        results_json = await async_repository.run(
+            "search",
+            lambda repository: json.dumps({
+                "results": search.search(q, kind, limit, offset, repository.connection),
+                "limit": limit,
+                "offset": offset,
+            }),
+        )
+        return Response(
+            content=results_json,
+            status_code=200,
+        )
+    except ValueError as e:
+        return Response(
+            content=str(e),
+            status_code=400,
+        )
+    except sqlite3.Error as e:
+        return database_error_response(e, f"searching for {q!r}")
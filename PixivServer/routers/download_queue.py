@@ -7,11 +7,16 @@ from datetime import timedelta
 from celery.result import AsyncResult
 from fastapi import APIRouter, Query, Response
 from fastapi.responses import JSONResponse
-from pixivutil_server_common.models import TagSortOrder, TagTypeMode
+from pixivutil_server_common.models import (
+    QueueArtworksRequest,
+    TagSortOrder,
+    TagTypeMode,
+)
 
 from PixivServer.config.celery import QUEUE_MAX_PRIORITY
 from PixivServer.models.pixiv_worker import (
     DeleteArtworkByIdRequest,
+    DeleteArtworksRequest,
     DownloadArtworkByIdRequest,
     DownloadArtworksByMemberIdRequest,
     DownloadArtworksByTagsRequest,
@@ -20,6 +25,7 @@ from PixivServer.repository.pixivutil import PixivUtilRepository
 from PixivServer.utils import is_valid_date
 from PixivServer.worker.download import (
     delete_artwork_by_id_task,
+    delete_artworks_task,
     download_artworks_by_id_task,
     download_artworks_by_member_id_task,
     download_artworks_by_tag_task,
@@ -78,6 +84,25 @@ async def queue_download_artwork_by_id(
         "member_name": member_name,
     })
 
+@router.post("/artworks")
+async def queue_download_artworks_by_ids(
+    request: QueueArtworksRequest,
+    priority: int = Query(default=QUEUE_MAX_PRIORITY, ge=1, le=QUEUE_MAX_PRIORITY),
+) -> Response:
+    """
+    Download Pixiv images by a list of IDs in one call.
+
+    Returns one queued task per artwork, in request order. Artwork and member names are not
+    looked up, to keep large batches cheap.
+    """
+    logger.info(f"Downloading {len(request.artwork_ids)} Pixiv artworks by image ID.")
+    responses = []
+    for artwork_id in request.artwork_ids:
+        task_request = DownloadArtworkByIdRequest(artwork_id=artwork_id)
+        task: AsyncResult = download_artworks_by_id_task.apply_async(args=[task_request.model_dump()], priority=priority)
+        responses.append({"task_id": task.id, "artwork_id": artwork_id})
+    return JSONResponse(responses)
+
 @router.post("/member/{member_id}")
 async def queue_download_artworks_by_member_id(
     member_id: str,
@@ -173,3 +198,41 @@ async def queue_delete_artwork_by_id(
         'artwork_id': artwork_id,
         'delete_metadata': delete_metadata,
     })
+
+@router.post("/artworks/delete")
+async def queue_delete_artworks_by_ids(
+    request: QueueArtworksRequest,
+    delete_metadata: bool = True,
+    priority: int = Query(default=2, ge=1, le=QUEUE_MAX_PRIORITY),
+) -> Response:
+    """
+    Delete many Pixiv images by ID from database and filesystem as a single task.
+
+    The database rows are deleted in one transaction and files are removed in parallel, so this
+    is much cheaper than one delete task per artwork.
+    """
+    logger.info(f"Deleting {len(request.artwork_ids)} Pixiv artworks by image ID (delete_metadata={delete_metadata}).")
+    task_request = DeleteArtworksRequest(artwork_ids=request.artwork_ids, delete_metadata=delete_metadata)
+    task: AsyncResult = delete_artworks_task.apply_async(args=[task_request.model_dump()], priority=priority)
+    return JSONResponse({
+        "task_id": task.id,
+        'delete_metadata': delete_metadata,
+    })
+
+@router.delete("/member/{member_id}")
+async def queue_delete_artworks_by_member_id(
+    member_id: str,
+    delete_metadata: bool = True,
+    priority: int = Query(default=2, ge=1, le=QUEUE_MAX_PRIORITY),
+) -> Response:
+    """
+    Delete all downloaded Pixiv images of a member from database and filesystem as a single task.
+    """
+    logger.info(f"Deleting Pixiv artworks by member ID: {member_id} (delete_metadata={delete_metadata}).")
+    task_request = DeleteArtworksRequest(member_id=int(member_id), delete_metadata=delete_metadata)
+    task: AsyncResult = delete_artworks_task.apply_async(args=[task_request.model_dump()], priority=priority)
+    return JSONResponse({
+        "task_id": task.id,
+        'member_id': member_id,
+        'delete_metadata': delete_metadata,
+    })
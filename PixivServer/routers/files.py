@@ -0,0 +1,105 @@
+import logging
+import sqlite3
+import zipfile
+
+from fastapi import APIRouter, Request, Response
+
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.service.archives import archive_cache
+from PixivServer.service.files import (
+    archive_member_response,
+    file_response,
+    resolve_download_path,
+)
+
+logger = logging.getLogger('uvicorn.pixivutil')
+router = APIRouter()
+
+
+def serve_save_name(request: Request, save_name: str) -> Response:
+    try:
+        path = resolve_download_path(save_name)
+    except PermissionError as e:
+        logger.warning(str(e))
+        return Response(content="File is outside the downloads directory.", status_code=403)
+    except FileNotFoundError as e:
+        logger.warning(str(e))
+        return Response(content="File not found on disk.", status_code=404)
+    return file_response(request, path)
+
+def serve_archive_member(request: Request, archive_save_name: str, member_name: str) -> Response:
+    try:
+        path = resolve_download_path(archive_save_name)
+        member = archive_cache.get_member(path, member_name)
+        return archive_member_response(request, member)
+    except PermissionError as e:
+        logger.warning(str(e))
+        return Response(content="File is outside the downloads directory.", status_code=403)
+    except FileNotFoundError as e:
+        logger.warning(str(e))
+        return Response(content="File not found on disk.", status_code=404)
+    except KeyError as e:
+        logger.warning(str(e))
+        return Response(content="Page not found in archive.", status_code=404)
+    except zipfile.BadZipFile as e:
+        logger.error(f"Corrupt archive {archive_save_name}: {e}")
+        return Response(content="Archive is corrupt.", status_code=500)
+
+@router.api_route("/image/{image_id}", methods=["GET", "HEAD"])
+def get_image_file(request: Request, image_id: int) -> Response:
+    """
+    Serve the downloaded file of an artwork (the ZIP file for archive-mode manga).
+    Supports Range, If-Range and If-None-Match.
+    """
+    repository = PixivUtilRepository()
+
+    try:
+        repository.open()
+        save_name = repository.get_image_save_name(image_id)
+    except sqlite3.Error as e:
+        logger.error(f"Database error while getting file for image {image_id}: {e}")
+        return Response(
+            content="Database error occurred.",
+            status_code=500,
+        )
+    except KeyError:
+        return Response(
+            content=f"No downloaded file for image {image_id}.",
+            status_code=404,
+        )
+    finally:
+        repository.close()
+
+    return serve_save_name(request, save_name)
+
+@router.api_route("/image/{image_id}/page/{page}", methods=["GET", "HEAD"])
+def get_page_file(request: Request, image_id: int, page: int) -> Response:
+    """
+    Serve the downloaded file of a manga page. For archive-mode artworks the page is read
+    from the artwork's ZIP file without extracting it.
+    Supports Range, If-Range and If-None-Match (Range only for uncompressed ZIP entries).
+    """
+    repository = PixivUtilRepository()
+
+    try:
+        repository.open()
+        image_save_name = repository.get_image_save_name(image_id)
+        save_name = repository.get_page_save_name(image_id, page)
+    except sqlite3.Error as e:
+        logger.error(f"Database error while getting file for page {page} of image {image_id}: {e}")
+        return Response(
+            content="Database error occurred.",
+            status_code=500,
+        )
+    except KeyError:
+        return Response(
+            content=f"No downloaded file for page {page} of image {image_id}.",
+            status_code=404,
+        )
+    finally:
+        repository.close()
+
+    # In archive mode, manga pages are stored inside the zip file as basenames only.
+    if image_save_name.endswith('.zip'):
+        return serve_archive_member(request, image_save_name, save_name)
+    return serve_save_name(request, save_name)
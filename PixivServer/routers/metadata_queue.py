@@ -4,7 +4,7 @@ import urllib.parse
 from celery.result import AsyncResult
 from fastapi import APIRouter, Query
 from fastapi.responses import JSONResponse
-from pixivutil_server_common.models import TagMetadataFilterMode
+from pixivutil_server_common.models import QueueArtworksRequest, TagMetadataFilterMode
 
 from PixivServer.config.celery import QUEUE_MAX_PRIORITY
 from PixivServer.models.pixiv_worker import (
@@ -28,6 +28,7 @@ router = APIRouter()
 async def queue_download_member_metadata_by_id(
     member_id: str,
     priority: int = Query(default=2, ge=1, le=QUEUE_MAX_PRIORITY),
+    refresh: bool = Query(default=False),
 ) -> JSONResponse:
     """
     Queue download of member metadata by ID.
@@ -39,7 +40,7 @@ async def queue_download_member_metadata_by_id(
         )
     member_id_int = int(member_id)
     logger.info(f"Queueing member metadata download by ID: {member_id_int}.")
-    request = DownloadMemberMetadataByIdRequest(member_id=member_id_int)
+    request = DownloadMemberMetadataByIdRequest(member_id=member_id_int, refresh=refresh)
     task: AsyncResult = download_member_metadata_by_id_task.apply_async(args=[request.model_dump()], priority=priority)
     return JSONResponse({"task_id": task.id, "member_id": member_id_int})
 
@@ -48,6 +49,7 @@ async def queue_download_member_metadata_by_id(
 async def queue_download_artwork_metadata_by_id(
     artwork_id: str,
     priority: int = Query(default=2, ge=1, le=QUEUE_MAX_PRIORITY),
+    refresh: bool = Query(default=False),
 ) -> JSONResponse:
     """
     Queue download of artwork metadata by ID.
@@ -59,15 +61,34 @@ async def queue_download_artwork_metadata_by_id(
         )
     artwork_id_int = int(artwork_id)
     logger.info(f"Queueing artwork metadata download by ID: {artwork_id_int}.")
-    request = DownloadArtworkMetadataByIdRequest(artwork_id=artwork_id_int)
+    request = DownloadArtworkMetadataByIdRequest(artwork_id=artwork_id_int, refresh=refresh)
     task: AsyncResult = download_artwork_metadata_by_id_task.apply_async(args=[request.model_dump()], priority=priority)
     return JSONResponse({"task_id": task.id, "artwork_id": artwork_id_int})
 
 
+@router.post("/artworks")
+async def queue_download_artworks_metadata_by_ids(
+    request: QueueArtworksRequest,
+    priority: int = Query(default=2, ge=1, le=QUEUE_MAX_PRIORITY),
+    refresh: bool = Query(default=False),
+) -> JSONResponse:
+    """
+    Queue download of artwork metadata for a list of IDs in one call.
+    """
+    logger.info(f"Queueing artwork metadata download for {len(request.artwork_ids)} artworks.")
+    responses = []
+    for artwork_id in request.artwork_ids:
+        task_request = DownloadArtworkMetadataByIdRequest(artwork_id=artwork_id, refresh=refresh)
+        task: AsyncResult = download_artwork_metadata_by_id_task.apply_async(args=[task_request.model_dump()], priority=priority)
+        responses.append({"task_id": task.id, "artwork_id": artwork_id})
+    return JSONResponse(responses)
+
+
 @router.post("/series/{series_id}")
 async def queue_download_series_metadata_by_id(
     series_id: str,
     priority: int = Query(default=1, ge=1, le=QUEUE_MAX_PRIORITY),
+    refresh: bool = Query(default=False),
 ) -> JSONResponse:
     """
     Queue download of series metadata by ID.
@@ -79,7 +100,7 @@ async def queue_download_series_metadata_by_id(
         )
     series_id_int = int(series_id)
     logger.info(f"Queueing series metadata download by ID: {series_id_int}.")
-    request = DownloadSeriesMetadataByIdRequest(series_id=series_id_int)
+    request = DownloadSeriesMetadataByIdRequest(series_id=series_id_int, refresh=refresh)
     task: AsyncResult = download_series_metadata_by_id_task.apply_async(args=[request.model_dump()], priority=priority)
     return JSONResponse({"task_id": task.id, "series_id": series_id_int})
 
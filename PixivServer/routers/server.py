@@ -1,9 +1,34 @@
 import logging
+import sqlite3
 
-from fastapi import APIRouter, Response
+from celery.result import AsyncResult
+from fastapi import APIRouter, Query, Response
+from fastapi.responses import JSONResponse
 from pixivutil_server_common.models import UpdateCookieRequest
 
-from PixivServer.service import pixiv
+from PixivServer.config.celery import QUEUE_MAX_PRIORITY
+from PixivServer.models.pixiv_worker import (
+    BackfillSearchIndexRequest,
+    DeduplicateDownloadsRequest,
+    RebuildTagStatsRequest,
+    VacuumDatabaseRequest,
+    VerifyDownloadsRequest,
+)
+from PixivServer.repository.manifest import FileStatus
+from PixivServer.service import (
+    dedup,
+    maintenance,
+    pixiv,
+    search,
+    tag_stats,
+    verification,
+)
+from PixivServer.service.dedup import DedupMode
+from PixivServer.worker.dedup import deduplicate_downloads_task
+from PixivServer.worker.maintenance import vacuum_database_task
+from PixivServer.worker.search import backfill_search_index_task
+from PixivServer.worker.tag_stats import rebuild_tag_stats_task
+from PixivServer.worker.verification import verify_downloads_task
 
 logger = logging.getLogger('uvicorn.pixivutil')
 router = APIRouter()
@@ -52,6 +77,33 @@ async def reset_database() -> Response:
         status_code=200,
     )
 
+@router.post("/database/vacuum")
+async def queue_vacuum_database(
+    priority: int = Query(default=1, ge=1, le=QUEUE_MAX_PRIORITY),
+) -> Response:
+    """
+    Queue a full vacuum that switches the database to incremental auto-vacuum.
+    """
+    request = VacuumDatabaseRequest()
+    task: AsyncResult = vacuum_database_task.apply_async(args=[request.model_dump()], priority=priority)
+    return JSONResponse({
+        "task_id": task.id,
+    })
+
+@router.get("/database/maintenance")
+def get_database_maintenance_status() -> Response:
+    """
+    Get the WAL size, free pages and last maintenance runs of the database.
+    """
+    try:
+        return JSONResponse(maintenance.get_status())
+    except sqlite3.Error as e:
+        logger.error(f"Database error while getting database maintenance status: {e}")
+        return Response(
+            content="Database error occurred.",
+            status_code=500,
+        )
+
 @router.delete("/downloads")
 async def reset_downloads() -> Response:
     pixiv.service.reset_downloads()
@@ -59,3 +111,125 @@ async def reset_downloads() -> Response:
         content="Reset downloads.",
         status_code=200,
     )
+
+@router.post("/dedup")
+async def queue_deduplicate_downloads(
+    mode: DedupMode | None = None,
+    priority: int = Query(default=1, ge=1, le=QUEUE_MAX_PRIORITY),
+) -> Response:
+    """
+    Queue a pass that hashes all downloaded files and replaces duplicates with links.
+    """
+    request = DeduplicateDownloadsRequest(mode=mode)
+    task: AsyncResult = deduplicate_downloads_task.apply_async(args=[request.model_dump()], priority=priority)
+    return JSONResponse({
+        "task_id": task.id,
+    })
+
+@router.get("/dedup")
+def get_dedup_report() -> Response:
+    """
+    Get how much space duplicate downloads take and how much deduplication has reclaimed.
+    """
+    try:
+        return JSONResponse(dedup.get_report())
+    except sqlite3.Error as e:
+        logger.error(f"Database error while getting deduplication report: {e}")
+        return Response(
+            content="Database error occurred.",
+            status_code=500,
+        )
+
+@router.post("/verification")
+async def queue_verify_downloads(
+    restart: bool = False,
+    hash_files: bool = False,
+    files_per_second: float | None = Query(default=None, gt=0),
+    repair: bool = False,
+    priority: int = Query(default=1, ge=1, le=QUEUE_MAX_PRIORITY),
+) -> Response:
+    """
+    Queue a check that every artwork's files exist and are intact, optionally re-downloading broken ones.
+    """
+    request = VerifyDownloadsRequest(restart=restart, hash_files=hash_files, files_per_second=files_per_second, repair=repair)
+    task: AsyncResult = verify_downloads_task.apply_async(args=[request.model_dump()], priority=priority)
+    return JSONResponse({
+        "task_id": task.id,
+    })
+
+@router.get("/verification")
+def get_verification_report(
+    status: FileStatus | None = None,
+    limit: int = Query(default=100, ge=1, le=10000),
+) -> Response:
+    """
+    Get the progress of the last verification run and the missing, corrupt or orphaned files it found.
+    """
+    try:
+        return JSONResponse(verification.get_report(status, limit))
+    except sqlite3.Error as e:
+        logger.error(f"Database error while getting verification report: {e}")
+        return Response(
+            content="Database error occurred.",
+            status_code=500,
+        )
+
+@router.post("/search-index")
+async def queue_backfill_search_index(
+    restart: bool = False,
+    batch_size: int = Query(default=1000, ge=1, le=100000),
+    pause_seconds: float = Query(default=0.0, ge=0),
+    priority: int = Query(default=1, ge=1, le=QUEUE_MAX_PRIORITY),
+) -> Response:
+    """
+    Queue indexing of existing artworks, members and tags for full-text search, in chunks.
+    """
+    request = BackfillSearchIndexRequest(restart=restart, batch_size=batch_size, pause_seconds=pause_seconds)
+    task: AsyncResult = backfill_search_index_task.apply_async(args=[request.model_dump()], priority=priority)
+    return JSONResponse({
+        "task_id": task.id,
+    })
+
+@router.get("/search-index")
+def get_search_index_status() -> Response:
+    """
+    Get how many documents of each kind are indexed and how far the backfill has come.
+    """
+    try:
+        return JSONResponse(search.get_status())
+    except sqlite3.Error as e:
+        logger.error(f"Database error while getting search index status: {e}")
+        return Response(
+            content="Database error occurred.",
+            status_code=500,
+        )
+
+@router.post("/tag-stats")
+async def queue_rebuild_tag_stats(
+    restart: bool = False,
+    batch_size: int = Query(default=1000, ge=1, le=100000),
+    pause_seconds: float = Query(default=0.0, ge=0),
+    priority: int = Query(default=1, ge=1, le=QUEUE_MAX_PRIORITY),
+) -> Response:
+    """
+    Queue counting of existing artworks' tags for the tag statistics, in chunks.
+    """
+    request = RebuildTagStatsRequest(restart=restart, batch_size=batch_size, pause_seconds=pause_seconds)
+    task: AsyncResult = rebuild_tag_stats_task.apply_async(args=[request.model_dump()], priority=priority)
+    return JSONResponse({
+        "task_id": task.id,
+    })
+
+@router.get("/tag-stats")
+def get_tag_stats_status() -> Response:
+    """
+    Get whether the tag statistics are complete and how far the rebuild has come.
+    """
+    try:
+        return JSONResponse(tag_stats.get_status())
+    except sqlite3.Error as e:
+        logger.error(f"Database error while getting tag statistics status: {e}")
+        return Response(
+            content="Database error occurred.",
+            status_code=500,
+        )
@@ -0,0 +1,144 @@
+import logging
+import sqlite3
+import urllib.parse
+import zipfile
+
+from celery.result import AsyncResult
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import JSONResponse
+from PIL import Image
+
+from PixivServer.config.celery import QUEUE_MAX_PRIORITY
+from PixivServer.models.pixiv_worker import WarmThumbnailsRequest
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.service.files import file_response
+from PixivServer.service.thumbnails import (
+    THUMBNAIL_MEDIA_TYPES,
+    THUMBNAIL_SIZES,
+    ThumbnailFormat,
+    resolve_thumbnail_source,
+    thumbnail_cache,
+)
+from PixivServer.worker.thumbnails import warm_thumbnails_task
+
+logger = logging.getLogger('uvicorn.pixivutil')
+router = APIRouter()
+
+# Thumbnails are re-rendered under the same URL when the original changes; ETags catch that.
+THUMBNAIL_MAX_AGE = 30 * 24 * 3600
+
+
+def invalid_sizes(sizes: list[int]) -> Response | None:
+    if all(size in THUMBNAIL_SIZES for size in sizes):
+        return None
+    return JSONResponse({
+        "error": f"Unsupported thumbnail size. Supported sizes: {list(THUMBNAIL_SIZES)}"
+    }, status_code=400)
+
+@router.api_route("/image/{image_id}", methods=["GET", "HEAD"])
+def get_thumbnail(
+    request: Request,
+    image_id: int,
+    page: int = Query(default=0, ge=0),
+    size: int = 256,
+    image_format: ThumbnailFormat = Query(default="webp", alias="format"),
+) -> Response:
+    """
+    Get a thumbnail of an artwork page fitting in `size`x`size`, rendering it on first request.
+    """
+    if (error := invalid_sizes([size])) is not None:
+        return error
+
+    repository = PixivUtilRepository()
+
+    try:
+        repository.open()
+        source = resolve_thumbnail_source(repository, image_id, page)
+    except sqlite3.Error as e:
+        logger.error(f"Database error while getting thumbnail source for image {image_id}: {e}")
+        return Response(
+            content="Database error occurred.",
+            status_code=500,
+        )
+    except (KeyError, FileNotFoundError):
+        return Response(
+            content=f"No downloaded file for page {page} of image {image_id}.",
+            status_code=404,
+        )
+    except PermissionError as e:
+        logger.warning(str(e))
+        return Response(content="File is outside the downloads directory.", status_code=403)
+    except zipfile.BadZipFile as e:
+        logger.error(f"Corrupt archive for image {image_id}: {e}")
+        return Response(content="Archive is corrupt.", status_code=500)
+    finally:
+        repository.close()
+
+    try:
+        path = thumbnail_cache.get(image_id, page, size, image_format, source)
+    except KeyError:
+        # The archive was rewritten without the page since its source was resolved.
+        return Response(
+            content=f"No downloaded file for page {page} of image {image_id}.",
+            status_code=404,
+        )
+    except zipfile.BadZipFile as e:
+        logger.error(f"Corrupt archive for image {image_id}: {e}")
+        return Response(content="Archive is corrupt.", status_code=500)
+    except (Image.DecompressionBombError, ValueError) as e:
+        logger.warning(f"Could not render thumbnail for page {page} of image {image_id}: {e}")
+        return Response(content="Could not render thumbnail.", status_code=422)
+    except OSError as e:
+        # Includes Pillow's UnidentifiedImageError for files that are not images (e.g. ugoira videos).
+        logger.warning(f"Could not render thumbnail for page {page} of image {image_id}: {e}")
+        return Response(content="Could not render thumbnail.", status_code=422)
+
+    return file_response(
+        request,
+        path,
+        THUMBNAIL_MEDIA_TYPES[image_format],
+        max_age=THUMBNAIL_MAX_AGE,
+        accel_redirect=False,
+    )
+
+@router.post("/warm/member/{member_id}")
+async def queue_warm_thumbnails_by_member_id(
+    member_id: int,
+    size: list[int] = Query(default=[256]),
+    image_format: ThumbnailFormat = Query(default="webp", alias="format"),
+    priority: int = Query(default=1, ge=1, le=QUEUE_MAX_PRIORITY),
+) -> Response:
+    """
+    Queue rendering of cover thumbnails for all artworks of a member.
+    """
+    if (error := invalid_sizes(size)) is not None:
+        return error
+    logger.info(f"Warming thumbnails for member ID: {member_id}.")
+    request = WarmThumbnailsRequest(member_id=member_id, sizes=size, image_format=image_format)
+    task: AsyncResult = warm_thumbnails_task.apply_async(args=[request.model_dump()], priority=priority)
+    return JSONResponse({
+        "task_id": task.id,
+        "member_id": member_id,
+    })
+
+@router.post("/warm/tag/{tag_name}")
+async def queue_warm_thumbnails_by_tag(
+    tag_name: str,
+    size: list[int] = Query(default=[256]),
+    image_format: ThumbnailFormat = Query(default="webp", alias="format"),
+    priority: int = Query(default=1, ge=1, le=QUEUE_MAX_PRIORITY),
+) -> Response:
+    """
+    Queue rendering of cover thumbnails for all artworks with a tag.
+    The tag_name is automatically URL-decoded.
+    """
+    if (error := invalid_sizes(size)) is not None:
+        return error
+    decoded_tag = urllib.parse.unquote(tag_name)
+    logger.info(f"Warming thumbnails for tag: {decoded_tag}.")
+    request = WarmThumbnailsRequest(tag=decoded_tag, sizes=size, image_format=image_format)
+    task: AsyncResult = warm_thumbnails_task.apply_async(args=[request.model_dump()], priority=priority)
+    return JSONResponse({
+        "task_id": task.id,
+        "tag": decoded_tag,
+    })
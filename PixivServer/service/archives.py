@@ -0,0 +1,186 @@
+import logging
+import mimetypes
+import os
+import struct
+import threading
+import zipfile
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO
+
+from PixivServer.config.server import config as server_config
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Fixed part of a ZIP local file header; the file name and extra field follow it.
+_LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+@dataclass(frozen=True, slots=True)
+class ArchiveMember:
+    """A file inside a ZIP archive, resolved through the archive's central directory."""
+
+    archive_path: Path
+    archive_stat: os.stat_result
+    info: zipfile.ZipInfo
+    zip_file: zipfile.ZipFile
+    # Offset of the member's data in the archive file; only set for stored (uncompressed) members.
+    data_offset: int | None
+
+    @property
+    def size(self) -> int:
+        return self.info.file_size
+
+    @property
+    def is_stored(self) -> bool:
+        return self.data_offset is not None
+
+    @property
+    def media_type(self) -> str:
+        return mimetypes.guess_type(self.info.filename)[0] or "application/octet-stream"
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.archive_stat.st_size:x}-{self.archive_stat.st_mtime_ns:x}-{self.info.CRC:08x}"'
+
+
+class _OpenArchive:
+
+    def __init__(self, path: Path, stat_result: os.stat_result):
+        self.stat_result = stat_result
+        self.zip_file = zipfile.ZipFile(path)
+        self.by_name = {info.filename: info for info in self.zip_file.infolist() if not info.is_dir()}
+        # PixivUtil2 records archive-mode pages by base name only.
+        self.by_basename: dict[str, zipfile.ZipInfo] = {}
+        for info in self.by_name.values():
+            self.by_basename.setdefault(os.path.basename(info.filename), info)
+        self.data_offsets: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def data_offset(self, path: Path, info: zipfile.ZipInfo) -> int:
+        """Locate a member's data from its local header, whose extra field may differ from the central directory's."""
+        with self.lock:
+            offset = self.data_offsets.get(info.filename)
+        if offset is None:
+            with open(path, "rb") as file:
+                file.seek(info.header_offset)
+                header = _LOCAL_HEADER.unpack(file.read(_LOCAL_HEADER.size))
+            if header[0] != _LOCAL_HEADER_SIGNATURE:
+                raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+            offset = info.header_offset + _LOCAL_HEADER.size + header[9] + header[10]
+            with self.lock:
+                self.data_offsets[info.filename] = offset
+        return offset
+
+
+class ZipArchiveCache:
+    """
+    LRU of open ZipFile handles keyed by archive path, so serving many pages from the same
+    archive parses its central directory once. Entries are reopened when the file's size or
+    mtime changes. Evicted handles stay usable by readers that already hold a member stream.
+    """
+
+    def __init__(self, max_open: int):
+        self.max_open = max_open
+        self._archives: OrderedDict[Path, _OpenArchive] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, path: Path) -> _OpenArchive:
+        stat_result = path.stat()
+        with self._lock:
+            archive = self._archives.get(path)
+            if archive is not None and (
+                archive.stat_result.st_mtime_ns == stat_result.st_mtime_ns
+                and archive.stat_result.st_size == stat_result.st_size
+            ):
+                self._archives.move_to_end(path)
+                return archive
+
+        opened = _OpenArchive(path, stat_result)
+        with self._lock:
+            stale = self._archives.pop(path, None)
+            self._archives[path] = opened
+            evicted = [stale] if stale is not None else []
+            while len(self._archives) > self.max_open:
+                evicted.append(self._archives.popitem(last=False)[1])
+            # Closed under the lock, so `_open_stream` never opens a member of a closing handle.
+            for archive in evicted:
+                archive.zip_file.close()
+        return opened
+
+    def get_member(self, path: Path, name: str) -> ArchiveMember:
+        """
+        Find a member by full name or base name.
+
+        Raises:
+            FileNotFoundError: If the archive does not exist.
+            KeyError: If the archive has no such member.
+            zipfile.BadZipFile: If the archive is corrupt.
+        """
+        archive = self._get(path)
+        info = archive.by_name.get(name) or archive.by_basename.get(os.path.basename(name))
+        if info is None:
+            raise KeyError(f"{name} not found in {path}")
+        data_offset = archive.data_offset(path, info) if info.compress_type == zipfile.ZIP_STORED else None
+        return ArchiveMember(path, archive.stat_result, info, archive.zip_file, data_offset)
+
+    def iter_member(self, member: ArchiveMember, start: int = 0, end: int | None = None) -> Iterator[bytes]:
+        """
+        Yield the bytes of a member. Stored members are read directly from the archive file,
+        so `start`/`end` (end exclusive) ranges cost no more than the bytes returned.
+        Compressed members are always decompressed in full, from a stream opened before this
+        returns.
+
+        Raises:
+            KeyError: If the archive was replaced since the lookup and no longer has the member.
+        """
+        end = member.size if end is None else end
+        if member.data_offset is not None:
+            return self._iter_stored(member, start, end)
+        return self._iter_stream(self._open_stream(member))
+
+    def _iter_stored(self, member: ArchiveMember, start: int, end: int) -> Iterator[bytes]:
+        with open(member.archive_path, "rb") as file:
+            file.seek(member.data_offset + start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = file.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise zipfile.BadZipFile(f"Unexpected end of data for {member.info.filename}")
+                remaining -= len(chunk)
+                yield chunk
+
+    def _iter_stream(self, stream: IO[bytes]) -> Iterator[bytes]:
+        with stream:
+            while chunk := stream.read(CHUNK_SIZE):
+                yield chunk
+
+    def _open_stream(self, member: ArchiveMember) -> IO[bytes]:
+        zip_file, info = member.zip_file, member.info
+        while True:
+            with self._lock:
+                # A stream keeps its archive file open after the ZipFile is closed, so it only
+                # has to be opened before the handle is evicted.
+                if zip_file.fp is not None:
+                    return zip_file.open(info)
+            # Evicted and closed since the member was looked up. The archive may have been
+            # rewritten since, so the member is looked up again in the reopened handle.
+            archive = self._get(member.archive_path)
+            zip_file, info = archive.zip_file, archive.by_name.get(member.info.filename)
+            if info is None:
+                raise KeyError(f"{member.info.filename} not found in {member.archive_path}")
+
+    def close(self):
+        with self._lock:
+            archives = list(self._archives.values())
+            self._archives.clear()
+            for archive in archives:
+                archive.zip_file.close()
+
+
+archive_cache = ZipArchiveCache(max_open=server_config.zip_cache_size)
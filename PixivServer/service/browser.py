@@ -0,0 +1,129 @@
+"""
+Hooks installed on PixivUtil2's browser, a mechanize.Browser, in server mode.
+"""
+
+import functools
+import io
+import socket
+import urllib.request
+from collections.abc import Callable
+from typing import Any
+from urllib.error import URLError
+
+import mechanize
+from mechanize._response import closeable_response
+
+from PixivServer.service.http_pool import HttpConnectionPool, PooledResponse
+from PixivServer.service.resumable import Opener
+
+# Browser methods that send a request; PixivUtil2's page and image fetches all go through them.
+REQUEST_METHODS = ("open", "open_novisit")
+
+
+class _PooledBody(io.RawIOBase):
+    """Raw stream over a pooled response, for mechanize's buffered, line-reading response."""
+
+    def __init__(self, response: PooledResponse):
+        self._response = response
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        return self._response.readinto(buffer)
+
+    def close(self):
+        if not self.closed:
+            self._response.close()
+        super().close()
+
+
+class _BrowserResponse:
+    """A mechanize response with the `http.client.HTTPResponse` attributes resumable downloads read."""
+
+    def __init__(self, response: Any):
+        self._response = response
+        self.status = response.code
+        self.headers = response.info()
+
+    def read(self, amt: int | None = None) -> bytes:
+        return self._response.read(-1 if amt is None else amt)
+
+    def close(self):
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PooledHTTPHandler(mechanize.BaseHandler):
+    """
+    Open the browser's HTTP and HTTPS requests on the pool's keep-alive connections, where
+    mechanize's own handlers open and close a connection per request. Only the transport is
+    replaced: mechanize still adds cookies, follows redirects and raises for error statuses.
+    Requests through a proxy are left to mechanize.
+    """
+
+    # Ahead of mechanize's HTTPHandler and HTTPSHandler (500).
+    handler_order = 400
+
+    def __init__(self, pool: HttpConnectionPool):
+        self.pool = pool
+
+    def http_open(self, request: mechanize.Request) -> closeable_response | None:
+        if request.has_proxy():
+            return None
+        headers = {name.title(): value for name, value in {**request.headers, **request.unredirected_hdrs}.items()}
+        if self.parent.finalize_request_headers is not None:
+            self.parent.finalize_request_headers(request, headers)
+        # mechanize's default timeout is a sentinel for the socket module's default.
+        timeout = request.timeout if isinstance(request.timeout, int | float) else socket.getdefaulttimeout()
+        try:
+            response = self.pool.send(request.get_method(), request.get_full_url(), headers, request.data, timeout)
+        except URLError:
+            raise
+        except OSError as e:
+            raise URLError(e) from e
+        body = io.BufferedReader(_PooledBody(response))
+        return closeable_response(body, response.headers, request.get_full_url(), response.status, response.reason)
+
+    https_open = http_open
+
+
+def install_pooled_handler(browser: Any, pool: HttpConnectionPool):
+    """Send the browser's requests over `pool`. Installing twice is a no-op."""
+    if any(isinstance(handler, PooledHTTPHandler) for handler in browser.handlers):
+        return
+    browser.add_handler(PooledHTTPHandler(pool))
+
+
+def flush_before_requests(browser: Any, flush: Callable[[], None]):
+    """Call `flush` before each request the browser sends. Wrapping twice is a no-op."""
+    for method_name in REQUEST_METHODS:
+        method = getattr(browser, method_name)
+        if getattr(method, "__flushes_before_request__", False):
+            continue
+        setattr(browser, method_name, _flushing_method(method, flush))
+
+
+def _flushing_method(method: Callable[..., Any], flush: Callable[[], None]) -> Callable[..., Any]:
+    @functools.wraps(method)
+    def flushing(*args, **kwargs):
+        flush()
+        return method(*args, **kwargs)
+
+    flushing.__flushes_before_request__ = True  # type: ignore[attr-defined]
+    return flushing
+
+
+def browser_opener(browser: Any) -> Opener:
+    """An opener for `resumable.download_file` that sends requests through the browser, so its cookies, proxy and connection pool apply."""
+
+    def open_request(request: urllib.request.Request, timeout: float) -> Any:
+        response = browser.open_novisit(mechanize.Request(request.full_url, headers=dict(request.header_items()), timeout=timeout))
+        return _BrowserResponse(response)
+
+    return open_request
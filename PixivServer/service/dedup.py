@@ -0,0 +1,198 @@
+import errno
+import filecmp
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+from PixivServer.config.server import config as server_config
+from PixivServer.repository.content import ContentRepository
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.service.files import resolve_download_path
+from PixivServer.utils import canonical_path
+
+logger = logging.getLogger(__name__)
+
+DedupMode = Literal["hardlink", "reflink"]
+
+# linux/fs.h: ioctl(dest_fd, FICLONE, src_fd) shares src's extents with dest.
+FICLONE = 0x40049409
+# Errors meaning the filesystem cannot reflink at all, so the rest of the pass is pointless.
+REFLINK_UNSUPPORTED = (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL)
+
+# Partial downloads and our own temporary links are never indexed.
+SKIPPED_SUFFIXES = (".tmp", ".part", ".part.json", ".pixiv")
+
+
+def hash_file(path: Path) -> str:
+    with open(path, "rb") as file:
+        return hashlib.file_digest(file, "sha256").hexdigest()
+
+
+@dataclass(frozen=True, slots=True)
+class IndexedFile:
+    sha256: str
+    size: int
+    mtime_ns: int
+    # False when the file was unchanged since it was indexed, so its recorded hash was reused.
+    hashed: bool
+
+
+def index_file(repository: ContentRepository, path: Path) -> IndexedFile:
+    """Hash a file into the content index unless its size and mtime are unchanged since it was indexed."""
+    stat_result = path.stat()
+    indexed = repository.select_file(str(path))
+    if indexed is not None and indexed[:2] == (stat_result.st_size, stat_result.st_mtime_ns):
+        return IndexedFile(indexed[2], stat_result.st_size, stat_result.st_mtime_ns, hashed=False)
+    sha256 = hash_file(path)
+    repository.upsert_file(
+        str(path), sha256, stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_dev, stat_result.st_ino
+    )
+    return IndexedFile(sha256, stat_result.st_size, stat_result.st_mtime_ns, hashed=True)
+
+
+def artwork_file_paths(repository: PixivUtilRepository, image_id: int) -> list[Path]:
+    """Get the downloaded files of an artwork that exist on disk."""
+    paths: list[Path] = []
+    for save_name in repository.get_artwork_save_names(image_id):
+        try:
+            paths.append(resolve_download_path(save_name))
+        except (FileNotFoundError, PermissionError):
+            continue
+    return paths
+
+
+def iter_download_files(root: Path):
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(Path(entry.path))
+                elif entry.is_file(follow_symlinks=False) and not entry.name.endswith(SKIPPED_SUFFIXES):
+                    yield Path(canonical_path(entry.path))
+
+
+def index_downloads(repository: ContentRepository) -> dict[str, int]:
+    """Hash new or changed files under the downloads directory and drop index entries for removed files."""
+    root = Path(canonical_path(server_config.downloads_dir))
+    counts = {"scanned": 0, "hashed": 0, "removed": 0}
+    seen: set[str] = set()
+    if root.is_dir():
+        for path in iter_download_files(root):
+            counts["scanned"] += 1
+            seen.add(str(path))
+            try:
+                if index_file(repository, path).hashed:
+                    counts["hashed"] += 1
+            except FileNotFoundError:
+                continue
+
+    missing = [path for path in repository.select_all_paths() if path not in seen]
+    if missing:
+        repository.delete_files(missing)
+    counts["removed"] = len(missing)
+    return counts
+
+
+def link_file(source: Path, target: Path, mode: DedupMode):
+    """Atomically replace `target` with a hardlink or reflink of `source`."""
+    temporary = target.with_name(f".{target.name}.dedup.tmp")
+    try:
+        if mode == "hardlink":
+            os.link(source, temporary)
+        else:
+            import fcntl  # Linux only, like reflinks themselves.
+
+            target_stat = target.stat()
+            with open(source, "rb") as source_file, open(temporary, "wb") as temporary_file:
+                fcntl.ioctl(temporary_file.fileno(), FICLONE, source_file.fileno())
+            os.utime(temporary, ns=(target_stat.st_atime_ns, target_stat.st_mtime_ns))
+        os.replace(temporary, target)
+    except BaseException:
+        temporary.unlink(missing_ok=True)
+        raise
+
+
+def link_duplicates(repository: ContentRepository, mode: DedupMode, sha256s: list[str] | None = None) -> dict[str, int]:
+    """
+    Replace indexed files that have identical content with links to one copy.
+
+    The oldest indexed copy of each content is kept. Files on another device than that copy
+    are left alone, as are files changed since they were indexed. Content is compared byte
+    for byte before linking, so a hash collision can never lose data.
+    """
+    counts = {"linked": 0, "reclaimed_bytes": 0, "skipped": 0}
+    for group in repository.select_duplicate_groups(sha256s):
+        canonical = next(((path, device, inode) for path, _, device, inode, dedup_of in group if dedup_of is None), None)
+        if canonical is None:
+            continue
+        canonical_file, canonical_device, canonical_inode = canonical
+
+        for path, size, device, inode, dedup_of in group:
+            if path == canonical_file or dedup_of is not None or inode == canonical_inode:
+                continue
+            if device != canonical_device:
+                counts["skipped"] += 1
+                continue
+            try:
+                current = os.stat(path)
+                if (current.st_size, current.st_ino) != (size, inode) or not filecmp.cmp(canonical_file, path, shallow=False):
+                    counts["skipped"] += 1
+                    continue
+                link_file(Path(canonical_file), Path(path), mode)
+            except FileNotFoundError:
+                counts["skipped"] += 1
+                continue
+            except OSError as e:
+                if mode == "reflink" and e.errno in REFLINK_UNSUPPORTED:
+                    logger.warning(f"Reflinks are not supported for {path}, stopping deduplication: {e}")
+                    return counts
+                logger.warning(f"Failed to deduplicate {path}: {e}")
+                counts["skipped"] += 1
+                continue
+
+            linked = os.stat(path)
+            repository.mark_deduplicated(path, canonical_file, linked.st_mtime_ns, linked.st_ino)
+            counts["linked"] += 1
+            counts["reclaimed_bytes"] += size
+    return counts
+
+
+def deduplicate_downloads(mode: DedupMode | None = None) -> dict[str, int]:
+    """Index the whole downloads directory, then link all duplicates."""
+    repository = ContentRepository()
+    try:
+        repository.open()
+        counts = index_downloads(repository)
+        counts.update(link_duplicates(repository, mode or server_config.dedup_mode))
+    finally:
+        repository.close()
+    logger.info(f"Deduplicated downloads: {counts}")
+    return counts
+
+
+def deduplicate_contents(sha256s: list[str], mode: DedupMode | None = None) -> dict[str, int]:
+    """
+    Link indexed files with the given contents, e.g. those of just-downloaded artworks indexed by
+    `verification.record_artworks`, to identical files already indexed.
+    """
+    if not sha256s:
+        return {"linked": 0, "reclaimed_bytes": 0, "skipped": 0}
+    repository = ContentRepository()
+    try:
+        repository.open()
+        return link_duplicates(repository, mode or server_config.dedup_mode, sorted(sha256s))
+    finally:
+        repository.close()
+
+
+def get_report() -> dict[str, int]:
+    repository = ContentRepository()
+    try:
+        repository.open()
+        return repository.select_report()
+    finally:
+        repository.close()
@@ -0,0 +1,175 @@
+import logging
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from pathlib import Path
+from urllib.parse import quote
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+from PixivServer.config.server import config as server_config
+from PixivServer.service.archives import ArchiveMember, archive_cache
+from PixivServer.utils import canonical_path
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_download_path(save_name: str) -> Path:
+    """
+    Resolve a PixivUtil2 `save_name` to a file inside the downloads directory.
+    Relative save names are resolved against the working directory, as PixivUtil2 writes them.
+
+    Raises:
+        PermissionError: If the path resolves outside the downloads directory.
+        FileNotFoundError: If the file does not exist.
+    """
+    downloads_root = Path(server_config.downloads_dir).resolve()
+    path = Path(canonical_path(save_name))
+    if not path.is_relative_to(downloads_root):
+        raise PermissionError(f"Refusing to serve file outside downloads directory: {save_name}")
+    if not path.is_file():
+        raise FileNotFoundError(f"File not found: {save_name}")
+    return path
+
+
+def remove_files(paths: list[str], max_workers: int = 8) -> dict[str, int]:
+    """
+    Unlink many files with a bounded thread pool; each unlink waits on filesystem metadata
+    I/O, which threads can overlap. Missing files are counted, not treated as errors.
+    """
+    def remove(path: str) -> str:
+        try:
+            os.remove(path)
+            return "deleted"
+        except FileNotFoundError:
+            return "missing"
+        except OSError as e:
+            logger.error(f"Error deleting file {path}: {e}")
+            return "failed"
+
+    counts = {"deleted": 0, "missing": 0, "failed": 0}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for outcome in executor.map(remove, paths):
+            counts[outcome] += 1
+    return counts
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """Strong ETag derived from file size and modification time."""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires (RFC 9110 13.1.2).
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates
+
+
+def file_response(
+    request: Request,
+    path: Path,
+    media_type: str | None = None,
+    *,
+    max_age: int = 86400,
+    accel_redirect: bool = True,
+) -> Response:
+    """
+    Serve a downloaded file with validators and Range support.
+
+    With `accel_redirect_prefix` configured the body is left to the reverse proxy via
+    X-Accel-Redirect, so the file is read and sent by nginx. Otherwise FileResponse serves it,
+    handling Range/If-Range and using zero-copy `pathsend` when the ASGI server supports it.
+    Pass `accel_redirect=False` for files outside the downloads directory.
+    """
+    stat_result = path.stat()
+    etag = file_etag(stat_result)
+    media_type = media_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "cache-control": f"private, max-age={max_age}",
+    }
+
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if accel_redirect and server_config.accel_redirect_prefix:
+        relative_path = path.relative_to(Path(server_config.downloads_dir).resolve()).as_posix()
+        headers["x-accel-redirect"] = f"{server_config.accel_redirect_prefix}/{quote(relative_path)}"
+        return Response(status_code=200, headers=headers, media_type=media_type)
+
+    return FileResponse(path, headers=headers, media_type=media_type, stat_result=stat_result)
+
+
+def parse_single_range(range_header: str, size: int) -> tuple[int, int] | None:
+    """
+    Parse a `Range: bytes=...` header into (start, end), end exclusive.
+    Returns None when the header should be ignored, including multi-range requests.
+
+    Raises:
+        ValueError: If the range cannot be satisfied.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+        elif last:
+            start = max(size - int(last), 0)
+            end = size
+        else:
+            return None
+    except ValueError:
+        return None
+    end = min(end, size)
+    if start >= end:
+        raise ValueError(f"Range {range_header} not satisfiable for size {size}")
+    return start, end
+
+
+def archive_member_response(request: Request, member: ArchiveMember) -> Response:
+    """
+    Serve one member of a ZIP archive. Stored members honor single byte ranges (and If-Range),
+    reading only the requested bytes; compressed members are streamed whole.
+    """
+    headers = {
+        "etag": member.etag,
+        "last-modified": formatdate(member.archive_stat.st_mtime, usegmt=True),
+        "cache-control": "private, max-age=86400",
+        "accept-ranges": "bytes" if member.is_stored else "none",
+    }
+    if is_not_modified(request, member.etag):
+        return Response(status_code=304, headers=headers)
+
+    start, end, status_code = 0, member.size, 200
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if member.is_stored and range_header and (if_range is None or if_range == member.etag):
+        try:
+            byte_range = parse_single_range(range_header, member.size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{member.size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            status_code = 206
+            headers["content-range"] = f"bytes {start}-{end - 1}/{member.size}"
+
+    headers["content-length"] = str(end - start)
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=member.media_type)
+    return StreamingResponse(
+        archive_cache.iter_member(member, start, end),
+        status_code=status_code,
+        headers=headers,
+        media_type=member.media_type,
+    )
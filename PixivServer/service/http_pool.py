@@ -0,0 +1,170 @@
+import http.client
+import logging
+import ssl
+import threading
+import time
+from collections import deque
+from urllib.error import URLError
+from urllib.parse import urlsplit
+
+from PixivServer.config.server import config as server_config
+from PixivServer.metrics import UPSTREAM_CONNECTIONS_TOTAL, UPSTREAM_IDLE_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+# A pooled connection the server already closed fails like this on first use; the request is retried once.
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError, ConnectionAbortedError)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+PoolKey = tuple[str, str, int]
+
+
+class PooledResponse:
+    """
+    An HTTP response whose connection goes back to the pool once the body has been read in full.
+    Closing it early discards the connection, since unread bytes would corrupt the next response.
+    """
+
+    def __init__(self, pool: "HttpConnectionPool", key: PoolKey, connection: http.client.HTTPConnection, response: http.client.HTTPResponse, url: str):
+        self._pool = pool
+        self._key = key
+        self._connection: http.client.HTTPConnection | None = connection
+        self._response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def getcode(self) -> int:
+        return self.status
+
+    def geturl(self) -> str:
+        return self.url
+
+    def read(self, amt: int | None = None) -> bytes:
+        data = self._response.read(amt)
+        if self._response.isclosed():
+            self._release()
+        return data
+
+    def readinto(self, buffer) -> int:
+        count = self._response.readinto(buffer)
+        if self._response.isclosed():
+            self._release()
+        return count
+
+    def _release(self):
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        if self._response.isclosed() and not self._response.will_close:
+            self._pool._release(self._key, connection)
+        else:
+            connection.close()
+
+    def close(self):
+        self._release()
+        self._response.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class HttpConnectionPool:
+    """
+    Keep-alive HTTP/1.1 connections to upstream hosts, pooled per scheme, host and port, so
+    page and image fetches skip TCP and TLS setup. `send` is only the transport: redirects,
+    cookies and error statuses are left to the browser's handlers in `browser.PooledHTTPHandler`.
+
+    The standard library has no HTTP/2 client, so connections are HTTP/1.1; reuse keeps
+    handshakes off the hot path all the same.
+    """
+
+    def __init__(self, max_idle_per_host: int = 8, idle_timeout: float = 60.0, ssl_context: ssl.SSLContext | None = None):
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._idle: dict[PoolKey, deque[tuple[http.client.HTTPConnection, float]]] = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, key: PoolKey, timeout: float | None) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _acquire(self, key: PoolKey, timeout: float | None) -> tuple[http.client.HTTPConnection, bool]:
+        now = time.monotonic()
+        expired: list[http.client.HTTPConnection] = []
+        connection = None
+        with self._lock:
+            idle = self._idle.get(key)
+            while idle:
+                candidate, released = idle.pop()
+                if now - released < self.idle_timeout:
+                    connection = candidate
+                    break
+                expired.append(candidate)
+            UPSTREAM_IDLE_CONNECTIONS.labels(key[1]).set(len(idle or ()))
+        for stale in expired:
+            stale.close()
+        if connection is None:
+            UPSTREAM_CONNECTIONS_TOTAL.labels(key[1], "new").inc()
+            return self._connect(key, timeout), False
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        UPSTREAM_CONNECTIONS_TOTAL.labels(key[1], "reused").inc()
+        return connection, True
+
+    def _release(self, key: PoolKey, connection: http.client.HTTPConnection):
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) < self.max_idle_per_host:
+                idle.append((connection, time.monotonic()))
+                connection = None
+            UPSTREAM_IDLE_CONNECTIONS.labels(key[1]).set(len(idle))
+        if connection is not None:
+            connection.close()
+
+    def send(self, method: str, url: str, headers: dict[str, str], body: bytes | None, timeout: float | None) -> PooledResponse:
+        """Send one request over a pooled connection, without following redirects or raising for error statuses."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise URLError(f"Unsupported URL: {url}")
+        key: PoolKey = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        while True:
+            connection, reused = self._acquire(key, timeout)
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+            except STALE_CONNECTION_ERRORS:
+                connection.close()
+                if reused and method in IDEMPOTENT_METHODS:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+            return PooledResponse(self, key, connection, response, url)
+
+    def close(self):
+        with self._lock:
+            pools, self._idle = self._idle, {}
+        for key, idle in pools.items():
+            for connection, _ in idle:
+                connection.close()
+            UPSTREAM_IDLE_CONNECTIONS.labels(key[1]).set(0)
+
+
+upstream_pool = HttpConnectionPool(
+    max_idle_per_host=server_config.upstream_pool_size,
+    idle_timeout=server_config.upstream_idle_timeout_seconds,
+)
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+import traceback
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+from PixivServer.config.celery import MAIN_QUEUE_NAME
+from PixivServer.config.server import config as server_config
+from PixivServer.metrics import (
+    DATABASE_FREELIST_PAGES,
+    DATABASE_MAINTENANCE_DURATION,
+    DATABASE_MAINTENANCE_TOTAL,
+    DATABASE_WAL_BYTES,
+)
+from PixivServer.repository.maintenance import MaintenanceRepository
+from PixivServer.service.rabbitmq import queue_message_count
+
+logger = logging.getLogger('uvicorn.pixivutil')
+
+# Last run of each maintenance operation in this process, for the status endpoint.
+last_runs: dict[str, dict] = {}
+
+
+def _run[T](operation: str, fn: Callable[[MaintenanceRepository], T], busy_timeout_seconds: float = 5.0) -> T:
+    """Run one maintenance operation on its own connection, recording its duration and result."""
+    repository = MaintenanceRepository(busy_timeout_seconds=busy_timeout_seconds)
+    start = time.perf_counter()
+    try:
+        repository.open()
+        result = fn(repository)
+        DATABASE_MAINTENANCE_TOTAL.labels(operation, "ok").inc()
+        return result
+    except Exception:
+        DATABASE_MAINTENANCE_TOTAL.labels(operation, "error").inc()
+        raise
+    finally:
+        repository.close()
+        duration = time.perf_counter() - start
+        DATABASE_MAINTENANCE_DURATION.labels(operation).observe(duration)
+        last_runs[operation] = {"date": datetime.now(UTC).isoformat(), "duration_seconds": round(duration, 3)}
+
+
+def _select_freelist() -> dict:
+    repository = MaintenanceRepository()
+    try:
+        repository.open()
+        freelist = repository.select_freelist()
+    finally:
+        repository.close()
+    DATABASE_FREELIST_PAGES.set(freelist["freelist_pages"])
+    return freelist
+
+
+def checkpoint_if_needed(threshold_bytes: int) -> bool:
+    """
+    Checkpoint and truncate the WAL if it has grown past `threshold_bytes`.
+
+    Returns:
+        Whether the WAL was truncated. It is not while a reader still uses part of it; the next
+        check tries again.
+    """
+    repository = MaintenanceRepository()
+    wal_bytes = repository.wal_bytes()
+    DATABASE_WAL_BYTES.set(wal_bytes)
+    if wal_bytes <= threshold_bytes:
+        return False
+    busy, log, checkpointed = _run("checkpoint", lambda repository: repository.checkpoint("TRUNCATE"))
+    DATABASE_WAL_BYTES.set(repository.wal_bytes())
+    if busy:
+        logger.info(f"WAL checkpoint was blocked by a reader after {checkpointed} of {log} frames.")
+    return not busy
+
+
+def optimize_database():
+    """Refresh the query planner statistics."""
+    _run("optimize", lambda repository: repository.optimize())
+
+
+def vacuum_incrementally(pages: int) -> int:
+    """
+    Return up to `pages` free pages to the filesystem if the database uses incremental
+    auto-vacuum.
+
+    Returns:
+        The number of pages freed.
+    """
+    freelist = _select_freelist()
+    if freelist["auto_vacuum"] != "incremental" or freelist["freelist_pages"] == 0:
+        return 0
+    freed = _run("incremental_vacuum", lambda repository: repository.incremental_vacuum(pages))
+    DATABASE_FREELIST_PAGES.set(freelist["freelist_pages"] - freed)
+    return freed
+
+
+def vacuum_database() -> dict:
+    """
+    Rebuild the database with incremental auto-vacuum, returning every free page. Afterwards the
+    maintenance loop keeps the file compact in small steps.
+
+    Returns:
+        The database's page counts after the vacuum.
+    """
+    # VACUUM waits for the write lock like any writer, then holds it until it is done.
+    _run("vacuum", lambda repository: repository.vacuum(), busy_timeout_seconds=30.0)
+    freelist = _select_freelist()
+    logger.info(f"Vacuumed database to {freelist['page_count']} pages.")
+    return freelist
+
+
+def get_status() -> dict:
+    return {
+        "wal_bytes": MaintenanceRepository().wal_bytes(),
+        **_select_freelist(),
+        "last_runs": last_runs,
+    }
+
+
+def _queue_is_idle() -> bool:
+    return queue_message_count(MAIN_QUEUE_NAME) == 0
+
+
+async def periodic_database_maintenance() -> None:
+    """
+    Check the database every interval: truncate the WAL once it passes the threshold, refresh
+    planner statistics every optimize interval, and vacuum free pages in small steps while
+    the download queue is empty.
+    """
+    threshold_bytes = int(server_config.wal_checkpoint_threshold_mb * 1024 * 1024)
+    last_optimize = time.monotonic()
+    while True:
+        try:
+            await asyncio.to_thread(checkpoint_if_needed, threshold_bytes)
+            if time.monotonic() - last_optimize >= server_config.database_optimize_interval_seconds:
+                await asyncio.to_thread(optimize_database)
+                last_optimize = time.monotonic()
+            if server_config.incremental_vacuum_pages and await asyncio.to_thread(_queue_is_idle):
+                await asyncio.to_thread(vacuum_incrementally, server_config.incremental_vacuum_pages)
+        except Exception:  # noqa: BLE001
+            logger.warning(f"Database maintenance error: {traceback.format_exc()}")
+        await asyncio.sleep(server_config.database_maintenance_interval_seconds)
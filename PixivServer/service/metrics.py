@@ -1,15 +1,10 @@
 import asyncio
-import base64
 import contextlib
-import json
 import logging
 import os
 import time
 import traceback
-import urllib.error
-import urllib.request
 from pathlib import Path
-from urllib.parse import quote, urlparse
 
 import psutil
 
@@ -20,7 +15,6 @@ import PixivServer.service
 import PixivServer.service.pixiv
 from PixivServer.config.celery import DEAD_LETTER_QUEUE_NAME, MAIN_QUEUE_NAME
 from PixivServer.config.pixivutil import config as pixivutil_config
-from PixivServer.config.rabbitmq import config as rabbitmq_config
 from PixivServer.metrics import (
     DB_ARTWORKS,
     DB_MEMBERS,
@@ -37,7 +31,8 @@ from PixivServer.metrics import (
     SYS_MEM_TOTAL_BYTES,
     SYS_MEM_USED_BYTES,
 )
-from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.repository.snapshot import database_snapshot
+from PixivServer.service.rabbitmq import queue_message_count
 
 logger = logging.getLogger('uvicorn.pixivutil')
 
@@ -59,8 +54,8 @@ def _collect_system_metrics() -> None:
 
 
 def _collect_db_stats() -> None:
-    repo = PixivUtilRepository()
-    repo.open()
+    repo = database_snapshot.reader()
+    repo.open(reader=True)
     try:
         DB_MEMBERS.set(repo.count_members())
         DB_ARTWORKS.set(repo.count_artworks())
@@ -92,37 +87,14 @@ def _collect_disk_metrics() -> None:
     DISK_DOWNLOADS_BYTES.set(total)
 
 
-def _rabbitmq_queue_message_count(queue_name: str) -> int | None:
-    parsed_mgmt = urlparse(rabbitmq_config.management_url)
-    user = parsed_mgmt.username or "guest"
-    password = parsed_mgmt.password or "guest"
-    base = f"{parsed_mgmt.scheme}://{parsed_mgmt.hostname}"
-    if parsed_mgmt.port:
-        base = f"{base}:{parsed_mgmt.port}"
-    parsed_broker = urlparse(rabbitmq_config.broker_url)
-    raw_vhost = parsed_broker.path.lstrip("/")
-    vhost = raw_vhost if raw_vhost else "/"
-    encoded_vhost = quote(vhost, safe="")
-    url = f"{base}/api/queues/{encoded_vhost}/{queue_name}"
-    credentials = base64.b64encode(f"{user}:{password}".encode()).decode()
-    req = urllib.request.Request(url, headers={"Authorization": f"Basic {credentials}"})
-    try:
-        with urllib.request.urlopen(req, timeout=5) as resp:
-            data = json.loads(resp.read())
-            return int(data.get("messages", 0))
-    except (urllib.error.URLError, OSError, ValueError) as exc:
-        logger.warning("RabbitMQ management API unreachable for queue %s: %s", queue_name, exc)
-        return None
-
-
 def _collect_queue_depth() -> None:
-    count = _rabbitmq_queue_message_count(MAIN_QUEUE_NAME)
+    count = queue_message_count(MAIN_QUEUE_NAME)
     if count is not None:
         QUEUE_DEPTH.set(count)
 
 
 def _collect_dlq_depth() -> None:
-    count = _rabbitmq_queue_message_count(DEAD_LETTER_QUEUE_NAME)
+    count = queue_message_count(DEAD_LETTER_QUEUE_NAME)
     if count is not None:
         DLQ_DEPTH.set(count)
 
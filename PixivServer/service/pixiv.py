@@ -1,3 +1,5 @@
+import contextlib
+import functools
 import logging
 import os
 import sqlite3
@@ -11,6 +13,7 @@ sys.path.append('PixivUtil2')
 from PixivServer.config.pixivutil import config as pixivutil_config
 from PixivServer.models.pixiv_worker import (
     DeleteArtworkByIdRequest,
+    DeleteArtworksRequest,
     DownloadArtworkByIdRequest,
     DownloadArtworkMetadataByIdRequest,
     DownloadArtworksByMemberIdRequest,
@@ -19,6 +22,19 @@ from PixivServer.models.pixiv_worker import (
     DownloadSeriesMetadataByIdRequest,
     DownloadTagMetadataByIdRequest,
 )
+from PixivServer.repository.async_pixivutil import async_repository
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.repository.profile import apply_performance_profile
+from PixivServer.repository.write_batch import BatchingConnection
+from PixivServer.service import resumable, search, tag_stats
+from PixivServer.service.browser import (
+    browser_opener,
+    flush_before_requests,
+    install_pooled_handler,
+)
+from PixivServer.service.files import remove_files
+from PixivServer.service.http_pool import upstream_pool
+from PixivServer.service.upstream_cache import upstream_cache
 from PixivServer.utils import clear_folder
 from PixivUtil2 import (
     PixivArtistHandler,
@@ -26,6 +42,7 @@ from PixivUtil2 import (
     PixivConfig,
     PixivConstant,
     PixivDBManager,
+    PixivDownloadHandler,
     PixivException,
     PixivHelper,
     PixivImageHandler,
@@ -41,6 +58,7 @@ class PixivConfigProtocol(Protocol):
     cookie: str
     retry: int
     retryWait: int
+    checkUpdatedLimit: int
     dbPath: str
     rootDirectory: str
 
@@ -90,8 +108,22 @@ class PixivDBManagerMultiThread(PixivDBManager):
                 'info', "Using custom DB Path: " + target)
         self.rootDirectory = root_directory
 
-        # allow sqlite connection on different threads
-        self.conn = sqlite3.connect(target, timeout, check_same_thread=False)
+        # allow sqlite connection on different threads; PixivUtil2's per-write commits are batched.
+        self.conn = sqlite3.connect(target, timeout, check_same_thread=False, factory=BatchingConnection)
+
+
+def flushes_database_writes(method):
+    """Commit the writes PixivUtil2 batched while running `method`, also when it fails."""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self.flush_database_writes()
+
+    return wrapper
+
 
 class PixivUtilService:
 
@@ -131,6 +163,12 @@ class PixivUtilService:
 
         if __br__ is None:
             __br__ = PixivBrowserFactory.getBrowser(config=__config__)
+        upstream_cache.open()
+        upstream_cache.wrap_browser(__br__)
+        install_pooled_handler(__br__, upstream_pool)
+        resumable.wrap_download_handler(PixivDownloadHandler, browser_opener(__br__))
+        # Keep the batched write transaction, and SQLite's write lock, from spanning a fetch.
+        flush_before_requests(__br__, self.flush_database_writes)
 
         # Worker may validate login at startup. API server should not.
         if validate_pixiv_login:
@@ -144,15 +182,34 @@ class PixivUtilService:
         __config__.writeConfig(path=configfile)
         assert __dbManager__ is not None
         __dbManager__.close()
+        upstream_pool.close()
+        upstream_cache.close()
 
     def open_database(self):
         global __dbManager__
         __dbManager__ = PixivDBManagerMultiThread(root_directory=__config__.rootDirectory, target=__config__.dbPath)
         self.configure_database_connection(__dbManager__.conn)
         __dbManager__.createDatabase()
+        repository = PixivUtilRepository()
+        try:
+            repository.open()
+            repository.create_indexes()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to create the image list indexes: {e}")
+        finally:
+            repository.close()
+        try:
+            search.install_search_index()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to install the search index: {e}")
+        try:
+            tag_stats.install_tag_stats()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to install the tag statistics: {e}")
 
     def configure_database_connection(self, connection: sqlite3.Connection) -> None:
-        """Apply server-side SQLite pragmas to reduce lock contention."""
+        """Apply server-side SQLite pragmas to reduce lock contention, and the performance profile."""
+        apply_performance_profile(connection)
         cursor = connection.cursor()
         try:
             cursor.execute("PRAGMA journal_mode=WAL")
@@ -161,6 +218,11 @@ class PixivUtilService:
         finally:
             cursor.close()
 
+    def flush_database_writes(self):
+        """Commit the database writes batched so far, so other connections see them."""
+        if __dbManager__ is not None and isinstance(__dbManager__.conn, BatchingConnection):
+            __dbManager__.conn.flush()
+
     def remove_database(self):
         assert __dbManager__ is not None
         __dbManager__.close()
@@ -169,6 +231,8 @@ class PixivUtilService:
     def reset_database(self):
         self.remove_database()
         self.open_database()
+        # Pooled read connections still point at the removed file.
+        async_repository.invalidate()
 
     def reset_downloads(self):
         clear_folder(self.downloads_folder)
@@ -192,6 +256,10 @@ class PixivUtilService:
         __config__.writeConfig(path=configfile)
         return True
 
+    def _upstream_cache_context(self, refresh: bool):
+        """Bypass the upstream page cache when a refresh is requested."""
+        return upstream_cache.bypass() if refresh else contextlib.nullcontext()
+
     def get_member_data(self, member_id: int):
         (data, response) = PixivBrowserFactory.getBrowser().getMemberPage(member_id)
         return data, response
@@ -256,6 +324,7 @@ class PixivUtilService:
             f"(pixiv_error_code={error_code}, result={process_result})"
         )
 
+    @flushes_database_writes
     def download_artwork_by_id(self, request: DownloadArtworkByIdRequest):
         PixivHelper.print_and_log("info", f"Download by artwork ID: {request.artwork_id}")
         return PixivImageHandler.process_image(
@@ -266,6 +335,7 @@ class PixivUtilService:
             user_dir=self.downloads_folder
         )
 
+    @flushes_database_writes
     def download_artworks_by_member_id(self, request: DownloadArtworksByMemberIdRequest):
         PixivHelper.print_and_log("info", f"Downloading by artist ID: {request.member_id}")
         PixivArtistHandler.process_member(
@@ -274,10 +344,14 @@ class PixivUtilService:
             member_id=request.member_id,
         )
 
+    @flushes_database_writes
     def download_artworks_by_tag(self, request: DownloadArtworksByTagsRequest):
         logger.info(f"Before calling PixivTagsHandler.process_tags with tag: {request.tags}")
+        previous_check_updated_limit = __config__.checkUpdatedLimit
         try:
-            logger.info(f"Parameters: wild_card={request.wildcard}, bookmark_count={request.bookmark_count}, sort_order={request.sort_order}")
+            logger.info(f"Parameters: wild_card={request.wildcard}, bookmark_count={request.bookmark_count}, sort_order={request.sort_order}, check_updated_limit={request.check_updated_limit}")
+            if request.check_updated_limit is not None:
+                __config__.checkUpdatedLimit = request.check_updated_limit
             PixivHelper.print_and_log("info", f"Downloading by tag: {request.tags}")
             PixivTagsHandler.process_tags(
                 sys.modules[__name__],
@@ -295,6 +369,8 @@ class PixivUtilService:
             logger.error(f"Error in download_artworks_by_tag: {str(e)}")
             logger.error(traceback.format_exc())
             raise
+        finally:
+            __config__.checkUpdatedLimit = previous_check_updated_limit
 
     def delete_artwork_by_id(self, request: DeleteArtworkByIdRequest):
         """Delete artwork by ID from database and filesystem."""
@@ -304,6 +380,7 @@ class PixivUtilService:
             raise FileNotFoundError(f"Database file not found: {db_path}")
 
         conn = sqlite3.connect(db_path, timeout=30.0)
+        apply_performance_profile(conn)
         files_to_delete = []
 
         try:
@@ -382,26 +459,57 @@ class PixivUtilService:
             mode = "archive" if is_archive_mode else "directory"
             PixivHelper.print_and_log("info", f"Successfully deleted artwork ({mode} mode): {request.artwork_id}")
 
+    def delete_artworks(self, request: DeleteArtworksRequest) -> dict[str, int]:
+        """
+        Delete many artworks (by ID and/or member) from the database in one transaction,
+        then remove their files in parallel.
+        """
+        PixivHelper.print_and_log(
+            "info",
+            f"Deleting {len(request.artwork_ids)} artworks by ID and member {request.member_id} "
+            f"(delete_metadata={request.delete_metadata})"
+        )
+        repository = PixivUtilRepository()
+        try:
+            repository.open()
+            image_ids, save_names = repository.delete_artworks(
+                request.artwork_ids, request.member_id, request.delete_metadata
+            )
+        finally:
+            repository.close()
+
+        counts = remove_files(save_names)
+        counts["artworks"] = len(image_ids)
+        if counts["failed"]:
+            PixivHelper.print_and_log("warning", f"Deleted artworks with {counts['failed']} file deletion error(s): {counts}")
+        else:
+            PixivHelper.print_and_log("info", f"Successfully deleted artworks: {counts}")
+        return counts
+
+    @flushes_database_writes
     def download_member_metadata_by_id(self, request: DownloadMemberMetadataByIdRequest):
         PixivHelper.print_and_log("info", f"Download member metadata by ID: {request.member_id}")
-        PixivArtistHandler.process_member_metadata(
-            sys.modules[__name__],
-            __config__,
-            request.member_id,
-        )
+        with self._upstream_cache_context(request.refresh):
+            PixivArtistHandler.process_member_metadata(
+                sys.modules[__name__],
+                __config__,
+                request.member_id,
+            )
 
+    @flushes_database_writes
     def download_artwork_metadata_by_id(self, request: DownloadArtworkMetadataByIdRequest):
         PixivHelper.print_and_log("info", f"Download artwork metadata by ID: {request.artwork_id}")
         previous_error_list_len = len(globals()["__errorList"])
         previous_error_code = ERROR_CODE
-        result = PixivImageHandler.process_image(
-            sys.modules[__name__],
-            __config__,
-            artist=None,
-            image_id=request.artwork_id,
-            useblacklist=False,
-            metadata_only=True,
-        )
+        with self._upstream_cache_context(request.refresh):
+            result = PixivImageHandler.process_image(
+                sys.modules[__name__],
+                __config__,
+                artist=None,
+                image_id=request.artwork_id,
+                useblacklist=False,
+                metadata_only=True,
+            )
         self._raise_metadata_process_image_failure(
             artwork_id=request.artwork_id,
             process_result=result,
@@ -409,14 +517,17 @@ class PixivUtilService:
             previous_error_code=previous_error_code,
         )
 
+    @flushes_database_writes
     def download_series_metadata_by_id(self, request: DownloadSeriesMetadataByIdRequest):
         PixivHelper.print_and_log("info", f"Download series metadata by ID: {request.series_id}")
-        PixivImageHandler.process_manga_series_metadata(
-            sys.modules[__name__],
-            __config__,
-            request.series_id,
-        )
+        with self._upstream_cache_context(request.refresh):
+            PixivImageHandler.process_manga_series_metadata(
+                sys.modules[__name__],
+                __config__,
+                request.series_id,
+            )
 
+    @flushes_database_writes
     def download_tag_metadata_by_id(self, request: DownloadTagMetadataByIdRequest):
         PixivHelper.print_and_log("info", f"Download tag metadata: {request.tag} (filter_mode={request.filter_mode})")
         PixivTagsHandler.process_tag_metadata(
@@ -0,0 +1,73 @@
+"""
+Process pool for the CPU-heavy work (thumbnails, ugoira conversion) that runs both in the API
+server and in Celery tasks.
+
+concurrent.futures.ProcessPoolExecutor cannot be used in the worker: Celery's prefork children
+are daemonic, and multiprocessing refuses to start processes from a daemonic process. billiard,
+Celery's fork of multiprocessing, has no such restriction.
+"""
+
+import contextlib
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, InvalidStateError
+
+import billiard
+from billiard.einfo import ExceptionInfo
+from billiard.pool import Pool
+
+
+class ProcessPool:
+    """
+    Pool of spawned processes, started on first use. `submit` returns a concurrent.futures
+    Future, like ProcessPoolExecutor's.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._pool: Pool | None = None
+        # Submitted work not finished yet, cancelled if the pool is terminated.
+        self._pending: set[Future] = set()
+        self._lock = threading.Lock()
+
+    def submit[T](self, fn: Callable[..., T], *args) -> Future[T]:
+        """Run `fn(*args)` in a pool process. `fn` and its arguments must be picklable."""
+        future: Future[T] = Future()
+
+        def on_result(value: T):
+            self._discard(future)
+            with contextlib.suppress(InvalidStateError):
+                future.set_result(value)
+
+        def on_error(error: ExceptionInfo):
+            self._discard(future)
+            with contextlib.suppress(InvalidStateError):
+                future.set_exception(error.exception)
+
+        with self._lock:
+            if self._pool is None:
+                # spawn: the server and worker processes hold threads and connections that must not be forked.
+                self._pool = billiard.get_context("spawn").Pool(self.workers)
+            self._pending.add(future)
+            self._pool.apply_async(fn, args, callback=on_result, error_callback=on_error)
+        return future
+
+    def _discard(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def close(self, wait: bool = True):
+        """Stop the pool's processes, by default after the submitted work has finished."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is None:
+            return
+        if wait:
+            pool.close()
+        else:
+            pool.terminate()
+        pool.join()
+        with self._lock:
+            pending, self._pending = self._pending, set()
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,34 @@
+import base64
+import json
+import logging
+import urllib.error
+import urllib.request
+from urllib.parse import quote, urlparse
+
+from PixivServer.config.rabbitmq import config as rabbitmq_config
+
+logger = logging.getLogger('uvicorn.pixivutil')
+
+
+def queue_message_count(queue_name: str) -> int | None:
+    """Messages waiting in a queue, from the RabbitMQ management API; None when it is unreachable."""
+    parsed_mgmt = urlparse(rabbitmq_config.management_url)
+    user = parsed_mgmt.username or "guest"
+    password = parsed_mgmt.password or "guest"
+    base = f"{parsed_mgmt.scheme}://{parsed_mgmt.hostname}"
+    if parsed_mgmt.port:
+        base = f"{base}:{parsed_mgmt.port}"
+    parsed_broker = urlparse(rabbitmq_config.broker_url)
+    raw_vhost = parsed_broker.path.lstrip("/")
+    vhost = raw_vhost if raw_vhost else "/"
+    encoded_vhost = quote(vhost, safe="")
+    url = f"{base}/api/queues/{encoded_vhost}/{queue_name}"
+    credentials = base64.b64encode(f"{user}:{password}".encode()).decode()
+    req = urllib.request.Request(url, headers={"Authorization": f"Basic {credentials}"})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            data = json.loads(resp.read())
+            return int(data.get("messages", 0))
+    except (urllib.error.URLError, OSError, ValueError) as exc:
+        logger.warning("RabbitMQ management API unreachable for queue %s: %s", queue_name, exc)
+        return None
@@ -0,0 +1,230 @@
+import contextlib
+import functools
+import inspect
+import json
+import logging
+import os
+import urllib.request
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from http.client import HTTPResponse, IncompleteRead
+from types import ModuleType
+from typing import Any
+from urllib.error import HTTPError
+
+from PixivServer.metrics import RESUMABLE_DOWNLOAD_BYTES_TOTAL
+
+logger = logging.getLogger(__name__)
+
+PART_SUFFIX = ".part"
+SIDECAR_SUFFIX = ".part.json"
+CHUNK_SIZE = 1024 * 1024
+
+Opener = Callable[[urllib.request.Request, float], HTTPResponse]
+
+# Arguments of PixivDownloadHandler.perform_download(url, file_size, filename, overwrite, config, referer, notifier)
+# that a resumable download needs; it returns (downloaded size, filename).
+PERFORM_DOWNLOAD_PARAMETERS = ("url", "file_size", "filename", "overwrite")
+DEFAULT_REFERER = "https://www.pixiv.net"
+
+
+class IncompleteDownloadError(ConnectionError):
+    """
+    The connection ended before the expected number of bytes arrived. The partial file is kept,
+    and being a ConnectionError, the worker's network retry resumes it.
+    """
+
+
+@dataclass(slots=True)
+class PartialDownload:
+    """Sidecar stored next to a `.part` file, describing what the finished file must be."""
+
+    url: str
+    expected_size: int | None
+    etag: str | None
+    last_modified: str | None
+
+    @property
+    def validator(self) -> str | None:
+        # If-Range requires a strong ETag; weak ones cannot guarantee byte-identical ranges.
+        if self.etag and not self.etag.startswith("W/"):
+            return self.etag
+        return self.last_modified
+
+
+def _urlopen(request: urllib.request.Request, timeout: float) -> HTTPResponse:
+    return urllib.request.urlopen(request, timeout=timeout)
+
+
+def _load_sidecar(sidecar_path: str, url: str) -> PartialDownload | None:
+    try:
+        with open(sidecar_path, encoding="utf-8") as file:
+            partial = PartialDownload(**json.load(file))
+    except (FileNotFoundError, TypeError, ValueError):
+        return None
+    return partial if partial.url == url else None
+
+
+def _save_sidecar(sidecar_path: str, partial: PartialDownload):
+    temporary = f"{sidecar_path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(asdict(partial), file)
+    os.replace(temporary, sidecar_path)
+
+
+def _parse_content_range(header: str | None) -> tuple[int, int | None] | None:
+    """Parse `bytes start-end/total` into (start, total)."""
+    if not header or not header.startswith("bytes "):
+        return None
+    try:
+        span, _, total = header[len("bytes "):].partition("/")
+        start = int(span.partition("-")[0])
+        return start, None if total == "*" else int(total)
+    except ValueError:
+        return None
+
+
+def _discard(part_path: str, sidecar_path: str):
+    for path in (part_path, sidecar_path):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def download_file(
+    url: str,
+    destination: str,
+    headers: dict[str, str] | None = None,
+    timeout: float = 60.0,
+    opener: Opener = _urlopen,
+    expected_size: int | None = None,
+) -> int:
+    """
+    Download `url` to `destination`, resuming an earlier interrupted attempt.
+
+    Bytes are written to `destination.part`, with the expected size and validators (ETag or
+    Last-Modified) in a `destination.part.json` sidecar. A later call sends
+    `Range: bytes=<part size>-` with `If-Range`, so only the missing bytes are transferred;
+    if the server answers 200 instead (file changed, or no range support) the download
+    starts over. The finished file must have the expected length before it atomically
+    replaces `destination`.
+
+    Args:
+        opener: Sends a request. Defaults to urllib; PixivUtil2 can pass its browser's opener so
+            cookies and proxies apply.
+        expected_size: Size of the finished file, if known beforehand. Used when the response has
+            no Content-Length, so a body cut short by a closed connection is not taken as complete.
+
+    Returns:
+        Size of the finished file in bytes.
+
+    Raises:
+        IncompleteDownloadError: If the response ended early. The partial file is kept for the next call.
+    """
+    part_path = destination + PART_SUFFIX
+    sidecar_path = destination + SIDECAR_SUFFIX
+
+    partial = _load_sidecar(sidecar_path, url)
+    offset = os.path.getsize(part_path) if partial is not None and os.path.exists(part_path) else 0
+    if partial is None or (partial.expected_size is not None and offset > partial.expected_size):
+        _discard(part_path, sidecar_path)
+        partial, offset = None, 0
+
+    request_headers = dict(headers or {})
+    if partial is not None and offset > 0:
+        request_headers["Range"] = f"bytes={offset}-"
+        if partial.validator:
+            request_headers["If-Range"] = partial.validator
+
+    try:
+        response = opener(urllib.request.Request(url, headers=request_headers), timeout)
+    except HTTPError as e:
+        if e.code != 416 or partial is None:
+            raise
+        e.close()
+        # Nothing left to send: the part file is complete if it has the expected size.
+        if partial.expected_size == offset:
+            os.replace(part_path, destination)
+            _discard(part_path, sidecar_path)
+            return offset
+        _discard(part_path, sidecar_path)
+        return download_file(url, destination, headers, timeout, opener, expected_size)
+
+    with response:
+        status = response.status
+        if status == 206 and partial is not None:
+            content_range = _parse_content_range(response.headers.get("Content-Range"))
+            if content_range is None or content_range[0] != offset:
+                raise IncompleteDownloadError(f"Unexpected Content-Range {response.headers.get('Content-Range')!r} for {url}")
+            logger.info(f"Resuming download of {url} at byte {offset}.")
+            RESUMABLE_DOWNLOAD_BYTES_TOTAL.labels("resumed").inc(offset)
+            mode = "ab"
+        else:
+            if offset:
+                logger.info(f"Server did not resume {url} (status {status}); restarting download.")
+            content_length = response.headers.get("Content-Length")
+            partial = PartialDownload(
+                url=url,
+                expected_size=int(content_length) if content_length and content_length.isdigit() else expected_size,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            _save_sidecar(sidecar_path, partial)
+            offset, mode = 0, "wb"
+
+        written = offset
+        with open(part_path, mode) as file:
+            while True:
+                try:
+                    chunk = response.read(CHUNK_SIZE)
+                except (IncompleteRead, OSError) as e:
+                    raise IncompleteDownloadError(f"Download of {url} interrupted after {written} bytes: {e}") from e
+                if not chunk:
+                    break
+                file.write(chunk)
+                written += len(chunk)
+                RESUMABLE_DOWNLOAD_BYTES_TOTAL.labels("network").inc(len(chunk))
+
+    if partial.expected_size is not None and written != partial.expected_size:
+        raise IncompleteDownloadError(f"Downloaded {written} of {partial.expected_size} bytes of {url}")
+    os.replace(part_path, destination)
+    _discard(part_path, sidecar_path)
+    return written
+
+
+def wrap_download_handler(download_handler: ModuleType, opener: Opener, timeout: float = 60.0):
+    """
+    Make PixivUtil2's download handler download images and ugoira ZIPs with `download_file`, so a
+    download interrupted by a worker restart or network error resumes from its `.part` file.
+    `overwrite` discards the `.part` file, a known `file_size` is required of the finished file,
+    and the notifier is told when a download starts and ends. Wrapping twice is a no-op.
+    """
+    perform_download = getattr(download_handler, "perform_download", None)
+    if perform_download is None or getattr(perform_download, "__resumable__", False):
+        return
+    signature = inspect.signature(perform_download)
+    if not all(name in signature.parameters for name in PERFORM_DOWNLOAD_PARAMETERS):
+        logger.warning(f"PixivUtil2's perform_download{signature} is not supported; downloads will not resume.")
+        return
+
+    @functools.wraps(perform_download)
+    def resumable_perform_download(*args, **kwargs) -> tuple[int, Any]:
+        arguments = signature.bind(*args, **kwargs).arguments
+        url, filename = arguments["url"], arguments["filename"]
+        # PixivUtil2 passes -1 when it does not know the size.
+        file_size = arguments["file_size"] if (arguments["file_size"] or 0) > 0 else None
+        notifier = arguments.get("notifier")
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        if arguments["overwrite"]:
+            _discard(filename + PART_SUFFIX, filename + SIDECAR_SUFFIX)
+        headers = {"Referer": arguments.get("referer") or DEFAULT_REFERER}
+        # PixivUtil2's network timeout, when its config is passed.
+        request_timeout = getattr(arguments.get("config"), "timeout", None) or timeout
+        if notifier is not None:
+            notifier(type="DOWNLOAD", message=f"Downloading {url} to {filename}")
+        size = download_file(url, filename, headers, request_timeout, opener, file_size)
+        if notifier is not None:
+            notifier(type="DOWNLOAD", message=f"Downloaded {size} bytes to {filename}")
+        return size, filename
+
+    resumable_perform_download.__resumable__ = True  # type: ignore[attr-defined]
+    download_handler.perform_download = resumable_perform_download  # type: ignore[attr-defined]
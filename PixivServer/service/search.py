@@ -0,0 +1,66 @@
+import logging
+import sqlite3
+import time
+
+from PixivServer.repository.search import SEARCH_KINDS, SearchKind, SearchRepository
+
+logger = logging.getLogger(__name__)
+
+
+def install_search_index():
+    """Create the search tables and the triggers that keep them in sync with new rows."""
+    repository = SearchRepository()
+    try:
+        repository.open()
+    finally:
+        repository.close()
+
+
+def backfill_search_index(restart: bool = False, batch_size: int = 1000, pause_seconds: float = 0.0) -> dict[str, int]:
+    """
+    Index rows that predate the search triggers. Each chunk commits on its own, so a download
+    waits for at most one chunk, and `pause_seconds` between chunks leaves the database idle
+    for others. An interrupted backfill resumes from its last chunk.
+
+    Returns:
+        Rows indexed by kind.
+    """
+    repository = SearchRepository()
+    counts: dict[str, int] = dict.fromkeys(SEARCH_KINDS, 0)
+    try:
+        repository.open()
+        if restart:
+            repository.reset_backfill()
+        for kind in SEARCH_KINDS:
+            while indexed := repository.backfill_chunk(kind, batch_size):
+                counts[kind] += indexed
+                if pause_seconds:
+                    time.sleep(pause_seconds)
+    finally:
+        repository.close()
+    logger.info(f"Backfilled search index: {counts}")
+    return counts
+
+
+def search(
+    query: str,
+    kind: SearchKind | None = None,
+    limit: int = 50,
+    offset: int = 0,
+    connection: sqlite3.Connection | None = None,
+) -> list[dict]:
+    repository = SearchRepository()
+    try:
+        repository.open(connection)
+        return repository.search(query, kind, limit, offset)
+    finally:
+        repository.close()
+
+
+def get_status() -> dict:
+    repository = SearchRepository()
+    try:
+        repository.open()
+        return repository.select_status()
+    finally:
+        repository.close()
@@ -0,0 +1,19 @@
+import asyncio
+import logging
+import traceback
+
+from PixivServer.repository.async_pixivutil import async_repository
+from PixivServer.repository.snapshot import database_snapshot
+
+logger = logging.getLogger('uvicorn.pixivutil')
+
+
+async def periodic_snapshot_refresher() -> None:
+    """Refresh the database snapshot every interval and move pooled readers onto it."""
+    while True:
+        try:
+            await asyncio.to_thread(database_snapshot.refresh)
+            async_repository.invalidate()
+        except Exception:  # noqa: BLE001
+            logger.warning(f"Database snapshot refresh error: {traceback.format_exc()}")
+        await asyncio.sleep(database_snapshot.interval_seconds)
@@ -1,12 +1,20 @@
 import logging
 import time
+from datetime import UTC, datetime
 
+from PixivServer.models.pixiv_worker import DownloadArtworksByTagsRequest
 from PixivServer.repository.pixivutil import PixivUtilRepository
 from PixivServer.repository.subscription import SubscriptionRepository
 from PixivServer.service.pixiv import service as pixiv_service
+from PixivServer.worker.download import download_artworks_by_tag_task
 
 logger = logging.getLogger(__name__)
 
+# Number of consecutive already-downloaded artworks after which a subscription crawl stops.
+# Kept above 1 so artworks that failed to download on a previous run do not end the crawl early.
+TAG_SUBSCRIPTION_CHECK_UPDATED_LIMIT = 5
+TAG_SUBSCRIPTION_PRIORITY = 1
+
 class SubscriptionService:
 
     def __init__(self):
@@ -23,17 +31,54 @@ class SubscriptionService:
         self.subscription_db.close()
         self.pixivutil_db.close()
 
-    def run_tag_subscription_job(self) -> dict[str, list[str]]:
-        logger.info("Triggering automated tag download job...")
-        subscribed_tags = self.get_subscribed_tags()
-
-        # num_new_artworks = 0
-        # new_artwork_titles_by_tag_id = dict()
+    def run_tag_subscription_job(self) -> dict[str, str]:
+        """
+        Queue an incremental download for every subscribed tag.
 
-        for tag in subscribed_tags:
-            tag_id = tag[0]
-            pixiv_service.download_artworks_by_tag(tag_id)
-            logger.info(f"Downloaded artworks by tag: {tag_id}")
+        Each tag keeps a high-water mark (newest artwork ID and upload date seen). The queued
+        crawl starts at the mark's upload date, walks newest-first, and stops once it reaches
+        already-downloaded artworks, so a run only costs the posts made since the previous run.
+        """
+        logger.info("Triggering automated tag download job...")
+        task_ids_by_tag_id: dict[str, str] = {}
+
+        for tag_id, bookmark_count, last_image_id, last_image_date in self.subscription_db.select_tag_subscription_states():
+            last_image_id, last_image_date = self.refresh_tag_high_water_mark(tag_id, last_image_id, last_image_date)
+            request = DownloadArtworksByTagsRequest(
+                tags=tag_id,
+                bookmark_count=bookmark_count,
+                sort_order='date_d',
+                start_date=last_image_date,
+                check_updated_limit=TAG_SUBSCRIPTION_CHECK_UPDATED_LIMIT if last_image_id is not None else None,
+            )
+            task = download_artworks_by_tag_task.apply_async(args=[request.model_dump()], priority=TAG_SUBSCRIPTION_PRIORITY)
+            task_ids_by_tag_id[tag_id] = task.id
+            logger.info(f"Queued incremental download for tag: {tag_id} (start_date={last_image_date}, last_image_id={last_image_id})")
+        return task_ids_by_tag_id
+
+    def refresh_tag_high_water_mark(
+        self,
+        tag_id: str,
+        last_image_id: int | None,
+        last_image_date: str | None,
+    ) -> tuple[int | None, str | None]:
+        """
+        Advance a tag's high-water mark from the artworks downloaded since the previous run.
+        """
+        newest = self.pixivutil_db.get_tag_high_water_mark(tag_id)
+        if newest is None:
+            return last_image_id, last_image_date
+
+        newest_image_id, uploaded_date_epoch = newest
+        if last_image_id is not None and newest_image_id <= last_image_id:
+            return last_image_id, last_image_date
+
+        newest_image_date = None
+        if uploaded_date_epoch is not None:
+            # Pixiv search dates are JST; the UTC calendar date is never later, so the crawl window only widens.
+            newest_image_date = datetime.fromtimestamp(uploaded_date_epoch, tz=UTC).strftime('%Y-%m-%d')
+        self.subscription_db.update_tag_high_water_mark(tag_id, newest_image_id, newest_image_date)
+        return newest_image_id, newest_image_date or last_image_date
 
     def run_member_subscription_job(self) -> dict[str, list[str]]:
         logger.info("Triggering automated artist download job...")
@@ -0,0 +1,100 @@
+import logging
+import sqlite3
+import time
+
+from PixivServer.config.server import config as server_config
+from PixivServer.repository.tag_stats import TagStatsRepository
+
+logger = logging.getLogger(__name__)
+
+
+def install_tag_stats():
+    """Create the tag statistics tables and the triggers that keep them up to date."""
+    repository = TagStatsRepository()
+    try:
+        repository.open()
+    finally:
+        repository.close()
+
+
+def rebuild_tag_stats(restart: bool = False, batch_size: int = 1000, pause_seconds: float = 0.0) -> int:
+    """
+    Count the tag links of existing artworks in chunks of `batch_size` artworks, each in its own
+    short transaction. Artworks the rebuild has passed are kept up to date by the triggers, so
+    downloads can continue meanwhile. An interrupted rebuild resumes from its last chunk.
+
+    Once the counts are complete, the most used tags become the top tags whose related tags are
+    kept, so a rebuild of complete statistics only refreshes those.
+
+    Returns:
+        The number of artworks counted.
+    """
+    repository = TagStatsRepository()
+    counted = 0
+    try:
+        repository.open()
+        if restart:
+            repository.reset()
+        while chunk := repository.rebuild_chunk(batch_size):
+            counted += chunk
+            if pause_seconds:
+                time.sleep(pause_seconds)
+        joined, left = repository.refresh_top_tags(server_config.tag_stats_top_tags)
+    finally:
+        repository.close()
+    logger.info(f"Rebuilt tag statistics of {counted} artworks; {joined} tags joined and {left} left the top tags.")
+    return counted
+
+
+def get_top_tags(limit: int = 50, offset: int = 0, connection: sqlite3.Connection | None = None) -> dict:
+    repository = TagStatsRepository()
+    try:
+        repository.open(connection)
+        return {
+            "tags": [
+                {"tag_id": tag_id, "image_count": image_count}
+                for tag_id, image_count in repository.select_top_tags(limit, offset)
+            ],
+            "complete": repository.is_complete(),
+        }
+    finally:
+        repository.close()
+
+
+def get_tag_count(tag_id: str, connection: sqlite3.Connection | None = None) -> dict:
+    repository = TagStatsRepository()
+    try:
+        repository.open(connection)
+        return {
+            "tag_id": tag_id,
+            "image_count": repository.select_tag_count(tag_id),
+            "complete": repository.is_complete(),
+        }
+    finally:
+        repository.close()
+
+
+def get_related_tags(tag_id: str, limit: int = 20, connection: sqlite3.Connection | None = None) -> dict:
+    repository = TagStatsRepository()
+    try:
+        repository.open(connection)
+        return {
+            "tag_id": tag_id,
+            "related": [
+                {"tag_id": other_tag_id, "image_count": image_count}
+                for other_tag_id, image_count in repository.select_related_tags(tag_id, limit)
+            ],
+            "top_tag": repository.is_top_tag(tag_id),
+            "complete": repository.is_complete(),
+        }
+    finally:
+        repository.close()
+
+
+def get_status() -> dict:
+    repository = TagStatsRepository()
+    try:
+        repository.open()
+        return repository.select_status()
+    finally:
+        repository.close()
@@ -0,0 +1,270 @@
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+from PixivServer.config.thumbnails import config as thumbnail_config
+from PixivServer.metrics import (
+    THUMBNAIL_CACHE_BYTES,
+    THUMBNAIL_RENDER_DURATION,
+    THUMBNAIL_REQUESTS_TOTAL,
+)
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.service.archives import ArchiveMember, archive_cache
+from PixivServer.service.files import resolve_download_path
+from PixivServer.service.process_pool import ProcessPool
+
+logger = logging.getLogger(__name__)
+
+ThumbnailFormat = Literal["webp", "jpeg"]
+
+# Allowed bounding-box sizes; a fixed set keeps the number of cache entries per page bounded.
+THUMBNAIL_SIZES = (128, 256, 512, 1024)
+THUMBNAIL_MEDIA_TYPES: dict[str, str] = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+# After eviction the cache is trimmed to this fraction of its budget, so eviction scans are rare.
+EVICTION_LOW_WATER = 0.9
+
+
+@dataclass(frozen=True, slots=True)
+class ThumbnailSource:
+    """Original file a thumbnail is rendered from: a downloaded file or a page inside an archive."""
+
+    path: Path
+    mtime_ns: int
+    member: ArchiveMember | None = None
+
+
+def resolve_thumbnail_source(repository: PixivUtilRepository, image_id: int, page: int) -> ThumbnailSource:
+    """
+    Find the original for a page of an artwork. Page 0 of a single-image artwork is its master file.
+
+    Raises:
+        KeyError: If the artwork or page has no saved file.
+        FileNotFoundError / PermissionError: See `resolve_download_path`.
+    """
+    image_save_name = repository.get_image_save_name(image_id)
+    is_archive_mode = image_save_name.endswith('.zip')
+    try:
+        page_save_name: str | None = repository.get_page_save_name(image_id, page)
+    except KeyError:
+        if page != 0 or is_archive_mode:
+            raise
+        page_save_name = None
+
+    if is_archive_mode:
+        archive_path = resolve_download_path(image_save_name)
+        member = archive_cache.get_member(archive_path, page_save_name or "")
+        return ThumbnailSource(archive_path, member.archive_stat.st_mtime_ns, member)
+
+    path = resolve_download_path(page_save_name or image_save_name)
+    return ThumbnailSource(path, path.stat().st_mtime_ns)
+
+
+def render_thumbnail(
+    source: str | bytes,
+    destination: str,
+    size: int,
+    image_format: ThumbnailFormat,
+    quality: int,
+    mtime_ns: int,
+) -> int:
+    """
+    Render a thumbnail fitting in `size`x`size` and write it atomically. Runs in the process pool.
+    The thumbnail's mtime is set to the source's, which is how stale thumbnails are detected.
+
+    Returns:
+        Size of the written thumbnail in bytes.
+    """
+    # Pillow is installed with the pixivutil2 extra, which the server image always includes.
+    from PIL import Image
+
+    with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as image:
+        # Lets the JPEG decoder downscale by up to 8x while decoding instead of afterwards.
+        image.draft("RGB", (size, size))
+        image.thumbnail((size, size))
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        if image_format == "webp" and has_alpha:
+            image = image.convert("RGBA")
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        temporary = f"{destination}.{os.getpid()}.tmp"
+        image.save(temporary, format=image_format.upper(), quality=quality)
+    os.utime(temporary, ns=(time.time_ns(), mtime_ns))
+    os.replace(temporary, destination)
+    return os.path.getsize(destination)
+
+
+class ThumbnailCache:
+    """
+    Persistent thumbnail cache keyed by (image_id, page, size, format).
+
+    Files are sharded into two levels of hex directories so no directory grows too large.
+    Recency is tracked with each file's atime, set explicitly on every hit so it works on
+    noatime mounts; when the cache exceeds `max_bytes`, least recently used thumbnails are
+    deleted down to `EVICTION_LOW_WATER` of the budget. Misses are rendered in a process
+    pool, and concurrent requests for the same thumbnail share one render.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, workers: int, quality: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.quality = quality
+        self._pool = ProcessPool(workers)
+        self._in_flight: dict[Path, Future[int]] = {}
+        self._total_bytes: int | None = None
+        self._lock = threading.Lock()
+
+    def path_for(self, image_id: int, page: int, size: int, image_format: ThumbnailFormat) -> Path:
+        name = f"{image_id}_p{page}_{size}.{image_format}"
+        digest = hashlib.sha1(name.encode()).hexdigest()
+        return self.root / digest[:2] / digest[2:4] / name
+
+    def get(
+        self,
+        image_id: int,
+        page: int,
+        size: int,
+        image_format: ThumbnailFormat,
+        source: ThumbnailSource,
+    ) -> Path:
+        """Return the path of an up-to-date thumbnail, rendering it if needed."""
+        path = self.path_for(image_id, page, size, image_format)
+        try:
+            stat_result = path.stat()
+            if stat_result.st_mtime_ns == source.mtime_ns:
+                os.utime(path, ns=(time.time_ns(), stat_result.st_mtime_ns))
+                THUMBNAIL_REQUESTS_TOTAL.labels("hit").inc()
+                return path
+        except FileNotFoundError:
+            stat_result = None
+
+        THUMBNAIL_REQUESTS_TOTAL.labels("miss").inc()
+        with self._lock:
+            future = self._in_flight.get(path)
+            if future is not None:
+                owner = False
+            else:
+                owner = True
+                future = self._in_flight[path] = Future()
+        if not owner:
+            future.result()
+            return path
+
+        started = time.perf_counter()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Archive members are read here; the pool only receives bytes or a plain path.
+            data: str | bytes = b"".join(archive_cache.iter_member(source.member)) if source.member else str(source.path)
+            written = self._pool.submit(
+                render_thumbnail, data, str(path), size, image_format, self.quality, source.mtime_ns
+            ).result()
+            future.set_result(written)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(path, None)
+        THUMBNAIL_RENDER_DURATION.observe(time.perf_counter() - started)
+        self._add_bytes(written - (stat_result.st_size if stat_result else 0))
+        return path
+
+    def _scan(self) -> list[tuple[float, int, Path]]:
+        entries: list[tuple[float, int, Path]] = []
+        if not self.root.is_dir():
+            return entries
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for subshard in os.scandir(shard.path):
+                if not subshard.is_dir():
+                    continue
+                for entry in os.scandir(subshard.path):
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        stat_result = entry.stat()
+                        entries.append((stat_result.st_atime, stat_result.st_size, Path(entry.path)))
+        return entries
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            return self._total_bytes
+
+    def _add_bytes(self, delta: int):
+        with self._lock:
+            # Until the first scan the total is unknown; the scan will include this change.
+            if self._total_bytes is not None:
+                self._total_bytes += delta
+        total = self.total_bytes()
+        THUMBNAIL_CACHE_BYTES.set(total)
+        if total > self.max_bytes:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete least recently used thumbnails until under the low-water mark. Returns bytes freed."""
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * EVICTION_LOW_WATER
+        freed = 0
+        for _, size, path in entries:
+            if total - freed <= target:
+                break
+            try:
+                path.unlink()
+                freed += size
+            except FileNotFoundError:
+                continue
+        with self._lock:
+            self._total_bytes = total - freed
+        THUMBNAIL_CACHE_BYTES.set(total - freed)
+        logger.info(f"Evicted {freed} bytes of thumbnails.")
+        return freed
+
+    def warm(self, image_ids: list[int], sizes: list[int], image_format: ThumbnailFormat) -> dict[str, int]:
+        """Render cover (page 0) thumbnails for many artworks, keeping the process pool busy."""
+        repository = PixivUtilRepository()
+        repository.open(check_same_thread=False)
+        lock = threading.Lock()
+        counts = {"rendered": 0, "failed": 0}
+
+        def warm_one(image_id: int):
+            try:
+                with lock:
+                    source = resolve_thumbnail_source(repository, image_id, 0)
+                for size in sizes:
+                    self.get(image_id, 0, size, image_format, source)
+                outcome = "rendered"
+            except (KeyError, OSError, ValueError, zipfile.BadZipFile) as e:
+                logger.warning(f"Could not warm thumbnails for image {image_id}: {e}")
+                outcome = "failed"
+            with lock:
+                counts[outcome] += 1
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(warm_one, image_ids))
+        finally:
+            repository.close()
+        return counts
+
+    def close(self):
+        self._pool.close()
+
+
+thumbnail_cache = ThumbnailCache(
+    root=Path(thumbnail_config.cache_dir),
+    max_bytes=thumbnail_config.cache_max_bytes,
+    workers=thumbnail_config.workers,
+    quality=thumbnail_config.quality,
+)
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import re
+import resource
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future
+from pathlib import Path
+
+from PixivServer.config.ugoira import config as ugoira_config
+from PixivServer.metrics import UGOIRA_CONVERSION_CPU_SECONDS, UGOIRA_CONVERSIONS_TOTAL
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.service.process_pool import ProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Ugoira ZIPs hold numbered frames only, unlike archive-mode ZIPs whose members are named after pages.
+FRAME_NAME = re.compile(r"^\d+\.(jpe?g|png|gif)$", re.IGNORECASE)
+OUTPUT_SUFFIXES: dict[str, str] = {"gif": ".gif", "apng": ".png", "webp": ".webp", "webm": ".webm"}
+
+
+def is_ugoira_zip(path: Path) -> bool:
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = [name for name in archive.namelist() if name != "animation.json"]
+    except (OSError, zipfile.BadZipFile):
+        return False
+    return bool(names) and all(FRAME_NAME.match(name) for name in names)
+
+
+def read_frame_delays(zip_path: Path, default_delay_ms: int) -> list[tuple[str, int]]:
+    """
+    Get (frame name, delay in ms) pairs. Delays come from animation.json, which PixivUtil2 writes
+    into the sibling .ugoira file (and some ZIPs); otherwise every frame gets `default_delay_ms`.
+    """
+    for source in (zip_path.with_suffix(".ugoira"), zip_path):
+        try:
+            with zipfile.ZipFile(source) as archive:
+                animation = json.loads(archive.read("animation.json"))
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            continue
+        frames = animation.get("ugokuIllustData", animation).get("frames") if isinstance(animation, dict) else None
+        if frames:
+            return [(frame["file"], int(frame["delay"])) for frame in frames]
+
+    with zipfile.ZipFile(zip_path) as archive:
+        names = sorted(name for name in archive.namelist() if FRAME_NAME.match(name))
+    return [(name, default_delay_ms) for name in names]
+
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError("Ugoira conversion timed out")
+
+
+def _encode_with_pillow(zip_path: Path, frames: list[tuple[str, int]], output: str, image_format: str):
+    # Pillow is installed with the pixivutil2 extra, which the server image always includes.
+    from PIL import Image
+
+    images = []
+    with zipfile.ZipFile(zip_path) as archive:
+        for name, _ in frames:
+            with archive.open(name) as file, Image.open(file) as frame:
+                images.append(frame.convert("RGBA" if image_format != "gif" else "RGB"))
+    save_format = {"gif": "GIF", "apng": "PNG", "webp": "WEBP"}[image_format]
+    images[0].save(
+        output,
+        format=save_format,
+        save_all=True,
+        append_images=images[1:],
+        duration=[delay for _, delay in frames],
+        loop=0,
+    )
+
+
+def _encode_with_ffmpeg(zip_path: Path, frames: list[tuple[str, int]], output: str, timeout: float):
+    with tempfile.TemporaryDirectory() as directory, zipfile.ZipFile(zip_path) as archive:
+        archive.extractall(directory, members=[name for name, _ in frames])
+        # The concat demuxer ignores the last duration unless the last frame is repeated.
+        lines = [f"file '{name}'\nduration {delay / 1000:.3f}" for name, delay in frames] + [f"file '{frames[-1][0]}'"]
+        concat_list = os.path.join(directory, "frames.txt")
+        with open(concat_list, "w") as file:
+            file.write("\n".join(lines) + "\n")
+        subprocess.run(
+            [
+                "ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", concat_list,
+                "-c:v", "libvpx-vp9", "-pix_fmt", "yuv420p", "-b:v", "0", "-crf", "30", "-f", "webm", output,
+            ],
+            check=True,
+            timeout=timeout,
+        )
+
+
+def convert_ugoira(zip_path: str, output_path: str, image_format: str, timeout: float, default_delay_ms: int) -> float:
+    """
+    Encode an ugoira ZIP as an animation and write it atomically. Runs in the process pool,
+    where SIGALRM enforces the timeout.
+
+    Returns:
+        CPU seconds used, including encoder subprocesses.
+    """
+    started = resource.getrusage(resource.RUSAGE_SELF)
+    started_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.alarm(max(1, int(timeout)))
+    temporary = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        frames = read_frame_delays(Path(zip_path), default_delay_ms)
+        if not frames:
+            raise ValueError(f"No frames in {zip_path}")
+        if image_format == "webm":
+            _encode_with_ffmpeg(Path(zip_path), frames, temporary, timeout)
+        else:
+            _encode_with_pillow(Path(zip_path), frames, temporary, image_format)
+        os.replace(temporary, output_path)
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous_handler)
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+    ended = resource.getrusage(resource.RUSAGE_SELF)
+    ended_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (
+        (ended.ru_utime + ended.ru_stime) - (started.ru_utime + started.ru_stime)
+        + (ended_children.ru_utime + ended_children.ru_stime) - (started_children.ru_utime + started_children.ru_stime)
+    )
+
+
+class UgoiraConverter:
+    """
+    Converts downloaded ugoira ZIPs in a process pool sized to the machine, so the CPU-heavy
+    encoding runs beside the single download worker instead of inside its task.
+    Outputs are written next to the ZIP and are skipped when newer than it.
+    """
+
+    def __init__(self, formats: list[str], workers: int, timeout_seconds: float, default_delay_ms: int):
+        self.formats = formats
+        self.workers = workers
+        self.timeout_seconds = timeout_seconds
+        self.default_delay_ms = default_delay_ms
+        self._pool = ProcessPool(workers)
+        # In-flight conversions by output path, so a re-downloaded artwork is not converted twice at once.
+        self._pending: dict[str, Future[float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.formats)
+
+    def output_path(self, zip_path: Path, image_format: str) -> Path:
+        return zip_path.with_suffix(OUTPUT_SUFFIXES[image_format])
+
+    def submit(self, zip_path: Path) -> list[Future[float]]:
+        """Queue conversion of an ugoira ZIP to every configured format that is missing or stale."""
+        if not self.enabled or not is_ugoira_zip(zip_path):
+            return []
+        zip_mtime_ns = zip_path.stat().st_mtime_ns
+        futures = []
+        for image_format in self.formats:
+            output = self.output_path(zip_path, image_format)
+            try:
+                if output.stat().st_mtime_ns >= zip_mtime_ns:
+                    continue
+            except FileNotFoundError:
+                pass
+            with self._lock:
+                if str(output) in self._pending:
+                    continue
+                future = self._pool.submit(
+                    convert_ugoira, str(zip_path), str(output), image_format, self.timeout_seconds, self.default_delay_ms
+                )
+                self._pending[str(output)] = future
+            future.add_done_callback(lambda done, image_format=image_format: self._on_done(done, zip_path, image_format))
+            futures.append(future)
+        return futures
+
+    def _on_done(self, future: Future[float], zip_path: Path, image_format: str):
+        with self._lock:
+            self._pending.pop(str(self.output_path(zip_path, image_format)), None)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            UGOIRA_CONVERSIONS_TOTAL.labels(image_format, "timeout" if isinstance(error, TimeoutError) else "failed").inc()
+            logger.error(f"Failed to convert ugoira {zip_path} to {image_format}: {error}")
+            return
+        cpu_seconds = future.result()
+        UGOIRA_CONVERSIONS_TOTAL.labels(image_format, "converted").inc()
+        UGOIRA_CONVERSION_CPU_SECONDS.labels(image_format).observe(cpu_seconds)
+        logger.info(f"Converted ugoira {zip_path} to {image_format} in {cpu_seconds:.2f} CPU seconds.")
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def close(self, wait: bool = True):
+        """Shut the pool down, by default letting queued conversions finish."""
+        pending = self.pending()
+        started = time.monotonic()
+        self._pool.close(wait=wait)
+        if wait and pending:
+            logger.info(f"Finished pending ugoira conversions in {time.monotonic() - started:.1f}s.")
+
+
+    def submit_artworks(self, image_ids: list[int]) -> int:
+        """Queue conversion of the ugoira ZIPs among the artworks' files. Returns the number of conversions queued."""
+        if not self.enabled:
+            return 0
+        repository = PixivUtilRepository()
+        try:
+            repository.open()
+            save_names = [
+                save_name
+                for image_id in image_ids
+                for save_name in repository.get_artwork_save_names(image_id)
+                if save_name.endswith(".zip")
+            ]
+        finally:
+            repository.close()
+        return sum(len(self.submit(Path(save_name).resolve())) for save_name in save_names if os.path.isfile(save_name))
+
+
+ugoira_converter = UgoiraConverter(
+    formats=ugoira_config.formats,
+    workers=ugoira_config.workers,
+    timeout_seconds=ugoira_config.timeout_seconds,
+    default_delay_ms=ugoira_config.default_delay_ms,
+)
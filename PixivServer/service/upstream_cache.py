@@ -0,0 +1,161 @@
+import contextlib
+import functools
+import inspect
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections.abc import Callable
+from typing import Any, TypeVar
+
+from PixivServer.config.server import config as server_config
+from PixivServer.metrics import UPSTREAM_CACHE_REQUESTS_TOTAL
+from PixivServer.repository.upstream_cache import UpstreamCacheRepository
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# PixivBrowser methods whose parsed results are cached, by cache kind.
+CACHED_BROWSER_METHODS = {
+    "getMemberPage": "member",
+    "getImagePage": "artwork",
+    "getMangaSeries": "series",
+}
+# Prune expired and excess entries after this many writes.
+PRUNE_INTERVAL = 100
+
+
+def cache_key(signature: inspect.Signature, args: tuple, kwargs: dict) -> str:
+    """
+    Key a call by its scalar arguments, bound to parameter names so positional and keyword calls
+    match. Object arguments (e.g. the parent artist of an image page) do not change what is fetched,
+    so they are left out, as are None values that usually stand in for them.
+    """
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    scalars = {
+        name: value for name, value in bound.arguments.items()
+        if isinstance(value, (bool, int, float, str))
+    }
+    return json.dumps(scalars, sort_keys=True)
+
+
+def is_cacheable(result: Any) -> bool:
+    """Browser page methods return (parsed page, response); a None page is a failed lookup."""
+    return result is not None and not (isinstance(result, tuple) and result and result[0] is None)
+
+
+class UpstreamCache:
+    """
+    TTL- and size-bounded cache of parsed upstream pages, persisted in SQLite so it survives
+    worker restarts. Metadata and download tasks for the same artwork, or a member crawl that
+    looks the member up twice, then fetch each page once per TTL.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, db_path: str | None = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.repository = UpstreamCacheRepository(db_path)
+        self._opened = False
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def open(self):
+        if not self.enabled or self._opened:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.repository.db_path)), exist_ok=True)
+        self.repository.open()
+        self._opened = True
+
+    def close(self):
+        if self._opened:
+            self.repository.close()
+            self._opened = False
+
+    @contextlib.contextmanager
+    def bypass(self):
+        """Fetch fresh pages inside this block. Fresh results still replace the cached ones."""
+        self._local.bypass = getattr(self._local, "bypass", 0) + 1
+        try:
+            yield
+        finally:
+            self._local.bypass -= 1
+
+    def _bypassed(self) -> bool:
+        return getattr(self._local, "bypass", 0) > 0
+
+    def get_or_fetch(self, kind: str, key: str, fetch: Callable[[], T]) -> T:
+        if not self._opened:
+            return fetch()
+
+        if self._bypassed():
+            UPSTREAM_CACHE_REQUESTS_TOTAL.labels(kind, "bypass").inc()
+        else:
+            try:
+                with self._lock:
+                    value = self.repository.select_entry(kind, key, time.time() - self.ttl_seconds)
+                if value is not None:
+                    result = pickle.loads(value)
+                    UPSTREAM_CACHE_REQUESTS_TOTAL.labels(kind, "hit").inc()
+                    return result
+            except Exception as e:  # noqa: BLE001
+                logger.warning(f"Ignoring unreadable upstream cache entry {kind} {key}: {e}")
+            UPSTREAM_CACHE_REQUESTS_TOTAL.labels(kind, "miss").inc()
+
+        result = fetch()
+        if is_cacheable(result):
+            self._store(kind, key, result)
+        return result
+
+    def _store(self, kind: str, key: str, result: Any):
+        try:
+            value = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:  # noqa: BLE001
+            logger.debug(f"Not caching {kind} {key}, it cannot be pickled: {e}")
+            return
+        try:
+            with self._lock:
+                self.repository.upsert_entry(kind, key, value)
+                self._writes += 1
+                if self._writes % PRUNE_INTERVAL == 0:
+                    self.repository.prune(time.time() - self.ttl_seconds, self.max_entries)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"Failed to cache {kind} {key}: {e}")
+
+    def clear(self, kind: str | None = None) -> int:
+        if not self._opened:
+            return 0
+        with self._lock:
+            return self.repository.delete_entries(kind)
+
+    def wrap_browser(self, browser: Any):
+        """Route the browser's page methods through the cache. Wrapping twice is a no-op."""
+        for method_name, kind in CACHED_BROWSER_METHODS.items():
+            method = getattr(browser, method_name, None)
+            if method is None or getattr(method, "__upstream_cached__", False):
+                continue
+            setattr(browser, method_name, self._cached_method(kind, method))
+
+    def _cached_method(self, kind: str, method: Callable[..., Any]) -> Callable[..., Any]:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def cached(*args, **kwargs):
+            return self.get_or_fetch(kind, cache_key(signature, args, kwargs), lambda: method(*args, **kwargs))
+
+        cached.__upstream_cached__ = True  # type: ignore[attr-defined]
+        return cached
+
+
+upstream_cache = UpstreamCache(
+    ttl_seconds=server_config.upstream_cache_ttl_seconds,
+    max_entries=server_config.upstream_cache_max_entries,
+)
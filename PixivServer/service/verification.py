@@ -0,0 +1,236 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Container
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PixivServer.repository.content import ContentRepository
+from PixivServer.repository.manifest import FileStatus, ManifestRepository
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.service.dedup import (
+    SKIPPED_SUFFIXES,
+    artwork_file_paths,
+    hash_file,
+    index_file,
+)
+from PixivServer.utils import canonical_path
+
+logger = logging.getLogger(__name__)
+
+# Directory listings kept between batches; artworks of one member share a folder but are not adjacent by ID.
+LISTING_CACHE_SIZE = 256
+# Stay well below SQLite's bound parameter limit.
+MAX_QUERY_PARAMETERS = 5000
+
+ManifestEntry = tuple[str, int | None, int | None, int | None, str | None, FileStatus]
+
+
+def list_directory(directory: str) -> dict[str, os.DirEntry]:
+    """List the files of a directory. One getdents pass; file types come from the directory entries."""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name: entry for entry in entries if entry.is_file()}
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+
+
+class DirectoryListings:
+    """LRU cache of directory listings, filled in parallel."""
+
+    def __init__(self, executor: ThreadPoolExecutor, max_size: int = LISTING_CACHE_SIZE):
+        self.executor = executor
+        self.max_size = max_size
+        self._listings: OrderedDict[str, dict[str, os.DirEntry]] = OrderedDict()
+
+    def load(self, directories: set[str]):
+        missing = [directory for directory in directories if directory not in self._listings]
+        for directory, listing in zip(missing, self.executor.map(list_directory, missing), strict=True):
+            self._listings[directory] = listing
+        for directory in directories:
+            self._listings.move_to_end(directory)
+        while len(self._listings) > max(self.max_size, len(directories)):
+            self._listings.popitem(last=False)
+
+    def __getitem__(self, directory: str) -> dict[str, os.DirEntry]:
+        return self._listings[directory]
+
+
+def record_artworks(image_ids: list[int]) -> list[str]:
+    """
+    Record the files of just-downloaded artworks in the manifest. Each file is hashed once, into
+    the content index, and the manifest keeps that hash as the one later runs verify against.
+
+    Returns:
+        SHA-256s of the files that were hashed, i.e. new or changed since they were indexed.
+    """
+    pixivutil_repository = PixivUtilRepository()
+    try:
+        pixivutil_repository.open()
+        files = [
+            (str(path), image_id)
+            for image_id in image_ids
+            for path in artwork_file_paths(pixivutil_repository, image_id)
+        ]
+    finally:
+        pixivutil_repository.close()
+
+    hashed: set[str] = set()
+    content_repository = ContentRepository()
+    repository = ManifestRepository()
+    try:
+        content_repository.open()
+        repository.open()
+        for start in range(0, len(files), MAX_QUERY_PARAMETERS):
+            chunk = files[start:start + MAX_QUERY_PARAMETERS]
+            recorded = repository.select_files([path for path, _ in chunk])
+            for path, image_id in chunk:
+                try:
+                    indexed = index_file(content_repository, Path(path))
+                except FileNotFoundError:
+                    continue
+                if indexed.hashed:
+                    hashed.add(indexed.sha256)
+                # Member downloads record every artwork of the member; skip files already recorded.
+                if recorded.get(path) == (indexed.size, indexed.mtime_ns, indexed.sha256):
+                    continue
+                repository.record_file(path, image_id, indexed.size, indexed.mtime_ns, indexed.sha256)
+    finally:
+        repository.close()
+        content_repository.close()
+    return sorted(hashed)
+
+
+def verify_file(
+    path: str,
+    image_id: int,
+    entry: os.DirEntry | None,
+    recorded: tuple[int | None, int | None, str | None] | None,
+    hash_files: bool,
+) -> ManifestEntry:
+    if entry is None:
+        return (path, image_id, None, None, None, "missing")
+    stat_result = entry.stat()
+    size, mtime_ns = stat_result.st_size, stat_result.st_mtime_ns
+    recorded_size, _, recorded_sha256 = recorded or (None, None, None)
+    # The recorded size and hash are what was downloaded; keep them when the file no longer matches.
+    if recorded_size is not None and recorded_size != size:
+        return (path, image_id, None, None, None, "corrupt")
+    if not hash_files:
+        return (path, image_id, size, mtime_ns, None, "ok")
+    sha256 = hash_file(Path(path))
+    if recorded_sha256 is not None and recorded_sha256 != sha256:
+        return (path, image_id, None, None, None, "corrupt")
+    return (path, image_id, size, mtime_ns, sha256, "ok")
+
+
+def find_orphans(
+    repository: ManifestRepository, directory: str, listing: dict[str, os.DirEntry], expected: Container[str]
+) -> list[ManifestEntry]:
+    """Find files in a directory that no artwork references. Requires `load_expected_paths`."""
+    candidates = [
+        path for name in listing
+        if not name.endswith(SKIPPED_SUFFIXES) and (path := os.path.join(directory, name)) not in expected
+    ]
+    orphans: list[ManifestEntry] = []
+    for start in range(0, len(candidates), MAX_QUERY_PARAMETERS):
+        chunk = candidates[start:start + MAX_QUERY_PARAMETERS]
+        referenced = repository.select_expected_paths(chunk)
+        for path in chunk:
+            if path not in referenced:
+                stat_result = listing[os.path.basename(path)].stat()
+                orphans.append((path, None, stat_result.st_size, stat_result.st_mtime_ns, None, "orphaned"))
+    return orphans
+
+
+def verify_downloads(
+    restart: bool = False,
+    hash_files: bool = False,
+    files_per_second: float | None = None,
+    batch_size: int = 500,
+    workers: int = 8,
+    on_issues: Callable[[list[int]], None] | None = None,
+) -> dict:
+    """
+    Check that the files of every artwork exist and match the manifest, in artwork ID order.
+
+    Directories holding a batch's files are listed in parallel with `os.scandir`, so a missing file
+    costs no syscall of its own; only present files are stat'ed, from their directory entries.
+    Files in those directories that no artwork references are reported as orphaned. With
+    `hash_files`, contents are re-hashed and compared with the hash recorded at download time.
+
+    Progress is checkpointed after every batch, and a run resumes where it stopped unless
+    `restart` is set or the last run finished. `files_per_second` throttles the run so it does not
+    starve downloads of disk bandwidth. `on_issues` receives the artwork IDs of each batch's
+    missing or corrupt files, e.g. to queue repair downloads.
+
+    Returns:
+        The run's progress and issue counts.
+    """
+    repository = ManifestRepository()
+    pixivutil_repository = PixivUtilRepository()
+    try:
+        repository.open()
+        pixivutil_repository.open()
+        run = repository.get_run()
+        if restart or run is None or run["finished_date"] is not None:
+            repository.start_run()
+            run = repository.get_run()
+            assert run is not None
+        else:
+            logger.info(f"Resuming verification after image {run['last_image_id']}.")
+        repository.load_expected_paths()
+
+        last_image_id: int = run["last_image_id"]
+        checked_directories: set[str] = set()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            listings = DirectoryListings(executor)
+            while artworks := pixivutil_repository.get_artwork_files_after(last_image_id, batch_size):
+                started = time.monotonic()
+                expected = {
+                    canonical_path(save_name): image_id
+                    for image_id, save_names in artworks
+                    for save_name in save_names
+                }
+                directories = {os.path.dirname(path) for path in expected}
+                listings.load(directories)
+                recorded = repository.select_files(list(expected)) if expected else {}
+
+                entries = [
+                    verify_file(path, image_id, listings[os.path.dirname(path)].get(os.path.basename(path)), recorded.get(path), hash_files)
+                    for path, image_id in expected.items()
+                ]
+                for directory in directories - checked_directories:
+                    entries.extend(find_orphans(repository, directory, listings[directory], expected))
+                checked_directories |= directories
+
+                last_image_id = artworks[-1][0]
+                repository.save_batch(last_image_id, len(artworks), entries)
+
+                issue_image_ids = sorted({entry[1] for entry in entries if entry[1] is not None and entry[5] != "ok"})
+                if issue_image_ids and on_issues is not None:
+                    on_issues(issue_image_ids)
+
+                if files_per_second:
+                    time.sleep(max(0.0, len(expected) / files_per_second - (time.monotonic() - started)))
+
+        repository.finish_run()
+        run = repository.get_run()
+        logger.info(f"Verified downloads: {run}")
+        return run or {}
+    finally:
+        pixivutil_repository.close()
+        repository.close()
+
+
+def get_report(status: FileStatus | None = None, limit: int = 100) -> dict:
+    repository = ManifestRepository()
+    try:
+        repository.open()
+        return {
+            "run": repository.get_run(),
+            "issues": repository.select_issues(status, limit),
+        }
+    finally:
+        repository.close()
@@ -45,6 +45,13 @@ def clear_folder(folder: str) -> bool:
 
     return True
 
+def canonical_path(path: str) -> str:
+    """
+    Absolute path with symlinks resolved. Downloaded files are keyed by it in the content index
+    and the file manifest, so both agree on which file a PixivUtil2 save name refers to.
+    """
+    return os.path.realpath(path)
+
 def is_valid_date(date: str) -> bool:
     """
     Check if a date string is in the format YYYY-MM-DD.
@@ -1,12 +1,20 @@
 import logging
 
 from celery import Celery
-from celery.signals import setup_logging, worker_init, worker_shutdown
+from celery.signals import (
+    setup_logging,
+    task_postrun,
+    worker_init,
+    worker_process_shutdown,
+    worker_shutdown,
+)
 from kombu import Exchange, Queue
 
 import PixivServer
 import PixivServer.service
 import PixivServer.service.pixiv
+import PixivServer.service.thumbnails
+import PixivServer.service.ugoira
 from PixivServer.config.celery import (
     LEGACY_MAIN_EXCHANGE_NAME,
     LEGACY_MAIN_QUEUE_NAME,
@@ -34,9 +42,25 @@ def on_worker_init(sender, **kwargs):
 @worker_shutdown.connect
 def on_worker_shutdown(*args, **kwargs):
     PixivServer.service.pixiv.service.close()
+    # Only started here with the solo or threads pool; prefork children close theirs below.
+    PixivServer.service.thumbnails.thumbnail_cache.close()
+    PixivServer.service.ugoira.ugoira_converter.close()
     return
 
 
+@worker_process_shutdown.connect
+def on_worker_process_shutdown(*args, **kwargs):
+    # Tasks run in the prefork child, which starts its own thumbnail and ugoira process pools.
+    PixivServer.service.thumbnails.thumbnail_cache.close()
+    PixivServer.service.ugoira.ugoira_converter.close()
+
+
+@task_postrun.connect
+def on_task_postrun(*args, **kwargs):
+    # Jobs that write through PixivUtil2 flush their own batch; this covers any other task.
+    PixivServer.service.pixiv.service.flush_database_writes()
+
+
 @setup_logging.connect
 def config_loggers(*args, **kwargs):
     return
@@ -92,8 +116,14 @@ def _cleanup_legacy_exchange(conn, exchange_name: str) -> None:
 
 # Register task modules, as @shared_task decorator only runs when the module is imported.
 # until then, the task functions don't exist in Celery's registry.
+import PixivServer.worker.dedup  # noqa: E402, F401
 import PixivServer.worker.download  # noqa: E402, F401
+import PixivServer.worker.maintenance  # noqa: E402, F401
 import PixivServer.worker.metadata  # noqa: E402, F401
+import PixivServer.worker.search  # noqa: E402, F401
+import PixivServer.worker.tag_stats  # noqa: E402, F401
+import PixivServer.worker.thumbnails  # noqa: E402, F401
+import PixivServer.worker.verification  # noqa: E402, F401
 
 if server_config.server_env == 'development':
     import PixivServer.worker.dev  # noqa: F401
@@ -0,0 +1,28 @@
+import logging
+import traceback
+
+from celery import shared_task
+
+from PixivServer.config.celery import MAIN_QUEUE_NAME
+from PixivServer.models.pixiv_worker import DeduplicateDownloadsRequest, as_celery_task
+from PixivServer.service import dedup
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, name="deduplicate_downloads", queue=MAIN_QUEUE_NAME)
+def deduplicate_downloads(self, request_dict: dict):
+    """
+    Hash every downloaded file and replace duplicates with links. Runs locally without
+    calling Pixiv, so it does not sleep between jobs.
+    """
+    try:
+        request = DeduplicateDownloadsRequest(**request_dict)
+        return dedup.deduplicate_downloads(request.mode)
+    except Exception as e:  # noqa: BLE001
+        logger.error(f"Error in deduplicate_downloads worker: {str(e)}")
+        logger.error(traceback.format_exc())
+        return False
+
+
+deduplicate_downloads_task = as_celery_task(deduplicate_downloads)
@@ -1,17 +1,23 @@
 import logging
 import traceback
+from datetime import UTC, datetime
 
 from celery import shared_task
 
 import PixivServer.service.pixiv
 from PixivServer.config.celery import MAIN_QUEUE_NAME
+from PixivServer.config.server import config as server_config
 from PixivServer.models.pixiv_worker import (
     DeleteArtworkByIdRequest,
+    DeleteArtworksRequest,
     DownloadArtworkByIdRequest,
     DownloadArtworksByMemberIdRequest,
     DownloadArtworksByTagsRequest,
     as_celery_task,
 )
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.service import dedup, verification
+from PixivServer.service.ugoira import ugoira_converter
 from PixivServer.worker.common import (
     NETWORK_MAX_RETRIES,
     NETWORK_RETRY_COUNTDOWN,
@@ -22,12 +28,46 @@ from PixivServer.worker.common import (
 logger = logging.getLogger(__name__)
 
 
+def database_now() -> str:
+    """The current UTC time as SQLite's datetime('now') formats it."""
+    return datetime.now(UTC).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def after_download(image_ids: list[int] | None = None, member_id: int | None = None, updated_since: str | None = None):
+    """
+    Record a finished download's files in the manifest and, when enabled, link them to identical
+    files already on disk and queue ugoira conversions. This is housekeeping, so its errors are logged and never fail the download.
+    The artworks are given by ID, by member, or as those saved since a time (see `database_now`).
+    """
+    try:
+        if member_id is not None or updated_since is not None:
+            repository = PixivUtilRepository()
+            try:
+                repository.open()
+                if member_id is not None:
+                    image_ids = repository.get_image_ids_by_member_id(member_id)
+                else:
+                    image_ids = repository.get_image_ids_updated_since(updated_since or "")
+            finally:
+                repository.close()
+        hashed = verification.record_artworks(image_ids or [])
+        if server_config.dedup_on_download:
+            counts = dedup.deduplicate_contents(hashed)
+            if counts["linked"]:
+                logger.info(f"Deduplicated downloaded files: {counts}")
+        if ugoira_converter.enabled and (queued := ugoira_converter.submit_artworks(image_ids or [])):
+            logger.info(f"Queued {queued} ugoira conversions.")
+    except Exception as e:  # noqa: BLE001
+        logger.warning(f"Failed to record downloaded files: {e}")
+
+
 @shared_task(bind=True, name="download_artworks_by_id", queue=MAIN_QUEUE_NAME, max_retries=NETWORK_MAX_RETRIES)
 def download_artworks_by_id(self, request_dict: dict):
     try:
         request = DownloadArtworkByIdRequest(**request_dict)
         PixivServer.service.pixiv.PixivHelper.print_and_log("info", f"Downloading artwork by ID: {request.artwork_id}.")
         PixivServer.service.pixiv.service.download_artwork_by_id(request)
+        after_download(image_ids=[request.artwork_id])
         return True
     except Exception as e:  # noqa: BLE001
         logger.error(f"Error in download_artworks_by_id worker: {str(e)}")
@@ -48,6 +88,7 @@ def download_artworks_by_member_id(self, request_dict: dict):
         request = DownloadArtworksByMemberIdRequest(**request_dict)
         PixivServer.service.pixiv.PixivHelper.print_and_log("info", f"Downloading artworks by member ID: {request.member_id}.")
         PixivServer.service.pixiv.service.download_artworks_by_member_id(request)
+        after_download(member_id=request.member_id)
         return True
     except Exception as e:  # noqa: BLE001
         logger.error(f"Error in download_artworks_by_member_id worker: {str(e)}")
@@ -65,7 +106,10 @@ def download_artworks_by_tag(self, request_dict: dict):
     try:
         request = DownloadArtworksByTagsRequest(**request_dict)
         PixivServer.service.pixiv.PixivHelper.print_and_log("info", f"Downloading artwork by tag: {request.tags}. Bookmark minimum: {request.bookmark_count}")
+        # A tag crawl does not report what it downloaded; the artworks it saved are found by their update time.
+        crawl_started = database_now()
         PixivServer.service.pixiv.service.download_artworks_by_tag(request)
+        after_download(updated_since=crawl_started)
         return True
     except Exception as e:  # noqa: BLE001
         logger.error(f"Error in download_artworks_by_tag worker: {str(e)}")
@@ -96,7 +140,22 @@ def delete_artwork_by_id(self, request_dict: dict):
         job_sleep()
 
 
+@shared_task(bind=True, name="delete_artworks", queue=MAIN_QUEUE_NAME)
+def delete_artworks(self, request_dict: dict):
+    """
+    Delete many artworks at once. Runs locally without calling Pixiv, so it does not sleep between jobs.
+    """
+    try:
+        request = DeleteArtworksRequest(**request_dict)
+        return PixivServer.service.pixiv.service.delete_artworks(request)
+    except Exception as e:  # noqa: BLE001
+        logger.error(f"Error in delete_artworks worker: {str(e)}")
+        logger.error(traceback.format_exc())
+        return False
+
+
 download_artworks_by_id_task = as_celery_task(download_artworks_by_id)
 download_artworks_by_member_id_task = as_celery_task(download_artworks_by_member_id)
 download_artworks_by_tag_task = as_celery_task(download_artworks_by_tag)
 delete_artwork_by_id_task = as_celery_task(delete_artwork_by_id)
+delete_artworks_task = as_celery_task(delete_artworks)
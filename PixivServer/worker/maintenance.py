@@ -0,0 +1,28 @@
+import logging
+import traceback
+
+from celery import shared_task
+
+from PixivServer.config.celery import MAIN_QUEUE_NAME
+from PixivServer.models.pixiv_worker import VacuumDatabaseRequest, as_celery_task
+from PixivServer.service import maintenance
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, name="vacuum_database", queue=MAIN_QUEUE_NAME)
+def vacuum_database(self, request_dict: dict):
+    """
+    Vacuum the database on the worker, between downloads, so it does not wait for the
+    worker's own writes.
+    """
+    try:
+        VacuumDatabaseRequest(**request_dict)
+        return maintenance.vacuum_database()
+    except Exception as e:  # noqa: BLE001
+        logger.error(f"Error in vacuum_database worker: {str(e)}")
+        logger.error(traceback.format_exc())
+        return False
+
+
+vacuum_database_task = as_celery_task(vacuum_database)
@@ -0,0 +1,32 @@
+import logging
+import traceback
+
+from celery import shared_task
+
+from PixivServer.config.celery import MAIN_QUEUE_NAME
+from PixivServer.models.pixiv_worker import BackfillSearchIndexRequest, as_celery_task
+from PixivServer.service import search
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, name="backfill_search_index", queue=MAIN_QUEUE_NAME)
+def backfill_search_index(self, request_dict: dict):
+    """
+    Index existing artworks, members and tags for full-text search. Runs locally without
+    calling Pixiv, so it does not sleep between jobs.
+    """
+    try:
+        request = BackfillSearchIndexRequest(**request_dict)
+        return search.backfill_search_index(
+            restart=request.restart,
+            batch_size=request.batch_size,
+            pause_seconds=request.pause_seconds,
+        )
+    except Exception as e:  # noqa: BLE001
+        logger.error(f"Error in backfill_search_index worker: {str(e)}")
+        logger.error(traceback.format_exc())
+        return False
+
+
+backfill_search_index_task = as_celery_task(backfill_search_index)
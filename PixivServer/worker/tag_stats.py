@@ -0,0 +1,32 @@
+import logging
+import traceback
+
+from celery import shared_task
+
+from PixivServer.config.celery import MAIN_QUEUE_NAME
+from PixivServer.models.pixiv_worker import RebuildTagStatsRequest, as_celery_task
+from PixivServer.service import tag_stats
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, name="rebuild_tag_stats", queue=MAIN_QUEUE_NAME)
+def rebuild_tag_stats(self, request_dict: dict):
+    """
+    Count tag links of existing artworks for the tag statistics. Runs locally without calling
+    Pixiv, so it does not sleep between jobs.
+    """
+    try:
+        request = RebuildTagStatsRequest(**request_dict)
+        return tag_stats.rebuild_tag_stats(
+            restart=request.restart,
+            batch_size=request.batch_size,
+            pause_seconds=request.pause_seconds,
+        )
+    except Exception as e:  # noqa: BLE001
+        logger.error(f"Error in rebuild_tag_stats worker: {str(e)}")
+        logger.error(traceback.format_exc())
+        return False
+
+
+rebuild_tag_stats_task = as_celery_task(rebuild_tag_stats)
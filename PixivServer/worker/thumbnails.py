@@ -0,0 +1,42 @@
+import logging
+import traceback
+
+from celery import shared_task
+
+from PixivServer.config.celery import MAIN_QUEUE_NAME
+from PixivServer.models.pixiv_worker import WarmThumbnailsRequest, as_celery_task
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.service.thumbnails import thumbnail_cache
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, name="warm_thumbnails", queue=MAIN_QUEUE_NAME)
+def warm_thumbnails(self, request_dict: dict):
+    """
+    Render cover thumbnails for a member's or tag's artworks. Runs locally without calling
+    Pixiv, so unlike download tasks it does not sleep between jobs.
+    """
+    try:
+        request = WarmThumbnailsRequest(**request_dict)
+        repository = PixivUtilRepository()
+        try:
+            repository.open()
+            if request.member_id is not None:
+                image_ids = repository.get_image_ids_by_member_id(request.member_id)
+            else:
+                image_ids = repository.get_image_ids_by_tag_id(request.tag or "")
+        finally:
+            repository.close()
+
+        logger.info(f"Warming {request.sizes} {request.image_format} thumbnails for {len(image_ids)} artworks.")
+        counts = thumbnail_cache.warm(image_ids, request.sizes, request.image_format)
+        logger.info(f"Warmed thumbnails: {counts}")
+        return counts
+    except Exception as e:  # noqa: BLE001
+        logger.error(f"Error in warm_thumbnails worker: {str(e)}")
+        logger.error(traceback.format_exc())
+        return False
+
+
+warm_thumbnails_task = as_celery_task(warm_thumbnails)
@@ -0,0 +1,44 @@
+import logging
+import traceback
+
+from celery import shared_task
+
+from PixivServer.config.celery import MAIN_QUEUE_NAME
+from PixivServer.models.pixiv_worker import (
+    DownloadArtworkByIdRequest,
+    VerifyDownloadsRequest,
+    as_celery_task,
+)
+from PixivServer.service import verification
+from PixivServer.worker.download import download_artworks_by_id_task
+
+logger = logging.getLogger(__name__)
+
+
+def queue_repair_downloads(image_ids: list[int]):
+    for image_id in image_ids:
+        download_artworks_by_id_task.apply_async(args=[DownloadArtworkByIdRequest(artwork_id=image_id).model_dump()])
+    logger.info(f"Queued repair downloads for {len(image_ids)} artworks.")
+
+
+@shared_task(bind=True, name="verify_downloads", queue=MAIN_QUEUE_NAME)
+def verify_downloads(self, request_dict: dict):
+    """
+    Verify downloaded files against the database and manifest. Runs locally without calling
+    Pixiv, so it does not sleep between jobs; repair downloads are queued as separate tasks.
+    """
+    try:
+        request = VerifyDownloadsRequest(**request_dict)
+        return verification.verify_downloads(
+            restart=request.restart,
+            hash_files=request.hash_files,
+            files_per_second=request.files_per_second,
+            on_issues=queue_repair_downloads if request.repair else None,
+        )
+    except Exception as e:  # noqa: BLE001
+        logger.error(f"Error in verify_downloads worker: {str(e)}")
+        logger.error(traceback.format_exc())
+        return False
+
+
+verify_downloads_task = as_celery_task(verify_downloads)
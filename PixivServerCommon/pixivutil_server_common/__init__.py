@@ -1,4 +1,6 @@
 from pixivutil_server_common.models import (
+    ImageListFields,
+    ImageListOrder,
     PixivDateInfo,
     PixivImageComplete,
     PixivImageToSeries,
@@ -12,13 +14,22 @@ from pixivutil_server_common.models import (
     PixivSeriesInfo,
     PixivTagInfo,
     PixivTagTranslation,
+    QueueArtworksRequest,
     QueueTaskResponse,
+    TagAllOf,
+    TagAnyOf,
+    TagExpression,
     TagMetadataFilterMode,
+    TagNoneOf,
+    TagQueryRequest,
+    TagQueryResponse,
     TagSortOrder,
     TagTypeMode,
 )
 
 __all__ = [
+    "ImageListFields",
+    "ImageListOrder",
     "PixivDateInfo",
     "PixivImageComplete",
     "PixivImageToSeries",
@@ -32,8 +43,15 @@ __all__ = [
     "PixivSeriesInfo",
     "PixivTagInfo",
     "PixivTagTranslation",
+    "QueueArtworksRequest",
     "QueueTaskResponse",
+    "TagAllOf",
+    "TagAnyOf",
+    "TagExpression",
     "TagMetadataFilterMode",
+    "TagNoneOf",
+    "TagQueryRequest",
+    "TagQueryResponse",
     "TagSortOrder",
     "TagTypeMode",
 ]
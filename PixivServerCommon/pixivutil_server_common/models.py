@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class DeadLetterMessage(BaseModel):
@@ -46,6 +46,50 @@ class UpdateCookieRequest(BaseModel):
     cookie: str
 
 
+class QueueArtworksRequest(BaseModel):
+    artwork_ids: list[int]
+
+
+class TagAllOf(BaseModel):
+    """Artworks matching every sub-expression."""
+    model_config = ConfigDict(extra="forbid")
+    all_of: list[TagExpression] = Field(min_length=1)
+
+
+class TagAnyOf(BaseModel):
+    """Artworks matching at least one sub-expression."""
+    model_config = ConfigDict(extra="forbid")
+    any_of: list[TagExpression] = Field(min_length=1)
+
+
+class TagNoneOf(BaseModel):
+    """Artworks matching none of the sub-expressions."""
+    model_config = ConfigDict(extra="forbid")
+    none_of: list[TagExpression] = Field(min_length=1)
+
+
+# A tag ID, or a boolean combination, e.g. {"all_of": ["A", "B", {"none_of": ["C"]}]}.
+TagExpression = str | TagAllOf | TagAnyOf | TagNoneOf
+
+
+class TagQueryRequest(BaseModel):
+    query: TagExpression
+    member_id: int | None = None
+    # Bounds on pixiv_date_info.uploaded_date_epoch; artworks without date info never match them.
+    uploaded_after: int | None = None
+    uploaded_before: int | None = None
+    # True: only AI-generated artworks; False: exclude them.
+    ai: bool | None = None
+    # Keyset cursor: return artworks with lower IDs than this, i.e. the next_cursor of the previous page.
+    before_image_id: int | None = None
+    limit: int = Field(default=100, ge=1, le=10000)
+
+
+class TagQueryResponse(BaseModel):
+    image_ids: list[int]
+    next_cursor: int | None = None
+
+
 class PixivMasterMember(BaseModel):
     member_id: int
     name: str
@@ -122,9 +166,18 @@ class PixivImageToSeries(BaseModel):
     last_update_date: str
 
 
+# Projection of the image lists of a member portfolio or tag: every column, every column but
+# the (possibly long) caption, or only the image IDs, returned in `image_ids` instead of `images`.
+ImageListFields = Literal["full", "no_caption", "ids"]
+ImageListOrder = Literal["asc", "desc"]
+
+
 class PixivMemberPortfolio(BaseModel):
     member: PixivMasterMember
     images: list[PixivMasterImage]
+    image_ids: list[int] | None = Field(None)
+    total_images: int | None = Field(None)
+    next_cursor: int | None = Field(None)
 
 
 class PixivImageComplete(BaseModel):
@@ -140,6 +193,9 @@ class PixivTagInfo(BaseModel):
     tag: PixivMasterTag
     translations: list[PixivTagTranslation]
     images: list[PixivImageToTag]
+    image_ids: list[int] | None = Field(None)
+    total_images: int | None = Field(None)
+    next_cursor: int | None = Field(None)
 
 
 class PixivSeriesInfo(BaseModel):
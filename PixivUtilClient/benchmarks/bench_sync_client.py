@@ -0,0 +1,81 @@
+"""
+Compare per-call overhead of the synchronous client against wrapping the async client in `asyncio.run`.
+
+Starts a local keep-alive HTTP server answering `/api/health/` and times sequential calls:
+
+    python PixivUtilClient/benchmarks/bench_sync_client.py --iterations 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import socket
+import statistics
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pixivutil_client import PixivAsyncClient, PixivClient
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self) -> None:
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self) -> None:
+        body = b'"ok"'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_: object) -> None:
+        pass
+
+
+def measure(name: str, call: Callable[[], object], iterations: int) -> None:
+    call()  # warm up imports and the first connection
+    samples: list[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:<36} mean {statistics.fmean(samples):7.3f} ms  p50 {statistics.median(samples):7.3f} ms  p95 {p95:7.3f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), HealthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    async def async_health() -> str:
+        async with PixivAsyncClient(base_url) as client:
+            return await client.health()
+
+    def sync_health_per_call() -> str:
+        with PixivClient(base_url) as client:
+            return client.health()
+
+    try:
+        measure("asyncio.run(PixivAsyncClient)", lambda: asyncio.run(async_health()), args.iterations)
+        measure("PixivClient per call", sync_health_per_call, args.iterations)
+        with PixivClient(base_url) as client:
+            measure("PixivClient shared (keep-alive)", client.health, args.iterations)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
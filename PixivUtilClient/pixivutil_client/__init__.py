@@ -1,13 +1,21 @@
+from pixivutil_client.bulk import BulkItemResult
 from pixivutil_client.client import PixivAsyncClient
 from pixivutil_client.exceptions import (
     PixivAPIError,
     PixivClientError,
     PixivTransportError,
 )
+from pixivutil_client.retry import NO_RETRY, RequestAttempt, RetryPolicy
+from pixivutil_client.sync_client import PixivClient
 
 __all__ = [
+    "BulkItemResult",
+    "NO_RETRY",
     "PixivAsyncClient",
     "PixivAPIError",
+    "PixivClient",
     "PixivClientError",
     "PixivTransportError",
+    "RequestAttempt",
+    "RetryPolicy",
 ]
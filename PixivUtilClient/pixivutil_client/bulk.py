@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from pixivutil_client.exceptions import PixivClientError
+
+
+@dataclass(slots=True)
+class BulkItemResult[K, T]:
+    """Outcome of one item in a bulk client operation."""
+
+    key: K
+    value: T | None = None
+    error: PixivClientError | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def gather_bounded[K, T](
+    keys: Iterable[K],
+    call: Callable[[K], Awaitable[T]],
+    concurrency: int,
+) -> list[BulkItemResult[K, T]]:
+    """
+    Run `call` for every key with at most `concurrency` calls in flight.
+
+    Results are returned in input order. Client errors are recorded per item instead of
+    aborting the batch; any other exception propagates.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1; got {concurrency}")
+
+    results: list[BulkItemResult[K, T]] = [BulkItemResult(key=key) for key in keys]
+    next_index = 0
+
+    # A fixed pool of workers pulling indexes keeps memory flat for very large inputs,
+    # unlike one coroutine per key waiting on a semaphore.
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < len(results):
+            result = results[next_index]
+            next_index += 1
+            try:
+                result.value = await call(result.key)
+            except PixivClientError as error:
+                result.error = error
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(results)))))
+    return results
+
+
+def map_bounded[K, T](
+    keys: Iterable[K],
+    call: Callable[[K], T],
+    concurrency: int,
+) -> list[BulkItemResult[K, T]]:
+    """Thread-pool counterpart of `gather_bounded` for the synchronous client."""
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1; got {concurrency}")
+
+    results: list[BulkItemResult[K, T]] = [BulkItemResult(key=key) for key in keys]
+    if not results:
+        return results
+
+    def run(result: BulkItemResult[K, T]) -> None:
+        try:
+            result.value = call(result.key)
+        except PixivClientError as error:
+            result.error = error
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(results))) as executor:
+        # Consume the iterator so exceptions other than client errors propagate.
+        for _ in executor.map(run, results):
+            pass
+    return results
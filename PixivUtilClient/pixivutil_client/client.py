@@ -1,18 +1,37 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import copy
+import time
+from collections.abc import AsyncIterator, Callable, Iterable
 from typing import Any
-from urllib.parse import quote
 
 import aiohttp
-
-from pixivutil_client.exceptions import PixivAPIError, PixivTransportError
+from pydantic_core import from_json
+
+from pixivutil_client import endpoints
+from pixivutil_client.bulk import BulkItemResult, gather_bounded
+from pixivutil_client.endpoints import (
+    BATCH_ENQUEUE_PATHS,
+    NDJSON_MEDIA_TYPE,
+    ApiCall,
+    EnqueueKind,
+    decode_payload,
+    extract_error_message,
+)
+from pixivutil_client.exceptions import (
+    PixivAPIError,
+    PixivClientError,
+    PixivTransportError,
+)
 from pixivutil_client.models import (
     DeadLetterDropAllResponse,
     DeadLetterDropResponse,
     DeadLetterMessage,
     DeadLetterResumeAllResponse,
     DeadLetterResumeResponse,
+    ImageListFields,
+    ImageListOrder,
     PixivImageComplete,
     PixivMemberPortfolio,
     PixivSeriesInfo,
@@ -22,6 +41,7 @@ from pixivutil_client.models import (
     TagSortOrder,
     TagTypeMode,
 )
+from pixivutil_client.retry import RequestAttempt, RetryPolicy, parse_retry_after
 
 
 class PixivAsyncClient:
@@ -34,13 +54,72 @@ class PixivAsyncClient:
         timeout_seconds: float = 30,
         ssl: bool | None = True,
         session: aiohttp.ClientSession | None = None,
+        *,
+        connection_limit: int = 100,
+        connection_limit_per_host: int = 16,
+        keepalive_timeout: float = 30,
+        dns_cache_ttl: int | None = 300,
+        max_concurrency: int = 8,
+        connect_timeout_seconds: float | None = None,
+        read_timeout_seconds: float | None = None,
+        retry_policy: RetryPolicy | None = None,
+        on_attempt: Callable[[RequestAttempt], None] | None = None,
     ) -> None:
+        """
+        Connection settings (`connection_limit*`, `keepalive_timeout`, `dns_cache_ttl`) only apply
+        to the session created by the client; they are ignored when `session` is passed in.
+        `max_concurrency` is the default number of in-flight requests for bulk helpers.
+
+        `timeout_seconds` bounds a single attempt end to end; `connect_timeout_seconds` and
+        `read_timeout_seconds` bound connection setup and each socket read within it.
+        `retry_policy` defaults to `RetryPolicy()`; pass `NO_RETRY` to disable retries.
+        `on_attempt` is called after every HTTP attempt, e.g. to export attempt and latency metrics.
+        """
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
         self.timeout_seconds = timeout_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.read_timeout_seconds = read_timeout_seconds
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.on_attempt = on_attempt
         self.ssl = ssl
+        self.connection_limit = connection_limit
+        self.connection_limit_per_host = connection_limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self.max_concurrency = max_concurrency
         self._session = session
         self._owns_session = session is None
+        self._parent: PixivAsyncClient | None = None
+        self._batch_enqueue_supported: dict[str, bool] = {}
+
+    def with_options(
+        self,
+        *,
+        retry_policy: RetryPolicy | None = None,
+        timeout_seconds: float | None = None,
+        connect_timeout_seconds: float | None = None,
+        read_timeout_seconds: float | None = None,
+    ) -> PixivAsyncClient:
+        """
+        Return a view of this client with overridden retry/timeout settings, for per-call use:
+
+            await client.with_options(retry_policy=NO_RETRY).queue_download_artwork(123)
+
+        The view shares this client's session and is closed together with it.
+        """
+        view = copy.copy(self)
+        view._parent = self._parent or self
+        view._owns_session = False
+        if retry_policy is not None:
+            view.retry_policy = retry_policy
+        if timeout_seconds is not None:
+            view.timeout_seconds = timeout_seconds
+        if connect_timeout_seconds is not None:
+            view.connect_timeout_seconds = connect_timeout_seconds
+        if read_timeout_seconds is not None:
+            view.read_timeout_seconds = read_timeout_seconds
+        return view
 
     async def __aenter__(self) -> PixivAsyncClient:
         await self._ensure_session()
@@ -55,15 +134,32 @@ class PixivAsyncClient:
         self._session = None
 
     async def _ensure_session(self) -> aiohttp.ClientSession:
+        if self._parent is not None:
+            return await self._parent._ensure_session()
         if self._session is None:
-            timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
-            self._session = aiohttp.ClientSession(timeout=timeout)
+            connector = aiohttp.TCPConnector(
+                limit=self.connection_limit,
+                limit_per_host=self.connection_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=self.dns_cache_ttl is not None,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            self._session = aiohttp.ClientSession(timeout=self._timeout(), connector=connector)
         return self._session
 
+    def _timeout(self) -> aiohttp.ClientTimeout:
+        return aiohttp.ClientTimeout(
+            total=self.timeout_seconds,
+            connect=self.connect_timeout_seconds,
+            sock_read=self.read_timeout_seconds,
+        )
+
     def _auth_headers(self) -> dict[str, str]:
-        if not self.api_key:
-            return {}
-        return {"Authorization": f"Bearer {self.api_key}"}
+        return endpoints.auth_headers(self.api_key)
+
+    async def _call[T](self, call: ApiCall[T]) -> T:
+        payload = await self._request(call.method, call.path, params=call.params, json_body=call.json_body)
+        return call.parse(payload)
 
     async def _request(
         self,
@@ -73,6 +169,47 @@ class PixivAsyncClient:
         params: dict[str, Any] | None = None,
         json_body: dict[str, Any] | None = None,
     ) -> Any:
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.perf_counter()
+            retry_after: float | None = None
+            try:
+                status, payload = await self._send(method, path, params=params, json_body=json_body)
+            except PixivAPIError as error:
+                retry_after = error.retry_after
+                failure: PixivClientError = error
+            except PixivTransportError as error:
+                failure = error
+            else:
+                self._report_attempt(RequestAttempt(method, path, attempt, time.perf_counter() - started, status=status))
+                return payload
+
+            delay = self.retry_policy.next_delay(method, attempt, failure, retry_after)
+            self._report_attempt(
+                RequestAttempt(
+                    method,
+                    path,
+                    attempt,
+                    time.perf_counter() - started,
+                    status=failure.status if isinstance(failure, PixivAPIError) else None,
+                    error=failure,
+                    retry_delay=delay,
+                )
+            )
+            if delay is None:
+                raise failure
+            await asyncio.sleep(delay)
+
+    async def _send(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json_body: dict[str, Any] | None = None,
+    ) -> tuple[int, Any]:
+        """Perform a single HTTP attempt, returning (status, decoded payload)."""
         session = await self._ensure_session()
         url = f"{self.base_url}{path}"
 
@@ -84,63 +221,81 @@ class PixivAsyncClient:
                 json=json_body,
                 headers=self._auth_headers(),
                 ssl=self.ssl,
+                timeout=self._timeout(),
             ) as response:
                 payload = await self._decode_payload(response)
                 if response.status >= 400:
                     raise PixivAPIError(
                         response.status,
-                        self._extract_error_message(payload),
+                        extract_error_message(payload),
                         body=payload,
+                        retry_after=parse_retry_after(response.headers.get("Retry-After")),
                     )
-                return payload
+                return response.status, payload
         except PixivAPIError:
             raise
         except aiohttp.ClientError as error:
             raise PixivTransportError(str(error)) from error
+        except TimeoutError as error:
+            raise PixivTransportError(f"Request timed out: {method} {path}") from error
+
+    def _report_attempt(self, attempt: RequestAttempt) -> None:
+        if self.on_attempt is not None:
+            self.on_attempt(attempt)
 
     async def _decode_payload(self, response: aiohttp.ClientResponse) -> Any:
-        raw_text = await response.text()
-        if not raw_text:
-            return None
+        return decode_payload(await response.read(), lambda: response.get_encoding())
+
+    async def _stream_ndjson(self, path: str) -> AsyncIterator[Any]:
+        """
+        Yield values from a newline-delimited JSON endpoint as they arrive, holding at most one
+        line in memory. Falls back to a buffered JSON array when the server does not stream.
+
+        Streams are not retried, since a partially consumed stream cannot be replayed.
+        """
+        session = await self._ensure_session()
+        url = f"{self.base_url}{path}"
+        # No total deadline for streams; connect and per-read timeouts still apply.
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            connect=self.connect_timeout_seconds,
+            sock_read=self.read_timeout_seconds or self.timeout_seconds,
+        )
 
         try:
-            return json.loads(raw_text)
-        except json.JSONDecodeError:
-            return raw_text
-
-    def _extract_error_message(self, payload: Any) -> str:
-        if isinstance(payload, dict):
-            if "detail" in payload:
-                return str(payload["detail"])
-            if "error" in payload:
-                return str(payload["error"])
-            if "message" in payload:
-                return str(payload["message"])
-        if isinstance(payload, str):
-            return payload
-        return "Request failed"
+            async with session.request(
+                "GET",
+                url,
+                headers={**self._auth_headers(), "Accept": NDJSON_MEDIA_TYPE},
+                ssl=self.ssl,
+                timeout=timeout,
+            ) as response:
+                if response.status >= 400:
+                    payload = await self._decode_payload(response)
+                    raise PixivAPIError(response.status, extract_error_message(payload), body=payload)
+                if response.content_type != NDJSON_MEDIA_TYPE:
+                    for item in await self._decode_payload(response) or []:
+                        yield item
+                    return
+                async for line in response.content:
+                    if line.strip():
+                        yield from_json(line)
+        except aiohttp.ClientError as error:
+            raise PixivTransportError(str(error)) from error
+        except TimeoutError as error:
+            raise PixivTransportError(f"Stream timed out: GET {path}") from error
 
     async def health(self) -> str:
-        payload = await self._request("GET", "/api/health/")
-        return str(payload)
+        return await self._call(endpoints.health())
 
     async def health_pixiv(self) -> str:
-        payload = await self._request("GET", "/api/health/pixiv")
-        return str(payload)
+        return await self._call(endpoints.health_pixiv())
 
     async def queue_download_artwork(self, artwork_id: int, *, priority: int | None = None) -> QueueTaskResponse:
-        params: dict[str, Any] = {}
-        if priority is not None:
-            params["priority"] = priority
-        payload = await self._request("POST", f"/api/queue/download/artwork/{artwork_id}", params=params or None)
-        return QueueTaskResponse.model_validate(payload)
+        return await self._call(endpoints.queue_download_artwork(artwork_id, priority=priority))
 
     async def queue_download_member(self, member_id: int, *, priority: int | None = None) -> QueueTaskResponse:
-        params: dict[str, Any] = {}
-        if priority is not None:
-            params["priority"] = priority
-        payload = await self._request("POST", f"/api/queue/download/member/{member_id}", params=params or None)
-        return QueueTaskResponse.model_validate(payload)
+        return await self._call(endpoints.queue_download_member(member_id, priority=priority))
 
     async def queue_download_tag(
         self,
@@ -155,25 +310,19 @@ class PixivAsyncClient:
         lookback_days: int | None = None,
         priority: int | None = None,
     ) -> QueueTaskResponse:
-        params: dict[str, Any] = {
-            "sort_order": sort_order,
-            "type_mode": type_mode,
-            "wildcard": wildcard,
-        }
-        if bookmark_count is not None:
-            params["bookmark_count"] = bookmark_count
-        if start_date is not None:
-            params["start_date"] = start_date
-        if end_date is not None:
-            params["end_date"] = end_date
-        if lookback_days is not None:
-            params["lookback_days"] = lookback_days
-        if priority is not None:
-            params["priority"] = priority
-
-        encoded_tag = quote(tag, safe="")
-        payload = await self._request("POST", f"/api/queue/download/tag/{encoded_tag}", params=params)
-        return QueueTaskResponse.model_validate(payload)
+        return await self._call(
+            endpoints.queue_download_tag(
+                tag,
+                bookmark_count=bookmark_count,
+                sort_order=sort_order,
+                type_mode=type_mode,
+                wildcard=wildcard,
+                start_date=start_date,
+                end_date=end_date,
+                lookback_days=lookback_days,
+                priority=priority,
+            )
+        )
 
     async def queue_delete_artwork(
         self,
@@ -182,36 +331,36 @@ class PixivAsyncClient:
         *,
         priority: int | None = None,
     ) -> QueueTaskResponse:
-        params: dict[str, Any] = {"delete_metadata": str(delete_metadata).lower()}
-        if priority is not None:
-            params["priority"] = priority
-        payload = await self._request(
-            "DELETE",
-            f"/api/queue/download/artwork/{artwork_id}",
-            params=params,
-        )
-        return QueueTaskResponse.model_validate(payload)
+        return await self._call(endpoints.queue_delete_artwork(artwork_id, delete_metadata, priority=priority))
+
+    async def queue_delete_artworks(
+        self,
+        artwork_ids: list[int],
+        delete_metadata: bool = True,
+        *,
+        priority: int | None = None,
+    ) -> QueueTaskResponse:
+        """Delete many artworks as a single task; much cheaper than one `queue_delete_artwork` call each."""
+        return await self._call(endpoints.queue_delete_artworks(artwork_ids, delete_metadata, priority=priority))
+
+    async def queue_delete_member(
+        self,
+        member_id: int,
+        delete_metadata: bool = True,
+        *,
+        priority: int | None = None,
+    ) -> QueueTaskResponse:
+        """Delete all of a member's downloaded artworks as a single task."""
+        return await self._call(endpoints.queue_delete_member(member_id, delete_metadata, priority=priority))
 
     async def queue_metadata_artwork(self, artwork_id: int, *, priority: int | None = None) -> QueueTaskResponse:
-        params: dict[str, Any] = {}
-        if priority is not None:
-            params["priority"] = priority
-        payload = await self._request("POST", f"/api/queue/metadata/artwork/{artwork_id}", params=params or None)
-        return QueueTaskResponse.model_validate(payload)
+        return await self._call(endpoints.queue_metadata_artwork(artwork_id, priority=priority))
 
     async def queue_metadata_member(self, member_id: int, *, priority: int | None = None) -> QueueTaskResponse:
-        params: dict[str, Any] = {}
-        if priority is not None:
-            params["priority"] = priority
-        payload = await self._request("POST", f"/api/queue/metadata/member/{member_id}", params=params or None)
-        return QueueTaskResponse.model_validate(payload)
+        return await self._call(endpoints.queue_metadata_member(member_id, priority=priority))
 
     async def queue_metadata_series(self, series_id: int, *, priority: int | None = None) -> QueueTaskResponse:
-        params: dict[str, Any] = {}
-        if priority is not None:
-            params["priority"] = priority
-        payload = await self._request("POST", f"/api/queue/metadata/series/{series_id}", params=params or None)
-        return QueueTaskResponse.model_validate(payload)
+        return await self._call(endpoints.queue_metadata_series(series_id, priority=priority))
 
     async def queue_metadata_tag(
         self,
@@ -220,85 +369,131 @@ class PixivAsyncClient:
         *,
         priority: int | None = None,
     ) -> QueueTaskResponse:
-        params: dict[str, Any] = {"filter_mode": filter_mode}
-        if priority is not None:
-            params["priority"] = priority
-        encoded_tag = quote(tag, safe="")
-        payload = await self._request(
-            "POST",
-            f"/api/queue/metadata/tag/{encoded_tag}",
-            params=params,
+        return await self._call(endpoints.queue_metadata_tag(tag, filter_mode, priority=priority))
+
+    async def enqueue_many(
+        self,
+        ids: Iterable[int],
+        kind: EnqueueKind = "download_artwork",
+        *,
+        priority: int | None = None,
+        concurrency: int | None = None,
+        use_batch: bool = True,
+    ) -> list[BulkItemResult[int, QueueTaskResponse]]:
+        """
+        Queue many download/metadata jobs, returning one result per ID in input order.
+
+        With `use_batch`, artwork kinds are sent through the server's batch endpoint in a single
+        request; if the server does not provide it (404/405), the client remembers that and falls
+        back to concurrent single-item calls bounded by `concurrency`.
+        """
+        id_list = list(ids)
+        if use_batch and kind in BATCH_ENQUEUE_PATHS and self._batch_enqueue_supported.get(kind, True):
+            try:
+                responses = await self._call(endpoints.queue_batch(kind, id_list, priority=priority))
+            except PixivClientError as error:
+                if not (isinstance(error, PixivAPIError) and error.status in (404, 405)):
+                    return [BulkItemResult(key=item_id, error=error) for item_id in id_list]
+                self._batch_enqueue_supported[kind] = False
+            else:
+                return [
+                    BulkItemResult(key=item_id, value=response)
+                    for item_id, response in zip(id_list, responses, strict=True)
+                ]
+
+        return await gather_bounded(
+            id_list,
+            lambda item_id: self._call(endpoints.queue_single(kind, item_id, priority=priority)),
+            concurrency or self.max_concurrency,
         )
-        return QueueTaskResponse.model_validate(payload)
 
     async def get_member_ids(self) -> list[int]:
-        payload = await self._request("GET", "/api/database/members")
-        return list(payload)
+        return await self._call(endpoints.get_member_ids())
 
     async def get_image_ids(self) -> list[int]:
-        payload = await self._request("GET", "/api/database/images")
-        return list(payload)
+        return await self._call(endpoints.get_image_ids())
 
     async def get_tags(self) -> list[str]:
-        payload = await self._request("GET", "/api/database/tags")
-        return list(payload)
+        return await self._call(endpoints.get_tags())
 
     async def get_series(self) -> list[str]:
-        payload = await self._request("GET", "/api/database/series")
-        return list(payload)
+        return await self._call(endpoints.get_series())
+
+    def iter_member_ids(self) -> AsyncIterator[int]:
+        return self._stream_ndjson(endpoints.get_member_ids().path)
+
+    def iter_image_ids(self) -> AsyncIterator[int]:
+        return self._stream_ndjson(endpoints.get_image_ids().path)
+
+    def iter_tags(self) -> AsyncIterator[str]:
+        return self._stream_ndjson(endpoints.get_tags().path)
 
-    async def get_member(self, member_id: int) -> PixivMemberPortfolio:
-        payload = await self._request("GET", f"/api/database/member/{member_id}")
-        return PixivMemberPortfolio.model_validate(payload)
+    def iter_series(self) -> AsyncIterator[str]:
+        return self._stream_ndjson(endpoints.get_series().path)
+
+    async def get_member(
+        self,
+        member_id: int,
+        *,
+        limit: int | None = None,
+        after: int | None = None,
+        order: ImageListOrder = "asc",
+        fields: ImageListFields = "full",
+    ) -> PixivMemberPortfolio:
+        return await self._call(endpoints.get_member(member_id, limit=limit, after=after, order=order, fields=fields))
 
     async def get_image(self, image_id: int) -> PixivImageComplete:
-        payload = await self._request("GET", f"/api/database/image/{image_id}")
-        return PixivImageComplete.model_validate(payload)
+        return await self._call(endpoints.get_image(image_id))
 
-    async def get_tag(self, tag_id: str) -> PixivTagInfo:
-        encoded_tag_id = quote(tag_id, safe="")
-        payload = await self._request("GET", f"/api/database/tag/{encoded_tag_id}")
-        return PixivTagInfo.model_validate(payload)
+    async def map_get_images(
+        self,
+        image_ids: Iterable[int],
+        *,
+        concurrency: int | None = None,
+    ) -> list[BulkItemResult[int, PixivImageComplete]]:
+        """
+        Fetch many images concurrently, returning one result per ID in input order.
+        Missing images and other client errors are reported per item.
+        """
+        return await gather_bounded(image_ids, self.get_image, concurrency or self.max_concurrency)
+
+    async def get_tag(
+        self,
+        tag_id: str,
+        *,
+        limit: int | None = None,
+        after: int | None = None,
+        order: ImageListOrder = "asc",
+        fields: ImageListFields = "full",
+    ) -> PixivTagInfo:
+        return await self._call(endpoints.get_tag(tag_id, limit=limit, after=after, order=order, fields=fields))
 
     async def get_series_info(self, series_id: str) -> PixivSeriesInfo:
-        encoded_series_id = quote(series_id, safe="")
-        payload = await self._request("GET", f"/api/database/series/{encoded_series_id}")
-        return PixivSeriesInfo.model_validate(payload)
+        return await self._call(endpoints.get_series_info(series_id))
 
     async def get_cookie(self) -> str:
-        payload = await self._request("GET", "/api/server/cookie")
-        return str(payload)
+        return await self._call(endpoints.get_cookie())
 
     async def update_cookie(self, cookie: str) -> str:
-        payload = await self._request("PUT", "/api/server/cookie", json_body={"cookie": cookie})
-        return str(payload)
+        return await self._call(endpoints.update_cookie(cookie))
 
     async def reset_database(self) -> str:
-        payload = await self._request("DELETE", "/api/server/database")
-        return str(payload)
+        return await self._call(endpoints.reset_database())
 
     async def reset_downloads(self) -> str:
-        payload = await self._request("DELETE", "/api/server/downloads")
-        return str(payload)
+        return await self._call(endpoints.reset_downloads())
 
     async def list_dead_letter_messages(self) -> list[DeadLetterMessage]:
-        payload = await self._request("GET", "/api/queue/dead-letter/")
-        return [DeadLetterMessage.model_validate(item) for item in payload]
+        return await self._call(endpoints.list_dead_letter_messages())
 
     async def resume_all_dead_letter_messages(self) -> DeadLetterResumeAllResponse:
-        payload = await self._request("POST", "/api/queue/dead-letter/resume")
-        return DeadLetterResumeAllResponse.model_validate(payload)
+        return await self._call(endpoints.resume_all_dead_letter_messages())
 
     async def resume_dead_letter_message(self, dead_letter_id: str) -> DeadLetterResumeResponse:
-        encoded_dead_letter_id = quote(dead_letter_id, safe="")
-        payload = await self._request("POST", f"/api/queue/dead-letter/{encoded_dead_letter_id}/resume")
-        return DeadLetterResumeResponse.model_validate(payload)
+        return await self._call(endpoints.resume_dead_letter_message(dead_letter_id))
 
     async def drop_all_dead_letter_messages(self) -> DeadLetterDropAllResponse:
-        payload = await self._request("DELETE", "/api/queue/dead-letter/")
-        return DeadLetterDropAllResponse.model_validate(payload)
+        return await self._call(endpoints.drop_all_dead_letter_messages())
 
     async def drop_dead_letter_message(self, dead_letter_id: str) -> DeadLetterDropResponse:
-        encoded_dead_letter_id = quote(dead_letter_id, safe="")
-        payload = await self._request("DELETE", f"/api/queue/dead-letter/{encoded_dead_letter_id}")
-        return DeadLetterDropResponse.model_validate(payload)
+        return await self._call(endpoints.drop_dead_letter_message(dead_letter_id))
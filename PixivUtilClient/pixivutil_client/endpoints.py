@@ -0,0 +1,358 @@
+"""
+Transport-independent request building and response decoding shared by the async and sync clients.
+
+Each endpoint function returns an `ApiCall` describing the HTTP request and how to turn the decoded
+payload into a model; the clients only differ in how they send it.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Literal
+from urllib.parse import quote, urlencode
+
+from pydantic_core import from_json
+
+from pixivutil_client.models import (
+    DeadLetterDropAllResponse,
+    DeadLetterDropResponse,
+    DeadLetterMessage,
+    DeadLetterResumeAllResponse,
+    DeadLetterResumeResponse,
+    ImageListFields,
+    ImageListOrder,
+    PixivImageComplete,
+    PixivMemberPortfolio,
+    PixivSeriesInfo,
+    PixivTagInfo,
+    QueueTaskResponse,
+    TagMetadataFilterMode,
+    TagSortOrder,
+    TagTypeMode,
+)
+
+EnqueueKind = Literal["download_artwork", "download_member", "metadata_artwork", "metadata_member"]
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Kinds with a server-side batch endpoint taking {"artwork_ids": [...]}.
+BATCH_ENQUEUE_PATHS: dict[str, str] = {
+    "download_artwork": "/api/queue/download/artworks",
+    "metadata_artwork": "/api/queue/metadata/artworks",
+}
+
+
+@dataclass(frozen=True, slots=True)
+class ApiCall[T]:
+    method: str
+    path: str
+    parse: Callable[[Any], T]
+    params: dict[str, Any] | None = None
+    json_body: dict[str, Any] | None = None
+
+
+def auth_headers(api_key: str | None) -> dict[str, str]:
+    if not api_key:
+        return {}
+    return {"Authorization": f"Bearer {api_key}"}
+
+
+def encode_query(params: dict[str, Any] | None) -> str:
+    return urlencode(params) if params else ""
+
+
+def decode_payload(raw_body: bytes, get_encoding: Callable[[], str] = lambda: "utf-8") -> Any:
+    """Decode a response body as JSON, falling back to text when it is not JSON."""
+    if not raw_body:
+        return None
+
+    # Parse straight from bytes; json.loads would first decode the whole body into a str.
+    try:
+        return from_json(raw_body)
+    except ValueError:
+        return raw_body.decode(get_encoding(), errors="replace")
+
+
+def extract_error_message(payload: Any) -> str:
+    if isinstance(payload, dict):
+        if "detail" in payload:
+            return str(payload["detail"])
+        if "error" in payload:
+            return str(payload["error"])
+        if "message" in payload:
+            return str(payload["message"])
+    if isinstance(payload, str):
+        return payload
+    return "Request failed"
+
+
+def _priority_params(priority: int | None) -> dict[str, Any] | None:
+    return {"priority": priority} if priority is not None else None
+
+
+def _as_str(payload: Any) -> str:
+    return str(payload)
+
+
+def _as_list(payload: Any) -> list:
+    return list(payload)
+
+
+def _queue_task(payload: Any) -> QueueTaskResponse:
+    return QueueTaskResponse.model_validate(payload)
+
+
+def health() -> ApiCall[str]:
+    return ApiCall("GET", "/api/health/", _as_str)
+
+
+def health_pixiv() -> ApiCall[str]:
+    return ApiCall("GET", "/api/health/pixiv", _as_str)
+
+
+def queue_download_artwork(artwork_id: int, *, priority: int | None = None) -> ApiCall[QueueTaskResponse]:
+    return ApiCall("POST", f"/api/queue/download/artwork/{artwork_id}", _queue_task, params=_priority_params(priority))
+
+
+def queue_download_member(member_id: int, *, priority: int | None = None) -> ApiCall[QueueTaskResponse]:
+    return ApiCall("POST", f"/api/queue/download/member/{member_id}", _queue_task, params=_priority_params(priority))
+
+
+def queue_download_tag(
+    tag: str,
+    *,
+    bookmark_count: int | None = None,
+    sort_order: TagSortOrder = "date_d",
+    type_mode: TagTypeMode = "a",
+    wildcard: bool = False,
+    start_date: str | None = None,
+    end_date: str | None = None,
+    lookback_days: int | None = None,
+    priority: int | None = None,
+) -> ApiCall[QueueTaskResponse]:
+    params: dict[str, Any] = {
+        "sort_order": sort_order,
+        "type_mode": type_mode,
+        "wildcard": str(wildcard).lower(),
+    }
+    if bookmark_count is not None:
+        params["bookmark_count"] = bookmark_count
+    if start_date is not None:
+        params["start_date"] = start_date
+    if end_date is not None:
+        params["end_date"] = end_date
+    if lookback_days is not None:
+        params["lookback_days"] = lookback_days
+    if priority is not None:
+        params["priority"] = priority
+
+    encoded_tag = quote(tag, safe="")
+    return ApiCall("POST", f"/api/queue/download/tag/{encoded_tag}", _queue_task, params=params)
+
+
+def queue_delete_artwork(
+    artwork_id: int,
+    delete_metadata: bool = True,
+    *,
+    priority: int | None = None,
+) -> ApiCall[QueueTaskResponse]:
+    params: dict[str, Any] = {"delete_metadata": str(delete_metadata).lower()}
+    if priority is not None:
+        params["priority"] = priority
+    return ApiCall("DELETE", f"/api/queue/download/artwork/{artwork_id}", _queue_task, params=params)
+
+
+def queue_delete_artworks(
+    artwork_ids: list[int],
+    delete_metadata: bool = True,
+    *,
+    priority: int | None = None,
+) -> ApiCall[QueueTaskResponse]:
+    params: dict[str, Any] = {"delete_metadata": str(delete_metadata).lower()}
+    if priority is not None:
+        params["priority"] = priority
+    return ApiCall(
+        "POST",
+        "/api/queue/download/artworks/delete",
+        _queue_task,
+        params=params,
+        json_body={"artwork_ids": artwork_ids},
+    )
+
+
+def queue_delete_member(
+    member_id: int,
+    delete_metadata: bool = True,
+    *,
+    priority: int | None = None,
+) -> ApiCall[QueueTaskResponse]:
+    params: dict[str, Any] = {"delete_metadata": str(delete_metadata).lower()}
+    if priority is not None:
+        params["priority"] = priority
+    return ApiCall("DELETE", f"/api/queue/download/member/{member_id}", _queue_task, params=params)
+
+
+def queue_metadata_artwork(artwork_id: int, *, priority: int | None = None) -> ApiCall[QueueTaskResponse]:
+    return ApiCall("POST", f"/api/queue/metadata/artwork/{artwork_id}", _queue_task, params=_priority_params(priority))
+
+
+def queue_metadata_member(member_id: int, *, priority: int | None = None) -> ApiCall[QueueTaskResponse]:
+    return ApiCall("POST", f"/api/queue/metadata/member/{member_id}", _queue_task, params=_priority_params(priority))
+
+
+def queue_metadata_series(series_id: int, *, priority: int | None = None) -> ApiCall[QueueTaskResponse]:
+    return ApiCall("POST", f"/api/queue/metadata/series/{series_id}", _queue_task, params=_priority_params(priority))
+
+
+def queue_metadata_tag(
+    tag: str,
+    filter_mode: TagMetadataFilterMode = "none",
+    *,
+    priority: int | None = None,
+) -> ApiCall[QueueTaskResponse]:
+    params: dict[str, Any] = {"filter_mode": filter_mode}
+    if priority is not None:
+        params["priority"] = priority
+    encoded_tag = quote(tag, safe="")
+    return ApiCall("POST", f"/api/queue/metadata/tag/{encoded_tag}", _queue_task, params=params)
+
+
+def queue_batch(kind: EnqueueKind, ids: list[int], *, priority: int | None = None) -> ApiCall[list[QueueTaskResponse]]:
+    def parse(payload: Any) -> list[QueueTaskResponse]:
+        return [QueueTaskResponse.model_validate(item) for item in payload]
+
+    return ApiCall(
+        "POST",
+        BATCH_ENQUEUE_PATHS[kind],
+        parse,
+        params=_priority_params(priority),
+        json_body={"artwork_ids": ids},
+    )
+
+
+def queue_single(kind: EnqueueKind, item_id: int, *, priority: int | None = None) -> ApiCall[QueueTaskResponse]:
+    build = {
+        "download_artwork": queue_download_artwork,
+        "download_member": queue_download_member,
+        "metadata_artwork": queue_metadata_artwork,
+        "metadata_member": queue_metadata_member,
+    }[kind]
+    return build(item_id, priority=priority)
+
+
+def get_member_ids() -> ApiCall[list[int]]:
+    return ApiCall("GET", "/api/database/members", _as_list)
+
+
+def get_image_ids() -> ApiCall[list[int]]:
+    return ApiCall("GET", "/api/database/images", _as_list)
+
+
+def get_tags() -> ApiCall[list[str]]:
+    return ApiCall("GET", "/api/database/tags", _as_list)
+
+
+def get_series() -> ApiCall[list[str]]:
+    return ApiCall("GET", "/api/database/series", _as_list)
+
+
+def image_page_params(
+    limit: int | None,
+    after: int | None,
+    order: ImageListOrder,
+    fields: ImageListFields,
+) -> dict[str, Any] | None:
+    params: dict[str, Any] = {}
+    if limit is not None:
+        params["limit"] = limit
+    if after is not None:
+        params["after"] = after
+    if order != "asc":
+        params["order"] = order
+    if fields != "full":
+        params["fields"] = fields
+    return params or None
+
+
+def get_member(
+    member_id: int,
+    *,
+    limit: int | None = None,
+    after: int | None = None,
+    order: ImageListOrder = "asc",
+    fields: ImageListFields = "full",
+) -> ApiCall[PixivMemberPortfolio]:
+    return ApiCall(
+        "GET",
+        f"/api/database/member/{member_id}",
+        PixivMemberPortfolio.model_validate,
+        params=image_page_params(limit, after, order, fields),
+    )
+
+
+def get_image(image_id: int) -> ApiCall[PixivImageComplete]:
+    return ApiCall("GET", f"/api/database/image/{image_id}", PixivImageComplete.model_validate)
+
+
+def get_tag(
+    tag_id: str,
+    *,
+    limit: int | None = None,
+    after: int | None = None,
+    order: ImageListOrder = "asc",
+    fields: ImageListFields = "full",
+) -> ApiCall[PixivTagInfo]:
+    encoded_tag_id = quote(tag_id, safe="")
+    return ApiCall(
+        "GET",
+        f"/api/database/tag/{encoded_tag_id}",
+        PixivTagInfo.model_validate,
+        params=image_page_params(limit, after, order, fields),
+    )
+
+
+def get_series_info(series_id: str) -> ApiCall[PixivSeriesInfo]:
+    encoded_series_id = quote(series_id, safe="")
+    return ApiCall("GET", f"/api/database/series/{encoded_series_id}", PixivSeriesInfo.model_validate)
+
+
+def get_cookie() -> ApiCall[str]:
+    return ApiCall("GET", "/api/server/cookie", _as_str)
+
+
+def update_cookie(cookie: str) -> ApiCall[str]:
+    return ApiCall("PUT", "/api/server/cookie", _as_str, json_body={"cookie": cookie})
+
+
+def reset_database() -> ApiCall[str]:
+    return ApiCall("DELETE", "/api/server/database", _as_str)
+
+
+def reset_downloads() -> ApiCall[str]:
+    return ApiCall("DELETE", "/api/server/downloads", _as_str)
+
+
+def list_dead_letter_messages() -> ApiCall[list[DeadLetterMessage]]:
+    def parse(payload: Any) -> list[DeadLetterMessage]:
+        return [DeadLetterMessage.model_validate(item) for item in payload]
+
+    return ApiCall("GET", "/api/queue/dead-letter/", parse)
+
+
+def resume_all_dead_letter_messages() -> ApiCall[DeadLetterResumeAllResponse]:
+    return ApiCall("POST", "/api/queue/dead-letter/resume", DeadLetterResumeAllResponse.model_validate)
+
+
+def resume_dead_letter_message(dead_letter_id: str) -> ApiCall[DeadLetterResumeResponse]:
+    encoded_dead_letter_id = quote(dead_letter_id, safe="")
+    return ApiCall("POST", f"/api/queue/dead-letter/{encoded_dead_letter_id}/resume", DeadLetterResumeResponse.model_validate)
+
+
+def drop_all_dead_letter_messages() -> ApiCall[DeadLetterDropAllResponse]:
+    return ApiCall("DELETE", "/api/queue/dead-letter/", DeadLetterDropAllResponse.model_validate)
+
+
+def drop_dead_letter_message(dead_letter_id: str) -> ApiCall[DeadLetterDropResponse]:
+    encoded_dead_letter_id = quote(dead_letter_id, safe="")
+    return ApiCall("DELETE", f"/api/queue/dead-letter/{encoded_dead_letter_id}", DeadLetterDropResponse.model_validate)
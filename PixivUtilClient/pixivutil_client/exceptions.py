@@ -12,8 +12,15 @@ class PixivTransportError(PixivClientError):
 class PixivAPIError(PixivClientError):
     """API-level error response."""
 
-    def __init__(self, status: int, message: str, body: object | None = None) -> None:
+    def __init__(
+        self,
+        status: int,
+        message: str,
+        body: object | None = None,
+        retry_after: float | None = None,
+    ) -> None:
         super().__init__(f"HTTP {status}: {message}")
         self.status = status
         self.message = message
         self.body = body
+        self.retry_after = retry_after
@@ -8,6 +8,8 @@ from pixivutil_server_common.models import (
     DeadLetterMessage,
     DeadLetterResumeAllResponse,
     DeadLetterResumeResponse,
+    ImageListFields,
+    ImageListOrder,
     PixivDateInfo,
     PixivImageComplete,
     PixivImageToSeries,
@@ -33,6 +35,8 @@ __all__ = [
     "DeadLetterMessage",
     "DeadLetterResumeAllResponse",
     "DeadLetterResumeResponse",
+    "ImageListFields",
+    "ImageListOrder",
     "PixivDateInfo",
     "PixivImageComplete",
     "PixivImageToSeries",
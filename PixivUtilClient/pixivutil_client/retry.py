@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import random
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+
+from pixivutil_client.exceptions import PixivAPIError, PixivClientError
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+@dataclass(frozen=True, slots=True)
+class RetryPolicy:
+    """
+    Decides whether and when a failed request is retried.
+
+    Transport errors and `retry_statuses` are retried for `retry_methods` only, since a
+    non-idempotent request may already have been applied. Statuses in `rejected_statuses`
+    (429/503) mean the server refused the request without processing it, so they are retried
+    for every method. Delays use exponential backoff with full jitter; a `Retry-After` header
+    takes precedence when present, capped at `max_retry_after`.
+    """
+
+    max_attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    retry_methods: frozenset[str] = IDEMPOTENT_METHODS
+    retry_statuses: frozenset[int] = frozenset({502, 504})
+    rejected_statuses: frozenset[int] = frozenset({429, 503})
+    respect_retry_after: bool = True
+    max_retry_after: float = 120.0
+    random_uniform: Callable[[float, float], float] = field(default=random.uniform, repr=False, compare=False)
+
+    def backoff(self, attempt: int) -> float:
+        ceiling = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        return self.random_uniform(0, ceiling)
+
+    def next_delay(
+        self,
+        method: str,
+        attempt: int,
+        error: PixivClientError,
+        retry_after: float | None = None,
+    ) -> float | None:
+        """
+        Return seconds to wait before the next attempt, or None to give up.
+        `attempt` is the 1-based number of the attempt that just failed.
+        """
+        if attempt >= self.max_attempts:
+            return None
+
+        status = error.status if isinstance(error, PixivAPIError) else None
+        if status in self.rejected_statuses:
+            if self.respect_retry_after and retry_after is not None:
+                return min(retry_after, self.max_retry_after)
+        elif method.upper() not in self.retry_methods or (status is not None and status not in self.retry_statuses):
+            return None
+        return self.backoff(attempt)
+
+
+NO_RETRY = RetryPolicy(max_attempts=1)
+
+
+@dataclass(frozen=True, slots=True)
+class RequestAttempt:
+    """Report for a single HTTP attempt, passed to the client's `on_attempt` hook."""
+
+    method: str
+    path: str
+    attempt: int
+    elapsed_seconds: float
+    status: int | None = None
+    error: PixivClientError | None = None
+    retry_delay: float | None = None
+
+    @property
+    def will_retry(self) -> bool:
+        return self.retry_delay is not None
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a `Retry-After` header given as delay-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=UTC)
+    return max(0.0, (retry_at - datetime.now(UTC)).total_seconds())
@@ -0,0 +1,578 @@
+from __future__ import annotations
+
+import copy
+import http.client
+import json
+import queue
+import socket
+import ssl as ssl_module
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+from urllib.parse import urlsplit
+
+from pydantic_core import from_json
+
+from pixivutil_client import endpoints
+from pixivutil_client.bulk import BulkItemResult, map_bounded
+from pixivutil_client.endpoints import (
+    BATCH_ENQUEUE_PATHS,
+    NDJSON_MEDIA_TYPE,
+    ApiCall,
+    EnqueueKind,
+    decode_payload,
+    encode_query,
+    extract_error_message,
+)
+from pixivutil_client.exceptions import (
+    PixivAPIError,
+    PixivClientError,
+    PixivTransportError,
+)
+from pixivutil_client.models import (
+    DeadLetterDropAllResponse,
+    DeadLetterDropResponse,
+    DeadLetterMessage,
+    DeadLetterResumeAllResponse,
+    DeadLetterResumeResponse,
+    ImageListFields,
+    ImageListOrder,
+    PixivImageComplete,
+    PixivMemberPortfolio,
+    PixivSeriesInfo,
+    PixivTagInfo,
+    QueueTaskResponse,
+    TagMetadataFilterMode,
+    TagSortOrder,
+    TagTypeMode,
+)
+from pixivutil_client.retry import RequestAttempt, RetryPolicy, parse_retry_after
+
+# Errors raised when a pooled keep-alive connection was closed by the server while idle.
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class _ConnectionPool:
+    """
+    Thread-safe pool of keep-alive `http.client` connections to a single host.
+
+    Idle connections are reused most-recently-released first, so rarely used ones age out
+    on the server side instead of all going stale together. At most `maxsize` idle
+    connections are kept; extra connections opened under load are closed on release.
+    """
+
+    def __init__(
+        self,
+        scheme: str,
+        host: str,
+        port: int | None,
+        *,
+        maxsize: int,
+        ssl_context: ssl_module.SSLContext | None,
+    ) -> None:
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self._idle: queue.LifoQueue[http.client.HTTPConnection] = queue.LifoQueue(maxsize=maxsize)
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def acquire(self, connect_timeout: float | None) -> tuple[http.client.HTTPConnection, bool]:
+        """Return a connection and whether it was reused from the pool."""
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            pass
+
+        if self.scheme == "https":
+            connection: http.client.HTTPConnection = http.client.HTTPSConnection(
+                self.host, self.port, timeout=connect_timeout, context=self.ssl_context
+            )
+        else:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=connect_timeout)
+        return connection, False
+
+    def release(self, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._idle.put_nowait(connection)
+                    return
+                except queue.Full:
+                    pass
+        connection.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class PixivClient:
+    """
+    Synchronous, thread-safe HTTP client for PixivUtil Server APIs.
+
+    Mirrors `PixivAsyncClient` method for method and shares its request building, response
+    decoding and retry policy, but sends requests over a pool of keep-alive connections
+    without an event loop. One instance can be shared between threads.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str | None = None,
+        timeout_seconds: float = 30,
+        ssl: bool | None = True,
+        *,
+        pool_maxsize: int = 16,
+        max_concurrency: int = 8,
+        connect_timeout_seconds: float | None = None,
+        read_timeout_seconds: float | None = None,
+        retry_policy: RetryPolicy | None = None,
+        on_attempt: Callable[[RequestAttempt], None] | None = None,
+    ) -> None:
+        """
+        `pool_maxsize` is the number of idle keep-alive connections kept for reuse.
+        `max_concurrency` is the default number of worker threads for bulk helpers.
+
+        `http.client` has no end-to-end deadline, so `timeout_seconds` is the default for
+        both `connect_timeout_seconds` and `read_timeout_seconds` (each socket read).
+        `ssl=False` disables certificate verification for https URLs.
+        """
+        parts = urlsplit(base_url.rstrip("/"))
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"base_url must be an absolute http(s) URL; got {base_url!r}")
+
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout_seconds = timeout_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.read_timeout_seconds = read_timeout_seconds
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.on_attempt = on_attempt
+        self.ssl = ssl
+        self.pool_maxsize = pool_maxsize
+        self.max_concurrency = max_concurrency
+        self._base_path = parts.path
+        self._pool = _ConnectionPool(
+            parts.scheme,
+            parts.hostname,
+            parts.port,
+            maxsize=pool_maxsize,
+            ssl_context=self._ssl_context() if parts.scheme == "https" else None,
+        )
+        self._owns_pool = True
+        self._batch_enqueue_supported: dict[str, bool] = {}
+
+    def with_options(
+        self,
+        *,
+        retry_policy: RetryPolicy | None = None,
+        timeout_seconds: float | None = None,
+        connect_timeout_seconds: float | None = None,
+        read_timeout_seconds: float | None = None,
+    ) -> PixivClient:
+        """Return a view of this client with overridden retry/timeout settings, sharing its connection pool."""
+        view = copy.copy(self)
+        view._owns_pool = False
+        if retry_policy is not None:
+            view.retry_policy = retry_policy
+        if timeout_seconds is not None:
+            view.timeout_seconds = timeout_seconds
+        if connect_timeout_seconds is not None:
+            view.connect_timeout_seconds = connect_timeout_seconds
+        if read_timeout_seconds is not None:
+            view.read_timeout_seconds = read_timeout_seconds
+        return view
+
+    def __enter__(self) -> PixivClient:
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._owns_pool:
+            self._pool.close()
+
+    def _ssl_context(self) -> ssl_module.SSLContext:
+        context = ssl_module.create_default_context()
+        if self.ssl is False:
+            context.check_hostname = False
+            context.verify_mode = ssl_module.CERT_NONE
+        return context
+
+    def _auth_headers(self) -> dict[str, str]:
+        return endpoints.auth_headers(self.api_key)
+
+    def _call[T](self, call: ApiCall[T]) -> T:
+        payload = self._request(call.method, call.path, params=call.params, json_body=call.json_body)
+        return call.parse(payload)
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json_body: dict[str, Any] | None = None,
+    ) -> Any:
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.perf_counter()
+            retry_after: float | None = None
+            try:
+                status, payload = self._send(method, path, params=params, json_body=json_body)
+            except PixivAPIError as error:
+                retry_after = error.retry_after
+                failure: PixivClientError = error
+            except PixivTransportError as error:
+                failure = error
+            else:
+                self._report_attempt(RequestAttempt(method, path, attempt, time.perf_counter() - started, status=status))
+                return payload
+
+            delay = self.retry_policy.next_delay(method, attempt, failure, retry_after)
+            self._report_attempt(
+                RequestAttempt(
+                    method,
+                    path,
+                    attempt,
+                    time.perf_counter() - started,
+                    status=failure.status if isinstance(failure, PixivAPIError) else None,
+                    error=failure,
+                    retry_delay=delay,
+                )
+            )
+            if delay is None:
+                raise failure
+            time.sleep(delay)
+
+    def _send(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json_body: dict[str, Any] | None = None,
+    ) -> tuple[int, Any]:
+        """Perform a single HTTP attempt, returning (status, decoded payload)."""
+        connection, response = self._open(method, path, params=params, json_body=json_body)
+        try:
+            raw_body = response.read()
+        except (OSError, http.client.HTTPException) as error:
+            connection.close()
+            raise PixivTransportError(f"Failed to read response: {method} {path}: {error}") from error
+        self._finish(connection, response)
+
+        payload = decode_payload(raw_body, lambda: response.headers.get_content_charset() or "utf-8")
+        if response.status >= 400:
+            raise PixivAPIError(
+                response.status,
+                extract_error_message(payload),
+                body=payload,
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+            )
+        return response.status, payload
+
+    def _open(
+        self,
+        method: str,
+        path: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json_body: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        read_timeout: float | None = None,
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        """Send a request and return the connection with its response, whose body is still unread."""
+        query = encode_query(params)
+        target = f"{self._base_path}{path}?{query}" if query else f"{self._base_path}{path}"
+        request_headers = {**self._auth_headers(), **(headers or {})}
+        body: bytes | None = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            request_headers["Content-Type"] = "application/json"
+
+        connect_timeout = self.connect_timeout_seconds or self.timeout_seconds
+        read_timeout = read_timeout or self.read_timeout_seconds or self.timeout_seconds
+        while True:
+            connection, reused = self._pool.acquire(connect_timeout)
+            try:
+                if connection.sock is None:
+                    connection.connect()
+                    # Small keep-alive requests otherwise stall on Nagle's algorithm and delayed ACKs.
+                    connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                connection.sock.settimeout(read_timeout)
+                connection.request(method, target, body=body, headers=request_headers)
+                return connection, connection.getresponse()
+            except _STALE_CONNECTION_ERRORS as error:
+                connection.close()
+                # An idle connection the server already closed; the request never reached it,
+                # so retry once on a fresh connection regardless of method.
+                if reused:
+                    continue
+                raise PixivTransportError(f"Connection closed: {method} {path}: {error}") from error
+            except TimeoutError as error:
+                connection.close()
+                raise PixivTransportError(f"Request timed out: {method} {path}") from error
+            except (OSError, http.client.HTTPException) as error:
+                connection.close()
+                raise PixivTransportError(str(error) or f"Request failed: {method} {path}") from error
+
+    def _finish(self, connection: http.client.HTTPConnection, response: http.client.HTTPResponse) -> None:
+        """Return a connection whose response was fully read to the pool, unless the server closes it."""
+        if response.will_close:
+            connection.close()
+        else:
+            self._pool.release(connection)
+
+    def _report_attempt(self, attempt: RequestAttempt) -> None:
+        if self.on_attempt is not None:
+            self.on_attempt(attempt)
+
+    def _stream_ndjson(self, path: str) -> Iterator[Any]:
+        """
+        Yield values from a newline-delimited JSON endpoint as they arrive, holding at most one
+        line in memory. Falls back to a buffered JSON array when the server does not stream.
+
+        Streams are not retried, since a partially consumed stream cannot be replayed.
+        """
+        connection, response = self._open(
+            "GET",
+            path,
+            headers={"Accept": NDJSON_MEDIA_TYPE},
+            read_timeout=self.read_timeout_seconds or self.timeout_seconds,
+        )
+        completed = False
+        try:
+            if response.status >= 400 or response.headers.get_content_type() != NDJSON_MEDIA_TYPE:
+                payload = decode_payload(response.read(), lambda: response.headers.get_content_charset() or "utf-8")
+                completed = True
+                if response.status >= 400:
+                    raise PixivAPIError(response.status, extract_error_message(payload), body=payload)
+                yield from payload or []
+                return
+            for line in response:
+                if line.strip():
+                    yield from_json(line)
+            completed = True
+        except (OSError, http.client.HTTPException) as error:
+            raise PixivTransportError(f"Stream failed: GET {path}: {error}") from error
+        finally:
+            # A stream abandoned midway leaves unread data on the socket, so it cannot be reused.
+            if completed:
+                self._finish(connection, response)
+            else:
+                connection.close()
+
+    def health(self) -> str:
+        return self._call(endpoints.health())
+
+    def health_pixiv(self) -> str:
+        return self._call(endpoints.health_pixiv())
+
+    def queue_download_artwork(self, artwork_id: int, *, priority: int | None = None) -> QueueTaskResponse:
+        return self._call(endpoints.queue_download_artwork(artwork_id, priority=priority))
+
+    def queue_download_member(self, member_id: int, *, priority: int | None = None) -> QueueTaskResponse:
+        return self._call(endpoints.queue_download_member(member_id, priority=priority))
+
+    def queue_download_tag(
+        self,
+        tag: str,
+        *,
+        bookmark_count: int | None = None,
+        sort_order: TagSortOrder = "date_d",
+        type_mode: TagTypeMode = "a",
+        wildcard: bool = False,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        lookback_days: int | None = None,
+        priority: int | None = None,
+    ) -> QueueTaskResponse:
+        return self._call(
+            endpoints.queue_download_tag(
+                tag,
+                bookmark_count=bookmark_count,
+                sort_order=sort_order,
+                type_mode=type_mode,
+                wildcard=wildcard,
+                start_date=start_date,
+                end_date=end_date,
+                lookback_days=lookback_days,
+                priority=priority,
+            )
+        )
+
+    def queue_delete_artwork(
+        self,
+        artwork_id: int,
+        delete_metadata: bool = True,
+        *,
+        priority: int | None = None,
+    ) -> QueueTaskResponse:
+        return self._call(endpoints.queue_delete_artwork(artwork_id, delete_metadata, priority=priority))
+
+    def queue_delete_artworks(
+        self,
+        artwork_ids: list[int],
+        delete_metadata: bool = True,
+        *,
+        priority: int | None = None,
+    ) -> QueueTaskResponse:
+        """Delete many artworks as a single task; much cheaper than one `queue_delete_artwork` call each."""
+        return self._call(endpoints.queue_delete_artworks(artwork_ids, delete_metadata, priority=priority))
+
+    def queue_delete_member(
+        self,
+        member_id: int,
+        delete_metadata: bool = True,
+        *,
+        priority: int | None = None,
+    ) -> QueueTaskResponse:
+        """Delete all of a member's downloaded artworks as a single task."""
+        return self._call(endpoints.queue_delete_member(member_id, delete_metadata, priority=priority))
+
+    def queue_metadata_artwork(self, artwork_id: int, *, priority: int | None = None) -> QueueTaskResponse:
+        return self._call(endpoints.queue_metadata_artwork(artwork_id, priority=priority))
+
+    def queue_metadata_member(self, member_id: int, *, priority: int | None = None) -> QueueTaskResponse:
+        return self._call(endpoints.queue_metadata_member(member_id, priority=priority))
+
+    def queue_metadata_series(self, series_id: int, *, priority: int | None = None) -> QueueTaskResponse:
+        return self._call(endpoints.queue_metadata_series(series_id, priority=priority))
+
+    def queue_metadata_tag(
+        self,
+        tag: str,
+        filter_mode: TagMetadataFilterMode = "none",
+        *,
+        priority: int | None = None,
+    ) -> QueueTaskResponse:
+        return self._call(endpoints.queue_metadata_tag(tag, filter_mode, priority=priority))
+
+    def enqueue_many(
+        self,
+        ids: Iterable[int],
+        kind: EnqueueKind = "download_artwork",
+        *,
+        priority: int | None = None,
+        concurrency: int | None = None,
+        use_batch: bool = True,
+    ) -> list[BulkItemResult[int, QueueTaskResponse]]:
+        """Synchronous counterpart of `PixivAsyncClient.enqueue_many`."""
+        id_list = list(ids)
+        if use_batch and kind in BATCH_ENQUEUE_PATHS and self._batch_enqueue_supported.get(kind, True):
+            try:
+                responses = self._call(endpoints.queue_batch(kind, id_list, priority=priority))
+            except PixivClientError as error:
+                if not (isinstance(error, PixivAPIError) and error.status in (404, 405)):
+                    return [BulkItemResult(key=item_id, error=error) for item_id in id_list]
+                self._batch_enqueue_supported[kind] = False
+            else:
+                return [
+                    BulkItemResult(key=item_id, value=response)
+                    for item_id, response in zip(id_list, responses, strict=True)
+                ]
+
+        return map_bounded(
+            id_list,
+            lambda item_id: self._call(endpoints.queue_single(kind, item_id, priority=priority)),
+            concurrency or self.max_concurrency,
+        )
+
+    def get_member_ids(self) -> list[int]:
+        return self._call(endpoints.get_member_ids())
+
+    def get_image_ids(self) -> list[int]:
+        return self._call(endpoints.get_image_ids())
+
+    def get_tags(self) -> list[str]:
+        return self._call(endpoints.get_tags())
+
+    def get_series(self) -> list[str]:
+        return self._call(endpoints.get_series())
+
+    def iter_member_ids(self) -> Iterator[int]:
+        return self._stream_ndjson(endpoints.get_member_ids().path)
+
+    def iter_image_ids(self) -> Iterator[int]:
+        return self._stream_ndjson(endpoints.get_image_ids().path)
+
+    def iter_tags(self) -> Iterator[str]:
+        return self._stream_ndjson(endpoints.get_tags().path)
+
+    def iter_series(self) -> Iterator[str]:
+        return self._stream_ndjson(endpoints.get_series().path)
+
+    def get_member(
+        self,
+        member_id: int,
+        *,
+        limit: int | None = None,
+        after: int | None = None,
+        order: ImageListOrder = "asc",
+        fields: ImageListFields = "full",
+    ) -> PixivMemberPortfolio:
+        return self._call(endpoints.get_member(member_id, limit=limit, after=after, order=order, fields=fields))
+
+    def get_image(self, image_id: int) -> PixivImageComplete:
+        return self._call(endpoints.get_image(image_id))
+
+    def map_get_images(
+        self,
+        image_ids: Iterable[int],
+        *,
+        concurrency: int | None = None,
+    ) -> list[BulkItemResult[int, PixivImageComplete]]:
+        """Fetch many images from a bounded thread pool, returning one result per ID in input order."""
+        return map_bounded(image_ids, self.get_image, concurrency or self.max_concurrency)
+
+    def get_tag(
+        self,
+        tag_id: str,
+        *,
+        limit: int | None = None,
+        after: int | None = None,
+        order: ImageListOrder = "asc",
+        fields: ImageListFields = "full",
+    ) -> PixivTagInfo:
+        return self._call(endpoints.get_tag(tag_id, limit=limit, after=after, order=order, fields=fields))
+
+    def get_series_info(self, series_id: str) -> PixivSeriesInfo:
+        return self._call(endpoints.get_series_info(series_id))
+
+    def get_cookie(self) -> str:
+        return self._call(endpoints.get_cookie())
+
+    def update_cookie(self, cookie: str) -> str:
+        return self._call(endpoints.update_cookie(cookie))
+
+    def reset_database(self) -> str:
+        return self._call(endpoints.reset_database())
+
+    def reset_downloads(self) -> str:
+        return self._call(endpoints.reset_downloads())
+
+    def list_dead_letter_messages(self) -> list[DeadLetterMessage]:
+        return self._call(endpoints.list_dead_letter_messages())
+
+    def resume_all_dead_letter_messages(self) -> DeadLetterResumeAllResponse:
+        return self._call(endpoints.resume_all_dead_letter_messages())
+
+    def resume_dead_letter_message(self, dead_letter_id: str) -> DeadLetterResumeResponse:
+        return self._call(endpoints.resume_dead_letter_message(dead_letter_id))
+
+    def drop_all_dead_letter_messages(self) -> DeadLetterDropAllResponse:
+        return self._call(endpoints.drop_all_dead_letter_messages())
+
+    def drop_dead_letter_message(self, dead_letter_id: str) -> DeadLetterDropResponse:
+        return self._call(endpoints.drop_dead_letter_message(dead_letter_id))
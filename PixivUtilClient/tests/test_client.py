@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Any
 
@@ -5,7 +6,47 @@ import pytest
 import pytest_asyncio
 from aiohttp import web
 
-from pixivutil_client import PixivAPIError, PixivAsyncClient
+from pixivutil_client import (
+    NO_RETRY,
+    PixivAPIError,
+    PixivAsyncClient,
+    PixivClient,
+    RequestAttempt,
+    RetryPolicy,
+    endpoints,
+)
+
+IMAGE_MEMBER = {
+    "member_id": 7,
+    "name": "member",
+    "save_folder": "member",
+    "created_date": "",
+    "last_update_date": "",
+    "last_image": 0,
+    "is_deleted": 0,
+}
+
+
+def _image_payload(image_id: int) -> dict[str, Any]:
+    return {
+        "image": {
+            "image_id": image_id,
+            "member_id": 7,
+            "title": f"title {image_id}",
+            "save_name": f"{image_id}.png",
+            "created_date": "",
+            "last_update_date": "",
+            "is_manga": "N",
+            "caption": None,
+        },
+        "member": IMAGE_MEMBER,
+        "pages": [],
+        "tags": [],
+    }
+
+
+# Concurrency observed by the fake image endpoint; reset per server fixture.
+image_requests_in_flight = {"current": 0, "peak": 0}
 
 
 @pytest_asyncio.fixture
@@ -52,6 +93,66 @@ async def server_url() -> str:
         dead_letter_id = request.match_info["dead_letter_id"]
         return web.json_response({"dead_letter_id": dead_letter_id, "dropped": True})
 
+    in_flight = image_requests_in_flight
+    in_flight.update(current=0, peak=0)
+
+    async def image(request: web.Request) -> web.Response:
+        image_id = int(request.match_info["image_id"])
+        in_flight["current"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["current"])
+        try:
+            # Later IDs answer first so ordering must come from the client, not completion order.
+            await asyncio.sleep(0.01 * (5 - image_id % 5))
+        finally:
+            in_flight["current"] -= 1
+        if image_id == 404:
+            return web.Response(text=f"Image with ID {image_id} not found.", status=404)
+        return web.json_response(_image_payload(image_id))
+
+    async def queue_artwork(request: web.Request) -> web.Response:
+        return web.json_response({"task_id": f"task-{request.match_info['artwork_id']}"})
+
+    flaky_calls = {"count": 0}
+
+    async def flaky(_: web.Request) -> web.Response:
+        flaky_calls["count"] += 1
+        if flaky_calls["count"] == 1:
+            return web.json_response({"error": "busy"}, status=503, headers={"Retry-After": "0"})
+        if flaky_calls["count"] == 2:
+            return web.json_response({"error": "bad gateway"}, status=502)
+        return web.json_response({"attempts": flaky_calls["count"]})
+
+    async def bad_gateway(_: web.Request) -> web.Response:
+        return web.json_response({"error": "bad gateway"}, status=502)
+
+    async def image_ids(request: web.Request) -> web.StreamResponse:
+        ids = [3, 5, 8]
+        if "application/x-ndjson" not in request.headers.get("Accept", ""):
+            return web.json_response(ids)
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        for image_id in ids:
+            await response.write(f"{image_id}\n".encode())
+        await response.write_eof()
+        return response
+
+    async def tags(_: web.Request) -> web.Response:
+        return web.json_response(["a", "b"])
+
+    async def queue_delete_artworks(request: web.Request) -> web.Response:
+        body = await request.json()
+        return web.json_response({
+            "task_id": f"delete-{len(body['artwork_ids'])}",
+            "delete_metadata": request.query["delete_metadata"] == "true",
+        })
+
+    app.router.add_get("/api/database/images", image_ids)
+    app.router.add_get("/api/database/tags", tags)
+    app.router.add_post("/api/queue/download/artworks/delete", queue_delete_artworks)
+    app.router.add_get("/flaky", flaky)
+    app.router.add_post("/bad-gateway", bad_gateway)
+    app.router.add_get("/api/database/image/{image_id}", image)
+    app.router.add_post("/api/queue/metadata/artwork/{artwork_id}", queue_artwork)
     app.router.add_get("/api/database/members", plain_json)
     app.router.add_post("/api/queue/download/artwork/123", auth_echo)
     app.router.add_get("/boom", failure)
@@ -103,8 +204,8 @@ async def test_ssl_flag_is_forwarded() -> None:
     class FakeResponse:
         status = 200
 
-        async def text(self) -> str:
-            return json.dumps({"ok": True})
+        async def read(self) -> bytes:
+            return json.dumps({"ok": True}).encode()
 
     class FakeContextManager:
         def __init__(self, response: FakeResponse):
@@ -152,3 +253,162 @@ async def test_dead_letter_queue_client_methods(server_url: str) -> None:
         dropped_one = await client.drop_dead_letter_message("abc-123")
         assert dropped_one.dead_letter_id == "abc-123"
         assert dropped_one.dropped is True
+
+
+@pytest.mark.asyncio
+async def test_queue_delete_artworks_sends_ids_in_one_request(server_url: str) -> None:
+    async with PixivAsyncClient(server_url) as client:
+        response = await client.queue_delete_artworks([1, 2, 3], delete_metadata=False)
+    assert response.task_id == "delete-3"
+    assert response.delete_metadata is False
+
+
+@pytest.mark.asyncio
+async def test_map_get_images_preserves_order_and_collects_errors(server_url: str) -> None:
+    image_ids = [1, 2, 404, 3, 4, 5, 6, 7, 8, 9]
+    async with PixivAsyncClient(server_url, max_concurrency=3) as client:
+        results = await client.map_get_images(image_ids)
+
+    assert [result.key for result in results] == image_ids
+    assert [result.value.image.image_id for result in results if result.ok] == [1, 2, 3, 4, 5, 6, 7, 8, 9]
+    failed = [result for result in results if not result.ok]
+    assert len(failed) == 1
+    assert failed[0].key == 404
+    assert isinstance(failed[0].error, PixivAPIError)
+    assert failed[0].error.status == 404
+    assert image_requests_in_flight["peak"] <= 3
+
+
+@pytest.mark.asyncio
+async def test_enqueue_many_falls_back_without_batch_endpoint(server_url: str) -> None:
+    async with PixivAsyncClient(server_url) as client:
+        results = await client.enqueue_many([11, 12, 13], kind="metadata_artwork")
+        assert [result.value.task_id for result in results] == ["task-11", "task-12", "task-13"]
+        assert client._batch_enqueue_supported == {"metadata_artwork": False}
+
+
+INSTANT_RETRY = RetryPolicy(max_attempts=3, random_uniform=lambda _low, _high: 0.0)
+
+
+@pytest.mark.asyncio
+async def test_retry_idempotent_request_and_report_attempts(server_url: str) -> None:
+    attempts: list[RequestAttempt] = []
+    async with PixivAsyncClient(server_url, retry_policy=INSTANT_RETRY, on_attempt=attempts.append) as client:
+        payload = await client._request("GET", "/flaky")
+
+    assert payload == {"attempts": 3}
+    assert [(attempt.attempt, attempt.status, attempt.will_retry) for attempt in attempts] == [
+        (1, 503, True),
+        (2, 502, True),
+        (3, 200, False),
+    ]
+    assert attempts[0].retry_delay == 0.0
+    assert all(attempt.elapsed_seconds >= 0 for attempt in attempts)
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_request_is_not_retried_on_bad_gateway(server_url: str) -> None:
+    attempts: list[RequestAttempt] = []
+    async with PixivAsyncClient(server_url, retry_policy=INSTANT_RETRY, on_attempt=attempts.append) as client:
+        with pytest.raises(PixivAPIError) as exc:
+            await client._request("POST", "/bad-gateway")
+    assert exc.value.status == 502
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_with_options_overrides_retry_policy(server_url: str) -> None:
+    async with PixivAsyncClient(server_url, retry_policy=INSTANT_RETRY) as client:
+        with pytest.raises(PixivAPIError) as exc:
+            await client.with_options(retry_policy=NO_RETRY)._request("GET", "/flaky")
+        assert exc.value.status == 503
+        assert exc.value.retry_after == 0.0
+        assert client.retry_policy is INSTANT_RETRY
+
+
+@pytest.mark.asyncio
+async def test_iter_image_ids_streams_ndjson(server_url: str) -> None:
+    async with PixivAsyncClient(server_url) as client:
+        assert [image_id async for image_id in client.iter_image_ids()] == [3, 5, 8]
+
+
+@pytest.mark.asyncio
+async def test_iter_tags_falls_back_to_json_array(server_url: str) -> None:
+    async with PixivAsyncClient(server_url) as client:
+        assert [tag async for tag in client.iter_tags()] == ["a", "b"]
+
+
+def _use_sync_client(server_url: str, **kwargs: Any) -> Any:
+    """Run a callable against a `PixivClient` off the event loop serving the fake server."""
+
+    def run(use: Any) -> Any:
+        def target() -> Any:
+            with PixivClient(server_url, **kwargs) as client:
+                return use(client)
+
+        return asyncio.to_thread(target)
+
+    return run
+
+
+@pytest.mark.asyncio
+async def test_sync_client_shares_request_building(server_url: str) -> None:
+    run = _use_sync_client(server_url, api_key="secret")
+    assert await run(lambda client: client.get_member_ids()) == [1, 2, 3]
+    queued = await run(lambda client: client._request("POST", "/api/queue/download/artwork/123"))
+    assert queued == {"authorization": "Bearer secret"}
+    messages = await run(lambda client: client.list_dead_letter_messages())
+    assert messages[0].payload["artwork_id"] == 42
+
+    with pytest.raises(PixivAPIError) as exc:
+        await run(lambda client: client._request("GET", "/boom"))
+    assert exc.value.status == 400
+    assert exc.value.message == "bad request"
+
+
+@pytest.mark.asyncio
+async def test_sync_client_reuses_pooled_connections(server_url: str) -> None:
+    def use(client: PixivClient) -> tuple[bool, bool]:
+        client.get_member_ids()
+        first, _ = client._pool.acquire(None)
+        client._pool.release(first)
+        client.get_member_ids()
+        connection, reused = client._pool.acquire(None)
+        return connection is first, reused
+
+    same_connection, reused = await _use_sync_client(server_url)(use)
+    assert same_connection and reused
+
+
+@pytest.mark.asyncio
+async def test_sync_client_retries_and_reports_attempts(server_url: str) -> None:
+    attempts: list[RequestAttempt] = []
+    run = _use_sync_client(server_url, retry_policy=INSTANT_RETRY, on_attempt=attempts.append)
+    assert await run(lambda client: client._request("GET", "/flaky")) == {"attempts": 3}
+    assert [attempt.status for attempt in attempts] == [503, 502, 200]
+
+
+@pytest.mark.asyncio
+async def test_sync_client_bulk_helpers_preserve_order(server_url: str) -> None:
+    image_ids = [1, 404, 2, 3, 4, 5]
+    results = await _use_sync_client(server_url, max_concurrency=3)(lambda client: client.map_get_images(image_ids))
+    assert [result.key for result in results] == image_ids
+    assert [result.ok for result in results] == [True, False, True, True, True, True]
+    assert image_requests_in_flight["peak"] <= 3
+
+    queued = await _use_sync_client(server_url)(lambda client: client.enqueue_many([11, 12], kind="metadata_artwork"))
+    assert [result.value.task_id for result in queued] == ["task-11", "task-12"]
+
+
+@pytest.mark.asyncio
+async def test_sync_client_iterates_ndjson_and_json_arrays(server_url: str) -> None:
+    run = _use_sync_client(server_url)
+    assert await run(lambda client: list(client.iter_image_ids())) == [3, 5, 8]
+    assert await run(lambda client: list(client.iter_tags())) == ["a", "b"]
+
+
+def test_image_page_options_send_only_non_defaults() -> None:
+    assert endpoints.get_member(7).params is None
+    call = endpoints.get_tag("a/b", limit=10, after=5, fields="ids")
+    assert call.path == "/api/database/tag/a%2Fb"
+    assert call.params == {"limit": 10, "after": 5, "fields": "ids"}
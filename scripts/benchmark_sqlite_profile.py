@@ -0,0 +1,126 @@
+"""
+Benchmark the database API queries against a PixivUtil2 database under different SQLite
+performance profiles.
+
+    uv run python scripts/benchmark_sqlite_profile.py --db .pixivUtil2/db/db.sqlite
+
+Each profile runs in its own process with its PIXIVUTIL_SERVER_SQLITE_* variables set, on one
+long-lived connection like the database API's read threads. The same sampled members,
+artworks and tags are queried under every profile. The first round is reported separately,
+since it mostly measures how much of the database the OS already has cached.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROFILES: dict[str, dict[str, str]] = {
+    # SQLite's built-in defaults: no memory mapping, about 2 MB of page cache per connection.
+    "sqlite-defaults": {
+        "PIXIVUTIL_SERVER_SQLITE_MMAP_SIZE_MB": "0",
+        "PIXIVUTIL_SERVER_SQLITE_CACHE_SIZE_MB": "2",
+        "PIXIVUTIL_SERVER_SQLITE_TEMP_STORE": "default",
+    },
+    # The server's configuration, from this environment.
+    "configured": {},
+    "large": {
+        "PIXIVUTIL_SERVER_SQLITE_MMAP_SIZE_MB": "2048",
+        "PIXIVUTIL_SERVER_SQLITE_CACHE_SIZE_MB": "256",
+        "PIXIVUTIL_SERVER_SQLITE_TEMP_STORE": "memory",
+    },
+}
+
+
+def sample_ids(db_path: str, samples: int, seed: int) -> dict[str, list]:
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rng = random.Random(seed)
+        sampled = {}
+        for kind, query in (
+            ("member", "SELECT member_id FROM pixiv_master_member"),
+            ("image", "SELECT image_id FROM pixiv_master_image"),
+            ("tag", "SELECT tag_id FROM pixiv_master_tag"),
+        ):
+            ids = [row[0] for row in connection.execute(query)]
+            sampled[kind] = rng.sample(ids, min(samples, len(ids)))
+        return sampled
+    finally:
+        connection.close()
+
+
+def run_profile(db_path: str, ids: dict[str, list], rounds: int) -> dict[str, list[float]]:
+    """Time the database router's queries; returns seconds per query and round."""
+    # Imported here so the profile's environment is in place when the configuration loads.
+    from PixivServer.repository.pixivutil import PixivUtilRepository
+
+    queries = {
+        "get_member": lambda repository: [
+            repository.get_member_data_by_id(member_id, limit=100) for member_id in ids["member"]
+        ],
+        "get_image": lambda repository: [repository.get_image_data_by_id(image_id) for image_id in ids["image"]],
+        "get_tag": lambda repository: [repository.get_tag_info_by_id(tag_id, limit=100) for tag_id in ids["tag"]],
+        "list_image_ids": lambda repository: list(repository.iter_pixiv_image_id_batches()),
+        "count_pages": lambda repository: repository.count_pages(),
+    }
+    timings: dict[str, list[float]] = {name: [] for name in queries}
+    repository = PixivUtilRepository(db_path=db_path)
+    repository.open(reader=True)
+    try:
+        for _ in range(rounds):
+            for name, query in queries.items():
+                start = time.perf_counter()
+                query(repository)
+                timings[name].append(time.perf_counter() - start)
+    finally:
+        repository.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="./.pixivUtil2/db/db.sqlite", help="PixivUtil2 database to read")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="comma-separated profiles to compare")
+    parser.add_argument("--samples", type=int, default=50, help="members, artworks and tags queried per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--run-profile", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_profile:
+        ids = json.load(sys.stdin)
+        json.dump(run_profile(args.db, ids, args.rounds), sys.stdout)
+        return
+
+    db_path = str(Path(args.db).resolve())
+    ids = sample_ids(db_path, args.samples, args.seed)
+    print(f"{args.db}: {len(ids['member'])} members, {len(ids['image'])} artworks, {len(ids['tag'])} tags per round")
+    print(f"{'profile':<16} {'query':<16} {'first round':>12} {'median':>10} {'p95':>10}")
+    repo_root = Path(__file__).resolve().parent.parent
+    for name in args.profiles.split(","):
+        output = subprocess.run(
+            [sys.executable, __file__, "--db", db_path, "--rounds", str(args.rounds), "--run-profile", name],
+            input=json.dumps(ids),
+            stdout=subprocess.PIPE,
+            text=True,
+            check=True,
+            cwd=repo_root,
+            env={**os.environ, **PROFILES[name], "PYTHONPATH": str(repo_root)},
+        ).stdout
+        for query, seconds in json.loads(output).items():
+            warm = seconds[1:] or seconds
+            p95 = statistics.quantiles(warm, n=20)[-1] if len(warm) > 1 else warm[0]
+            print(
+                f"{name:<16} {query:<16} {seconds[0] * 1000:>10.1f}ms "
+                f"{statistics.median(warm) * 1000:>8.1f}ms {p95 * 1000:>8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import sqlite3
 import tempfile
 from pathlib import Path
 
@@ -33,3 +34,102 @@ def temp_folder_with_files(temp_dir):
     link_path.symlink_to(temp_dir / "test_file1.txt")
 
     yield temp_dir
+
+
+# Subset of the PixivUtil2 (server mode) schema read by the server repositories.
+PIXIVUTIL_TEST_SCHEMA = """
+CREATE TABLE pixiv_master_member (
+    member_id INTEGER PRIMARY KEY ON CONFLICT IGNORE,
+    name TEXT,
+    save_folder TEXT,
+    created_date DATE,
+    last_update_date DATE,
+    last_image INTEGER,
+    is_deleted INTEGER DEFAULT 0,
+    member_token TEXT
+);
+CREATE TABLE pixiv_master_image (
+    image_id INTEGER PRIMARY KEY,
+    member_id INTEGER,
+    title TEXT,
+    save_name TEXT,
+    created_date DATE,
+    last_update_date DATE,
+    is_manga TEXT,
+    caption TEXT
+);
+CREATE TABLE pixiv_manga_image (
+    image_id INTEGER,
+    page INTEGER,
+    save_name TEXT,
+    created_date DATE,
+    last_update_date DATE,
+    PRIMARY KEY (image_id, page)
+);
+CREATE TABLE pixiv_master_tag (
+    tag_id VARCHAR(255) PRIMARY KEY,
+    created_date DATE,
+    last_update_date DATE
+);
+CREATE TABLE pixiv_tag_translation (
+    tag_id VARCHAR(255),
+    translation_type VARCHAR(255),
+    translation VARCHAR(255),
+    created_date DATE,
+    last_update_date DATE,
+    PRIMARY KEY (tag_id, translation_type)
+);
+CREATE TABLE pixiv_image_to_tag (
+    image_id INTEGER,
+    tag_id VARCHAR(255),
+    created_date DATE,
+    last_update_date DATE,
+    PRIMARY KEY (image_id, tag_id)
+);
+CREATE INDEX idx_pixiv_image_to_tag_tag_id_image_id ON pixiv_image_to_tag (tag_id, image_id);
+CREATE TABLE pixiv_master_series (
+    series_id VARCHAR(255) PRIMARY KEY,
+    series_title TEXT,
+    series_type VARCHAR(255),
+    series_description TEXT,
+    created_date DATE,
+    last_update_date DATE
+);
+CREATE TABLE pixiv_image_to_series (
+    series_id VARCHAR(255),
+    series_order INTEGER,
+    image_id INTEGER,
+    created_date DATE,
+    last_update_date DATE,
+    PRIMARY KEY (series_id, image_id)
+);
+CREATE TABLE pixiv_date_info (
+    image_id INTEGER PRIMARY KEY,
+    created_date_epoch INTEGER,
+    uploaded_date_epoch INTEGER,
+    created_date DATE,
+    last_update_date DATE
+);
+CREATE TABLE pixiv_ai_info (
+    image_id INTEGER PRIMARY KEY,
+    ai_type INTEGER,
+    created_date DATE,
+    last_update_date DATE
+);
+"""
+
+
+@pytest.fixture
+def pixivutil_db(temp_dir, monkeypatch):
+    """
+    Provide an empty PixivUtil2 database and point the server configuration at it.
+    """
+    from PixivServer.config.pixivutil import config as pixivutil_config
+
+    db_path = temp_dir / "db.sqlite"
+    connection = sqlite3.connect(db_path)
+    connection.executescript(PIXIVUTIL_TEST_SCHEMA)
+    connection.commit()
+    monkeypatch.setattr(pixivutil_config, "db_path", str(db_path))
+    yield connection
+    connection.close()
@@ -0,0 +1,71 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from PixivServer.repository.async_pixivutil import (
+    AsyncPixivUtilRepository,
+    DatabaseOverloaded,
+    DatabaseQueryTimeout,
+)
+from PixivServer.repository.pixivutil import PixivUtilRepository
+
+# Counts to a billion: far longer than any test timeout.
+SLOW_QUERY = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000000000) SELECT COUNT(*) FROM n"
+
+
+def slow_read(repository: PixivUtilRepository) -> int:
+    return repository.connection.execute(SLOW_QUERY).fetchone()[0]
+
+
+def test_facade_runs_repository_methods_and_streams(pixivutil_db: sqlite3.Connection):
+    pixivutil_db.executemany("INSERT INTO pixiv_master_image (image_id, member_id) VALUES (?, 1)", [(1,), (2,), (3,)])
+    pixivutil_db.commit()
+    repository = AsyncPixivUtilRepository(workers=2, max_queued=10, query_timeout_seconds=5)
+
+    async def read() -> tuple[list[int], list[list[int]]]:
+        image_ids = await repository.get_all_pixiv_image_ids()
+        batches = [
+            batch async for batch in repository.stream(
+                lambda repository: repository.iter_pixiv_image_id_batches(batch_size=2)
+            )
+        ]
+        return image_ids, batches
+
+    try:
+        assert asyncio.run(read()) == ([1, 2, 3], [[1, 2], [3]])
+        with pytest.raises(AttributeError):
+            repository.not_a_method  # noqa: B018
+    finally:
+        repository.close()
+
+
+def test_runaway_read_is_interrupted_and_connection_reused(pixivutil_db: sqlite3.Connection):
+    repository = AsyncPixivUtilRepository(workers=1, max_queued=0, query_timeout_seconds=0.05)
+
+    async def read():
+        with pytest.raises(DatabaseQueryTimeout):
+            await repository.run("slow", slow_read)
+        return await repository.count_artworks()
+
+    try:
+        assert asyncio.run(read()) == 0
+    finally:
+        repository.close()
+
+
+def test_reads_beyond_the_queue_are_rejected(pixivutil_db: sqlite3.Connection):
+    repository = AsyncPixivUtilRepository(workers=1, max_queued=0, query_timeout_seconds=0.2)
+
+    async def read():
+        slow = asyncio.ensure_future(repository.run("slow", slow_read))
+        await asyncio.sleep(0)
+        with pytest.raises(DatabaseOverloaded):
+            await repository.count_artworks()
+        with pytest.raises(DatabaseQueryTimeout):
+            await slow
+
+    try:
+        asyncio.run(read())
+    finally:
+        repository.close()
@@ -0,0 +1,92 @@
+import os
+import sqlite3
+
+import pytest
+
+from PixivServer.config.server import config as server_config
+from PixivServer.repository.content import ContentRepository
+from PixivServer.service import dedup, verification
+
+
+@pytest.fixture
+def downloads_dir(temp_dir, monkeypatch):
+    downloads = temp_dir / "downloads"
+    (downloads / "old_name").mkdir(parents=True)
+    (downloads / "new_name").mkdir()
+    monkeypatch.setattr(server_config, "downloads_dir", str(downloads))
+    return downloads
+
+
+@pytest.fixture
+def content_repository(pixivutil_db: sqlite3.Connection):
+    repository = ContentRepository()
+    repository.open()
+    yield repository
+    repository.close()
+
+
+def test_deduplicate_downloads_hardlinks_duplicates_and_reports(downloads_dir, content_repository: ContentRepository):
+    first = downloads_dir / "old_name" / "1_p0.png"
+    second = downloads_dir / "new_name" / "1_p0.png"
+    other = downloads_dir / "new_name" / "2_p0.png"
+    first.write_bytes(b"a" * 100)
+    second.write_bytes(b"a" * 100)
+    other.write_bytes(b"b" * 50)
+    (downloads_dir / "new_name" / "3_p0.png.part").write_bytes(b"a" * 100)
+
+    counts = dedup.deduplicate_downloads("hardlink")
+    assert counts == {"scanned": 3, "hashed": 3, "removed": 0, "linked": 1, "reclaimed_bytes": 100, "skipped": 0}
+    assert os.path.samefile(first, second)
+    assert second.read_bytes() == b"a" * 100
+
+    report = content_repository.select_report()
+    assert report["files"] == 3
+    assert report["total_bytes"] == 250
+    assert report["unique_bytes"] == 150
+    assert report["reclaimed_bytes"] == 100
+    assert report["reclaimable_bytes"] == 0
+
+    # A second pass finds nothing new to hash or link.
+    assert dedup.deduplicate_downloads("hardlink")["hashed"] == 0
+
+    first.unlink()
+    assert dedup.deduplicate_downloads("hardlink")["removed"] == 1
+    assert content_repository.select_report()["deduplicated_files"] == 0
+
+
+def test_link_duplicates_skips_files_changed_since_indexing(downloads_dir, content_repository: ContentRepository):
+    first = downloads_dir / "old_name" / "1_p0.png"
+    second = downloads_dir / "new_name" / "1_p0.png"
+    first.write_bytes(b"same")
+    second.write_bytes(b"same")
+    dedup.index_downloads(content_repository)
+
+    second.write_bytes(b"diff")
+    counts = dedup.link_duplicates(content_repository, "hardlink")
+    assert counts["linked"] == 0
+    assert counts["skipped"] == 1
+    assert second.read_bytes() == b"diff"
+
+
+def test_downloaded_artworks_are_hashed_once_and_deduplicated(
+    pixivutil_db: sqlite3.Connection, downloads_dir, content_repository: ContentRepository
+):
+    existing = downloads_dir / "old_name" / "10_p0.png"
+    existing.write_bytes(b"page")
+    dedup.index_downloads(content_repository)
+
+    downloaded = downloads_dir / "new_name" / "10_p0.png"
+    downloaded.write_bytes(b"page")
+    (downloads_dir / "new_name" / "unrelated.png").write_bytes(b"page")
+    pixivutil_db.execute("INSERT INTO pixiv_master_image (image_id, member_id, save_name) VALUES (10, 7, ?)", (str(downloaded),))
+    pixivutil_db.execute("INSERT INTO pixiv_manga_image (image_id, page, save_name) VALUES (10, 0, ?)", (str(downloaded),))
+    pixivutil_db.commit()
+
+    hashed = verification.record_artworks([10])
+    assert hashed == [content_repository.select_file(str(existing))[2]]
+    counts = dedup.deduplicate_contents(hashed, "hardlink")
+    assert counts["linked"] == 1
+    assert os.path.samefile(existing, downloaded)
+    assert content_repository.select_report()["files"] == 2
+    # Unchanged files are not hashed again.
+    assert verification.record_artworks([10]) == []
@@ -0,0 +1,161 @@
+import shutil
+import zipfile
+
+import pytest
+from fastapi import Request
+from fastapi.responses import FileResponse
+
+from PixivServer.config.server import config as server_config
+from PixivServer.service.archives import ZipArchiveCache
+from PixivServer.service.files import (
+    archive_member_response,
+    file_etag,
+    file_response,
+    parse_single_range,
+    resolve_download_path,
+)
+
+
+def make_request(headers: dict[str, str] | None = None) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+    })
+
+
+@pytest.fixture
+def downloads_dir(temp_dir, monkeypatch):
+    downloads = temp_dir / "downloads"
+    (downloads / "member").mkdir(parents=True)
+    (downloads / "member" / "1_p0.png").write_bytes(b"png bytes")
+    (temp_dir / "secret.txt").write_text("secret")
+    monkeypatch.setattr(server_config, "downloads_dir", str(downloads))
+    monkeypatch.setattr(server_config, "accel_redirect_prefix", None)
+    return downloads
+
+
+def test_resolve_download_path_stays_inside_downloads(downloads_dir):
+    assert resolve_download_path(str(downloads_dir / "member" / "1_p0.png")) == (downloads_dir / "member" / "1_p0.png").resolve()
+
+    with pytest.raises(PermissionError):
+        resolve_download_path(str(downloads_dir / ".." / "secret.txt"))
+    with pytest.raises(FileNotFoundError):
+        resolve_download_path(str(downloads_dir / "member" / "missing.png"))
+
+
+def test_file_response_sets_validators_and_honors_if_none_match(downloads_dir):
+    path = downloads_dir / "member" / "1_p0.png"
+    etag = file_etag(path.stat())
+
+    response = file_response(make_request(), path)
+    assert isinstance(response, FileResponse)
+    assert response.headers["etag"] == etag
+    assert response.headers["content-type"] == "image/png"
+    assert response.headers["accept-ranges"] == "bytes"
+
+    not_modified = file_response(make_request({"If-None-Match": f'W/{etag}, "other"'}), path)
+    assert not_modified.status_code == 304
+
+
+def test_file_response_offloads_with_accel_redirect(downloads_dir, monkeypatch):
+    monkeypatch.setattr(server_config, "accel_redirect_prefix", "/_downloads")
+    path = downloads_dir / "member" / "1_p0.png"
+
+    response = file_response(make_request(), path)
+    assert response.headers["x-accel-redirect"] == "/_downloads/member/1_p0.png"
+    assert response.body == b""
+
+
+def test_parse_single_range():
+    assert parse_single_range("bytes=0-3", 10) == (0, 4)
+    assert parse_single_range("bytes=4-", 10) == (4, 10)
+    assert parse_single_range("bytes=-3", 10) == (7, 10)
+    assert parse_single_range("bytes=0-1,4-5", 10) is None
+    with pytest.raises(ValueError):
+        parse_single_range("bytes=10-", 10)
+
+
+@pytest.fixture
+def manga_zip(temp_dir):
+    path = temp_dir / "123.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr(zipfile.ZipInfo("123/123_p0.png"), b"0123456789", compress_type=zipfile.ZIP_STORED)
+        archive.writestr("123_p1.jpg", b"jpeg" * 100, compress_type=zipfile.ZIP_DEFLATED)
+    return path
+
+
+def test_archive_member_lookup_and_ranges(manga_zip):
+    cache = ZipArchiveCache(max_open=1)
+    try:
+        stored = cache.get_member(manga_zip, "123_p0.png")
+        assert stored.is_stored
+        assert stored.media_type == "image/png"
+        assert b"".join(cache.iter_member(stored, 2, 5)) == b"234"
+
+        compressed = cache.get_member(manga_zip, "123_p1.jpg")
+        assert not compressed.is_stored
+        assert b"".join(cache.iter_member(compressed)) == b"jpeg" * 100
+
+        with pytest.raises(KeyError):
+            cache.get_member(manga_zip, "123_p9.png")
+    finally:
+        cache.close()
+
+
+def test_archive_cache_evicts_least_recently_used(manga_zip, temp_dir):
+    other_zip = temp_dir / "456.zip"
+    shutil.copy(manga_zip, other_zip)
+    cache = ZipArchiveCache(max_open=1)
+    try:
+        first = cache.get_member(manga_zip, "123_p1.jpg")
+        cache.get_member(other_zip, "123_p1.jpg")
+        assert first.zip_file.fp is None
+        # A member looked up before eviction can still be read.
+        assert b"".join(cache.iter_member(first)) == b"jpeg" * 100
+    finally:
+        cache.close()
+
+
+def test_archive_stream_outlives_eviction(manga_zip, temp_dir):
+    other_zip = temp_dir / "456.zip"
+    shutil.copy(manga_zip, other_zip)
+    cache = ZipArchiveCache(max_open=1)
+    try:
+        stream = cache.iter_member(cache.get_member(manga_zip, "123_p1.jpg"))
+        first_chunk = next(stream)
+        cache.get_member(other_zip, "123_p1.jpg")
+        assert first_chunk + b"".join(stream) == b"jpeg" * 100
+    finally:
+        cache.close()
+
+
+def test_archive_member_missing_after_reopen(manga_zip, temp_dir):
+    other_zip = temp_dir / "456.zip"
+    shutil.copy(manga_zip, other_zip)
+    cache = ZipArchiveCache(max_open=1)
+    try:
+        member = cache.get_member(manga_zip, "123_p1.jpg")
+        cache.get_member(other_zip, "123_p1.jpg")
+        with zipfile.ZipFile(manga_zip, "w") as archive:
+            archive.writestr("123_p2.jpg", b"other page" * 100, compress_type=zipfile.ZIP_DEFLATED)
+        with pytest.raises(KeyError):
+            cache.iter_member(member)
+    finally:
+        cache.close()
+
+
+def test_archive_member_response_serves_stored_range(manga_zip):
+    cache = ZipArchiveCache(max_open=1)
+    try:
+        member = cache.get_member(manga_zip, "123_p0.png")
+        response = archive_member_response(make_request({"Range": "bytes=0-3"}), member)
+        assert response.status_code == 206
+        assert response.headers["content-range"] == "bytes 0-3/10"
+        assert response.headers["content-length"] == "4"
+
+        unsatisfiable = archive_member_response(make_request({"Range": "bytes=20-"}), member)
+        assert unsatisfiable.status_code == 416
+    finally:
+        cache.close()
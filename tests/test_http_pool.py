@@ -0,0 +1,99 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from PixivServer.service.http_pool import HttpConnectionPool
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Client ports seen per request; one port means one reused connection.
+    ports: list[int] = []
+    # Drop the connection after responding, without announcing it, like an idle timeout on the server.
+    drop_after_response = False
+
+    def do_GET(self):
+        type(self).ports.append(self.client_address[1])
+        if self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/image.png")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/missing":
+            self.send_error(404)
+            return
+        body = b"image bytes"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.drop_after_response:
+            self.close_connection = True
+
+    def log_message(self, format, *args):  # noqa: A002
+        return
+
+
+@pytest.fixture
+def server():
+    KeepAliveHandler.ports = []
+    KeepAliveHandler.drop_after_response = False
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_connections_are_reused_across_requests(server):
+    pool = HttpConnectionPool()
+    try:
+        for path, status in (("/image.png", 200), ("/redirect", 302), ("/image.png", 200)):
+            with pool.send("GET", server + path, {}, None, 5) as response:
+                assert response.status == status
+                body = response.read()
+        assert body == b"image bytes"
+    finally:
+        pool.close()
+    assert len(KeepAliveHandler.ports) == 3
+    assert len(set(KeepAliveHandler.ports)) == 1
+
+
+def test_stale_connection_is_replaced(server):
+    KeepAliveHandler.drop_after_response = True
+    pool = HttpConnectionPool()
+    try:
+        for _ in range(2):
+            with pool.send("GET", server + "/image.png", {}, None, 5) as response:
+                assert response.read() == b"image bytes"
+    finally:
+        pool.close()
+    assert len(set(KeepAliveHandler.ports)) == 2
+
+
+def test_browser_requests_reuse_pooled_connections(server):
+    mechanize = pytest.importorskip("mechanize")
+    from PixivServer.service.browser import install_pooled_handler
+
+    pool = HttpConnectionPool()
+    browser = mechanize.Browser()
+    browser.set_handle_robots(False)
+    install_pooled_handler(browser, pool)
+    install_pooled_handler(browser, pool)
+    try:
+        for path in ("/image.png", "/redirect"):
+            response = browser.open_novisit(server + path, timeout=5)
+            assert response.read() == b"image bytes"
+            assert response.geturl() == server + "/image.png"
+            response.close()
+        with pytest.raises(mechanize.HTTPError) as error:
+            browser.open(server + "/missing", timeout=5)
+        assert error.value.code == 404
+    finally:
+        browser.close()
+        pool.close()
+    assert len(KeepAliveHandler.ports) == 4
+    assert len(set(KeepAliveHandler.ports)) == 1
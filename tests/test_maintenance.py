@@ -0,0 +1,69 @@
+import sqlite3
+
+from prometheus_client import REGISTRY
+
+from PixivServer.service import maintenance
+
+
+def test_checkpoint_truncates_wal_past_threshold(pixivutil_db: sqlite3.Connection):
+    pixivutil_db.execute("PRAGMA journal_mode=WAL")
+    # Keep the writer's own checkpoints from emptying the WAL first.
+    pixivutil_db.execute("PRAGMA wal_autocheckpoint=0")
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_master_image (image_id, member_id, caption) VALUES (?, 1, ?)",
+        [(image_id, "x" * 1000) for image_id in range(200)],
+    )
+    pixivutil_db.commit()
+
+    assert not maintenance.checkpoint_if_needed(threshold_bytes=1024 * 1024 * 1024)
+    wal_bytes = REGISTRY.get_sample_value("pixivutil_database_wal_bytes")
+    assert wal_bytes > 0
+
+    assert maintenance.checkpoint_if_needed(threshold_bytes=wal_bytes // 2)
+    assert REGISTRY.get_sample_value("pixivutil_database_wal_bytes") == 0
+    assert maintenance.get_status()["wal_bytes"] == 0
+
+
+def test_incremental_vacuum_after_converting_database(pixivutil_db: sqlite3.Connection):
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_master_image (image_id, member_id, caption) VALUES (?, 1, ?)",
+        [(image_id, "x" * 1000) for image_id in range(500)],
+    )
+    pixivutil_db.commit()
+    pixivutil_db.execute("DELETE FROM pixiv_master_image")
+    pixivutil_db.commit()
+
+    # Free pages stay in the file until the database is converted to incremental auto-vacuum.
+    status = maintenance.get_status()
+    assert status["auto_vacuum"] == "none"
+    assert status["freelist_pages"] > 0
+    assert maintenance.vacuum_incrementally(pages=10) == 0
+
+    after_vacuum = maintenance.vacuum_database()
+    assert after_vacuum["auto_vacuum"] == "incremental"
+    assert after_vacuum["freelist_pages"] == 0
+
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_master_image (image_id, member_id, caption) VALUES (?, 1, ?)",
+        [(image_id, "x" * 1000) for image_id in range(500)],
+    )
+    pixivutil_db.commit()
+    pixivutil_db.execute("DELETE FROM pixiv_master_image")
+    pixivutil_db.commit()
+    free_pages = maintenance.get_status()["freelist_pages"]
+
+    assert maintenance.vacuum_incrementally(pages=10) == 10
+    assert maintenance.get_status()["freelist_pages"] == free_pages - 10
+    assert REGISTRY.get_sample_value(
+        "pixivutil_database_maintenance_total", {"operation": "incremental_vacuum", "result": "ok"}
+    ) >= 1
+
+
+def test_optimize_records_planner_statistics(pixivutil_db: sqlite3.Connection):
+    pixivutil_db.execute("INSERT INTO pixiv_master_image (image_id, member_id) VALUES (1, 1)")
+    pixivutil_db.commit()
+
+    maintenance.optimize_database()
+
+    assert pixivutil_db.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+    assert "optimize" in maintenance.get_status()["last_runs"]
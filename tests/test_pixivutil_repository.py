@@ -0,0 +1,184 @@
+import sqlite3
+
+import pytest
+
+from PixivServer.config.sqlite import config as sqlite_config
+from PixivServer.repository.pixivutil import PixivUtilRepository
+
+
+def test_iter_pixiv_image_id_batches(pixivutil_db: sqlite3.Connection):
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_master_image (image_id, member_id) VALUES (?, 1)",
+        [(image_id,) for image_id in (5, 1, 4, 2, 3)],
+    )
+    pixivutil_db.commit()
+
+    repository = PixivUtilRepository()
+    repository.open()
+    try:
+        assert list(repository.iter_pixiv_image_id_batches(batch_size=2)) == [[1, 2], [3, 4], [5]]
+        assert list(repository.iter_pixiv_series_batches()) == []
+    finally:
+        repository.close()
+
+
+def test_get_image_ids_updated_since(pixivutil_db: sqlite3.Connection):
+    # PixivUtil2 stamps artworks it saves with datetime('now').
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_master_image (image_id, member_id, last_update_date) VALUES (?, 1, ?)",
+        [(1, "2026-01-01 09:59:59"), (2, "2026-01-01 10:00:00"), (3, "2026-01-02 08:00:00"), (4, None)],
+    )
+    pixivutil_db.commit()
+
+    repository = PixivUtilRepository()
+    repository.open()
+    try:
+        assert repository.get_image_ids_updated_since("2026-01-01 10:00:00") == [2, 3]
+    finally:
+        repository.close()
+
+
+def test_delete_artworks_by_ids_and_member(pixivutil_db: sqlite3.Connection):
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_master_image (image_id, member_id, save_name) VALUES (?, ?, ?)",
+        [(1, 7, "/d/1_p0.png"), (2, 7, "/d/2.zip"), (3, 8, "/d/3_p0.png"), (4, 9, "/d/4_p0.png")],
+    )
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_manga_image (image_id, page, save_name) VALUES (?, ?, ?)",
+        [(1, 0, "/d/1_p0.png"), (1, 1, "/d/1_p1.png"), (2, 0, "2_p0.png"), (3, 0, "/d/3_p0.png")],
+    )
+    pixivutil_db.executemany("INSERT INTO pixiv_image_to_tag VALUES (?, 'tag', '', '')", [(1,), (3,), (4,)])
+    pixivutil_db.executemany("INSERT INTO pixiv_date_info VALUES (?, 0, 0, '', '')", [(1,), (3,)])
+    pixivutil_db.commit()
+
+    repository = PixivUtilRepository()
+    repository.open()
+    try:
+        image_ids, save_names = repository.delete_artworks([3, 404], member_id=7, delete_metadata=False)
+        assert image_ids == [1, 2, 3]
+        # Archive-mode pages live inside the ZIP file, so only the ZIP is returned.
+        assert sorted(save_names) == ["/d/1_p0.png", "/d/1_p1.png", "/d/2.zip", "/d/3_p0.png"]
+    finally:
+        repository.close()
+
+    assert pixivutil_db.execute("SELECT image_id FROM pixiv_master_image").fetchall() == [(4,)]
+    assert pixivutil_db.execute("SELECT COUNT(*) FROM pixiv_manga_image").fetchone() == (0,)
+    assert pixivutil_db.execute("SELECT image_id FROM pixiv_image_to_tag").fetchall() == [(4,)]
+    assert pixivutil_db.execute("SELECT COUNT(*) FROM pixiv_date_info").fetchone() == (2,)
+
+
+def test_query_image_ids_by_tags(pixivutil_db: sqlite3.Connection):
+    from pixivutil_server_common.models import TagQueryRequest
+
+    tags = {1: ["cat", "sky"], 2: ["cat", "sky", "night"], 3: ["cat"], 4: ["sky"], 5: ["cat", "sky"], 6: ["dog"]}
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_image_to_tag VALUES (?, ?, '', '')",
+        [(image_id, tag) for image_id, image_tags in tags.items() for tag in image_tags],
+    )
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_master_image (image_id, member_id) VALUES (?, ?)",
+        [(image_id, 7 if image_id % 2 else 8) for image_id in tags],
+    )
+    pixivutil_db.executemany("INSERT INTO pixiv_date_info VALUES (?, 0, ?, '', '')", [(1, 100), (2, 200), (5, 500)])
+    pixivutil_db.execute("INSERT INTO pixiv_ai_info VALUES (5, 2, '', '')")
+    pixivutil_db.commit()
+
+    def query(expression, **filters):
+        request = TagQueryRequest.model_validate({"query": expression, **filters})
+        return repository.query_image_ids_by_tags(request.query, **request.model_dump(exclude={"query"}))
+
+    repository = PixivUtilRepository()
+    repository.open()
+    try:
+        assert query({"all_of": ["cat", "sky", {"none_of": ["night"]}]}) == [5, 1]
+        assert query({"any_of": ["night", "dog"]}) == [6, 2]
+        assert query({"none_of": ["cat", "sky"]}) == [6]
+        assert query("missing") == []
+        assert query({"all_of": ["cat", "sky"]}, member_id=7) == [5, 1]
+        assert query({"all_of": ["cat", "sky"]}, uploaded_after=150, uploaded_before=600) == [5, 2]
+        assert query({"all_of": ["cat", "sky"]}, ai=False) == [2, 1]
+        assert query("cat", limit=2) == [5, 3]
+        assert query("cat", limit=2, before_image_id=3) == [2, 1]
+    finally:
+        repository.close()
+
+
+def test_member_and_tag_image_pages(pixivutil_db: sqlite3.Connection):
+    pixivutil_db.execute("INSERT INTO pixiv_master_member VALUES (7, 'artist', '/d', '', '', 0, 0, NULL)")
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_master_image VALUES (?, 7, 'title', 'save', '', '', 'N', 'a long caption')",
+        [(image_id,) for image_id in (3, 1, 5, 2, 4)],
+    )
+    pixivutil_db.execute("INSERT INTO pixiv_master_tag VALUES ('cat', '', '')")
+    pixivutil_db.executemany("INSERT INTO pixiv_image_to_tag VALUES (?, 'cat', '', '')", [(1,), (2,), (4,)])
+    pixivutil_db.commit()
+
+    repository = PixivUtilRepository()
+    repository.open()
+    try:
+        repository.create_indexes()
+
+        # Without a limit everything is returned, as before.
+        portfolio = repository.get_member_data_by_id(7)
+        assert [image.image_id for image in portfolio.images] == [1, 2, 3, 4, 5]
+        assert (portfolio.total_images, portfolio.next_cursor) == (5, None)
+
+        page = repository.get_member_data_by_id(7, limit=2, after=4, order="desc", fields="no_caption")
+        assert [image.image_id for image in page.images] == [3, 2]
+        assert page.images[0].caption is None
+        assert page.next_cursor == 2
+        last = repository.get_member_data_by_id(7, limit=2, after=page.next_cursor, order="desc", fields="ids")
+        assert (last.images, last.image_ids, last.next_cursor) == ([], [1], None)
+
+        tag_page = repository.get_tag_info_by_id("cat", limit=2, fields="ids")
+        assert (tag_page.image_ids, tag_page.total_images, tag_page.next_cursor) == ([1, 2], 3, 2)
+        tag_page = repository.get_tag_info_by_id("cat", limit=2, after=2)
+        assert [image.image_id for image in tag_page.images] == [4]
+
+        plan = " ".join(
+            row[3] for row in repository.connection.execute(
+                "EXPLAIN QUERY PLAN SELECT COUNT(*) FROM pixiv_master_image WHERE member_id = ?", (7,)
+            )
+        )
+        assert "COVERING INDEX" in plan
+    finally:
+        repository.close()
+
+
+def test_open_applies_performance_profile(pixivutil_db: sqlite3.Connection, monkeypatch):
+    monkeypatch.setattr(sqlite_config, "mmap_size_mb", 64)
+    monkeypatch.setattr(sqlite_config, "cache_size_mb", 16)
+    monkeypatch.setattr(sqlite_config, "temp_store", "memory")
+    monkeypatch.setattr(sqlite_config, "query_only_readers", True)
+
+    repository = PixivUtilRepository()
+    repository.open(reader=True)
+    try:
+        assert repository.connection.execute("PRAGMA mmap_size").fetchone()[0] == 64 * 1024 * 1024
+        assert repository.connection.execute("PRAGMA cache_size").fetchone()[0] == -16 * 1024
+        assert repository.connection.execute("PRAGMA temp_store").fetchone()[0] == 2
+        with pytest.raises(sqlite3.OperationalError):
+            repository.connection.execute("DELETE FROM pixiv_master_image")
+    finally:
+        repository.close()
+
+    # Only readers refuse writes.
+    repository = PixivUtilRepository()
+    repository.open()
+    try:
+        assert repository.connection.execute("PRAGMA query_only").fetchone()[0] == 0
+    finally:
+        repository.close()
+
+
+def test_new_database_gets_configured_page_size(temp_dir, monkeypatch):
+    monkeypatch.setattr(sqlite_config, "page_size", 8192)
+
+    repository = PixivUtilRepository(db_path=str(temp_dir / "new.sqlite"))
+    repository.open()
+    try:
+        repository.connection.execute("CREATE TABLE t (x)")
+        assert repository.connection.execute("PRAGMA page_size").fetchone()[0] == 8192
+        assert repository.connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        repository.close()
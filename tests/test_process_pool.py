@@ -0,0 +1,39 @@
+import multiprocessing
+import operator
+import os
+
+import pytest
+
+from PixivServer.service.process_pool import ProcessPool
+
+
+def pool_pid(results):
+    pool = ProcessPool(workers=1)
+    try:
+        results.put(pool.submit(os.getpid).result(timeout=60))
+    finally:
+        pool.close()
+
+
+def test_submit_returns_results_and_exceptions():
+    pool = ProcessPool(workers=2)
+    try:
+        assert pool.submit(operator.mul, 6, 7).result(timeout=60) == 42
+        with pytest.raises(ZeroDivisionError):
+            pool.submit(operator.truediv, 1, 0).result(timeout=60)
+    finally:
+        pool.close()
+
+
+def test_pool_starts_from_daemonic_process():
+    # Celery's prefork children are daemonic, where ProcessPoolExecutor cannot start processes.
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=pool_pid, args=(results, ), daemon=True)
+    process.start()
+    try:
+        pid = results.get(timeout=60)
+    finally:
+        process.join(timeout=60)
+    assert process.exitcode == 0
+    assert pid not in (os.getpid(), process.pid)
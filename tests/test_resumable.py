@@ -0,0 +1,137 @@
+import threading
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from PixivServer.service.resumable import (
+    IncompleteDownloadError,
+    download_file,
+    wrap_download_handler,
+)
+
+CONTENT = bytes(range(256)) * 64
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    # Set by tests: bytes to send before dropping the connection, the ETag to advertise, and
+    # whether to send Content-Length (without it the body ends when the connection closes).
+    cut_after: int | None = None
+    etag = '"v1"'
+    send_length = True
+    requests: list[dict[str, str]] = []
+
+    def do_GET(self):
+        type(self).requests.append(dict(self.headers))
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range", self.etag) == self.etag:
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}")
+        else:
+            self.send_response(200)
+        body = CONTENT[start:]
+        if self.send_length:
+            self.send_header("Content-Length", str(len(body)))
+        else:
+            self.close_connection = True
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+        if self.cut_after is not None:
+            self.wfile.write(body[:self.cut_after])
+            type(self).cut_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        return
+
+
+@pytest.fixture
+def server():
+    RangeHandler.requests = []
+    RangeHandler.cut_after = None
+    RangeHandler.etag = '"v1"'
+    RangeHandler.send_length = True
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/image.png"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_interrupted_download_resumes_with_range(server, temp_dir):
+    destination = str(temp_dir / "image.png")
+    RangeHandler.cut_after = 5000
+
+    with pytest.raises(IncompleteDownloadError):
+        download_file(server, destination, timeout=5)
+    assert (temp_dir / "image.png.part").stat().st_size == 5000
+
+    assert download_file(server, destination, timeout=5) == len(CONTENT)
+    assert (temp_dir / "image.png").read_bytes() == CONTENT
+    assert not (temp_dir / "image.png.part").exists()
+    assert not (temp_dir / "image.png.part.json").exists()
+    assert RangeHandler.requests[-1]["Range"] == "bytes=5000-"
+    assert RangeHandler.requests[-1]["If-Range"] == '"v1"'
+
+
+def test_changed_file_restarts_download(server, temp_dir):
+    destination = str(temp_dir / "image.png")
+    RangeHandler.cut_after = 5000
+    with pytest.raises(IncompleteDownloadError):
+        download_file(server, destination, timeout=5)
+
+    RangeHandler.etag = '"v2"'
+    assert download_file(server, destination, timeout=5) == len(CONTENT)
+    assert (temp_dir / "image.png").read_bytes() == CONTENT
+
+
+def test_download_handler_resumes_through_browser(server, temp_dir):
+    mechanize = pytest.importorskip("mechanize")
+    from PixivServer.service.browser import browser_opener, install_pooled_handler
+    from PixivServer.service.http_pool import HttpConnectionPool
+
+    def perform_download(url, file_size, filename, overwrite, config, referer=None, notifier=None):
+        raise AssertionError("PixivUtil2's own download should be replaced")
+
+    download_handler = types.ModuleType("PixivDownloadHandler")
+    download_handler.perform_download = perform_download  # type: ignore[attr-defined]
+    browser = mechanize.Browser()
+    browser.set_handle_robots(False)
+    pool = HttpConnectionPool()
+    install_pooled_handler(browser, pool)
+    wrap_download_handler(download_handler, browser_opener(browser), timeout=5)
+    wrap_download_handler(download_handler, browser_opener(browser), timeout=5)
+    destination = str(temp_dir / "member" / "image.png")
+    part = temp_dir / "member" / "image.png.part"
+    notifications = []
+    RangeHandler.send_length = False
+
+    try:
+        # Without Content-Length, only the known file size shows the body was cut short.
+        RangeHandler.cut_after = 5000
+        with pytest.raises(IncompleteDownloadError):
+            download_handler.perform_download(server, len(CONTENT), destination, False, None, "https://www.pixiv.net/")
+        assert part.stat().st_size == 5000
+
+        RangeHandler.cut_after = 3000
+        with pytest.raises(IncompleteDownloadError):
+            download_handler.perform_download(server, len(CONTENT), destination, True, None)
+        assert "Range" not in RangeHandler.requests[-1]
+        assert part.stat().st_size == 3000
+
+        result = download_handler.perform_download(
+            server, -1, destination, False, None, notifier=lambda **kwargs: notifications.append(kwargs)
+        )
+        assert result == (len(CONTENT), destination)
+    finally:
+        pool.close()
+    assert (temp_dir / "member" / "image.png").read_bytes() == CONTENT
+    assert not part.exists()
+    assert RangeHandler.requests[0]["Referer"] == "https://www.pixiv.net/"
+    assert RangeHandler.requests[-1]["Range"] == "bytes=3000-"
+    assert [notification["type"] for notification in notifications] == ["DOWNLOAD", "DOWNLOAD"]
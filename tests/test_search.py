@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from PixivServer.repository.search import build_match_query
+from PixivServer.service import search
+
+
+def test_backfill_and_triggers_keep_index_in_sync(pixivutil_db: sqlite3.Connection):
+    # Rows written before the index exists are only found after a backfill.
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_master_image (image_id, member_id, title, caption) VALUES (?, 1, ?, ?)",
+        [(1, "Sunset over the harbor", "watercolor study"), (2, "Harbor lights", None), (3, "夕焼けの港", "")],
+    )
+    pixivutil_db.execute("INSERT INTO pixiv_master_member (member_id, name) VALUES (1, 'harborpainter')")
+    pixivutil_db.commit()
+
+    search.install_search_index()
+    assert search.search("harbor") == []
+    assert search.backfill_search_index(batch_size=2) == {"image": 3, "member": 1, "tag": 0}
+    assert search.backfill_search_index(batch_size=2) == {"image": 0, "member": 0, "tag": 0}
+
+    results = search.search("harbor")
+    assert {(result["kind"], result["id"]) for result in results} == {("image", 1), ("image", 2), ("member", 1)}
+    assert [result["id"] for result in search.search("harbor", kind="member")] == [1]
+    assert [result["id"] for result in search.search("焼けの")] == [3]
+    assert [result["id"] for result in search.search("watercolor harbor")] == [1]
+
+    # New and changed rows are indexed by the triggers.
+    pixivutil_db.execute("INSERT INTO pixiv_master_tag (tag_id) VALUES ('風景')")
+    pixivutil_db.execute("INSERT INTO pixiv_tag_translation (tag_id, translation_type, translation) VALUES ('風景', 'en', 'landscape')")
+    pixivutil_db.execute("UPDATE pixiv_master_image SET title = 'Night market' WHERE image_id = 2")
+    pixivutil_db.execute("DELETE FROM pixiv_master_member WHERE member_id = 1")
+    pixivutil_db.commit()
+
+    assert [(result["kind"], result["id"]) for result in search.search("landscape")] == [("tag", "風景")]
+    assert [result["id"] for result in search.search("harbor")] == [1]
+    assert [result["id"] for result in search.search("market")] == [2]
+    assert search.get_status()["member"]["documents"] == 0
+
+
+def test_build_match_query_quotes_terms():
+    assert build_match_query('blue "sky" NOT') == '"blue" """sky""" "NOT"'
+    with pytest.raises(ValueError):
+        build_match_query("   ")
+    with pytest.raises(ValueError):
+        build_match_query("an apple")
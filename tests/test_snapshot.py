@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+from prometheus_client import REGISTRY
+
+from PixivServer.repository import snapshot as snapshot_module
+from PixivServer.repository.snapshot import DatabaseSnapshot
+
+FULL_COPIES_SAMPLE = "pixivutil_database_snapshot_refreshes_total"
+
+
+def make_snapshot(temp_dir, **kwargs) -> DatabaseSnapshot:
+    options = {"interval_seconds": 60, "max_staleness_seconds": 600, "pages_per_step": 1}
+    options.update(kwargs)
+    return DatabaseSnapshot(enabled=True, snapshot_path=str(temp_dir / "snapshot.sqlite"), **options)
+
+
+def test_reads_come_from_the_snapshot_until_refreshed(pixivutil_db: sqlite3.Connection, temp_dir, monkeypatch):
+    monkeypatch.setattr(snapshot_module, "STEP_PAUSE_SECONDS", 0)
+    pixivutil_db.execute("PRAGMA journal_mode=WAL")
+    pixivutil_db.execute("INSERT INTO pixiv_master_image (image_id, member_id) VALUES (1, 1)")
+    pixivutil_db.commit()
+    snapshot = make_snapshot(temp_dir)
+
+    # Until the first refresh, reads go to the live database.
+    assert not snapshot.reader().read_only
+    snapshot.refresh()
+    pixivutil_db.execute("INSERT INTO pixiv_master_image (image_id, member_id) VALUES (2, 1)")
+    pixivutil_db.commit()
+
+    reader = snapshot.reader()
+    reader.open()
+    try:
+        assert reader.db_path == snapshot.snapshot_path
+        assert reader.get_all_pixiv_image_ids() == [1]
+        with pytest.raises(sqlite3.OperationalError):
+            reader.connection.execute("DELETE FROM pixiv_master_image")
+    finally:
+        reader.close()
+
+    snapshot.refresh()
+    reader = snapshot.reader()
+    reader.open()
+    try:
+        assert reader.get_all_pixiv_image_ids() == [1, 2]
+    finally:
+        reader.close()
+
+    # A snapshot past the staleness limit is not used.
+    snapshot.refreshed_at -= 601
+    assert snapshot.reader().db_path != snapshot.snapshot_path
+
+
+def test_backup_restarted_by_writes_is_copied_in_one_step(pixivutil_db: sqlite3.Connection, temp_dir, monkeypatch):
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_master_image (image_id, member_id, caption) VALUES (?, 1, zeroblob(2000))",
+        [(image_id,) for image_id in range(100)],
+    )
+    pixivutil_db.commit()
+    writes = iter(range(1000, 2000))
+
+    def write_during_step(*_):
+        pixivutil_db.execute("INSERT INTO pixiv_master_image (image_id, member_id) VALUES (?, 1)", (next(writes),))
+        pixivutil_db.commit()
+
+    monkeypatch.setattr(snapshot_module.time, "sleep", write_during_step)
+    full_copies = REGISTRY.get_sample_value(FULL_COPIES_SAMPLE, {"result": "full"}) or 0
+    snapshot = make_snapshot(temp_dir)
+    snapshot.refresh()
+    assert REGISTRY.get_sample_value(FULL_COPIES_SAMPLE, {"result": "full"}) == full_copies + 1
+
+    copy = sqlite3.connect(snapshot.snapshot_path)
+    try:
+        assert copy.execute("SELECT COUNT(*) FROM pixiv_master_image WHERE image_id < 100").fetchone() == (100,)
+        assert copy.execute("PRAGMA journal_mode").fetchone() == ("delete",)
+    finally:
+        copy.close()
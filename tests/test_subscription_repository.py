@@ -0,0 +1,57 @@
+import sqlite3
+
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.repository.subscription import SubscriptionRepository
+
+
+def test_tag_subscription_table_is_migrated(pixivutil_db: sqlite3.Connection):
+    """Test that subscription tables created before high-water marks gain the new columns."""
+    pixivutil_db.execute(
+        """CREATE TABLE pixiv_server_tag_subscription (
+           tag_id VARCHAR(255) PRIMARY KEY ON CONFLICT IGNORE,
+           bookmark_count INTEGER,
+           created_date DATE,
+           last_modified_date DATE)"""
+    )
+    pixivutil_db.execute("INSERT INTO pixiv_server_tag_subscription VALUES ('landscape', 100, NULL, NULL)")
+    pixivutil_db.commit()
+
+    repository = SubscriptionRepository()
+    repository.open()
+    try:
+        assert repository.select_tag_subscription_states() == [("landscape", 100, None, None)]
+    finally:
+        repository.close()
+
+
+def test_tag_high_water_mark_never_moves_backwards(pixivutil_db: sqlite3.Connection):
+    repository = SubscriptionRepository()
+    repository.open()
+    try:
+        repository.add_tag_subscription("landscape", 100)
+        repository.update_tag_high_water_mark("landscape", 200, "2024-05-01")
+        repository.update_tag_high_water_mark("landscape", 150, "2024-04-01")
+        assert repository.select_tag_subscription_states() == [("landscape", 100, 200, "2024-05-01")]
+
+        repository.update_tag_high_water_mark("landscape", 300, None)
+        assert repository.select_tag_subscription_states() == [("landscape", 100, 300, "2024-05-01")]
+    finally:
+        repository.close()
+
+
+def test_get_tag_high_water_mark(pixivutil_db: sqlite3.Connection):
+    pixivutil_db.executemany(
+        "INSERT INTO pixiv_image_to_tag VALUES (?, ?, '', '')",
+        [(10, "landscape"), (30, "landscape"), (20, "landscape"), (40, "portrait")],
+    )
+    pixivutil_db.execute("INSERT INTO pixiv_date_info VALUES (30, 1714500000, 1714521600, '', '')")
+    pixivutil_db.commit()
+
+    repository = PixivUtilRepository()
+    repository.open()
+    try:
+        assert repository.get_tag_high_water_mark("landscape") == (30, 1714521600)
+        assert repository.get_tag_high_water_mark("portrait") == (40, None)
+        assert repository.get_tag_high_water_mark("missing") is None
+    finally:
+        repository.close()
@@ -0,0 +1,105 @@
+import asyncio
+import sqlite3
+
+from PixivServer.config.server import config as server_config
+from PixivServer.repository.async_pixivutil import AsyncPixivUtilRepository
+from PixivServer.repository.tag_stats import TagStatsRepository
+from PixivServer.service import tag_stats
+
+
+def link(connection: sqlite3.Connection, image_id: int, *tag_ids: str):
+    connection.executemany(
+        "INSERT INTO pixiv_image_to_tag (image_id, tag_id) VALUES (?, ?)",
+        [(image_id, tag_id) for tag_id in tag_ids],
+    )
+    connection.commit()
+
+
+def recount(connection: sqlite3.Connection, top_tags: tuple[str, ...] = ()) -> tuple[dict, dict]:
+    counts = dict(connection.execute("SELECT tag_id, COUNT(*) FROM pixiv_image_to_tag GROUP BY tag_id"))
+    pairs = dict(connection.execute(
+        f'''SELECT a.tag_id || '|' || b.tag_id, COUNT(*) FROM pixiv_image_to_tag a
+           JOIN pixiv_image_to_tag b ON b.image_id = a.image_id AND b.tag_id != a.tag_id
+           WHERE a.tag_id IN ({", ".join("?" for _ in top_tags)})
+           GROUP BY a.tag_id, b.tag_id''',
+        top_tags,
+    ))
+    return counts, pairs
+
+
+def stored(connection: sqlite3.Connection) -> tuple[dict, dict]:
+    counts = dict(connection.execute("SELECT tag_id, image_count FROM pixiv_server_tag_count"))
+    pairs = dict(connection.execute("SELECT tag_id || '|' || other_tag_id, image_count FROM pixiv_server_tag_pair"))
+    return counts, pairs
+
+
+def test_rebuild_and_triggers_keep_counts_exact(pixivutil_db: sqlite3.Connection, monkeypatch):
+    monkeypatch.setattr(server_config, "tag_stats_top_tags", 2)
+    link(pixivutil_db, 1, "cat", "sky")
+    link(pixivutil_db, 2, "cat", "sea")
+    link(pixivutil_db, 3, "cat", "sea", "sky")
+
+    tag_stats.install_tag_stats()
+    assert tag_stats.get_status()["complete"] is False
+    assert tag_stats.get_tag_count("cat")["image_count"] == 0
+
+    # Writes during a rebuild are counted once, whether or not the rebuild has passed them.
+    repository = TagStatsRepository()
+    repository.open()
+    try:
+        assert repository.rebuild_chunk(batch_size=2) == 2
+    finally:
+        repository.close()
+    pixivutil_db.execute("DELETE FROM pixiv_image_to_tag WHERE image_id = 1 AND tag_id = 'sky'")
+    pixivutil_db.execute("DELETE FROM pixiv_image_to_tag WHERE image_id = 3 AND tag_id = 'cat'")
+    link(pixivutil_db, 4, "sea", "sky")
+    assert tag_stats.rebuild_tag_stats() == 2
+    assert stored(pixivutil_db) == recount(pixivutil_db, ("cat", "sea"))
+
+    tag_stats.rebuild_tag_stats(restart=True, batch_size=1, pause_seconds=0)
+    assert stored(pixivutil_db) == recount(pixivutil_db, ("cat", "sea"))
+    assert tag_stats.get_status()["complete"] is True
+
+    top = tag_stats.get_top_tags(limit=2)
+    assert top == {"tags": [{"tag_id": "sea", "image_count": 3}, {"tag_id": "cat", "image_count": 2}], "complete": True}
+    assert tag_stats.get_related_tags("sea")["related"] == [
+        {"tag_id": "sky", "image_count": 2},
+        {"tag_id": "cat", "image_count": 1},
+    ]
+    assert tag_stats.get_tag_count("sky") == {"tag_id": "sky", "image_count": 2, "complete": True}
+
+    # Pairs are kept for the top tags only; a rebuild of complete statistics refreshes which those are.
+    link(pixivutil_db, 5, "cat", "sky")
+    assert stored(pixivutil_db) == recount(pixivutil_db, ("cat", "sea"))
+    link(pixivutil_db, 6, "sky")
+    assert tag_stats.rebuild_tag_stats() == 0
+    assert stored(pixivutil_db) == recount(pixivutil_db, ("cat", "sky"))
+    assert tag_stats.get_related_tags("sea") == {"tag_id": "sea", "related": [], "top_tag": False, "complete": True}
+    assert tag_stats.get_status()["top_tags"] == 2
+
+
+def test_empty_database_needs_no_rebuild(pixivutil_db: sqlite3.Connection):
+    tag_stats.install_tag_stats()
+    link(pixivutil_db, 1, "cat", "sky")
+    assert tag_stats.get_status()["complete"] is True
+    assert stored(pixivutil_db) == recount(pixivutil_db)
+    assert tag_stats.rebuild_tag_stats() == 0
+    assert stored(pixivutil_db) == recount(pixivutil_db, ("cat", "sky"))
+
+
+def test_stats_are_read_on_database_read_threads(pixivutil_db: sqlite3.Connection):
+    tag_stats.install_tag_stats()
+    link(pixivutil_db, 1, "cat", "sky")
+    repository = AsyncPixivUtilRepository(workers=1, max_queued=0, query_timeout_seconds=5)
+
+    async def read() -> list[dict]:
+        # The thread's connection is reused, so the first read must leave it open.
+        return [
+            await repository.run("get_tag_count", lambda repository: tag_stats.get_tag_count("cat", repository.connection))
+            for _ in range(2)
+        ]
+
+    try:
+        assert asyncio.run(read()) == [{"tag_id": "cat", "image_count": 1, "complete": True}] * 2
+    finally:
+        repository.close()
@@ -0,0 +1,94 @@
+import io
+import os
+import sqlite3
+import zipfile
+
+import pytest
+
+from PixivServer.config.server import config as server_config
+from PixivServer.repository.pixivutil import PixivUtilRepository
+from PixivServer.service.thumbnails import ThumbnailCache, resolve_thumbnail_source
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def png_bytes(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def downloads_dir(temp_dir, monkeypatch):
+    downloads = temp_dir / "downloads"
+    downloads.mkdir()
+    monkeypatch.setattr(server_config, "downloads_dir", str(downloads))
+    return downloads
+
+
+@pytest.fixture
+def cache(temp_dir):
+    cache = ThumbnailCache(temp_dir / "thumbnails", max_bytes=10 * 1024 ** 2, workers=1, quality=80)
+    yield cache
+    cache.close()
+
+
+def test_thumbnail_is_rendered_once_and_refreshed_when_source_changes(
+    pixivutil_db: sqlite3.Connection, downloads_dir, cache: ThumbnailCache
+):
+    original = downloads_dir / "1_p0.png"
+    original.write_bytes(png_bytes(800, 400))
+    pixivutil_db.execute("INSERT INTO pixiv_master_image (image_id, member_id, save_name) VALUES (1, 7, ?)", (str(original),))
+    pixivutil_db.commit()
+
+    repository = PixivUtilRepository()
+    repository.open()
+    try:
+        source = resolve_thumbnail_source(repository, 1, 0)
+        path = cache.get(1, 0, 256, "webp", source)
+        with Image.open(path) as thumbnail:
+            assert thumbnail.format == "WEBP"
+            assert thumbnail.size == (256, 128)
+        assert path.stat().st_mtime_ns == source.mtime_ns
+        assert cache.total_bytes() == path.stat().st_size
+
+        os.utime(original, ns=(source.mtime_ns, source.mtime_ns + 1_000_000_000))
+        refreshed = resolve_thumbnail_source(repository, 1, 0)
+        assert cache.get(1, 0, 256, "webp", refreshed) == path
+        assert path.stat().st_mtime_ns == refreshed.mtime_ns
+    finally:
+        repository.close()
+
+
+def test_thumbnail_of_archive_mode_page(pixivutil_db: sqlite3.Connection, downloads_dir, cache: ThumbnailCache):
+    archive = downloads_dir / "2.zip"
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        zip_file.writestr("2_p1.png", png_bytes(300, 600))
+    pixivutil_db.execute("INSERT INTO pixiv_master_image (image_id, member_id, save_name) VALUES (2, 7, ?)", (str(archive),))
+    pixivutil_db.execute("INSERT INTO pixiv_manga_image (image_id, page, save_name) VALUES (2, 1, '2_p1.png')")
+    pixivutil_db.commit()
+
+    repository = PixivUtilRepository()
+    repository.open()
+    try:
+        source = resolve_thumbnail_source(repository, 2, 1)
+        with Image.open(cache.get(2, 1, 128, "jpeg", source)) as thumbnail:
+            assert thumbnail.format == "JPEG"
+            assert thumbnail.size == (64, 128)
+        with pytest.raises(KeyError):
+            resolve_thumbnail_source(repository, 2, 0)
+    finally:
+        repository.close()
+
+
+def test_evict_removes_least_recently_used(temp_dir):
+    cache = ThumbnailCache(temp_dir / "thumbnails", max_bytes=150, workers=1, quality=80)
+    paths = [cache.path_for(image_id, 0, 256, "webp") for image_id in range(3)]
+    for atime, path in enumerate(paths):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (atime, atime))
+
+    assert cache.evict() == 200
+    assert [path.exists() for path in paths] == [False, False, True]
+    assert cache.total_bytes() == 100
@@ -0,0 +1,55 @@
+import io
+import json
+import shutil
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from PixivServer.service.ugoira import convert_ugoira, is_ugoira_zip, read_frame_delays
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def write_ugoira(path: Path, delays: list[int]):
+    with zipfile.ZipFile(path, "w") as archive:
+        for index, color in enumerate(["red", "green", "blue"][:len(delays)]):
+            buffer = io.BytesIO()
+            Image.new("RGB", (16, 16), color).save(buffer, format="JPEG")
+            archive.writestr(f"{index:06d}.jpg", buffer.getvalue())
+    with zipfile.ZipFile(path.with_suffix(".ugoira"), "w") as archive:
+        frames = [{"file": f"{index:06d}.jpg", "delay": delay} for index, delay in enumerate(delays)]
+        archive.writestr("animation.json", json.dumps({"ugokuIllustData": {"frames": frames}}))
+
+
+def test_is_ugoira_zip(tmp_path: Path):
+    ugoira = tmp_path / "1_ugoira.zip"
+    write_ugoira(ugoira, [50, 80])
+    archive = tmp_path / "2.zip"
+    with zipfile.ZipFile(archive, "w") as file:
+        file.writestr("2_p0.png", b"")
+    (tmp_path / "3.zip").write_bytes(b"not a zip")
+
+    assert is_ugoira_zip(ugoira)
+    assert not is_ugoira_zip(archive)
+    assert not is_ugoira_zip(tmp_path / "3.zip")
+    assert read_frame_delays(ugoira, 100) == [("000000.jpg", 50), ("000001.jpg", 80)]
+    ugoira.with_suffix(".ugoira").unlink()
+    assert read_frame_delays(ugoira, 100) == [("000000.jpg", 100), ("000001.jpg", 100)]
+
+
+@pytest.mark.parametrize("image_format", ["gif", "apng", "webp", "webm"])
+def test_convert_ugoira(tmp_path: Path, image_format: str):
+    if image_format == "webm" and shutil.which("ffmpeg") is None:
+        pytest.skip("ffmpeg is not installed")
+    ugoira = tmp_path / "1_ugoira.zip"
+    write_ugoira(ugoira, [50, 80, 120])
+    output = tmp_path / f"1_ugoira.{image_format}"
+
+    cpu_seconds = convert_ugoira(str(ugoira), str(output), image_format, timeout=60, default_delay_ms=100)
+
+    assert cpu_seconds >= 0
+    assert [path.name for path in tmp_path.iterdir() if path.name.endswith(".tmp")] == []
+    if image_format != "webm":
+        with Image.open(output) as animation:
+            assert animation.n_frames == 3
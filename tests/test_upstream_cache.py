@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+
+from PixivServer.service.upstream_cache import UpstreamCache
+
+
+@dataclass
+class ParsedImage:
+    image_id: int
+    title: str
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.calls: list[int] = []
+
+    def getImagePage(self, image_id, parent=None, from_bookmark=False):
+        self.calls.append(image_id)
+        if image_id == 404:
+            return None, "not found"
+        return ParsedImage(image_id, f"title {len(self.calls)}"), "{}"
+
+
+def test_browser_pages_are_cached_across_restarts(temp_dir):
+    db_path = str(temp_dir / "cache.sqlite")
+    browser = FakeBrowser()
+    cache = UpstreamCache(ttl_seconds=600, max_entries=100, db_path=db_path)
+    cache.open()
+    try:
+        cache.wrap_browser(browser)
+        cache.wrap_browser(browser)
+        first = browser.getImagePage(1)
+        # Keyword and positional calls share a key; object arguments are not part of it.
+        assert browser.getImagePage(image_id=1, parent=object()) == first
+        browser.getImagePage(404)
+        browser.getImagePage(404)
+        assert browser.calls == [1, 404, 404]
+
+        with cache.bypass():
+            refreshed = browser.getImagePage(1)
+        assert refreshed[0].title == "title 4"
+    finally:
+        cache.close()
+
+    restarted = UpstreamCache(ttl_seconds=600, max_entries=100, db_path=db_path)
+    restarted.open()
+    try:
+        other_browser = FakeBrowser()
+        restarted.wrap_browser(other_browser)
+        assert other_browser.getImagePage(1) == refreshed
+        assert other_browser.calls == []
+    finally:
+        restarted.close()
+
+
+def test_expired_entries_are_refetched(temp_dir):
+    browser = FakeBrowser()
+    cache = UpstreamCache(ttl_seconds=600, max_entries=100, db_path=str(temp_dir / "cache.sqlite"))
+    cache.open()
+    try:
+        cache.wrap_browser(browser)
+        browser.getImagePage(1)
+        cache.ttl_seconds = 1e-9
+        browser.getImagePage(1)
+        assert browser.calls == [1, 1]
+        assert cache.repository.prune(min_stored_at=0, max_entries=0) == 1
+    finally:
+        cache.close()
@@ -0,0 +1,78 @@
+import sqlite3
+
+import pytest
+
+from PixivServer.config.server import config as server_config
+from PixivServer.repository.manifest import ManifestRepository
+from PixivServer.service import verification
+
+
+@pytest.fixture
+def downloads_dir(temp_dir, monkeypatch):
+    downloads = temp_dir / "downloads"
+    (downloads / "member").mkdir(parents=True)
+    monkeypatch.setattr(server_config, "downloads_dir", str(downloads))
+    return downloads
+
+
+def add_artwork(connection: sqlite3.Connection, image_id: int, *paths):
+    connection.execute("INSERT INTO pixiv_master_image (image_id, member_id, save_name) VALUES (?, 7, ?)", (image_id, str(paths[0])))
+    for page, path in enumerate(paths):
+        connection.execute("INSERT INTO pixiv_manga_image (image_id, page, save_name) VALUES (?, ?, ?)", (image_id, page, str(path)))
+    connection.commit()
+
+
+def test_verify_downloads_reports_missing_corrupt_and_orphaned_files(pixivutil_db: sqlite3.Connection, downloads_dir):
+    member = downloads_dir / "member"
+    (member / "1_p0.png").write_bytes(b"page 0")
+    (member / "1_p1.png").write_bytes(b"page 1")
+    (member / "2_p0.png").write_bytes(b"original")
+    (member / "stray.png").write_bytes(b"stray")
+    (member / "4_p0.png.part").write_bytes(b"partial")
+    add_artwork(pixivutil_db, 1, member / "1_p0.png", member / "1_p1.png")
+    add_artwork(pixivutil_db, 2, member / "2_p0.png")
+    add_artwork(pixivutil_db, 3, member / "3_p0.png")
+
+    verification.record_artworks([1, 2])
+    (member / "2_p0.png").write_bytes(b"truncated!!")
+
+    repaired: list[int] = []
+    run = verification.verify_downloads(batch_size=2, workers=2, on_issues=repaired.extend)
+    assert run["artworks"] == 3
+    assert run["files"] == 4
+    assert (run["missing"], run["corrupt"], run["orphaned"]) == (1, 1, 1)
+    assert run["finished_date"] is not None
+    assert repaired == [2, 3]
+
+    report = verification.get_report()
+    assert {(issue["path"], issue["status"]) for issue in report["issues"]} == {
+        (str(member / "2_p0.png"), "corrupt"),
+        (str(member / "3_p0.png"), "missing"),
+        (str(member / "stray.png"), "orphaned"),
+    }
+
+
+def test_verify_downloads_resumes_unfinished_run(pixivutil_db: sqlite3.Connection, downloads_dir):
+    member = downloads_dir / "member"
+    for image_id in (1, 2, 3):
+        (member / f"{image_id}_p0.png").write_bytes(b"x")
+        add_artwork(pixivutil_db, image_id, member / f"{image_id}_p0.png")
+
+    def interrupt(image_ids: list[int]):
+        raise RuntimeError("worker lost")
+
+    (member / "1_p0.png").unlink()
+    with pytest.raises(RuntimeError):
+        verification.verify_downloads(batch_size=1, on_issues=interrupt)
+
+    # The interrupted batch was saved before the callback, so the run continues after it.
+    run = verification.verify_downloads(batch_size=1)
+    assert run["artworks"] == 3
+    assert run["missing"] == 1
+
+    repository = ManifestRepository()
+    repository.open()
+    try:
+        assert repository.get_run()["last_image_id"] == 3
+    finally:
+        repository.close()
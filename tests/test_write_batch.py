@@ -0,0 +1,105 @@
+import sqlite3
+
+import pytest
+
+from PixivServer.config.server import config as server_config
+from PixivServer.repository.write_batch import BatchingConnection
+
+
+def count_images(db_path) -> int:
+    reader = sqlite3.connect(db_path)
+    try:
+        return reader.execute("SELECT COUNT(*) FROM pixiv_master_image").fetchone()[0]
+    finally:
+        reader.close()
+
+
+def insert_image(connection: sqlite3.Connection, image_id: int):
+    # Like PixivUtil2's database manager: one statement, then commit.
+    connection.execute("INSERT INTO pixiv_master_image (image_id, member_id) VALUES (?, 1)", (image_id, ))
+    connection.commit()
+
+
+def test_commits_are_batched_until_size_or_flush(pixivutil_db: sqlite3.Connection, temp_dir, monkeypatch):
+    monkeypatch.setattr(server_config, "database_write_batch_size", 3)
+    monkeypatch.setattr(server_config, "database_write_batch_seconds", 3600)
+    db_path = temp_dir / "db.sqlite"
+    pixivutil_db.execute("PRAGMA journal_mode=WAL")
+    connection = sqlite3.connect(db_path, factory=BatchingConnection)
+    try:
+        insert_image(connection, 1)
+        insert_image(connection, 2)
+        assert connection.pending_writes == 2
+        assert count_images(db_path) == 0
+
+        insert_image(connection, 3)
+        assert connection.pending_writes == 0
+        assert count_images(db_path) == 3
+
+        insert_image(connection, 4)
+        connection.flush()
+        assert count_images(db_path) == 4
+    finally:
+        connection.close()
+
+
+def test_rollback_keeps_earlier_writes_of_batch(pixivutil_db: sqlite3.Connection, temp_dir, monkeypatch):
+    monkeypatch.setattr(server_config, "database_write_batch_size", 100)
+    monkeypatch.setattr(server_config, "database_write_batch_seconds", 3600)
+    db_path = temp_dir / "db.sqlite"
+    connection = sqlite3.connect(db_path, factory=BatchingConnection)
+    insert_image(connection, 1)
+    connection.execute("INSERT INTO pixiv_master_image (image_id, member_id) VALUES (2, 1)")
+    connection.rollback()
+    assert connection.execute("SELECT image_id FROM pixiv_master_image").fetchall() == [(1, )]
+
+    # Closing commits the batch instead of discarding it.
+    connection.close()
+    assert count_images(db_path) == 1
+
+
+def test_batch_is_committed_after_delay(pixivutil_db: sqlite3.Connection, temp_dir, monkeypatch):
+    monkeypatch.setattr(server_config, "database_write_batch_size", 100)
+    monkeypatch.setattr(server_config, "database_write_batch_seconds", 0)
+    db_path = temp_dir / "db.sqlite"
+    connection = sqlite3.connect(db_path, factory=BatchingConnection)
+    try:
+        insert_image(connection, 1)
+        assert count_images(db_path) == 1
+    finally:
+        connection.close()
+
+
+def test_batch_is_committed_before_browser_requests(pixivutil_db: sqlite3.Connection, temp_dir, monkeypatch):
+    mechanize = pytest.importorskip("mechanize")
+    from PixivServer.service.browser import flush_before_requests
+
+    monkeypatch.setattr(server_config, "database_write_batch_size", 100)
+    monkeypatch.setattr(server_config, "database_write_batch_seconds", 3600)
+    db_path = temp_dir / "db.sqlite"
+    pixivutil_db.execute("PRAGMA journal_mode=WAL")
+    # Images other connections see when a request goes out.
+    visible_at_request: list[int] = []
+
+    class RecordingHandler(mechanize.BaseHandler):
+        handler_order = 400
+
+        def http_open(self, request):
+            visible_at_request.append(count_images(db_path))
+            return mechanize.make_response("page", [], request.get_full_url())
+
+    browser = mechanize.Browser()
+    browser.set_handle_robots(False)
+    browser.add_handler(RecordingHandler())
+    connection = sqlite3.connect(db_path, factory=BatchingConnection)
+    flush_before_requests(browser, connection.flush)
+    flush_before_requests(browser, connection.flush)
+    try:
+        insert_image(connection, 1)
+        browser.open("http://www.pixiv.net/")
+        insert_image(connection, 2)
+        browser.open_novisit("http://i.pximg.net/image.png")
+    finally:
+        browser.close()
+        connection.close()
+    assert visible_at_request == [1, 2]